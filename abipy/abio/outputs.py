@@ -929,9 +929,7 @@ class AboRobot(Robot):
                 Each function receives a |GsrFile| object and returns a tuple (key, value)
                 where key is a string with the name of column and value is the value to be inserted.
         """
-        rows, row_names = [], []
-        for label, abo in self.items():
-            row_names.append(label)
+        def get_row(abo):
             d = OrderedDict()
 
             if with_dims:
@@ -944,9 +942,13 @@ class AboRobot(Robot):
             if with_geo and abo.run_completed:
                 d.update(abo.final_structure.get_dict4pandas(with_spglib=True))
 
-            # Execute functions
+            return d
+
+        rows = self._get_cached_results("get_dataframe%s" % str((with_geo, with_dims)), get_row)
+        row_names = []
+        for (label, abo), d in zip(self.items(), rows):
+            row_names.append(label)
             if funcs is not None: d.update(self._exec_funcs(funcs, abo))
-            rows.append(d)
 
         row_names = row_names if not abspath else self._to_relpaths(row_names)
         return pd.DataFrame(rows, index=row_names, columns=list(rows[0].keys()))
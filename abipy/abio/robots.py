@@ -7,10 +7,11 @@ import sys
 import os
 import inspect
 import itertools
+import threading
 import numpy as np
 
 from collections import OrderedDict, deque
-from functools import wraps
+from functools import wraps, lru_cache
 from monty.string import is_string, list_strings
 from monty.termcolor import cprint
 from abipy.core.mixins import NotebookWriter
@@ -19,6 +20,285 @@ from abipy.tools import duck
 from abipy.tools.plotting import (plot_xy_with_hue, add_fig_kwargs, get_ax_fig_plt, get_axarray_fig_plt,
     rotate_ticklabels, set_visible)
 
+import logging
+logger = logging.getLogger(__name__)
+
+
+# SQLite database used to cache the rows of the dataframes computed by the robots.
+# None (default) disables the cache. Use e.g.
+# set_summary_index_path(os.path.join(os.path.expanduser("~"), ".abinit", "abipy", "robots_index.sqlite"))
+_SUMMARY_INDEX_PATH = None
+
+
+def set_summary_index_path(new_path):
+    """
+    Change the path ``_SUMMARY_INDEX_PATH`` of the database used by the robots to cache
+    the rows of the dataframes. None disables the cache. Return old value.
+    """
+    global _SUMMARY_INDEX_PATH
+    old_path = _SUMMARY_INDEX_PATH
+    _SUMMARY_INDEX_PATH = new_path
+    return old_path
+
+
+@lru_cache()
+def _get_source_hash(modnames):
+    """
+    Return hash of the source code of the modules in the tuple ``modnames``.
+    Used to invalidate the entries of the |SummaryIndex| if the code producing the results changed.
+    """
+    import hashlib
+    h = hashlib.sha1(str(SummaryIndex.SCHEMA_VERSION).encode())
+    for modname in modnames:
+        path = getattr(sys.modules.get(modname), "__file__", None)
+        if path is None: continue
+        try:
+            with open(path, "rb") as fh:
+                h.update(fh.read())
+        except OSError:
+            pass
+
+    return h.hexdigest()[:12]
+
+
+class SummaryIndex(object):
+    """
+    SQLite database with the results extracted by the robots from the files (e.g. the rows of a dataframe).
+    Results are indexed by the absolute path of the file and by a tag identifying the robot method
+    and its arguments. An entry is valid only if the modification time and the size of the file did not change.
+    """
+    # Max number of parameters in a SQL query.
+    _CHUNK = 500
+
+    # Version of the format of the entries. Increase it to invalidate the old entries.
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path):
+        import sqlite3
+        dirname = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(dirname): os.makedirs(dirname)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS results (filepath TEXT, tag TEXT, "
+                              "mtime_ns INTEGER, size INTEGER, data BLOB, PRIMARY KEY (filepath, tag))")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def stat_key(filepath):
+        """Return (mtime_ns, size) of the file. None if file does not exist."""
+        try:
+            st = os.stat(filepath)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def get(self, stat_keys, tag):
+        """
+        Return dictionary filepath --> result with the valid entries.
+
+        Args:
+            stat_keys: dictionary filepath --> (mtime_ns, size) with the current stat of the files.
+            tag: String identifying the result.
+        """
+        import pickle
+        found = {}
+        filepaths = list(stat_keys.keys())
+        for start in range(0, len(filepaths), self._CHUNK):
+            chunk = filepaths[start:start + self._CHUNK]
+            query = ("SELECT filepath, mtime_ns, size, data FROM results WHERE tag = ? AND filepath IN (%s)" %
+                     ",".join("?" * len(chunk)))
+            for filepath, mtime_ns, size, data in self.conn.execute(query, [tag] + chunk):
+                if stat_keys[filepath] != (mtime_ns, size): continue
+                try:
+                    found[filepath] = pickle.loads(data)
+                except Exception as exc:
+                    logger.warning("Cannot unpickle result for %s: %s" % (filepath, str(exc)))
+
+        return found
+
+    def put(self, results, stat_keys, tag):
+        """
+        Save the results in the database.
+
+        Args:
+            results: dictionary filepath --> result. The result must be picklable.
+            stat_keys: dictionary filepath --> (mtime_ns, size) with the stat of the files
+                before computing the result.
+            tag: String identifying the result.
+        """
+        import pickle
+        records = []
+        for filepath, result in results.items():
+            try:
+                data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as exc:
+                logger.warning("Cannot pickle result for %s: %s" % (filepath, str(exc)))
+                continue
+            mtime_ns, size = stat_keys[filepath]
+            records.append((filepath, tag, mtime_ns, size, data))
+
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", records)
+
+
+def _read_abifile_meta(filepath):
+    """
+    Open the file with abiopen and return dictionary with the metadata cached by |LazyAbifile|.
+    None if the file is not supported by abiopen. Executed in the worker processes of the Robot.
+    """
+    from abipy.abilab import abiopen
+    abifile = abiopen(filepath)
+    if abifile is None: return None
+    with abifile:
+        meta = {"filepath": abifile.filepath, "filetype": abifile.__class__.__name__}
+        for aname in ("structure", "params"):
+            try:
+                meta[aname] = getattr(abifile, aname)
+            except Exception:
+                pass
+
+    return meta
+
+
+class OpenFilePool(object):
+    """
+    LRU pool with the files opened by the |LazyAbifile| objects of a |Robot|.
+    At most ``maxsize`` files are kept open, the least recently used file is closed
+    when a new file must be opened.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = max(int(maxsize), 1)
+        self._files = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._files)
+
+    def get(self, filepath):
+        """Return the abipy file associated to ``filepath``. Open it if needed."""
+        with self._lock:
+            abifile = self._files.pop(filepath, None)
+            if abifile is None:
+                from abipy.abilab import abiopen
+                abifile = abiopen(filepath)
+                if abifile is None:
+                    raise ValueError("abiopen does not support file: %s" % filepath)
+
+            self._files[filepath] = abifile
+            while len(self._files) > self.maxsize:
+                _, old = self._files.popitem(last=False)
+                self._close_file(old)
+
+            return abifile
+
+    def close(self, filepath):
+        """Close the file if it's in the pool."""
+        with self._lock:
+            abifile = self._files.pop(filepath, None)
+            if abifile is not None: self._close_file(abifile)
+
+    def close_all(self):
+        """Close all the files in the pool."""
+        with self._lock:
+            while self._files:
+                _, abifile = self._files.popitem(last=False)
+                self._close_file(abifile)
+
+    @staticmethod
+    def _close_file(abifile):
+        try:
+            abifile.close()
+        except Exception as exc:
+            print("Exception while closing: ", abifile.filepath)
+            print(exc)
+
+
+class LazyAbifile(object):
+    """
+    Proxy for an abipy file used by a |Robot| with ``max_open_files``.
+    The file is opened via the |OpenFilePool| of the robot when an attribute of the file is accessed
+    and it may be closed (and reopened on demand) when other files are accessed.
+    ``structure`` and ``params`` are read when the robot is built and do not require an open file.
+
+    .. note::
+
+        Objects computed by the file are not cached when the file is closed by the pool
+        and objects that keep a reference to the netcdf handle (e.g. ``abifile.reader``)
+        should not be used after accessing other files of the robot.
+    """
+
+    def __init__(self, filepath, meta=None, pool=None):
+        self._filepath = os.path.abspath(filepath)
+        self._meta = {} if meta is None else meta
+        self._pool = OpenFilePool(1) if pool is None else pool
+
+    def get_abifile(self):
+        """Return the abipy file. Open it if needed."""
+        return self._pool.get(self._filepath)
+
+    def __getattr__(self, name):
+        # Called only if the attribute is not found in the proxy.
+        # Don't forward special methods (e.g. pickle, copy) and the attributes of the proxy.
+        if name.startswith("__") or name in ("_filepath", "_meta", "_pool"): raise AttributeError(name)
+        return getattr(self.get_abifile(), name)
+
+    def __repr__(self):
+        return "<%s, %s>" % (self._meta.get("filetype", self.__class__.__name__), self.relpath)
+
+    def __str__(self):
+        return str(self.get_abifile())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def filepath(self):
+        """Absolute path of the file."""
+        return self._filepath
+
+    @property
+    def relpath(self):
+        """Relative path."""
+        try:
+            return os.path.relpath(self.filepath)
+        except OSError:
+            # current working directory may not be defined!
+            return self.filepath
+
+    @property
+    def basename(self):
+        """Basename of the file."""
+        return os.path.basename(self.filepath)
+
+    @property
+    def structure(self):
+        """|Structure| object."""
+        if "structure" in self._meta: return self._meta["structure"]
+        return self.get_abifile().structure
+
+    @property
+    def params(self):
+        """:class:`OrderedDict` with parameters that might be subject to convergence studies."""
+        if "params" in self._meta: return self._meta["params"]
+        return self.get_abifile().params
+
+    def close(self):
+        """Close the file (if open). The file will be reopened on demand."""
+        self._pool.close(self._filepath)
+
 
 class Robot(NotebookWriter):
     """
@@ -37,18 +317,33 @@ class Robot(NotebookWriter):
     # filepaths are relative to `start`. None for asbolute paths. This flag is set in trim_paths
     start = None
 
+    # Default maximum number of files kept open at the same time by the robot. None means no limit: files are
+    # opened when they are added and stay open until robot.close (default). If not None, the robot
+    # stores |LazyAbifile| proxies and the files are opened on demand via an |OpenFilePool|.
+    # Can be changed for a single robot with the ``max_open_files`` argument of the constructors.
+    max_open_files = None
+
+    # Default number of processes used to read the metadata of the files (structure, params) when
+    # the robot is built from directories or lists of files with max_open_files.
+    nprocs = 4
+
     # Used in iter_lineopt to generate matplotlib linestyles.
     _LINE_COLORS = ["b", "r", "g", "m", "y", "k", "c"]
     _LINE_STYLES = ["-", ":", "--", "-.",]
     _LINE_WIDTHS = [2, ]
 
-    def __init__(self, *args):
+    def __init__(self, *args, max_open_files=None, nprocs=None):
         """
         Args:
             args is a list of tuples (label, filepath)
+            max_open_files: Maximum number of files kept open at the same time. None to use the class default.
+            nprocs: Number of processes used to read the metadata of the files. None to use the class default.
         """
+        if max_open_files is not None: self.max_open_files = max_open_files
+        if nprocs is not None: self.nprocs = nprocs
         self._abifiles, self._do_close = OrderedDict(), OrderedDict()
         self._exceptions = deque(maxlen=100)
+        self._pool = None if self.max_open_files is None else OpenFilePool(self.max_open_files)
 
         for label, abifile in args:
             self.add_file(label, abifile)
@@ -77,7 +372,7 @@ class Robot(NotebookWriter):
                          str(cls.get_supported_extensions()))
 
     @classmethod
-    def from_dir(cls, top, walk=True, abspath=False):
+    def from_dir(cls, top, walk=True, abspath=False, max_open_files=None, nprocs=None):
         """
         This class method builds a robot by scanning all files located within directory `top`.
         This method should be invoked with a concrete robot class, for example:
@@ -88,29 +383,33 @@ class Robot(NotebookWriter):
             top (str): Root directory
             walk: if True, directories inside `top` are included as well.
             abspath: True if paths in index should be absolute. Default: Relative to `top`.
+            max_open_files: Maximum number of files kept open at the same time. None to use the class default.
+            nprocs: Number of processes used to read the metadata of the files. None to use the class default.
         """
-        new = cls(*cls._open_files_in_dir(top, walk))
+        new = cls(*cls._open_files_in_dir(top, walk, max_open_files=max_open_files, nprocs=nprocs),
+                  max_open_files=max_open_files, nprocs=nprocs)
         if not abspath: new.trim_paths(start=top)
         return new
 
     @classmethod
-    def from_dirs(cls, dirpaths, walk=True, abspath=False):
+    def from_dirs(cls, dirpaths, walk=True, abspath=False, max_open_files=None, nprocs=None):
         """
         Similar to `from_dir` but accepts a list of directories instead of a single directory.
 
         Args:
             walk: if True, directories inside `top` are included as well.
             abspath: True if paths in index should be absolute. Default: Relative to `top`.
+            max_open_files, nprocs: See `from_dir`.
         """
         items = []
         for top in list_strings(dirpaths):
-            items.extend(cls._open_files_in_dir(top, walk))
-        new = cls(*items)
+            items.extend(cls._open_files_in_dir(top, walk, max_open_files=max_open_files, nprocs=nprocs))
+        new = cls(*items, max_open_files=max_open_files, nprocs=nprocs)
         if not abspath: new.trim_paths(start=os.getcwd())
         return new
 
     @classmethod
-    def from_dir_glob(cls, pattern, walk=True, abspath=False):
+    def from_dir_glob(cls, pattern, walk=True, abspath=False, max_open_files=None, nprocs=None):
         """
         This class method builds a robot by scanning all files located within the directories
         matching `pattern` as implemented by glob.glob
@@ -122,36 +421,80 @@ class Robot(NotebookWriter):
             pattern: Pattern string
             walk: if True, directories inside `top` are included as well.
             abspath: True if paths in index should be absolute. Default: Relative to getcwd().
+            max_open_files, nprocs: See `from_dir`.
         """
         import glob
         items = []
         for top in filter(os.path.isdir, glob.iglob(pattern)):
-            items += cls._open_files_in_dir(top, walk=walk)
-        new = cls(*items)
+            items += cls._open_files_in_dir(top, walk=walk, max_open_files=max_open_files, nprocs=nprocs)
+        new = cls(*items, max_open_files=max_open_files, nprocs=nprocs)
         if not abspath: new.trim_paths(start=os.getcwd())
         return new
 
     @classmethod
-    def _open_files_in_dir(cls, top, walk):
+    def _open_files_in_dir(cls, top, walk, max_open_files=None, nprocs=None):
         """Open files in directory tree starting from `top`. Return list of Abinit files."""
         if not os.path.isdir(top):
             raise ValueError("%s: no such directory" % str(top))
-        from abipy.abilab import abiopen
-        items = []
+        filepaths = []
         if walk:
             for dirpath, dirnames, filenames in os.walk(top):
                 filenames = [f for f in filenames if cls.class_handles_filename(f)]
-                for f in filenames:
-                    abifile = abiopen(os.path.join(dirpath, f))
-                    if abifile is not None: items.append((abifile.filepath, abifile))
+                filepaths.extend(os.path.join(dirpath, f) for f in filenames)
         else:
             filenames = [f for f in os.listdir(top) if cls.class_handles_filename(f)]
-            for f in filenames:
-                abifile = abiopen(os.path.join(top, f))
-                if abifile is not None: items.append((abifile.filepath, abifile))
+            filepaths.extend(os.path.join(top, f) for f in filenames)
+
+        items = []
+        for abifile in cls._open_files(filepaths, max_open_files=max_open_files, nprocs=nprocs):
+            if isinstance(abifile, Exception): raise abifile
+            if abifile is not None: items.append((abifile.filepath, abifile))
 
         return items
 
+    @classmethod
+    def _open_files(cls, filepaths, max_open_files=None, nprocs=None):
+        """
+        Open a list of files. Return list with the abipy files (or |LazyAbifile| if ``max_open_files``
+        is not None) in the same order as filepaths. The list contains None if the file is not supported
+        by abiopen and the exception if the file cannot be opened.
+        ``max_open_files`` and ``nprocs`` default to the class attributes if None.
+        """
+        from abipy.abilab import abiopen
+        if max_open_files is None: max_open_files = cls.max_open_files
+        if nprocs is None: nprocs = cls.nprocs
+        if max_open_files is None:
+            # Open all the files.
+            abifiles = []
+            for f in filepaths:
+                try:
+                    abifiles.append(abiopen(f))
+                except Exception as exc:
+                    abifiles.append(exc)
+            return abifiles
+
+        # Read the metadata in parallel. Files are closed and will be opened on demand.
+        if nprocs > 1 and len(filepaths) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(nprocs, len(filepaths))) as executor:
+                futures = [executor.submit(_read_abifile_meta, f) for f in filepaths]
+                metas = []
+                for future in futures:
+                    try:
+                        metas.append(future.result())
+                    except Exception as exc:
+                        metas.append(exc)
+        else:
+            metas = []
+            for f in filepaths:
+                try:
+                    metas.append(_read_abifile_meta(f))
+                except Exception as exc:
+                    metas.append(exc)
+
+        return [meta if meta is None or isinstance(meta, Exception) else LazyAbifile(meta["filepath"], meta=meta)
+                for meta in metas]
+
     @classmethod
     def class_handles_filename(cls, filename):
         """True if robot class handles filename."""
@@ -163,31 +506,30 @@ class Robot(NotebookWriter):
                 filename.endswith("." + cls.EXT))  # This for .abo
 
     @classmethod
-    def from_files(cls, filenames, labels=None, abspath=False):
+    def from_files(cls, filenames, labels=None, abspath=False, max_open_files=None, nprocs=None):
         """
         Build a Robot from a list of `filenames`.
         if labels is None, labels are automatically generated from absolute paths.
 
         Args:
             abspath: True if paths in index should be absolute. Default: Relative to `top`.
+            max_open_files, nprocs: See `from_dir`.
         """
         filenames = list_strings(filenames)
-        from abipy.abilab import abiopen
         filenames = [f for f in filenames if cls.class_handles_filename(f)]
+        abifiles = cls._open_files(filenames, max_open_files=max_open_files, nprocs=nprocs)
         items = []
-        for i, f in enumerate(filenames):
-            try:
-                abifile = abiopen(f)
-            except Exception as exc:
+        for i, (f, abifile) in enumerate(zip(filenames, abifiles)):
+            if isinstance(abifile, Exception):
                 cprint("Exception while opening file: `%s`" % str(f), "red")
-                cprint(exc, "red")
+                cprint(abifile, "red")
                 abifile = None
 
             if abifile is not None:
                 label = abifile.filepath if labels is None else labels[i]
                 items.append((label, abifile))
 
-        new = cls(*items)
+        new = cls(*items, max_open_files=max_open_files, nprocs=nprocs)
         if labels is None and not abspath: new.trim_paths(start=None)
         return new
 
@@ -298,7 +640,8 @@ class Robot(NotebookWriter):
             Number of files found.
         """
         count = 0
-        for filepath, abifile in self.__class__._open_files_in_dir(top, walk):
+        for filepath, abifile in self._open_files_in_dir(top, walk,
+                                                         max_open_files=self.max_open_files, nprocs=self.nprocs):
             count += 1
             self.add_file(filepath, abifile)
 
@@ -316,8 +659,11 @@ class Robot(NotebookWriter):
                 True if the file should be added to the plotter.
         """
         if is_string(abifile):
-            from abipy.abilab import abiopen
-            abifile = abiopen(abifile)
+            if self._pool is not None:
+                abifile = LazyAbifile(abifile, pool=self._pool)
+            else:
+                from abipy.abilab import abiopen
+                abifile = abiopen(abifile)
             if filter_abifile is not None and not filter_abifile(abifile):
                 abifile.close()
                 return
@@ -328,6 +674,11 @@ class Robot(NotebookWriter):
         if label in self._abifiles:
             raise ValueError("label %s is already present!" % label)
 
+        if isinstance(abifile, LazyAbifile) and self._pool is not None:
+            # Use the pool of the robot. The file is handled by the robot --> have to close it.
+            abifile._pool = self._pool
+            self._do_close[abifile.filepath] = True
+
         self._abifiles[label] = abifile
 
     #def pop_filepath(self, filepath):
@@ -697,6 +1048,8 @@ Expecting callable or attribute name or key in abifile.params""" % (type(hue), s
                     print("Exception while closing: ", abifile.filepath)
                     print(exc)
 
+        if self._pool is not None: self._pool.close_all()
+
     #@classmethod
     #def open(cls, obj, nids=None, **kwargs):
     #    """
@@ -737,6 +1090,58 @@ Expecting callable or attribute name or key in abifile.params""" % (type(hue), s
     #    else:
     #        return list(od.values())
 
+    def _get_cached_results(self, tag, func, prefetch=None):
+        """
+        Return list with the results of ``func(abifile)`` for the files in the robot (same order as items).
+        Results are read from the summary index (see set_summary_index_path) if the file did not change
+        since the previous call and only new or modified files are analyzed. Results must be picklable.
+        Only the data extracted from the files should be cached: user-supplied functions
+        (e.g. ``funcs`` in ``get_dataframe``) are not part of the tag and must be executed by the caller.
+
+        Args:
+            tag: String identifying the function and its arguments. The name of the class,
+                the version of AbiPy and a hash of the source code of the modules defining the robot
+                and func are added automatically.
+            func: Function receiving an abifile.
+            prefetch: Optional function receiving the list of abifiles that must be analyzed
+                before calling ``func``. Can be used to precompute (e.g. in parallel) the data needed by func.
+        """
+        abifiles = self.abifiles
+        if _SUMMARY_INDEX_PATH is None or not abifiles:
+            if prefetch is not None and abifiles: prefetch(abifiles)
+            return [func(abifile) for abifile in abifiles]
+
+        import sqlite3
+        from abipy.core.release import __version__
+        modnames = tuple(sorted({__name__, self.__class__.__module__, getattr(func, "__module__", None) or __name__}))
+        tag = "%s.%s@%s:%s" % (self.__class__.__name__, tag, __version__, _get_source_hash(modnames))
+        stat_keys = OrderedDict()
+        for abifile in abifiles:
+            key = SummaryIndex.stat_key(abifile.filepath)
+            if key is not None: stat_keys[abifile.filepath] = key
+
+        try:
+            with SummaryIndex(_SUMMARY_INDEX_PATH) as index:
+                found = index.get(stat_keys, tag)
+                if prefetch is not None:
+                    todo = [abifile for abifile in abifiles if abifile.filepath not in found]
+                    if todo: prefetch(todo)
+                new = {}
+                results = []
+                for abifile in abifiles:
+                    if abifile.filepath in found:
+                        results.append(found[abifile.filepath])
+                    else:
+                        results.append(func(abifile))
+                        if abifile.filepath in stat_keys: new[abifile.filepath] = results[-1]
+
+                if new: index.put(new, stat_keys, tag)
+                return results
+
+        except (sqlite3.Error, OSError) as exc:
+            logger.warning("Error in summary index %s: %s. Cache is ignored." % (_SUMMARY_INDEX_PATH, str(exc)))
+            return [func(abifile) for abifile in abifiles]
+
     def _exec_funcs(self, funcs, arg):
         """
         Execute list of callable functions. Each function receives arg as argument.
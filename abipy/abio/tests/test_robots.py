@@ -3,10 +3,11 @@
 import sys
 import os
 import abipy.data as abidata
+import numpy as np
 import abipy.abilab as abilab
 
 from abipy.core.testing import AbipyTest
-from abipy.abio.robots import Robot
+from abipy.abio.robots import Robot, LazyAbifile, SummaryIndex, set_summary_index_path, _get_source_hash
 
 
 class RobotTest(AbipyTest):
@@ -36,3 +37,104 @@ class RobotTest(AbipyTest):
 
         if self.has_nbformat():
             assert robot.get_baserobot_code_cells()
+
+    def test_robot_with_max_open_files(self):
+        """Testing robot with lazy files and bounded pool of open files."""
+        filepaths = [os.path.join(abidata.dirpath, "refs", "si_qha", "mp-149_%s_GSR.nc" % s)
+                     for s in ("-2", "+0", "+2")]
+
+        ref_robot = abilab.GsrRobot.from_files(filepaths, abspath=True)
+        ref_df = ref_robot.get_dataframe()
+
+        for nprocs in (1, 2):
+            with abilab.GsrRobot.from_files(filepaths, abspath=True, max_open_files=2, nprocs=nprocs) as robot:
+                # Options are stored in the instance, the class defaults are not changed.
+                assert robot.max_open_files == 2 and robot.nprocs == nprocs
+                assert abilab.GsrRobot.max_open_files is None
+                assert len(robot) == 3
+                assert all(isinstance(abifile, LazyAbifile) for abifile in robot.abifiles)
+                # Structure and params are read when the robot is built.
+                assert len(robot._pool) == 0
+                assert robot.abifiles[0].structure.formula == ref_robot.abifiles[0].structure.formula
+                assert robot.abifiles[0].params == ref_robot.abifiles[0].params
+                assert robot.has_different_structures() == ref_robot.has_different_structures()
+                assert len(robot._pool) == 0
+
+                # Files are opened on demand and at most max_open_files are kept open.
+                assert robot.labels == ref_robot.labels
+                df = robot.get_dataframe()
+                for abifile in robot.abifiles:
+                    assert abifile.energy is not None
+                assert len(robot._pool) == 2
+                self.assert_equal(df["energy"].values, ref_df["energy"].values)
+                labels, abifiles, params = robot.sortby(lambda f: f.energy, reverse=True, unpack=True)
+                assert labels == ref_robot.sortby(lambda f: f.energy, reverse=True, unpack=True)[0]
+                assert robot.abifiles[0].ebands.nkpt == ref_robot.abifiles[0].ebands.nkpt
+                assert str(robot)
+
+            assert len(robot._pool) == 0
+
+        # Lazy robot built from a directory.
+        with abilab.GsrRobot.from_dir(os.path.join(abidata.dirpath, "refs", "si_qha"),
+                                      max_open_files=1, nprocs=1) as robot:
+            assert len(robot) == 6
+            assert all(isinstance(abifile, LazyAbifile) for abifile in robot.abifiles)
+            assert robot.abifiles[0].energy is not None
+            assert len(robot._pool) == 1
+
+        ref_robot.close()
+
+    def test_summary_index(self):
+        """Testing the summary index used to cache the dataframes of the robots."""
+        import shutil
+        tmpdir = self.mkdtemp()
+        filepaths = []
+        for s in ("-2", "+0", "+2"):
+            src = os.path.join(abidata.dirpath, "refs", "si_qha", "mp-149_%s_GSR.nc" % s)
+            filepaths.append(shutil.copy(src, tmpdir))
+
+        old_path = set_summary_index_path(None)
+        try:
+            with abilab.GsrRobot.from_files(filepaths) as robot:
+                ref_df = robot.get_dataframe()
+
+                set_summary_index_path(os.path.join(tmpdir, "index.sqlite"))
+                for i in range(2):
+                    # The second time the rows are read from the index.
+                    df = robot.get_dataframe(funcs=lambda gsr: ("foo", 1))
+                    assert list(df.columns) == list(ref_df.columns) + ["foo"] and all(df["foo"] == 1)
+                    assert list(df.index) == list(ref_df.index)
+                    for aname in ("energy", "pressure", "volume", "spglib_num"):
+                        self.assert_almost_equal(np.array(df[aname], dtype=float),
+                                                 np.array(ref_df[aname], dtype=float))
+
+                # Only new or modified files are analyzed.
+                calls = []
+                def func(abifile):
+                    calls.append(abifile.filepath)
+                    return abifile.energy
+
+                energies = robot._get_cached_results("energy", func)
+                assert len(calls) == 3
+                assert robot._get_cached_results("energy", func) == energies and len(calls) == 3
+                st = os.stat(filepaths[1])
+                os.utime(filepaths[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+                assert robot._get_cached_results("energy", func) == energies
+                assert calls[3:] == [os.path.abspath(filepaths[1])]
+
+                # Entries are invalidated if the code producing the results changes.
+                old_version = SummaryIndex.SCHEMA_VERSION
+                try:
+                    SummaryIndex.SCHEMA_VERSION += 1
+                    _get_source_hash.cache_clear()
+                    assert robot._get_cached_results("energy", func) == energies
+                    assert len(calls) == 7
+                finally:
+                    SummaryIndex.SCHEMA_VERSION = old_version
+                    _get_source_hash.cache_clear()
+
+                with SummaryIndex(os.path.join(tmpdir, "index.sqlite")) as index:
+                    stat_keys = {robot.abifiles[0].filepath: SummaryIndex.stat_key(robot.abifiles[0].filepath)}
+                    assert len(index.get(stat_keys, "foo")) == 0
+        finally:
+            set_summary_index_path(old_path)
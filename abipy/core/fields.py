@@ -704,29 +704,30 @@ class Density(_DensityField):
                         total /= (nnx*nny*nnz)
                         core_den[0, igp_uc[0], igp_uc[1], igp_uc[2]] += total
         elif method == 'mesh3d_dist_gridpoints':
-            import time
             site_coords = [site.coords for site in structure]
-            start = time.time()
-            dist_gridpoints_sites = valence_density.mesh.dist_gridpoints_in_spheres(points=site_coords, radius=maxr)
+            gps = valence_density.mesh.get_gridpoints_in_spheres(points=site_coords, radius=maxr)
             nnx, nny, nnz = small_dist_mesh
             meshgrid = np.meshgrid(np.linspace(-0.5, 0.5, nnx, endpoint=False) + 0.5 / nnx,
                                    np.linspace(-0.5, 0.5, nny, endpoint=False) + 0.5 / nny,
                                    np.linspace(-0.5, 0.5, nnz, endpoint=False) + 0.5 / nnz)
             coords_grid = np.outer(meshgrid[0], dvx) + np.outer(meshgrid[1], dvy) + np.outer(meshgrid[2], dvz)
-            for isite, dist_gridpoints_site in enumerate(dist_gridpoints_sites):
-                for igp_uc, dist, igp in dist_gridpoints_site:
-                    if dist > smallradius:
-                        core_den[0, igp_uc[0], igp_uc[1], igp_uc[2]] += rhoc_atom_splines[isite](dist)
-                    # For small distances, integrate over the small volume dv around the point as the core density
-                    # is extremely high close to the atom
-                    else:
-                        total = 0.0
-                        rpoint = valence_density.mesh.rpoint(ix=igp[0], iy=igp[1], iz=igp[2])
-                        grid_loc = rpoint + coords_grid
-                        distances = np.linalg.norm(grid_loc-site_coords[isite], axis=1)
-                        total = np.sum(rhoc_atom_splines[isite](distances))
-                        total /= (nnx*nny*nnz)
-                        core_den[0, igp_uc[0], igp_uc[1], igp_uc[2]] += total
+            dvs = np.array([dvx, dvy, dvz])
+            for isite in range(len(structure)):
+                sl = slice(gps.ptr[isite], gps.ptr[isite + 1])
+                dists = gps.dists[sl]
+                values = np.empty(len(dists))
+                far = dists > smallradius
+                values[far] = rhoc_atom_splines[isite](dists[far])
+                # For small distances, integrate over the small volume dv around the point as the core density
+                # is extremely high close to the atom
+                near = ~far
+                if np.any(near):
+                    rpoints = np.dot(gps.inds[sl][near], dvs)
+                    grid_loc = rpoints[:, np.newaxis, :] + coords_grid
+                    distances = np.linalg.norm(grid_loc - site_coords[isite], axis=-1)
+                    values[near] = np.mean(rhoc_atom_splines[isite](distances), axis=1)
+                inds_uc = gps.inds_uc[sl]
+                np.add.at(core_den[0], (inds_uc[:, 0], inds_uc[:, 1], inds_uc[:, 2]), values)
 
         elif method == 'get_sites_in_sphere':
             nnx, nny, nnz = small_dist_mesh
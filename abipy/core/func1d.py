@@ -378,7 +378,7 @@ class Function1D(object):
     #    smooth_vals = smooth(self.values, window_len=window_len, window=window)
     #    return self.__class__(self.mesh, smooth_vals)
 
-    def real_from_kk(self, with_div=True):
+    def real_from_kk(self, with_div=True, method="fft", tail=None):
         """
         Compute the Kramers-Kronig transform of the imaginary part
         to get the real part. Assume self represents the Fourier
@@ -387,10 +387,21 @@ class Function1D(object):
         Args:
             with_div: True if the divergence should be treated numerically.
                 If False, the divergence is ignored, results are less accurate
-                but the calculation is faster.
+                but the calculation is faster. Used only if method == "quad".
+            method: "fft" to compute the principal value with FFT convolutions in O(N log N)
+                (see :func:`abipy.tools.numtools.kk_real_from_imag`). Requires a linear mesh with non-negative
+                frequencies else "quad" is used. "quad" for the O(N^2) quadrature.
+            tail: Exponent of the power law used to extrapolate the function beyond the end of the mesh.
+                None to truncate the integral. Used only if method == "fft", see :func:`abipy.tools.numtools.kk_real_from_imag`.
 
         .. seealso:: <https://en.wikipedia.org/wiki/Kramers%E2%80%93Kronig_relations>
         """
+        if method == "fft" and self.h is not None and self.mesh[0] >= 0:
+            from abipy.tools.numtools import kk_real_from_imag
+            return self.__class__(self.mesh, kk_real_from_imag(self.mesh, self.values.imag, tail=tail))
+        if method not in ("fft", "quad"):
+            raise ValueError("Invalid method: %s" % str(method))
+
         from scipy.integrate import cumtrapz, quad
         from scipy.interpolate import UnivariateSpline
         wmesh = self.mesh
@@ -418,7 +429,7 @@ class Function1D(object):
 
         return self.__class__(self.mesh, (2 / np.pi) * kk_values)
 
-    def imag_from_kk(self, with_div=True):
+    def imag_from_kk(self, with_div=True, method="fft", tail=None):
         """
         Compute the Kramers-Kronig transform of the real part
         to get the imaginary part. Assume self represents the Fourier
@@ -427,10 +438,21 @@ class Function1D(object):
         Args:
             with_div: True if the divergence should be treated numerically.
                 If False, the divergence is ignored, results are less accurate
-                but the calculation is faster.
+                but the calculation is faster. Used only if method == "quad".
+            method: "fft" to compute the principal value with FFT convolutions in O(N log N)
+                (see :func:`abipy.tools.numtools.kk_imag_from_real`). Requires a linear mesh with non-negative
+                frequencies else "quad" is used. "quad" for the O(N^2) quadrature.
+            tail: Exponent of the power law used to extrapolate the function beyond the end of the mesh.
+                None to truncate the integral. Used only if method == "fft", see :func:`abipy.tools.numtools.kk_imag_from_real`.
 
         .. seealso:: <https://en.wikipedia.org/wiki/Kramers%E2%80%93Kronig_relations>
         """
+        if method == "fft" and self.h is not None and self.mesh[0] >= 0:
+            from abipy.tools.numtools import kk_imag_from_real
+            return self.__class__(self.mesh, kk_imag_from_real(self.mesh, self.values.real, tail=tail))
+        if method not in ("fft", "quad"):
+            raise ValueError("Invalid method: %s" % str(method))
+
         from scipy.integrate import cumtrapz, quad
         from scipy.interpolate import UnivariateSpline
         wmesh = self.mesh
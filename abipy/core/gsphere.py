@@ -31,9 +31,23 @@ class GSphere(collections.abc.Sequence):
         self._gvecs = np.reshape(np.array(gvecs), (-1, 3))
         self.npw = self.gvecs.shape[0]
 
-        self.istwfk = istwfk
-        if istwfk != 1:
-            raise NotImplementedError("istwfk %d is not implemented" % self.istwfk)
+        self.istwfk = int(istwfk)
+        if not 1 <= self.istwfk <= 9:
+            raise ValueError("Invalid value for istwfk: %s" % str(istwfk))
+
+        # Cache with the FFT indices of the G-vectors. Indexed by mesh.shape
+        self._fft_inds = {}
+
+    @property
+    def g0(self):
+        """
+        Reduced coordinates of the reciprocal lattice vector G0 such that 2k = G0.
+        For ``istwfk > 1``, only half of the coefficients are stored and the missing ones
+        are obtained from :math:`u(-G-G0) = u(G)^*`.
+        """
+        b = self.istwfk - 2
+        if b < 0: return None
+        return np.array([b & 1, (b >> 2) & 1, (b >> 1) & 1])
 
     @property
     def gvecs(self):
@@ -65,16 +79,14 @@ class GSphere(collections.abc.Sequence):
         return the index of the G-vector ``gvec`` in self.
         Raises: `ValueError` if the value is not present.
         """
-        gvec = np.asarray(gvec)
-        for i, g in enumerate(self):
-            if np.all(g == gvec):
-                return i
-        else:
+        inds = np.nonzero(np.all(self.gvecs == np.asarray(gvec), axis=1))[0]
+        if len(inds) == 0:
             raise ValueError("Cannot find %s in Gsphere" % str(gvec))
+        return inds[0]
 
     def count(self, gvec):
         """Return number of occurrences of gvec."""
-        return np.count_nonzero(np.all(g == gvec) for g in self)
+        return np.count_nonzero(np.all(self.gvecs == np.asarray(gvec), axis=1))
 
     def __str__(self):
         return self.to_string()
@@ -144,77 +156,67 @@ class GSphere(collections.abc.Sequence):
     #  """Returns the number of divisions of the FFT box enclosing the sphere."""
     #  #return ndivs
 
+    def get_fft_inds(self, mesh):
+        """
+        Return the indices of the G-vectors in the flattened FFT ``mesh``.
+        If ``istwfk > 1``, return a tuple (inds, cinds) where cinds are the indices of -G-G0.
+        The indices are computed once and cached for each mesh shape.
+        """
+        shape = tuple(mesh.shape)
+        if shape not in self._fft_inds:
+            ndivs = np.array(shape)
+            if np.any(self.gvecs >= ndivs) or np.any(self.gvecs < -ndivs):
+                raise ValueError("FFT mesh %s is too small for the G-sphere" % str(shape))
+            inds = np.ravel_multi_index((self.gvecs % ndivs).T, shape)
+            if self.istwfk != 1:
+                cinds = np.ravel_multi_index(((-self.gvecs - self.g0) % ndivs).T, shape)
+                inds = (inds, cinds)
+            self._fft_inds[shape] = inds
+
+        return self._fft_inds[shape]
+
     def tofftmesh(self, mesh, arr_on_sphere):
         """
         Insert the array ``arr_on_sphere`` given on the sphere inside the FFT mesh.
+        If ``istwfk > 1``, the coefficients not stored on the sphere are reconstructed
+        from time-reversal symmetry.
 
         Args:
-            mesh:
-            arr_on_sphere:
+            mesh: |Mesh3D| object.
+            arr_on_sphere: Array of shape [..., npw].
         """
         arr_on_sphere = np.atleast_2d(arr_on_sphere)
         ishape = arr_on_sphere.shape
-        s0 = ishape[0]
         assert self.npw == ishape[-1]
+        arr_on_sphere = np.reshape(arr_on_sphere, (-1, self.npw))
 
-        arr_on_mesh = np.zeros((s0,) + mesh.shape, dtype=arr_on_sphere.dtype)
+        arr_on_mesh = np.zeros((arr_on_sphere.shape[0], mesh.size), dtype=arr_on_sphere.dtype)
 
         if self.istwfk == 1:
-            #do ipw=1,npw
-            #  i1=kg_k(1,ipw); if(i1<0)i1=i1+n1; i1=i1+1
-            #  i2=kg_k(2,ipw); if(i2<0)i2=i2+n2; i2=i2+1
-            #  i3=kg_k(3,ipw); if(i3<0)i3=i3+n3; i3=i3+1
-            #end do
-
-            n1, n2, n3 = mesh.shape
-            for sph_idx, gvec in enumerate(self.gvecs):
-                i1 = gvec[0]
-                if i1 < 0: i1 = i1 + n1
-                i2 = gvec[1]
-                if i2 < 0: i2 = i2 + n2
-                i3 = gvec[2]
-                if i3 < 0: i3 = i3 + n3
-                arr_on_mesh[..., i1, i2, i3] = arr_on_sphere[..., sph_idx]
-
+            arr_on_mesh[:, self.get_fft_inds(mesh)] = arr_on_sphere
         else:
-            raise NotImplementedError("istwfk = %s not implemented" % self.istwfk)
+            inds, cinds = self.get_fft_inds(mesh)
+            # Fill u(-G-G0) first so that the stored value wins for self-conjugate G-vectors.
+            arr_on_mesh[:, cinds] = arr_on_sphere.conj()
+            arr_on_mesh[:, inds] = arr_on_sphere
 
-        if s0 == 1:
+        if ishape[:-1] == (1,):
             # Reinstate input shape
-            arr_on_mesh.shape = mesh.shape
+            return np.reshape(arr_on_mesh, mesh.shape)
 
-        return arr_on_mesh
+        return np.reshape(arr_on_mesh, ishape[:-1] + mesh.shape)
 
     def fromfftmesh(self, mesh, arr_on_mesh):
         """
         Transfer ``arr_on_mesh`` given on the FFT mesh to the G-sphere.
         """
         indim = arr_on_mesh.ndim
-        arr_on_mesh = mesh.reshape(arr_on_mesh)
-        ishape = arr_on_mesh.shape
-        s0 = ishape[0]
-
-        arr_on_sphere = np.empty((s0,) + (self.npw,), dtype=arr_on_mesh.dtype)
+        arr_on_mesh = np.reshape(arr_on_mesh, (-1, mesh.size))
+        s0 = arr_on_mesh.shape[0]
 
-        if self.istwfk == 1:
-            #do ig=1,npwout
-            #  i1=kg_kout(1,ig); if (i1<0) i1=i1+n1; i1=i1+1
-            #  i2=kg_kout(2,ig); if (i2<0) i2=i2+n2; i2=i2+1
-            #  i3=kg_kout(3,ig); if (i3<0) i3=i3+n3; i3=i3+1
-            #end do
-            n1, n2, n3 = mesh.shape
-
-            for sph_idx, gvec in enumerate(self.gvecs):
-                i1 = gvec[0]
-                if i1 < 0: i1 = i1 + n1
-                i2 = gvec[1]
-                if i2 < 0: i2 = i2 + n2
-                i3 = gvec[2]
-                if i3 < 0: i3 = i3 + n3
-                arr_on_sphere[..., sph_idx] = arr_on_mesh[..., i1, i2, i3]
-
-        else:
-            raise NotImplementedError("istwfk %s is not implemented" % self.istwfk)
+        inds = self.get_fft_inds(mesh)
+        if self.istwfk != 1: inds = inds[0]
+        arr_on_sphere = arr_on_mesh[:, inds]
 
         if s0 == 1 and indim == 1:
             # Reinstate input shape
@@ -222,6 +224,21 @@ class GSphere(collections.abc.Sequence):
 
         return arr_on_sphere
 
+    def vdot(self, arr1, arr2):
+        """
+        Scalar product of two arrays given on the sphere. Take into account
+        the coefficients that are not stored if ``istwfk > 1``.
+        """
+        if self.istwfk == 1:
+            return np.vdot(arr1, arr2)
+
+        # u(G) and u(-G-G0) contribute twice unless G == -G-G0
+        selfc = np.all(2 * self.gvecs == -self.g0, axis=1)
+        arr1 = np.reshape(arr1, (-1, self.npw))
+        arr2 = np.reshape(arr2, (-1, self.npw))
+        prod = (arr1.conj() * arr2)
+        return 2 * prod.real.sum() - prod[:, selfc].real.sum()
+
     #def rotate(self, symmop):
     #    """
     #    Returns a new `GSphere` centered on Sk.
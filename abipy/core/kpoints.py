@@ -1,7 +1,11 @@
 # coding: utf-8
 """This module defines objects describing the sampling of the Brillouin Zone."""
+import builtins
 import collections
+import hashlib
 import json
+import operator
+import os
 import sys
 import time
 import numpy as np
@@ -45,6 +49,10 @@ _ATOL_KDIFF = 1e-8
 _SPGLIB_SYMPREC = 1e-5
 _SPGLIB_ANGLE_TOLERANCE = -1.0
 
+# Directory used to cache the k-meshes computed by spglib. None (default) disables the cache.
+# Use e.g. set_kmesh_cache_dir(os.path.join(os.path.expanduser("~"), ".abinit", "abipy", "kmesh_cache"))
+_KMESH_CACHE_DIR = None
+
 
 def set_atol_kdiff(new_atol):
     """
@@ -76,6 +84,70 @@ def set_spglib_tols(symprec, angle_tolerance):
     return old_symprec, old_angle_tolerance
 
 
+def set_kmesh_cache_dir(new_dir):
+    """
+    Change the directory ``_KMESH_CACHE_DIR`` used to cache the k-meshes computed by spglib.
+    None disables the cache. Return old value.
+    """
+    global _KMESH_CACHE_DIR
+    old_dir = _KMESH_CACHE_DIR
+    _KMESH_CACHE_DIR = new_dir
+    return old_dir
+
+
+def get_ir_reciprocal_mesh(cell, mesh, is_shift, has_timrev, symprec=None):
+    """
+    Call spglib to compute the irreducible k-points of the ``mesh``.
+    If ``_KMESH_CACHE_DIR`` is not None (see set_kmesh_cache_dir), results are cached with a key
+    computed from the cell, mesh, shift, time-reversal and tolerance so that repeated calls
+    for the same crystal do not call spglib again.
+
+    Args:
+        cell: (lattice, frac_coords, atomic_numbers) tuple (spglib API).
+        mesh: Three integers with the number of divisions.
+        is_shift: three integers (spglib API). None means unshifted mesh.
+        has_timrev: True if time-reversal can be used.
+        symprec: Tolerance passed to spglib. Use _SPGLIB_SYMPREC if None.
+
+    Return:
+        (mapping, grid) as returned by spglib.get_ir_reciprocal_mesh.
+    """
+    import spglib as spg
+    if symprec is None: symprec = _SPGLIB_SYMPREC
+    mesh = np.array(mesh, dtype=np.int)
+
+    path = None
+    if _KMESH_CACHE_DIR is not None:
+        h = hashlib.sha1()
+        for arr in cell[:3]:
+            h.update(np.ascontiguousarray(arr, dtype=np.float).tobytes())
+        h.update(repr((mesh.tolist(), None if is_shift is None else list(map(int, is_shift)),
+                       bool(has_timrev), float(symprec), spg.__version__)).encode())
+        path = os.path.join(_KMESH_CACHE_DIR, h.hexdigest() + ".npz")
+        if os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    return data["mapping"], data["grid"]
+            except Exception as exc:
+                logger.warning("Cannot read k-mesh from cache file %s:\n%s" % (path, str(exc)))
+
+    mapping, grid = spg.get_ir_reciprocal_mesh(mesh, cell,
+        is_shift=is_shift, is_time_reversal=has_timrev, symprec=symprec)
+
+    if path is not None:
+        # Write to temporary file and rename so that other processes never read partial data.
+        try:
+            os.makedirs(_KMESH_CACHE_DIR, exist_ok=True)
+            tmp_path = path + ".%d.tmp" % os.getpid()
+            with open(tmp_path, "wb") as fh:
+                np.savez(fh, mapping=mapping, grid=grid)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Cannot write k-mesh to cache file %s:\n%s" % (path, str(exc)))
+
+    return mapping, grid
+
+
 def is_integer(x, atol=None):
     """
     True if all x is integer within the absolute tolerance atol.
@@ -222,20 +294,22 @@ def map_grid2ibz(structure, ibz, ngkpt, has_timrev, pbc=False):
         raise ValueError("Structure does not contain Abinit spacegroup info!")
 
     # Extract rotations in reciprocal space (FM part).
-    symrec_fm = [o.rot_g for o in abispg.fm_symmops]
-
-    # Compute TS k_ibz.
+    symrec_fm = np.array([o.rot_g for o in abispg.fm_symmops], dtype=np.int)
+
+    # Compute TS k_ibz for all the points in the IBZ and all the symmetries at once.
+    # rot_gp has shape [nibz, nsym, ntsign, 3]
+    gp_ibz = np.array(np.rint(np.reshape(ibz, (-1, 3)) * ngkpt), dtype=np.int)
+    rot_gp = np.einsum("sij,kj->ksi", symrec_fm, gp_ibz)
+    tsigns = np.array((1, -1) if has_timrev else (1,))
+    rot_gp = rot_gp[:, :, None, :] * tsigns[None, None, :, None]
+    gp_bz = np.reshape(rot_gp % ngkpt, (-1, 3))
+    ids = (gp_bz[:, 0] * ngkpt[1] + gp_bz[:, 1]) * ngkpt[2] + gp_bz[:, 2]
+    ik_ibz = np.repeat(np.arange(len(gp_ibz)), len(symrec_fm) * len(tsigns))
+
+    # If a grid point is obtained from different IBZ points, the last one wins.
+    last = len(ids) - 1 - np.unique(ids[::-1], return_index=True)[1]
     bzgrid2ibz = -np.ones(ngkpt, dtype=np.int)
-
-    for ik_ibz, kibz in enumerate(ibz):
-        gp_ibz = np.array(np.rint(kibz * ngkpt), dtype=np.int)
-        for rot in symrec_fm:
-            rot_gp = np.matmul(rot, gp_ibz)
-            gp_bz = rot_gp % ngkpt
-            bzgrid2ibz[gp_bz[0], gp_bz[1], gp_bz[2]] = ik_ibz
-            if has_timrev:
-                gp_bz = (-rot_gp) % ngkpt
-                bzgrid2ibz[gp_bz[0], gp_bz[1], gp_bz[2]] = ik_ibz
+    bzgrid2ibz.ravel()[ids[last]] = ik_ibz[last]
 
     if pbc:
         # Add periodic replicas.
@@ -330,33 +404,41 @@ def map_kpoints(other_kpoints, other_lattice, ref_lattice, ref_kpoints, ref_symr
 
             kpt_other = TS kpt_ref + G0
     """
-    ref_gprimd_inv = np.inv(np.asarray(ref_lattice).T)
+    ref_gprimd_inv = np.linalg.inv(np.asarray(ref_lattice).T)
     other_gprimd = np.asarray(other_lattice).T
     other_kpoints = np.asarray(other_kpoints).reshape((-1, 3))
     ref_kpoints = np.asarray(ref_kpoints).reshape((-1, 3))
-    o2r_map = len(other_kpoints) * [None]
+    ref_symrecs = np.reshape(ref_symrecs, (-1, 3, 3))
 
     tsigns = (1, -1) if has_timrev else (1,)
     kmap = collections.namedtuple("kmap", "ik_ref, tsign, isym, g0")
 
-    for ik_oth, okpt in enumerate(other_kpoints):
-        # Get other k-point in reduced coordinates in the referece lattice.
-        okpt_red = np.matmul(ref_gprimd_inv, np.matmul(other_gprimd, okpt))
+    # Get other k-points in reduced coordinates in the reference lattice.
+    okpts_red = np.matmul(other_kpoints, np.matmul(ref_gprimd_inv, other_gprimd).T)
+
+    # k_other = TS k_ref + G0 --> k_ref = S^{-1} T k_other - S^{-1} G0
+    # Loop over the symmetries and search all the points at once.
+    # For each other point, we keep the first match in the (ik_ref, tsign, isym) loop order.
+    ref_index = KpointIndex(ref_kpoints)
+    nref, nsym, nt = len(ref_kpoints), len(ref_symrecs), len(tsigns)
+    best = np.full(len(okpts_red), nref * nt * nsym)
+    for it, tsign in enumerate(tsigns):
+        for isym, symrec in enumerate(ref_symrecs):
+            symrec_inv = np.rint(np.linalg.inv(symrec))
+            ik_refs = ref_index.find_first(tsign * np.matmul(okpts_red, symrec_inv.T))
+            found = ik_refs != -1
+            order = (ik_refs * nt + it) * nsym + isym
+            best[found] = np.minimum(best[found], order[found])
 
-        # k_other = TS k_ref + G0
-        found = False
-        for ik_ref, kref in enumerate(ref_kpoints):
-            if found: break
-            for tsign in tsigns:
-                for isym, symrec in enumerate(ref_symrecs):
-                    krot = tsign * np.matmul(symrec, kref)
-                    if issamek(okpt_red, krot):
-                        g0 = np.rint(okpt_red - krot)
-                        o2r_map[ik_oth] = kmap(ik_ref, tsign, isym, g0)
-                        found = True
-                        break
+    o2r_map = len(other_kpoints) * [None]
+    for ik_oth in np.nonzero(best < nref * nt * nsym)[0]:
+        ik_ref, rest = divmod(best[ik_oth], nt * nsym)
+        it, isym = divmod(rest, nsym)
+        krot = tsigns[it] * np.matmul(ref_symrecs[isym], ref_kpoints[ik_ref])
+        g0 = np.rint(okpts_red[ik_oth] - krot)
+        o2r_map[ik_oth] = kmap(ik_ref, tsigns[it], isym, g0)
 
-        return o2r_map, o2r_map.count(None)
+    return o2r_map, o2r_map.count(None)
 
 
 #def find_irred_kpoints_kmesh(structure, kfrac_coords):
@@ -420,41 +502,30 @@ def find_irred_kpoints_generic(structure, kfrac_coords, verbose=1):
     Return:
         irred_map: Index of the i-th irreducible k-point in the input kfrac_coords array.
 
-    .. warning::
+    .. note::
 
-        In the worst case, the algorithm scales as nkpt ** 2 * nsym.
-        hence this routine should be used only if ``kfrac_coords`` represents
-        e.g. a path in the Brillouin zone or an arbitrary set of points.
+        A point is irreducible if it is the first point of its star in ``kfrac_coords``.
+        The images of all the points are computed for one symmetry at a time
+        and searched with :class:`KpointIndex` hence the algorithm scales as nkpt * nsym.
     """
     start = time.time()
-    print("Removing redundant k-points. This is gonna take a while... ")
+    kfrac_coords = np.reshape(kfrac_coords, (-1, 3))
+    nk = len(kfrac_coords)
+    kindex = KpointIndex(kfrac_coords)
 
-    # Wrap points in [0,1[ interval.
-    uc_kcoords = np.reshape(kfrac_coords, (-1, 3)) % 1
+    # Index of the first point in the list that belongs to the star of k.
+    first_in_star = np.arange(nk)
+    for symmop in structure.abi_spacegroup:
+        krots = symmop.time_sign * np.matmul(kfrac_coords, symmop.rot_g.T)
+        iks = kindex.find_first(krots)
+        found = iks != -1
+        first_in_star[found] = np.minimum(first_in_star[found], iks[found])
 
-    irred_map = collections.deque()
-    irred_map.append(0)
-    kpts2irred = collections.deque()
-    kpts2irred.append((0, 0, +1))
+    irred_map = np.nonzero(first_in_star == np.arange(nk))[0]
 
-    for ik, kk in enumerate(uc_kcoords[1:]):
-        ik += 1
-        found = False
-        for ik_irr in irred_map:
-            kirr = kfrac_coords[ik_irr]
-            for isym, symmop in enumerate(structure.abi_spacegroup):
-                krot = symmop.rotate_k(kirr)
-                if issamek(krot, kk):
-                    found = True
-                    #kpts2irred[ik] = (ik_irr, isym, symmops.time_sign)
-                    break
-
-        if not found:
-            irred_map.append(ik)
-
-    print("Completed in", time.time() - start, "[s]")
     if verbose:
-        print("Entered with ", len(uc_kcoords), "k-points")
+        print("Completed in", time.time() - start, "[s]")
+        print("Entered with ", nk, "k-points")
         print("Found ", len(irred_map), "irred k-points")
 
     return dict2namedtuple(irred_map=np.array(irred_map, dtype=np.int))
@@ -636,9 +707,7 @@ class Kpoint(SlotPickleMixin):
 
     def set_name(self, name):
         """Set the name of the k-point."""
-        # Fix typo in Latex syntax (if any).
-        if name is not None and name.startswith("\\"): name = "$" + name + "$"
-        self._name = name
+        self._name = _fix_kname(name)
 
     @lazy_property
     def on_border(self):
@@ -682,10 +751,10 @@ class Kpoint(SlotPickleMixin):
 
     # Kpoint algebra.
     def __add__(self, other):
-        return self.__class__(self.frac_coords + other.frac_coords, self.lattice)
+        return Kpoint(self.frac_coords + other.frac_coords, self.lattice)
 
     def __sub__(self, other):
-        return self.__class__(self.frac_coords - other.frac_coords, self.lattice)
+        return Kpoint(self.frac_coords - other.frac_coords, self.lattice)
 
     def __eq__(self, other):
         if hasattr(other, "frac_coords"):
@@ -722,7 +791,7 @@ class Kpoint(SlotPickleMixin):
 
     def copy(self):
         """Deep copy."""
-        return self.__class__(self.frac_coords.copy(), self.lattice.copy(),
+        return Kpoint(self.frac_coords.copy(), self.lattice.copy(),
                               weight=self.weight, name=self.name)
 
     def is_gamma(self, allow_umklapp=False, atol=None):
@@ -745,20 +814,19 @@ class Kpoint(SlotPickleMixin):
 
     def versor(self):
         """Returns the versor i.e. math:`||k|| = 1`"""
-        cls = self.__class__
         if self.norm > 1e-12:
-            return cls(self.frac_coords / self.norm, self.lattice, weight=self.weight)
+            return Kpoint(self.frac_coords / self.norm, self.lattice, weight=self.weight)
         else:
-            return cls.gamma(self.lattice, weight=self.weight)
+            return Kpoint.gamma(self.lattice, weight=self.weight)
 
     def wrap_to_ws(self):
         """Returns a new |Kpoint| in the Wigner-Seitz zone."""
-        return self.__class__(wrap_to_ws(self.frac_coords), self.lattice,
+        return Kpoint(wrap_to_ws(self.frac_coords), self.lattice,
                               name=self.name, weight=self.weight)
 
     def wrap_to_bz(self):
         """Returns a new |Kpoint| in the first unit cell."""
-        return self.__class__(wrap_to_bz(self.frac_coords), self.lattice,
+        return Kpoint(wrap_to_bz(self.frac_coords), self.lattice,
                               name=self.name, weight=self.weight)
 
     def compute_star(self, symmops, wrap_tows=True):
@@ -778,13 +846,199 @@ class Kpoint(SlotPickleMixin):
         return KpointStar(self.lattice, frac_coords, weights=None, names=len(frac_coords) * [self.name])
 
 
+def _fix_kname(name):
+    """Fix typo in Latex syntax (if any)."""
+    if name is not None and name.startswith("\\"): name = "$" + name + "$"
+    return name
+
+
+class _KpointView(Kpoint):
+    """
+    |Kpoint| created on the fly by |KpointList|.
+    The weight and the name are stored in the arrays of the parent list
+    so that ``set_weight`` and ``set_name`` change the list as well.
+    """
+
+    __slots__ = [
+        "_klist",
+        "_ik",
+    ]
+
+    def __init__(self, klist, ik):
+        self._klist, self._ik = klist, ik
+        self._frac_coords = klist._frac_coords[ik]
+        self._lattice = klist.reciprocal_lattice
+
+    @property
+    def _weight(self):
+        return self._klist._weights[self._ik]
+
+    @_weight.setter
+    def _weight(self, weight):
+        self._klist._weights[self._ik] = 0.0 if weight is None else weight
+
+    @property
+    def _name(self):
+        names = self._klist._names
+        return None if names is None else names[self._ik]
+
+    @_name.setter
+    def _name(self, name):
+        if self._klist._names is None:
+            if name is None: return
+            self._klist._names = len(self._klist) * [None]
+        self._klist._names[self._ik] = name
+
+    def __reduce__(self):
+        # Pickle a standalone Kpoint without the parent list.
+        return (Kpoint, (np.copy(self.frac_coords), self.lattice, self.weight, self.name))
+
+
+def _issamek_vec(k1, k2, atol):
+    """
+    Vectorized version of :func:`issamek`. k1 and k2 are broadcastable arrays with shape [..., 3].
+    Return boolean array with shape [...].
+    """
+    diff = np.asarray(k1) - np.asarray(k2)
+    int_diff = np.rint(diff)
+    # Same test as np.allclose(int_diff, diff, atol=atol) used in is_integer.
+    return np.all(np.abs(diff - int_diff) <= atol + 1e-5 * np.abs(int_diff), axis=-1)
+
+
+class KpointIndex(object):
+    """
+    Search index for a list of k-points given in reduced coordinates.
+    Points are compared modulo reciprocal lattice vectors as in :func:`issamek`.
+
+    If the points belong to a Monkhorst-Pack mesh, the index is a table
+    with the integer coordinates of the points in the mesh and lookups cost O(1).
+    For arbitrary lists, we use a KD-tree built from the coordinates wrapped to [0, 1[
+    with periodic boundary conditions and lookups cost O(log N).
+    """
+
+    def __init__(self, frac_coords, mpdivs=None, shift=None):
+        """
+        Args:
+            frac_coords: [nk, 3] array with the reduced coordinates of the k-points.
+            mpdivs: Number of divisions of the Monkhorst-Pack mesh. None if not a mesh.
+            shift: Shift of the Monkhorst-Pack mesh. None for unshifted mesh.
+        """
+        self.frac_coords = np.reshape(frac_coords, (-1, 3))
+        self.nk = len(self.frac_coords)
+        self.mpdivs = None
+        self._kdtree = None
+
+        if mpdivs is not None:
+            mpdivs = np.asarray(mpdivs, dtype=np.int)
+            shift = np.zeros(3) if shift is None else np.reshape(shift, (3,))
+            ids, ongrid = self._grid_ids(self.frac_coords, mpdivs, shift)
+            if np.all(ongrid):
+                # Dense table: linear index in the mesh --> first position in the list.
+                self.mpdivs, self.shift = mpdivs, shift
+                self._table = -np.ones(np.prod(mpdivs), dtype=np.int)
+                uids, first = np.unique(ids, return_index=True)
+                self._table[uids] = first
+                self._ids = ids
+
+        if self.mpdivs is None:
+            from scipy.spatial import cKDTree
+            self._kdtree = cKDTree(self._wrap(self.frac_coords), boxsize=1.0)
+
+    @staticmethod
+    def _wrap(frac_coords):
+        """Wrap reduced coordinates to [0, 1[."""
+        w = frac_coords % 1
+        # x % 1 may return 1.0 for tiny negative values.
+        w[w >= 1.0] = 0.0
+        return w
+
+    @staticmethod
+    def _grid_ids(frac_coords, mpdivs, shift):
+        """
+        Return the linear index of the points in the mesh and a boolean array
+        telling whether the points belong to the mesh.
+        """
+        x = frac_coords * mpdivs - shift
+        ix = np.rint(x).astype(np.int)
+        ongrid = np.all(np.abs(x - ix) <= _ATOL_KDIFF * mpdivs, axis=-1)
+        ix %= mpdivs
+        ids = (ix[:, 0] * mpdivs[1] + ix[:, 1]) * mpdivs[2] + ix[:, 2]
+        return ids, ongrid
+
+    @lazy_property
+    def _first(self):
+        """
+        Array with the index of the first occurrence of each point in the list
+        (used to handle duplicated points with the KD-tree).
+        """
+        first = np.arange(self.nk)
+        pairs = self._kdtree.query_pairs(r=np.sqrt(3) * _ATOL_KDIFF, output_type="ndarray")
+        if len(pairs):
+            i, j = pairs.min(axis=1), pairs.max(axis=1)
+            np.minimum.at(first, j, i)
+        return first
+
+    @property
+    def is_grid(self):
+        """True if the index uses the integer coordinates of the Monkhorst-Pack mesh."""
+        return self.mpdivs is not None
+
+    def find_first(self, frac_coords, atol=None):
+        """
+        Find the first occurrence of the points in the list.
+
+        Args:
+            frac_coords: [n, 3] array with reduced coordinates.
+            atol: Tolerance used to compare k-points. Use _ATOL_KDIFF is atol is None.
+
+        Return: [n] array with the indices in the list. -1 if the point is not found.
+        """
+        if atol is None: atol = _ATOL_KDIFF
+        frac_coords = np.reshape(frac_coords, (-1, 3))
+        nq = len(frac_coords)
+        if self.nk == 0: return -np.ones(nq, dtype=np.int)
+
+        if self.is_grid:
+            ids, _ = self._grid_ids(frac_coords, self.mpdivs, self.shift)
+            inds = self._table[ids]
+        else:
+            # Get the closest point and then the first occurrence of that point in the list.
+            _, inds = self._kdtree.query(self._wrap(frac_coords))
+            inds = self._first[np.asarray(inds, dtype=np.int)]
+
+        found = inds != -1
+        found[found] = _issamek_vec(frac_coords[found], self.frac_coords[inds[found]], atol)
+        inds[~found] = -1
+        return inds
+
+    def find_all(self, frac_coords, atol=None):
+        """
+        Return |numpy-array| with the indices of all the occurrences of the point in the list.
+        Use _ATOL_KDIFF is atol is None.
+        """
+        if atol is None: atol = _ATOL_KDIFF
+        frac_coords = np.reshape(frac_coords, (3,))
+        if self.is_grid:
+            ids, _ = self._grid_ids(frac_coords[None, :], self.mpdivs, self.shift)
+            inds = np.nonzero(self._ids == ids[0])[0]
+        else:
+            # Use a slightly larger radius to account for the relative tolerance used in issamek.
+            r = np.sqrt(3) * (atol + 1e-5)
+            inds = np.array(sorted(self._kdtree.query_ball_point(self._wrap(frac_coords[None, :])[0], r=r)),
+                            dtype=np.int)
+
+        if len(inds) == 0: return inds
+        return inds[_issamek_vec(frac_coords, self.frac_coords[inds], atol)]
+
+
 class KpointList(collections.abc.Sequence):
     """
     Base class defining a sequence of |Kpoint| objects. Essentially consists
     of base methods implementing the sequence protocol and helper functions.
     The subclasses |Kpath| and |IrredZone| provide specialized methods to operate
     on k-points representing a path or list of points in the IBZ, respectively.
-    This object is immutable.
+    This object is immutable. Coordinates, weights and names are stored in arrays
+    and |Kpoint| objects are created on the fly when the list is indexed or iterated.
 
     .. Note:
 
@@ -830,7 +1084,7 @@ class KpointList(collections.abc.Sequence):
             reciprocal_lattice=self.reciprocal_lattice.as_dict(),
             frac_coords=self.frac_coords.tolist(),
             weights=weights,
-            names=[k.name for k in self],
+            names=self.names,
             ksampling=self.ksampling,
         )
 
@@ -851,7 +1105,7 @@ class KpointList(collections.abc.Sequence):
             if len(weights) != len(frac_coords):
                 raise ValueError("len(weights) != len(frac_coords):\nweights: %s\nfrac_coords: %s" %
                     (weights, frac_coords))
-            weights = np.asarray(weights)
+            weights = np.array(weights, dtype=np.float)
         else:
             weights = np.zeros(len(self.frac_coords))
 
@@ -859,10 +1113,11 @@ class KpointList(collections.abc.Sequence):
             raise ValueError("len(names) != len(frac_coords):\nnames: %s\nfrac_coords: %s" %
                     (names, frac_coords))
 
-        self._points = []
-        for i, rcs in enumerate(frac_coords):
-            name = None if names is None else names[i]
-            self._points.append(Kpoint(rcs, self.reciprocal_lattice, weight=weights[i], name=name))
+        # Store weights and names in arrays. Kpoint objects are created on the fly in __getitem__.
+        self._weights = weights
+        self._names = None
+        if names is not None and any(name is not None for name in names):
+            self._names = [_fix_kname(name) for name in names]
 
     @property
     def reciprocal_lattice(self):
@@ -885,49 +1140,70 @@ class KpointList(collections.abc.Sequence):
 
     # Sequence protocol.
     def __len__(self):
-        return len(self._points)
+        return len(self._frac_coords)
 
     def __iter__(self):
-        return self._points.__iter__()
+        for ik in range(len(self)):
+            yield _KpointView(self, ik)
 
     def __getitem__(self, slice):
-        return self._points[slice]
+        if isinstance(slice, builtins.slice):
+            return [_KpointView(self, ik) for ik in range(*slice.indices(len(self)))]
+        ik = operator.index(slice)
+        if ik < 0: ik += len(self)
+        if not 0 <= ik < len(self):
+            raise IndexError("Index %s out of range for KpointList of length %d" % (slice, len(self)))
+        return _KpointView(self, ik)
 
     def __contains__(self, kpoint):
-        return kpoint in self._points
+        return self.find(kpoint) != -1
 
     def __reversed__(self):
-        return self._points.__reversed__()
+        for ik in reversed(range(len(self))):
+            yield _KpointView(self, ik)
 
     def __add__(self, other):
         if self.reciprocal_lattice != other.reciprocal_lattice:
             raise ValueError("Cannot merge k-points with different reciprocal lattice.")
 
         return KpointList(self.reciprocal_lattice,
-                          frac_coords=[k.frac_coords for k in self] + [k.frac_coords for k in other],
+                          frac_coords=np.concatenate([self.frac_coords, other.frac_coords]),
                           weights=None,
-                          names=[k.name for k in self] + [k.name for k in other],
+                          names=self.names + other.names,
                         )
 
     def __eq__(self, other):
         if other is None or not isinstance(other, KpointList): return False
-        for k1, k2 in zip(self, other):
-            if k1 != k2: return False
-        return True
+        n = min(len(self), len(other))
+        return bool(np.all(_issamek_vec(self.frac_coords[:n], other.frac_coords[:n], _ATOL_KDIFF)))
 
     def __ne__(self, other):
         return not (self == other)
 
+    @lazy_property
+    def search_index(self):
+        """
+        :class:`KpointIndex` used to find k-points in the list.
+        Uses the integer coordinates of the points if self is a Monkhorst-Pack mesh with one shift.
+        """
+        mpdivs, shifts = None, None
+        if self.is_ibz and self.ksampling is not None and self.ksampling.kptrlatt is not None:
+            mpdivs, shifts = self.mpdivs_shifts
+        if mpdivs is not None and shifts is not None and len(np.reshape(shifts, (-1, 3))) == 1:
+            return KpointIndex(self.frac_coords, mpdivs=mpdivs, shift=np.reshape(shifts, (3,)))
+        return KpointIndex(self.frac_coords)
+
     def index(self, kpoint):
         """
         Returns: the first index of kpoint in self.
 
         Raises: `ValueError` if not found.
         """
-        try:
-            return self._points.index(kpoint)
-        except ValueError:
+        frac_coords = kpoint.frac_coords if hasattr(kpoint, "frac_coords") else kpoint
+        ind = self.search_index.find_first(frac_coords)[0]
+        if ind == -1:
             raise ValueError("Cannot find point: %s in KpointList:\n%s" % (repr(kpoint), repr(self)))
+        return ind
 
     def get_all_kindices(self, kpoint):
         """
@@ -935,11 +1211,7 @@ class KpointList(collections.abc.Sequence):
         Accepts: |Kpoint| instance or integer.
         """
         start = self.index(kpoint)
-        k0 = self[start]
-        kinds = []
-        for ik, k in enumerate(self):
-            if k == k0: kinds.append(ik)
-        return np.array(kinds)
+        return self.search_index.find_all(self.frac_coords[start])
 
     def find(self, kpoint):
         """
@@ -952,7 +1224,8 @@ class KpointList(collections.abc.Sequence):
 
     def count(self, kpoint):
         """Return number of occurrences of kpoint"""
-        return self._points.count(kpoint)
+        frac_coords = kpoint.frac_coords if hasattr(kpoint, "frac_coords") else kpoint
+        return len(self.search_index.find_all(frac_coords))
 
     def find_closest(self, obj):
         """
@@ -975,12 +1248,14 @@ class KpointList(collections.abc.Sequence):
         else:
             frac_coords = np.asarray(obj)
 
-        dist = np.empty(len(self))
-        for i, kpt in enumerate(self):
-            dist[i] = kpt.lattice.norm(kpt.frac_coords - frac_coords)
+        dist, ind = self._cart_kdtree.query(self.reciprocal_lattice.get_cartesian_coords(frac_coords))
+        return ind, self[ind], dist
 
-        ind = dist.argmin()
-        return ind, self[ind], np.copy(dist[ind])
+    @lazy_property
+    def _cart_kdtree(self):
+        """KD-tree with the cartesian coordinates of the k-points (used in find_closest)."""
+        from scipy.spatial import cKDTree
+        return cKDTree(self.reciprocal_lattice.get_cartesian_coords(self.frac_coords))
 
     @property
     def is_path(self):
@@ -1020,21 +1295,21 @@ class KpointList(collections.abc.Sequence):
 
     def get_cart_coords(self):
         """Cartesian coordinates of the k-point as |numpy-array| of shape (len(self), 3)"""
-        return np.reshape([k.cart_coords for k in self], (-1, 3))
+        return np.reshape(self.reciprocal_lattice.get_cartesian_coords(self.frac_coords), (-1, 3))
 
     @property
     def names(self):
         """List with the name of the k-points."""
-        return [k.name for k in self]
+        return len(self) * [None] if self._names is None else list(self._names)
 
     @property
     def weights(self):
         """|numpy-array| with the weights of the k-points."""
-        return np.array([kpoint.weight for kpoint in self])
+        return self._weights.copy()
 
     def sum_weights(self):
         """Returns the sum of the weights."""
-        return np.sum(self.weights)
+        return np.sum(self._weights)
 
     def check_weights(self):
         """
@@ -1053,24 +1328,16 @@ class KpointList(collections.abc.Sequence):
         """
         Remove duplicated k-points from self. Returns new :class:`KpointList` instance.
         """
-        frac_coords, good_indices = [self[0].frac_coords], [0]
-
-        for i, kpoint in enumerate(self[1:]):
-            i += 1
-            # Add it only if it's not already in the list.
-            for prev_coords in frac_coords:
-                if issamek(kpoint.frac_coords, prev_coords): break
-            else:
-                frac_coords.append(kpoint.frac_coords)
-                good_indices.append(i)
-
-        good_kpoints = [self[i] for i in good_indices]
+        # Keep the first occurrence of each point.
+        first = self.search_index.find_first(self.frac_coords)
+        good_indices = np.nonzero(first == np.arange(len(self)))[0]
+        names = self.names
 
         return self.__class__(
                 self.reciprocal_lattice,
-                frac_coords=[k.frac_coords for k in good_kpoints],
+                frac_coords=self.frac_coords[good_indices],
                 weights=None,
-                names=[k.name for k in good_kpoints],
+                names=[names[i] for i in good_indices],
                 ksampling=self.ksampling)
 
     def to_array(self):
@@ -1088,7 +1355,7 @@ class KpointList(collections.abc.Sequence):
         from pymatgen.electronic_structure.plotter import plot_brillouin_zone
         fold = False
         if self.is_path:
-            labels = {k.name: k.frac_coords for k in self if k.name}
+            labels = {name: self.frac_coords[ik] for ik, name in enumerate(self.names) if name}
             frac_coords_lines = [self.frac_coords[line] for line in self.lines]
             return plot_brillouin_zone(self.reciprocal_lattice, lines=frac_coords_lines, labels=labels,
                                        ax=ax, fold=fold, **kwargs)
@@ -1121,16 +1388,14 @@ class KpointList(collections.abc.Sequence):
             for ik, _ in enumerate(self):
                 k2kqg[ik] = (ik, g0)
         else:
-            # N**2 scaling but this algorithm can handle k-paths
+            # Use the search index so that this algorithm can handle k-paths as well.
             # Note that in principle one could have multiple k+q in k-points
             # but only the first match is considered.
-            for ik, kpoint in enumerate(self):
-                kpq = kpoint.frac_coords + qfrac_coords
-                for ikq, ksearch in enumerate(self):
-                    if issamek(kpq, ksearch.frac_coords, atol=atol_kdiff):
-                        g0 = np.rint(kpq - ksearch.frac_coords)
-                        k2kqg[ik] = (ikq, g0)
-                        break
+            kpq = self.frac_coords + qfrac_coords
+            kq_inds = self.search_index.find_first(kpq, atol=atol_kdiff)
+            g0s = np.rint(kpq - self.frac_coords[kq_inds])
+            for ik, ikq in enumerate(kq_inds):
+                if ikq != -1: k2kqg[ik] = (ikq, g0s[ik])
 
         return k2kqg
 
@@ -1264,10 +1529,7 @@ class Kpath(KpointList):
         |numpy-array| of len(self)-1 elements giving the distance between two
         consecutive k-points, i.e. ds[i] = ||k[i+1] - k[i]|| for i=0,1,...,n-1
         """
-        ds = np.zeros(len(self) - 1)
-        for i, kpoint in enumerate(self[:-1]):
-            ds[i] = (self[i + 1] - kpoint).norm
-        return ds
+        return np.linalg.norm(np.diff(self.get_cart_coords(), axis=0), axis=1)
 
     @lazy_property
     def versors(self):
@@ -1310,16 +1572,13 @@ class Kpath(KpointList):
     @lazy_property
     def frac_bounds(self):
         """Numpy array of shape [M, 3] with the vertexes of the path in frac coords."""
-        frac_bounds = [self[line[0]].frac_coords for line in self.lines]
-        frac_bounds.append(self[self.lines[-1][-1]].frac_coords)
-        return np.reshape(frac_bounds, (-1, 3))
+        inds = [line[0] for line in self.lines] + [self.lines[-1][-1]]
+        return np.reshape(self.frac_coords[inds], (-1, 3))
 
     @lazy_property
     def cart_bounds(self):
         """Numpy array of shape [M, 3] with the vertexes of the path in frac coords."""
-        cart_bounds = [self[line[0]].cart_coords for line in self.lines]
-        cart_bounds.append(self[self.lines[-1][-1]].cart_coords)
-        return np.reshape(cart_bounds, (-1, 3))
+        return np.reshape(self.reciprocal_lattice.get_cartesian_coords(self.frac_bounds), (-1, 3))
 
     def find_points_along_path(self, cart_coords, dist_tol=1e-12):
         """
@@ -1770,16 +2029,15 @@ class Ktables(object):
             is_shift
             has_timrev
         """
-        import spglib as spg
         self.mesh = np.array(mesh)
         self.is_shift = is_shift
         self.has_timrev = has_timrev
         cell = (structure.lattice.matrix, structure.frac_coords, structure.atomic_numbers)
 
-        mapping, self.grid = spg.get_ir_reciprocal_mesh(self.mesh, cell,
-            is_shift=self.is_shift, is_time_reversal=self.has_timrev, symprec=_SPGLIB_SYMPREC)
+        mapping, self.grid = get_ir_reciprocal_mesh(cell, self.mesh, self.is_shift, self.has_timrev)
 
-        uniq, self.weights = np.unique(mapping, return_counts=True)
+        # All k-points and mapping to ir-grid points.
+        uniq, self.bz2ibz, self.weights = np.unique(mapping, return_inverse=True, return_counts=True)
         self.weights = np.asarray(self.weights, dtype=np.float) / len(self.grid)
         self.nibz = len(uniq)
         self.kshift = [0., 0., 0.] if is_shift is None else 0.5 * np.asarray(is_shift)
@@ -1787,14 +2045,6 @@ class Ktables(object):
         self.bz = (self.grid + self.kshift) / self.mesh
         self.nbz = len(self.bz)
 
-        # All k-points and mapping to ir-grid points.
-        # FIXME This is slow.
-        self.bz2ibz = np.empty(len(self.bz), dtype=np.int)
-        for ik_bz, ir_gp_id in enumerate(mapping):
-            inds = np.where(uniq == ir_gp_id)
-            assert len(inds) == 1
-            self.bz2ibz[ik_bz] = inds[0]
-
     def __str__(self):
         return self.to_string()
 
@@ -1,6 +1,7 @@
 # coding: utf-8
 """This module contains the class defining Uniform 3D meshes."""
 
+import collections
 import numpy as np
 
 #from itertools import product as iproduct
@@ -9,12 +10,35 @@ from monty.functools import lazy_property
 from numpy.fft import fftn, ifftn, fftshift, ifftshift, fftfreq
 from abipy.tools import duck
 
+try:
+    # scipy >= 1.4 supports multithreaded FFTs.
+    import scipy.fft as scipy_fft
+except ImportError:
+    scipy_fft = None
+
 
 __all__ = [
     "Mesh3D",
 ]
 
 
+def _fftn(a, axes=None, workers=None):
+    """Forward FFT. Use scipy.fft if ``workers`` is specified and scipy supports it."""
+    if workers is not None and scipy_fft is not None:
+        return scipy_fft.fftn(a, axes=axes, workers=workers)
+    return fftn(a, axes=axes)
+
+
+def _ifftn(a, axes=None, workers=None):
+    """Backward FFT. Use scipy.fft if ``workers`` is specified and scipy supports it."""
+    if workers is not None and scipy_fft is not None:
+        return scipy_fft.ifftn(a, axes=axes, workers=workers)
+    return ifftn(a, axes=axes)
+
+
+_GridPointsInSpheres = collections.namedtuple("GridPointsInSpheres", "ptr inds_uc dists inds")
+
+
 class Mesh3D(object):
     r"""
     Descriptor-class for uniform 3D meshes.
@@ -190,25 +214,27 @@ class Mesh3D(object):
         #shape = extra_dims + self.shape)
         return np.reshape(arr, (-1,) + self.shape)
 
-    def fft_r2g(self, fr, shift_fg=False):
+    def fft_r2g(self, fr, shift_fg=False, workers=None):
         """
         FFT of array ``fr`` given in real space.
+        Arrays with ndim > 3 are transformed in a single call over the last three axes.
+        ``workers`` gives the number of threads used by ``scipy.fft`` (if available).
         """
         ndim, shape = fr.ndim, fr.shape
 
         if ndim == 1:
             fr = np.reshape(fr, self.shape)
-            return self.fft_r2g(fr, shift_fg=shift_fg).flatten()
+            return self.fft_r2g(fr, shift_fg=shift_fg, workers=workers).flatten()
 
         elif ndim == 3:
             assert self.size == np.prod(shape[-3:])
-            fg = fftn(fr)
+            fg = _fftn(fr, workers=workers)
             if shift_fg: fg = fftshift(fg)
 
         elif ndim > 3:
             assert self.size == np.prod(shape[-3:])
-            axes = np.arange(ndim)[-3:]
-            fg = fftn(fr, axes=axes)
+            axes = tuple(np.arange(ndim)[-3:])
+            fg = _fftn(fr, axes=axes, workers=workers)
             if shift_fg: fg = fftshift(fg, axes=axes)
 
         else:
@@ -216,26 +242,28 @@ class Mesh3D(object):
 
         return fg / self.size
 
-    def fft_g2r(self, fg, fg_ishifted=False):
+    def fft_g2r(self, fg, fg_ishifted=False, workers=None):
         """
         FFT of array ``fg`` given in G-space.
+        Arrays with ndim > 3 are transformed in a single call over the last three axes.
+        ``workers`` gives the number of threads used by ``scipy.fft`` (if available).
         """
         ndim, shape = fg.ndim, fg.shape
 
         if ndim == 1:
             fg = np.reshape(fg, self.shape)
-            return self.fft_g2r(fg, fg_ishifted=fg_ishifted).flatten()
+            return self.fft_g2r(fg, fg_ishifted=fg_ishifted, workers=workers).flatten()
 
         if ndim == 3:
             assert self.size == np.prod(shape[-3:])
             if fg_ishifted: fg = ifftshift(fg)
-            fr = ifftn(fg)
+            fr = _ifftn(fg, workers=workers)
 
         elif ndim > 3:
             assert self.size == np.prod(shape[-3:])
-            axes = np.arange(ndim)[-3:]
+            axes = tuple(np.arange(ndim)[-3:])
             if fg_ishifted: fg = ifftshift(fg, axes=axes)
-            fr = ifftn(fg, axes=axes)
+            fr = _ifftn(fg, axes=axes, workers=workers)
 
         else:
             raise NotImplementedError("ndim < 3 are not supported")
@@ -434,64 +462,104 @@ class Mesh3D(object):
         """
         Given a list of points, this function return a |numpy-array| with the indices of the closest gridpoint.
         """
-        points = np.reshape(points, (-1, 3))
-        inv_vectors = self.inv_vectors
-        fcoords = [np.dot(point, inv_vectors) for point in points]
-        inds = [[np.mod(int(np.rint(pc[ii]*self.shape[ii])), self.nx) for ii in range(3)] for pc in fcoords]
-        return np.array(inds)
-
-        # return [(int(np.rint(pc[ii]*self.nx)), int(np.rint(pc[0]*self.nx)),int(np.rint(pc[0]*self.nx))) for pc in coords]
-        # ix = int(np.rint(coords[0]*self.nx))
-        # iy = int(np.rint(coords[1]*self.ny))
-        # iz = int(np.rint(coords[2]*self.nz))
-        # return (ix, iy, iz)
-
-    # @DW TODO Add test.
-    def dist_gridpoints_in_spheres(self, points, radius):
-        # c_ab = np.cross(self.vectors[0], self.vectors[1])
-        # c_bc = np.cross(self.vectors[1], self.vectors[2])
-        # c_ca = np.cross(self.vectors[2], self.vectors[0])
-        # h_ab = np.abs(np.dot(c_ab, self.vectors[2]) / np.linalg.norm(c_ab))
-        # h_bc = np.abs(np.dot(c_bc, self.vectors[0]) / np.linalg.norm(c_bc))
-        # h_ca = np.abs(np.dot(c_ca, self.vectors[1]) / np.linalg.norm(c_ca))
+        return np.mod(self._i_closest_gridpoints_unwrapped(points), self.shape)
+
+    def _i_closest_gridpoints_unwrapped(self, points):
+        """
+        Indices of the closest gridpoints without folding them into the unit cell.
+        """
+        fcoords = np.dot(np.reshape(points, (-1, 3)), self.inv_vectors)
+        return np.rint(fcoords * self.shape).astype(np.int)
+
+    def _get_sphere_stencil(self, radius):
+        """
+        Return the offsets (with respect to the closest gridpoint) of the gridpoints that
+        can be inside a sphere of the given radius centered on an arbitrary point and their
+        cartesian coordinates. Results are cached for each radius.
+        """
+        try:
+            cache = self._sphere_stencils
+        except AttributeError:
+            cache = self._sphere_stencils = {}
+
+        if radius in cache:
+            return cache[radius]
+
+        dvs = np.array([self.dvx, self.dvy, self.dvz])
         maxdiag = max([np.linalg.norm(self.dvx+self.dvy+self.dvz),
                        np.linalg.norm(self.dvx+self.dvy-self.dvz),
                        np.linalg.norm(self.dvx-self.dvy+self.dvz),
                        np.linalg.norm(self.dvx-self.dvy-self.dvz)])
+        # Heights of the parallelepiped spanned by dvx, dvy, dvz.
         c_ab = np.cross(self.dvx, self.dvy)
         c_bc = np.cross(self.dvy, self.dvz)
         c_ca = np.cross(self.dvz, self.dvx)
         h_ab = np.abs(np.dot(c_ab, self.dvz) / np.linalg.norm(c_ab))
         h_bc = np.abs(np.dot(c_bc, self.dvx) / np.linalg.norm(c_bc))
         h_ca = np.abs(np.dot(c_ca, self.dvy) / np.linalg.norm(c_ca))
-        a_factor = 1.01 * (radius+0.5*maxdiag) / h_bc
-        b_factor = 1.01 * (radius+0.5*maxdiag) / h_ca
-        c_factor = 1.01 * (radius+0.5*maxdiag) / h_ab
-        # print('HEIGHTS')
-        # print(h_ab, h_bc, h_ca)
-        # print(c_factor*h_ab, a_factor* h_bc, b_factor*h_ca)
-        mins = np.array(np.floor([-a_factor, -b_factor, -c_factor]), dtype=int)
-        maxes = np.array(np.ceil([a_factor, b_factor, c_factor]), dtype=int)
-        # print('AAAMINS AND MAXES', mins, maxes)
-        # maxes = np.ceil(nmax)
-        i_closest_gridpoint_points = self.i_closest_gridpoints(points=points)
+        # The point is at most 0.5 * maxdiag away from its closest gridpoint.
+        rmax = radius + 0.5 * maxdiag
+        nmax = np.array(np.ceil(1.01 * rmax / np.array([h_bc, h_ca, h_ab])), dtype=np.int)
+
+        offsets = np.stack(np.meshgrid(*[np.arange(-n, n + 1) for n in nmax], indexing="ij"), axis=-1)
+        offsets = np.reshape(offsets, (-1, 3))
+        cart = np.dot(offsets, dvs)
+        keep = np.sum(cart ** 2, axis=1) <= rmax ** 2
+        cache[radius] = offsets[keep], cart[keep]
+
+        return cache[radius]
+
+    def get_gridpoints_in_spheres(self, points, radius):
+        """
+        Find the gridpoints (including periodic images) within a distance ``radius`` from ``points``.
+        The stencil of candidate gridpoints is computed once per radius.
+
+        Args:
+            points: Cartesian coordinates of the centers of the spheres.
+            radius: Radius of the spheres.
+
+        Return:
+            namedtuple with the following CSR-like arrays. The gridpoints of the i-th point
+            are in the slice ``ptr[i]:ptr[i+1]``.
+
+            ptr: [npoints + 1] array with offsets.
+            inds_uc: [n, 3] array with the indices of the gridpoints folded in the unit cell.
+            dists: [n] array with the distance from the point.
+            inds: [n, 3] array with the (unfolded) indices of the periodic image.
+        """
+        points = np.reshape(points, (-1, 3))
+        offsets, cart_offsets = self._get_sphere_stencil(radius)
+        dvs = np.array([self.dvx, self.dvy, self.dvz])
+        i_closest = self._i_closest_gridpoints_unwrapped(points)
+
+        ptr = np.zeros(len(points) + 1, dtype=np.int)
+        inds_list, dists_list = [], []
+        r2 = radius ** 2
+        for ipoint, (pp, ic) in enumerate(zip(points, i_closest)):
+            dist2 = np.sum((cart_offsets - (pp - np.dot(ic, dvs))) ** 2, axis=1)
+            mask = dist2 <= r2
+            inds_list.append(ic + offsets[mask])
+            dists_list.append(np.sqrt(dist2[mask]))
+            ptr[ipoint + 1] = ptr[ipoint] + np.count_nonzero(mask)
+
+        inds = np.concatenate(inds_list) if inds_list else np.empty((0, 3), dtype=np.int)
+        dists = np.concatenate(dists_list) if dists_list else np.empty(0)
+
+        return _GridPointsInSpheres(ptr=ptr, inds_uc=np.mod(inds, self.shape), dists=dists, inds=inds)
+
+    def dist_gridpoints_in_spheres(self, points, radius):
+        """
+        Return list with the gridpoints in the spheres centered on ``points``. For each point,
+        a list of tuples (index_in_unit_cell, distance, index_of_periodic_image) is returned.
+        See :meth:`get_gridpoints_in_spheres` for the more efficient array-based version.
+        """
+        gps = self.get_gridpoints_in_spheres(points, radius)
         dist_gridpoints_points = []
-        r2 = radius**2
-        for ipoint, point_i_closest_gridpoint in enumerate(i_closest_gridpoint_points):
-            pp = points[ipoint]
-            dist_gridpoints = []
-            for ix in range(int(mins[0]), int(maxes[0])):
-                ipx = point_i_closest_gridpoint[0] + ix
-                for iy in range(int(mins[1]), int(maxes[1])):
-                    ipy = point_i_closest_gridpoint[1] + iy
-                    for iz in range(int(mins[2]), int(maxes[2])):
-                        ipz = point_i_closest_gridpoint[2] + iz
-                        gp = ipx*self.dvx + ipy * self.dvy + ipz * self.dvz
-                        dist2_gp_pp = np.dot(pp-gp, pp-gp)
-                        if dist2_gp_pp <= r2:
-                            dist_gridpoints.append(((np.mod(ipx, self.nx), np.mod(ipy, self.ny), np.mod(ipz, self.nz)),
-                                                    np.sqrt(dist2_gp_pp), (ipx, ipy, ipz)))
-            dist_gridpoints_points.append(dist_gridpoints)
+        for ipoint in range(len(gps.ptr) - 1):
+            sl = slice(gps.ptr[ipoint], gps.ptr[ipoint + 1])
+            dist_gridpoints_points.append([(tuple(uc), d, tuple(ii)) for uc, d, ii in
+                                           zip(gps.inds_uc[sl], gps.dists[sl], gps.inds[sl])])
+
         return dist_gridpoints_points
 
     # def dist2_gridpoints_in_spheres(self, points, radius):
@@ -14,9 +14,10 @@ from collections import deque, OrderedDict
 from monty.termcolor import cprint
 from monty.collections import dict2namedtuple
 from abipy.tools.plotting import add_fig_kwargs, get_ax_fig_plt
-from abipy.tools.numtools import gaussian, find_degs_sk
-from abipy.core.kpoints import Kpath
+from abipy.tools.numtools import gaussian, gaussian_binned, find_degs_sk
+from abipy.core.kpoints import Kpath, get_ir_reciprocal_mesh
 from abipy.core.symmetries import mati3inv
+from abipy.core.tetrahedron import TetraMesh
 
 
 class ElectronInterpolator(metaclass=abc.ABCMeta):
@@ -64,12 +65,11 @@ class ElectronInterpolator(metaclass=abc.ABCMeta):
             nbz
             grid:
         """
-        import spglib as spg
         mesh = np.array(mesh)
-        mapping, grid = spg.get_ir_reciprocal_mesh(mesh, self.cell,
-            is_shift=is_shift, is_time_reversal=self.has_timrev, symprec=self.symprec)
+        mapping, grid = get_ir_reciprocal_mesh(self.cell, mesh, is_shift, self.has_timrev, symprec=self.symprec)
 
-        uniq, weights = np.unique(mapping, return_counts=True)
+        # All k-points and mapping to ir-grid points
+        uniq, bz2ibz, weights = np.unique(mapping, return_inverse=True, return_counts=True)
         weights = np.asarray(weights, dtype=np.float) / len(grid)
         nkibz = len(uniq)
         ibz = grid[uniq] / mesh
@@ -79,16 +79,6 @@ class ElectronInterpolator(metaclass=abc.ABCMeta):
         kshift = 0.0 if is_shift is None else 0.5 * np.asarray(is_shift)
         bz = (grid + kshift) / mesh
 
-        # All k-points and mapping to ir-grid points
-        bz2ibz = np.empty(len(bz), dtype=np.int)
-        for i, (ir_gp_id, gp) in enumerate(zip(mapping, grid)):
-            inds = np.where(uniq == ir_gp_id)
-            #print("inds", inds, "inds[0]", inds[0])
-            assert len(inds) == 1
-            bz2ibz[i] = inds[0]
-            #print("%3d ->%3d %s" % (i, ir_gp_id, (gp + [0.5, 0.5, 0.5]) / mesh))
-            #print("%3d ->%3d %s" % (i, ir_gp_id, (gp + kshift) / mesh))
-
         return dict2namedtuple(mesh=mesh, shift=kshift,
                                ibz=ibz, nibz=len(ibz), weights=weights,
                                bz=bz, nbz=len(bz), grid=grid, bz2ibz=bz2ibz)
@@ -186,6 +176,8 @@ class ElectronInterpolator(metaclass=abc.ABCMeta):
             is_shift: three integers (spglib API). When is_shift is not None, the kmesh is shifted along
                 the axis in half of adjacent mesh points irrespective of the mesh numbers. None means unshited mesh.
             method: String defining the method for the computation of the DOS.
+                "gaussian" for gaussian broadening, "gaussian_binned" for gaussian broadening
+                computed by convolving the histogram of the eigenvalues, "tetra" for the linear tetrahedron method.
             step: Energy step (eV) of the linear mesh.
             width: Standard deviation (eV) of the gaussian.
             mesh: Frequency mesh to use. If None, the mesh is computed automatically from the eigenvalues.
@@ -216,6 +208,18 @@ class ElectronInterpolator(metaclass=abc.ABCMeta):
             # Compute IDOS
             integral = scipy.integrate.cumtrapz(values, x=wmesh, initial=0.0)
 
+        elif method == "gaussian_binned":
+            for spin in range(self.nsppol):
+                values[spin] = gaussian_binned(wmesh, width, eigens[spin], weights=k.weights[:, None])
+            integral = scipy.integrate.cumtrapz(values, x=wmesh, initial=0.0)
+
+        elif method == "tetra":
+            # Reciprocal lattice vectors (without 2 pi) along the rows.
+            tetra = TetraMesh.from_grid(k.grid, k.mesh, k.bz2ibz, np.linalg.inv(self.cell[0]).T)
+            integral = np.zeros((self.nsppol, nw))
+            for spin in range(self.nsppol):
+                values[spin], integral[spin] = tetra.get_dos_idos(eigens[spin], wmesh)
+
         else:
             raise ValueError("Method %s is not supported" % method)
 
@@ -638,7 +642,48 @@ class ElectronInterpolator(metaclass=abc.ABCMeta):
             oeigs[nband]
         """
 
-    def interp_kpts(self, kfrac_coords, dk1=False, dk2=False):
+    def eval_kblock(self, kfrac_coords, dk1=False, dk2=False):
+        """
+        Interpolate eigenvalues for all spins and bands on a block of k-points.
+        Optionally compute gradients and Hessian matrices.
+
+        This default implementation calls `eval_sk` for each (spin, k-point).
+        Subclasses can override it with a vectorized version.
+
+        Args:
+            kfrac_coords: [nk, 3] array with k-points in reduced coordinates.
+            dk1 (bool): True if gradient is wanted.
+            dk2 (bool): True to compute 2nd order derivatives.
+
+        Return:
+            (eigens[nsppol, nk, nband], dedk[nsppol, nk, nband, 3], dedk2[nsppol, nk, nband, 3, 3])
+            dedk and dedk2 are set to None if not computed.
+        """
+        nk = len(kfrac_coords)
+        eigens = np.empty((self.nsppol, nk, self.nband))
+        dedk = None if not dk1 else np.empty((self.nsppol, nk, self.nband, 3))
+        dedk2 = None if not dk2 else np.empty((self.nsppol, nk, self.nband, 3, 3))
+
+        der1, der2 = None, None
+        for spin in range(self.nsppol):
+            for ik, kpt in enumerate(kfrac_coords):
+                if dk1: der1 = dedk[spin, ik]
+                if dk2: der2 = dedk2[spin, ik]
+                eigens[spin, ik] = self.eval_sk(spin, kpt, der1=der1, der2=der2)
+
+        return eigens, dedk, dedk2
+
+    def get_kblock_size(self, dk1=False, dk2=False, max_mem_mb=256):
+        """
+        Return the number of k-points that can be treated in a single call
+        to `eval_kblock` without exceeding `max_mem_mb` megabytes of workspace.
+        """
+        # Memory for output arrays of a single k-point.
+        ncomp = 1 + 3 * int(dk1) + 9 * int(dk2)
+        bytes_per_k = 8 * self.nsppol * self.nband * ncomp
+        return max(1, int(max_mem_mb * 1024**2 / bytes_per_k))
+
+    def interp_kpts(self, kfrac_coords, dk1=False, dk2=False, blocked=True, max_mem_mb=256):
         """
         Interpolate energies on an arbitrary set of k-points. Optionally, compute
         gradients and Hessian matrices.
@@ -647,6 +692,9 @@ class ElectronInterpolator(metaclass=abc.ABCMeta):
             kfrac_coords: K-points in reduced coordinates.
             dk1 (bool): True if gradient is wanted.
             dk2 (bool): True to compute 2nd order derivatives.
+            blocked: True if k-points should be processed in blocks with `eval_kblock`.
+                False to call `eval_sk` for each k-point (slow, mainly for testing purposes).
+            max_mem_mb: Max memory in Mb used for the workspace arrays of a single block.
 
         Return:
             namedtuple with:
@@ -665,12 +713,21 @@ class ElectronInterpolator(metaclass=abc.ABCMeta):
         dedk = None if not dk1 else np.empty((self.nsppol, new_nkpt, self.nband, 3))
         dedk2 = None if not dk2 else np.empty((self.nsppol, new_nkpt, self.nband, 3, 3))
 
-        der1, der2 = None, None
-        for spin in range(self.nsppol):
-            for ik, newk in enumerate(kfrac_coords):
-                if dk1: der1 = dedk[spin, ik]
-                if dk2: der2 = dedk2[spin, ik]
-                new_eigens[spin, ik] = self.eval_sk(spin, newk, der1=der1, der2=der2)
+        if blocked:
+            # Stream blocks of k-points so that the workspace does not exceed max_mem_mb.
+            eval_kblock = self.eval_kblock
+            nkb = self.get_kblock_size(dk1=dk1, dk2=dk2, max_mem_mb=max_mem_mb)
+        else:
+            # Use the generic implementation based on eval_sk.
+            eval_kblock = lambda kpts, dk1, dk2: ElectronInterpolator.eval_kblock(self, kpts, dk1=dk1, dk2=dk2)
+            nkb = max(1, new_nkpt)
+
+        for ks in range(0, new_nkpt, nkb):
+            ke = min(ks + nkb, new_nkpt)
+            eigs, der1, der2 = eval_kblock(kfrac_coords[ks:ke], dk1=dk1, dk2=dk2)
+            new_eigens[:, ks:ke] = eigs
+            if dk1: dedk[:, ks:ke] = der1
+            if dk2: dedk2[:, ks:ke] = der2
 
         if self.verbose:
             print("Interpolation completed in %.3f (s)" % (time.time() - start))
@@ -801,9 +858,7 @@ class SkwInterpolator(ElectronInterpolator):
 
         # Construct star functions for the ab-initio k-points.
         nsppol, nband, nkpt, nr = self.nsppol, self.nband, self.nkpt, self.nr
-        self.skr = np.empty((nkpt, nr), dtype=np.complex)
-        for ik, kpt in enumerate(kpts):
-            self.skr[ik] = self.get_stark(kpt)
+        self.skr = self.get_stark_block(kpts)[0]
 
         # Build H(k,k') matrix (Hermitian)
         hmat = np.empty((nkpt-1, nkpt-1), dtype=np.complex)
@@ -870,9 +925,10 @@ class SkwInterpolator(ElectronInterpolator):
 
         # Compare ab-initio data with interpolated results.
         mae = 0.0
+        skw_eigens = self.eval_kblock(kpts)[0]
         for spin in range(nsppol):
             for ik, kpt in enumerate(kpts):
-                skw_eb = self.eval_sk(spin, kpt)
+                skw_eb = skw_eigens[spin, ik]
                 mae += np.abs(eigens[spin, ik] - skw_eb).sum()
                 if self.verbose >= 10:
                     # print interpolated eigenvales
@@ -943,7 +999,7 @@ class SkwInterpolator(ElectronInterpolator):
                     value = np.matmul(self.coefs[spin, :, :], skr_dk2[ii,jj])
                     if not self.iscomplexobj: value = value.real
                     der2[:, ii, jj] = value
-                    if ii != jj: der2[jj, ii] = der2[ii, jj]
+                    if ii != jj: der2[:, jj, ii] = der2[:, ii, jj]
 
         return oeigs
 
@@ -1050,26 +1106,161 @@ class SkwInterpolator(ElectronInterpolator):
             of the star function wrt k in reduced coordinates.
         """
         srk_dk2 = np.zeros((3, 3, self.nr), dtype=np.complex)
-        raise NotImplementedError()
-        #work = zero
-        #do isym=1,self.ptg_nsym
-        #   sk = two_pi * matmul(transpose(self%ptg_symrel(:,:,isym)), kpt)
-        #   do ir=1,self%nr
-        #     sr = matmul(self%ptg_symrel(:,:,isym), self%rpts(:,ir))
-        #     eiskr = exp(j_dpc * dot_product(sk, self%rpts(:,ir)))
-        #     do jj=1,3
-        #        do ii=1,jj
-        #            work(ii,jj,ir) = work(ii,jj,ir) + eiskr * sr(ii) * sr(jj)
-
-        #work = - work / self.ptg_nsym
-
-        #do jj=1,3
-        #   do ii=1,jj
-        #       srk_dk2(:, ii, jj) = work(ii, jj, :)
-        #       if (ii /= jj) srk_dk2(:,jj,ii) = work(:,ii,jj)
+        two_pi = 2.0 * np.pi
+
+        for omat in self.ptg_symrel:
+            sk = two_pi * np.matmul(omat.T, kpt)
+            exp_skr = np.exp(1.j * np.matmul(self.rpts, sk))
+            srpts = np.matmul(self.rpts, omat.T)
+            for jj in range(3):
+                for ii in range(jj + 1):
+                    srk_dk2[ii, jj] += exp_skr * srpts[:, ii] * srpts[:, jj]
+
+        srk_dk2 *= -1.0 / self.ptg_nsym
+        for jj in range(3):
+            for ii in range(jj):
+                srk_dk2[jj, ii] = srk_dk2[ii, jj]
 
         return srk_dk2
 
+    def _get_srpts(self):
+        """
+        Return the rotated lattice vectors S R used to compute the star functions.
+        If the point group contains the inversion, only one operation for each (S, -S) pair is kept.
+        Computed once and cached.
+
+        Return:
+            (srpts, has_inv) where srpts is a [nsym, nr, 3] array.
+        """
+        if not hasattr(self, "_srpts"):
+            symrel = self.ptg_symrel
+            # minus[i, j] is True if S_j = -S_i
+            minus = np.all(symrel[:, None] == -symrel[None, :], axis=(2, 3))
+            has_inv = bool(np.all(minus.any(axis=1)))
+            if has_inv:
+                isyms = [isym for isym in range(self.ptg_nsym) if np.argmax(minus[isym]) > isym]
+                symrel = symrel[isyms]
+            self._srpts = (np.einsum("sij,rj->sri", symrel, self.rpts), has_inv)
+
+        return self._srpts
+
+    def get_stark_block(self, kpts, dk1=False, dk2=False):
+        """
+        Compute the star functions (and optionally their derivatives wrt k)
+        for a block of k-points.
+
+        Args:
+            kpts: [nk, 3] array with k-points in reduced coordinates.
+            dk1 (bool): True if 1st-order derivatives are wanted.
+            dk2 (bool): True if 2nd-order derivatives are wanted.
+
+        Return:
+            (skr[nk, nr], skr_dk1[3, nk, nr], skr_dk2[6, nk, nr])
+            skr_dk2 contains the upper triangle of the Hessian in the order given by `self._dk2_inds`.
+            skr_dk1 and skr_dk2 are set to None if not computed.
+            Arrays are real if the point group contains the inversion.
+        """
+        kpts = np.reshape(kpts, (-1, 3))
+        nk = len(kpts)
+        two_pi = 2.0 * np.pi
+        srpts_sym, has_inv = self._get_srpts()
+
+        # exp(i S^T k.R) = exp(i k.SR) hence we can use the rotated R-points.
+        # With inversion, exp(i k.SR) + exp(-i k.SR) = 2 cos(k.SR) and the star functions are real.
+        dtype = np.float if has_inv else np.complex
+        skr = np.zeros((nk, self.nr), dtype=dtype)
+        skr_dk1 = None if not dk1 else np.zeros((3, nk, self.nr), dtype=dtype)
+        skr_dk2 = None if not dk2 else np.zeros((6, nk, self.nr), dtype=dtype)
+
+        for srpts in srpts_sym:
+            arg = two_pi * np.matmul(kpts, srpts.T)
+            if has_inv:
+                # Note: derivatives of cos give -sin.
+                exp_skr = np.cos(arg)
+                der_skr = np.sin(arg) if dk1 else None
+            else:
+                # This is much faster than np.exp(1j * arg)
+                exp_skr = np.cos(arg) + 1j * np.sin(arg)
+                der_skr = exp_skr
+
+            skr += exp_skr
+            if dk1:
+                for ii in range(3):
+                    skr_dk1[ii] += der_skr * srpts[:, ii]
+            if dk2:
+                for ij, (ii, jj) in enumerate(self._dk2_inds):
+                    skr_dk2[ij] += exp_skr * (srpts[:, ii] * srpts[:, jj])
+
+        if has_inv:
+            skr *= 2.0 / self.ptg_nsym
+            if dk1: skr_dk1 *= -2.0 / self.ptg_nsym
+            if dk2: skr_dk2 *= -2.0 / self.ptg_nsym
+        else:
+            skr /= self.ptg_nsym
+            if dk1: skr_dk1 *= 1.j / self.ptg_nsym
+            if dk2: skr_dk2 *= -1.0 / self.ptg_nsym
+
+        return skr, skr_dk1, skr_dk2
+
+    # Indices of the independent entries of the Hessian.
+    _dk2_inds = [(0, 0), (0, 1), (1, 1), (0, 2), (1, 2), (2, 2)]
+
+    def get_kblock_size(self, dk1=False, dk2=False, max_mem_mb=256):
+        """
+        Return the number of k-points that can be treated in a single call
+        to `eval_kblock` without exceeding `max_mem_mb` megabytes of workspace.
+        """
+        # star functions + derivatives + workspace arrays for the phases.
+        ncomp = 3 + 3 * int(dk1) + 6 * int(dk2)
+        bytes_per_k = 16 * self.nr * ncomp + 16 * self.nsppol * self.nband * ncomp
+        return max(1, int(max_mem_mb * 1024**2 / bytes_per_k))
+
+    def eval_kblock(self, kfrac_coords, dk1=False, dk2=False):
+        """
+        Interpolate eigenvalues for all spins and bands on a block of k-points.
+        Optionally compute gradients and Hessian matrices.
+        Eigenvalues and derivatives are obtained with a single matrix-matrix multiplication.
+
+        Args:
+            kfrac_coords: [nk, 3] array with k-points in reduced coordinates.
+            dk1 (bool): True if gradient is wanted.
+            dk2 (bool): True to compute 2nd order derivatives.
+
+        Return:
+            (eigens[nsppol, nk, nband], dedk[nsppol, nk, nband, 3], dedk2[nsppol, nk, nband, 3, 3])
+            dedk and dedk2 are set to None if not computed.
+        """
+        kfrac_coords = np.reshape(kfrac_coords, (-1, 3))
+        nk, nsppol, nband = len(kfrac_coords), self.nsppol, self.nband
+        skr, skr_dk1, skr_dk2 = self.get_stark_block(kfrac_coords, dk1=dk1, dk2=dk2)
+
+        # Stack star functions and derivatives: [ncomp * nk, nr] x [nr, nsppol * nband]
+        stars = [skr[None]]
+        if dk1: stars.append(skr_dk1)
+        if dk2: stars.append(skr_dk2)
+        stars = np.concatenate(stars) if len(stars) > 1 else stars[0]
+        ncomp = len(stars)
+
+        coefs = np.reshape(self.coefs, (nsppol * nband, self.nr))
+        values = np.matmul(np.reshape(stars, (ncomp * nk, self.nr)), coefs.T)
+        if not self.iscomplexobj: values = values.real
+
+        # [ncomp, nk, nsppol, nband] --> [ncomp, nsppol, nk, nband]
+        values = np.reshape(values, (ncomp, nk, nsppol, nband)).transpose(0, 2, 1, 3)
+
+        eigens = values[0].copy()
+        dedk, dedk2 = None, None
+        if dk1:
+            dedk = np.ascontiguousarray(values[1:4].transpose(1, 2, 3, 0))
+        if dk2:
+            dedk2 = np.empty((nsppol, nk, nband, 3, 3), dtype=values.dtype)
+            start = 4 if dk1 else 1
+            for ij, (ii, jj) in enumerate(self._dk2_inds):
+                dedk2[..., ii, jj] = values[start + ij]
+                if ii != jj: dedk2[..., jj, ii] = values[start + ij]
+
+        return eigens, dedk, dedk2
+
     #def find_stationary_points(self, kmesh, bstart=None, bstop=None, is_shift=None)
     #    k = self.get_sampling(kmesh, is_shift)
     #    if bstart is None: bstart = self.nelect // 2 - 1
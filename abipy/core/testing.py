@@ -306,6 +306,19 @@ class AbipyTest(PymatgenTest):
 
     SkipTest = unittest.SkipTest
 
+    @classmethod
+    def setUpClass(cls):
+        """Disable the k-mesh cache so that the tests do not write files in the home directory of the user."""
+        from abipy.core.kpoints import set_kmesh_cache_dir
+        cls._old_kmesh_cache_dir = set_kmesh_cache_dir(None)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        from abipy.core.kpoints import set_kmesh_cache_dir
+        set_kmesh_cache_dir(cls._old_kmesh_cache_dir)
+        super().tearDownClass()
+
     @staticmethod
     def which(program):
         """Returns full path to a executable. None if not found or not executable."""
@@ -87,6 +87,23 @@ class TestFunction1D(AbipyTest):
             real_part = eix.real_from_kk(with_div=with_div)
             imag_part = real_part.imag_from_kk(with_div=with_div)
 
+        # FFT and quadrature should agree for a smooth response function.
+        mesh = np.linspace(0, 30, 601)
+        chi = Function1D(mesh, 4 / (3.0 ** 2 - mesh ** 2 - 2j * mesh))
+        # The quadrature is less accurate close to zero.
+        inner = (mesh > 0.5) & (mesh < 15)
+        for kk_fft, kk_quad in [(chi.real_from_kk(), chi.real_from_kk(method="quad")),
+                                (chi.imag_from_kk(), chi.imag_from_kk(method="quad"))]:
+            assert kk_fft.has_same_mesh(chi)
+            assert np.abs(kk_fft.values - kk_quad.values)[inner].max() < 2e-2
+        assert np.abs(chi.real_from_kk().values - chi.values.real)[mesh < 15].max() < 1e-3
+        # The power-law tail reduces the error close to the end of the mesh.
+        err_trunc = abs(chi.imag_from_kk().values[-1] - chi.values.imag[-1])
+        err_tail = abs(chi.imag_from_kk(tail=2).values[-1] - chi.values.imag[-1])
+        assert err_tail < 1e-2 * err_trunc
+        with self.assertRaises(ValueError):
+            chi.real_from_kk(method="foo")
+
         if self.has_matplotlib():
             cosf.plot(show=False)
             eix.plot(show=False)
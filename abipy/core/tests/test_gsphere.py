@@ -62,3 +62,54 @@ class TestGSphere(AbipyTest):
                 int_r = mesh.integrate(fr)
                 int_g = fg[...,0,0,0]
                 self.assert_almost_equal(int_r, int_g)
+
+    def test_tofftmesh_fromfftmesh(self):
+        """Scatter/gather between G-sphere and FFT mesh"""
+        rprimd = np.eye(3)
+        mesh = Mesh3D((8, 9, 10), rprimd)
+        gvecs = np.array([[i, j, k] for i in range(-3, 4) for j in range(-3, 4) for k in range(-3, 4)
+                          if i**2 + j**2 + k**2 <= 9])
+        gsphere = GSphere(2, rprimd, [0, 0, 0], gvecs, istwfk=1)
+
+        ug = np.random.rand(3, gsphere.npw) + 1j * np.random.rand(3, gsphere.npw)
+        ug_mesh = gsphere.tofftmesh(mesh, ug)
+        assert ug_mesh.shape == (3,) + mesh.shape
+        for ig, g in enumerate(gvecs):
+            self.assert_equal(ug_mesh[:, g[0], g[1], g[2]], ug[:, ig])
+        assert np.count_nonzero(ug_mesh[0]) == gsphere.npw
+        self.assert_equal(gsphere.fromfftmesh(mesh, ug_mesh), ug)
+        # Indices are cached per mesh.
+        assert gsphere.get_fft_inds(mesh) is gsphere.get_fft_inds(mesh)
+
+        # Single band keeps the input shape.
+        assert gsphere.tofftmesh(mesh, ug[0]).shape == mesh.shape
+        self.assert_equal(gsphere.fromfftmesh(mesh, gsphere.tofftmesh(mesh, ug[0]).flatten()), ug[0])
+
+        with self.assertRaises(ValueError):
+            gsphere.tofftmesh(Mesh3D((3, 3, 3), rprimd), ug)
+
+        # Time-reversal storage: keep half of the sphere, u(r) must be real at Gamma.
+        # k-points associated to istwfk in Abinit.
+        istwfk2kpt = {2: [0, 0, 0], 3: [0.5, 0, 0], 4: [0, 0, 0.5], 5: [0.5, 0, 0.5],
+                      6: [0, 0.5, 0], 7: [0.5, 0.5, 0], 8: [0, 0.5, 0.5], 9: [0.5, 0.5, 0.5]}
+        assert GSphere(2, rprimd, [0, 0, 0], gvecs, istwfk=1).g0 is None
+        for istwfk, kpt in istwfk2kpt.items():
+            g0 = np.rint(2 * np.array(kpt)).astype(int)
+            keep = [g for g in gvecs if tuple(g) >= tuple(-g - g0)]
+            half = GSphere(2, rprimd, kpt, keep, istwfk=istwfk)
+            self.assert_equal(half.g0, g0)
+            uh = np.random.rand(half.npw) + 1j * np.random.rand(half.npw)
+            selfc = np.all(2 * half.gvecs == -g0, axis=1)
+            uh[selfc] = uh[selfc].real
+            uh_mesh = half.tofftmesh(mesh, uh)
+            for ig, g in enumerate(half.gvecs):
+                self.assert_almost_equal(uh_mesh[tuple((-g - g0) % mesh.shape)], uh[ig].conj())
+            self.assert_equal(half.fromfftmesh(mesh, uh_mesh.flatten()), uh)
+            # Norm on the sphere must agree with the norm on the full FFT box.
+            self.assert_almost_equal(half.vdot(uh, uh), np.vdot(uh_mesh, uh_mesh))
+            if istwfk == 2:
+                ur = mesh.fft_g2r(uh_mesh, fg_ishifted=False)
+                self.assert_almost_equal(ur.imag, 0)
+
+        with self.assertRaises(ValueError):
+            GSphere(2, rprimd, [0, 0, 0], gvecs, istwfk=10)
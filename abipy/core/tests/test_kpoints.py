@@ -9,7 +9,8 @@ from pymatgen.core.lattice import Lattice
 from abipy import abilab
 from abipy.core.kpoints import (wrap_to_ws, wrap_to_bz, issamek, Kpoint, KpointList, IrredZone, Kpath, KpointsReader,
     has_timrev_from_kptopt, KSamplingInfo, as_kpoints, rc_list, kmesh_from_mpdivs, map_grid2ibz,
-    set_atol_kdiff, set_spglib_tols, kpath_from_bounds_and_ndivsm, build_segments)  #Ktables,
+    set_atol_kdiff, set_spglib_tols, kpath_from_bounds_and_ndivsm, build_segments, KpointIndex,
+    map_kpoints, find_irred_kpoints_generic, Ktables, set_kmesh_cache_dir)
 from abipy.core.testing import AbipyTest
 
 
@@ -207,6 +208,20 @@ class TestKpointList(AbipyTest):
         for kpoint in klist: kpoint.set_weight(1.0)
         assert np.all(klist.weights == 1.0)
 
+        # Kpoint objects are created on the fly from the arrays stored in klist.
+        assert klist[-1] == klist[2] and klist[0:2] == [klist[0], klist[1]]
+        assert [k for k in reversed(klist)] == [klist[2], klist[1], klist[0]]
+        with self.assertRaises(IndexError):
+            klist[3]
+        assert klist.names == [None, None, None]
+        klist[1].set_name("\\Gamma")
+        assert klist.names == [None, "$\\Gamma$", None]
+        assert klist[1].name == "$\\Gamma$"
+        same_k = self.serialize_with_pickle(klist[1], protocols=[-1])[0]
+        assert type(same_k) is Kpoint and same_k.name == "$\\Gamma$" and same_k == klist[1]
+        self.assert_equal(klist[1].cart_coords, klist.get_cart_coords()[1])
+        assert (klist[2] - klist[1]) == Kpoint([-1/6, -1/6, -1/6], lattice)
+
         # Test find_closest
         iclose, kclose, dist = klist.find_closest([0, 0, 0])
         assert iclose == 0 and dist == 0.
@@ -246,6 +261,40 @@ class TestKpointList(AbipyTest):
         with self.assertRaises(ValueError):
             klist.index((0, 0, 0))
 
+    def test_kpoint_index(self):
+        """Testing KpointIndex."""
+        mpdivs, shift = np.array([4, 3, 2]), np.array([0.5, 0, 0])
+        grid = np.array(list(itertools.product(range(4), range(3), range(2))))
+        frac_coords = (grid + shift) / mpdivs
+        # Add duplicated point (modulo G).
+        frac_coords = np.concatenate([frac_coords, frac_coords[3:4] + [1, 0, -1]])
+
+        rng = np.random.RandomState(0)
+        queries = np.concatenate([frac_coords + rng.randint(-2, 3, size=frac_coords.shape), [[0.1, 0.2, 0.3]]])
+        for kindex in (KpointIndex(frac_coords, mpdivs=mpdivs, shift=shift), KpointIndex(frac_coords)):
+            inds = kindex.find_first(queries)
+            # Compare with brute force search.
+            for q, ind in zip(queries, inds):
+                ref = [i for i, k in enumerate(frac_coords) if issamek(q, k)]
+                assert ind == (ref[0] if ref else -1)
+            self.assert_equal(kindex.find_all(frac_coords[3]), [3, len(frac_coords) - 1])
+            assert len(kindex.find_all([0.1, 0.2, 0.3])) == 0
+
+        assert KpointIndex(frac_coords, mpdivs=mpdivs, shift=shift).is_grid
+        assert not KpointIndex(frac_coords).is_grid
+        # Points not in the mesh --> fallback to KD-tree
+        assert not KpointIndex(queries, mpdivs=mpdivs, shift=shift).is_grid
+
+        # k --> k + q map should agree with brute force search.
+        klist = KpointList(self.lattice, frac_coords)
+        qpt = frac_coords[5] - frac_coords[0]
+        k2kqg = klist.get_k2kqg_map(qpt)
+        assert len(k2kqg) == len(klist)
+        for ik, (ikq, g0) in k2kqg.items():
+            kpq = frac_coords[ik] + qpt
+            assert ikq == [i for i, k in enumerate(frac_coords) if issamek(kpq, k)][0]
+            self.assert_equal(g0, np.rint(kpq - frac_coords[ikq]))
+
 
 class TestIrredZone(AbipyTest):
 
@@ -627,6 +676,70 @@ class TestKmappingTools(AbipyTest):
 
         assert not errors
 
+    def test_map_kpoints(self):
+        """Testing map_kpoints."""
+        nx, ny, nz = self.ngkpt
+        bz = np.reshape([[ix/nx, iy/ny, iz/nz] for ix, iy, iz in
+                         itertools.product(range(nx), range(ny), range(nz))], (-1, 3))[::7]
+        symrecs = [o.rot_g for o in self.mgb2.abi_spacegroup.fm_symmops]
+        rlatt = self.mgb2.reciprocal_lattice.matrix
+        o2r_map, nmissing = map_kpoints(bz, rlatt, rlatt, self.kibz, symrecs, self.has_timrev)
+        assert nmissing == 0 and len(o2r_map) == len(bz)
+        for kbz, kmap in zip(bz, o2r_map):
+            krot = kmap.tsign * np.matmul(symrecs[kmap.isym], self.kibz[kmap.ik_ref])
+            self.assert_almost_equal(kbz, krot + kmap.g0)
+
+        # Points that are not in the IBZ.
+        o2r_map, nmissing = map_kpoints([[0.01, 0.02, 0.03]], rlatt, rlatt, self.kibz, symrecs, self.has_timrev)
+        assert nmissing == 1 and o2r_map[0] is None
+
+    def test_find_irred_kpoints_generic(self):
+        """Testing find_irred_kpoints_generic."""
+        nx, ny, nz = self.ngkpt
+        bz = np.reshape([[ix/nx, iy/ny, iz/nz] for ix, iy, iz in
+                         itertools.product(range(nx), range(ny), range(nz))], (-1, 3))
+        irred_map = find_irred_kpoints_generic(self.mgb2, bz, verbose=0).irred_map
+        assert len(irred_map) == len(self.kibz)
+        assert irred_map[0] == 0
+
+        # Compare with the brute force algorithm on a small set of points.
+        kcoords = bz[::131]
+        irred_map = find_irred_kpoints_generic(self.mgb2, kcoords, verbose=0).irred_map
+        ref_map = [0]
+        for ik, kk in enumerate(kcoords[1:], start=1):
+            if not any(issamek(symmop.rotate_k(kcoords[ik_irr]), kk)
+                       for ik_irr in ref_map for symmop in self.mgb2.abi_spacegroup):
+                ref_map.append(ik)
+        self.assert_equal(irred_map, ref_map)
+
+    def test_ktables(self):
+        """Testing Ktables and the k-mesh cache."""
+        import tempfile, os
+        cache_dir = tempfile.mkdtemp()
+        old_dir = set_kmesh_cache_dir(cache_dir)
+        try:
+            k = Ktables(self.mgb2, [6, 6, 4], is_shift=None, has_timrev=True)
+            repr(k); str(k)
+            assert len(os.listdir(cache_dir)) == 1
+            assert k.nbz == 6 * 6 * 4 and len(k.bz2ibz) == k.nbz
+            self.assert_almost_equal(k.weights.sum(), 1.0)
+            # Each BZ point is mapped onto an IBZ point of the same star.
+            for kbz, ik_ibz in zip(k.bz, k.bz2ibz):
+                assert any(issamek(symmop.rotate_k(k.ibz[ik_ibz]), kbz) for symmop in self.mgb2.abi_spacegroup)
+            self.assert_equal(np.bincount(k.bz2ibz) / k.nbz, k.weights)
+
+            # Second call reads the mesh from the cache.
+            same_k = Ktables(self.mgb2, [6, 6, 4], is_shift=None, has_timrev=True)
+            assert len(os.listdir(cache_dir)) == 1
+            self.assert_equal(same_k.bz2ibz, k.bz2ibz)
+            self.assert_equal(same_k.ibz, k.ibz)
+
+            # Different shift --> new entry.
+            Ktables(self.mgb2, [6, 6, 4], is_shift=[1, 1, 1], has_timrev=True)
+            assert len(os.listdir(cache_dir)) == 2
+        finally:
+            set_kmesh_cache_dir(old_dir)
+
     #def test_with_from_structure_with_symrec(self):
     #    """Generate Ktables from a structure with Abinit symmetries."""
     #    self.mgb2 = self.get_abistructure.mgb2("mgb2_kpath_FATBANDS.nc")
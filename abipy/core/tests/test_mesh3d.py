@@ -77,6 +77,38 @@ class TestMesh3D(AbipyTest):
                     r += shift
                     self.assert_equal(mesh_443.i_closest_gridpoints(r), [[ix, iy, iz]])
 
+    def test_gridpoints_in_spheres(self):
+        """Testing Mesh3D.get_gridpoints_in_spheres"""
+        vectors = np.array([[4.0, 0.0, 0.0], [1.0, 3.5, 0.0], [0.5, 0.3, 3.0]])
+        mesh = Mesh3D((8, 7, 6), vectors)
+        points = np.array([[0.1, 0.2, 0.3], [3.9, 3.4, 2.9], [-0.7, 5.0, 1.0]])
+        radius = 1.3
+        gps = mesh.get_gridpoints_in_spheres(points, radius)
+        assert len(gps.ptr) == len(points) + 1
+        assert np.all(gps.dists <= radius)
+        self.assert_equal(gps.inds_uc, np.mod(gps.inds, mesh.shape))
+        # Stencil is cached.
+        assert mesh._get_sphere_stencil(radius) is mesh._get_sphere_stencil(radius)
+
+        # Brute force over the periodic images of the gridpoints.
+        dvs = np.array([mesh.dvx, mesh.dvy, mesh.dvz])
+        rng = [np.arange(-2 * n, 3 * n) for n in mesh.shape]
+        all_inds = np.reshape(np.stack(np.meshgrid(*rng, indexing="ij"), axis=-1), (-1, 3))
+        all_cart = np.dot(all_inds, dvs)
+        for ip, pp in enumerate(points):
+            dists = np.linalg.norm(all_cart - pp, axis=1)
+            ref = set(map(tuple, all_inds[dists <= radius]))
+            sl = slice(gps.ptr[ip], gps.ptr[ip + 1])
+            assert set(map(tuple, gps.inds[sl])) == ref
+            self.assert_almost_equal(gps.dists[sl], np.linalg.norm(np.dot(gps.inds[sl], dvs) - pp, axis=1))
+
+        # List-based API
+        dist_gridpoints = mesh.dist_gridpoints_in_spheres(points, radius)
+        assert len(dist_gridpoints) == len(points)
+        igp_uc, dist, igp = dist_gridpoints[0][0]
+        self.assert_equal(igp_uc, gps.inds_uc[0])
+        assert dist == gps.dists[0]
+
     def test_fft(self):
         """Test FFT transforms with mesh3d"""
         rprimd = np.array([1.,0,0, 0,1,0, 0,0,1])
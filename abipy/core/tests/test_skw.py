@@ -56,12 +56,27 @@ class TestSkwInterpolator(AbipyTest):
         assert res1.dedk.shape == (skw.nsppol, len(new_kcoords), skw.nband, 3)
         # Group velocities at Gamma should be zero by symmetry.
         self.assert_almost_equal(res1.dedk[0, 0], 0.0)
-        #assert 0
-        #res12 = skw.interp_kpts(new_kcoords, dk1=True, dk2=True)
-        #print(res12.dedk2)
+
+        # Blocked algorithm should give the same results as the loop over k-points.
+        res12 = skw.interp_kpts(new_kcoords, dk1=True, dk2=True, max_mem_mb=0.01)
+        assert skw.get_kblock_size(dk1=True, dk2=True, max_mem_mb=0.01) < len(new_kcoords)
+        ref12 = skw.interp_kpts(new_kcoords, dk1=True, dk2=True, blocked=False)
+        assert res12.dedk2.shape == (skw.nsppol, len(new_kcoords), skw.nband, 3, 3)
+        self.assert_almost_equal(res12.eigens, ref12.eigens)
+        self.assert_almost_equal(res12.dedk, ref12.dedk)
+        self.assert_almost_equal(res12.dedk2, ref12.dedk2)
+        self.assert_almost_equal(res12.eigens, new_eigens)
+        # Hessian is symmetric.
+        self.assert_almost_equal(res12.dedk2, res12.dedk2.transpose(0, 1, 2, 4, 3))
 
         # Test interpolation routines (high-level API).
         edos = skw.get_edos(kmesh, is_shift=None, method="gaussian", step=0.1, width=0.2, wmesh=None)
+        bdos = skw.get_edos(kmesh, is_shift=None, method="gaussian_binned", step=0.1, width=0.2, wmesh=None)
+        assert np.abs(bdos.values - edos.values).max() < 1e-2 * edos.values.max()
+        tdos = skw.get_edos(kmesh, is_shift=None, method="tetra", step=0.1, wmesh=None)
+        assert tdos.values.shape == edos.values.shape
+        # IDOS integrates to the number of bands.
+        self.assert_almost_equal(tdos.integral[:, -1], skw.nband)
         #jdos = skw.get_jdos_q0(kmesh, is_shift=None, method="gaussian", step=0.1, width=0.2, wmesh=None)
         #nest = skw.get_nesting_at_e0(qpoints, kmesh, e0, width=0.2, is_shift=None)
 
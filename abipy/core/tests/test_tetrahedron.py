@@ -0,0 +1,57 @@
+"""Tests for core.tetrahedron module"""
+import numpy as np
+
+from abipy.core.testing import AbipyTest
+from abipy.core.tetrahedron import TetraMesh
+
+
+class TestTetraMesh(AbipyTest):
+    """Unit tests for TetraMesh."""
+
+    def test_cubic_tight_binding(self):
+        """Testing tetrahedron DOS for simple cubic tight-binding model."""
+        mesh = [12, 12, 12]
+        grid = np.array([[i, j, k] for i in range(mesh[0]) for j in range(mesh[1]) for k in range(mesh[2])])
+        # No symmetry: each point of the mesh is a different IBZ point.
+        bz2ibz = np.arange(len(grid))
+        tetra = TetraMesh.from_grid(grid, mesh, bz2ibz, np.eye(3))
+        repr(tetra); str(tetra)
+        assert tetra.nibz == len(grid)
+        assert tetra.ntetra_bz == 6 * len(grid)
+        self.assert_almost_equal(tetra.tvols.sum(), 1.0)
+
+        kfrac = grid / np.array(mesh)
+        eigens = -2 * np.cos(2 * np.pi * kfrac).sum(axis=1)
+        eigens = np.stack([eigens, eigens + 1], axis=1)
+        wmesh = np.linspace(-8, 9, 341)
+
+        dos, idos = tetra.get_dos_idos(eigens, wmesh)
+        assert dos.shape == idos.shape == wmesh.shape
+        assert np.all(dos >= 0)
+        # IDOS integrates to the number of bands and the DOS is its derivative.
+        self.assert_almost_equal(idos[0], 0.0)
+        self.assert_almost_equal(idos[-1], 2.0)
+        self.assert_almost_equal(np.trapz(dos, x=wmesh), 2.0, decimal=2)
+
+        # Generic weights should reproduce the standard DOS with unit weights.
+        w = np.ones((3, tetra.nibz, 2))
+        w[1] = 2
+        w[2, :, 1] = 0
+        wdos, widos = tetra.get_dos_idos(eigens, wmesh, weights=w)
+        assert wdos.shape == (3, len(wmesh))
+        self.assert_almost_equal(wdos[0], dos)
+        self.assert_almost_equal(widos[0], idos)
+        self.assert_almost_equal(wdos[1], 2 * dos)
+        self.assert_almost_equal(widos[2, -1], 1.0)
+
+        # Results should not depend on the size of the chunks.
+        cdos, cidos = tetra.get_dos_idos(eigens, wmesh, weights=w, max_pairs=100)
+        self.assert_almost_equal(cdos, wdos)
+        self.assert_almost_equal(cidos, widos)
+
+        # Blochl correction does not change the total number of states.
+        bdos, bidos = tetra.get_dos_idos(eigens, wmesh, weights=w, blochl=True)
+        self.assert_almost_equal(bidos[:, -1], widos[:, -1])
+
+        with self.assertRaises(ValueError):
+            tetra.get_dos_idos(eigens[1:], wmesh)
@@ -0,0 +1,343 @@
+# coding: utf-8
+"""
+Linear tetrahedron method for the integration of quantities defined on homogeneous k-meshes.
+For the theoretical background see :cite:`Blochl1994`.
+"""
+import numpy as np
+
+
+__all__ = [
+    "TetraMesh",
+]
+
+
+# The six tetrahedra sharing the main diagonal 0 --> 7 of the sub-cube.
+# Corners are labelled with bits (a, b, c) --> 4 * a + 2 * b + c
+_TETRA_CORNERS = np.array([
+    [0, 4, 6, 7],
+    [0, 4, 5, 7],
+    [0, 2, 6, 7],
+    [0, 2, 3, 7],
+    [0, 1, 5, 7],
+    [0, 1, 3, 7],
+], dtype=np.int)
+
+
+class TetraMesh(object):
+    """
+    Tetrahedra obtained by splitting the sub-cubes of a homogeneous k-mesh in the full BZ.
+    Tetrahedra are expressed in terms of the indices of the k-points in the IBZ and
+    tetrahedra with the same vertices (modulo permutations) are merged and treated only once.
+
+    .. rubric:: Inheritance Diagram
+    .. inheritance-diagram:: TetraMesh
+    """
+
+    def __init__(self, bz2ibz, reciprocal_matrix):
+        """
+        Args:
+            bz2ibz: [n0, n1, n2] array with the index of the IBZ point associated to each point of the mesh.
+            reciprocal_matrix: [3, 3] matrix with the reciprocal lattice vectors along the rows.
+                Used to select the shortest main diagonal of the sub-cubes.
+        """
+        bz2ibz = np.asarray(bz2ibz, dtype=np.int)
+        if bz2ibz.ndim != 3:
+            raise ValueError("Expecting 3d array for bz2ibz, got shape: %s" % str(bz2ibz.shape))
+        self.mesh = np.array(bz2ibz.shape)
+        self.nibz = bz2ibz.max() + 1
+        nbz = bz2ibz.size
+        n0, n1, n2 = self.mesh
+
+        # Select the shortest main diagonal. Corners p and 7 - p with p = 0, 1, 2, 3
+        gmat = np.asarray(reciprocal_matrix) / self.mesh[:, None]
+        diags = np.array([[1, 1, 1], [1, 1, -1], [1, -1, 1], [1, -1, -1]])
+        lengths = np.linalg.norm(np.matmul(diags, gmat), axis=1)
+        self.idiag = int(lengths.argmin())
+        corners = _TETRA_CORNERS ^ self.idiag
+
+        # Indices of the 8 corners of each sub-cube (periodic boundary conditions).
+        i0, i1, i2 = np.meshgrid(np.arange(n0), np.arange(n1), np.arange(n2), indexing="ij")
+        cube = np.empty((nbz, 8), dtype=np.int)
+        for p in range(8):
+            a, b, c = (p >> 2) & 1, (p >> 1) & 1, p & 1
+            cube[:, p] = bz2ibz[(i0 + a) % n0, (i1 + b) % n1, (i2 + c) % n2].ravel()
+
+        # [6 * nbz, 4] array with IBZ indices. Merge equivalent tetrahedra.
+        tetra = np.sort(cube[:, corners].reshape(-1, 4), axis=1)
+        self.ntetra_bz = len(tetra)
+        self.tetra, counts = np.unique(tetra, axis=0, return_counts=True)
+        self.ntetra = len(self.tetra)
+
+        # Volume of the tetrahedron divided by the volume of the BZ (including multiplicity).
+        self.tvols = counts / self.ntetra_bz
+
+    @classmethod
+    def from_grid(cls, grid, mesh, bz2ibz, reciprocal_matrix):
+        """
+        Build the object from the integer coordinates of the points in the full BZ
+        e.g. the grid addresses returned by spglib.
+
+        Args:
+            grid: [nbz, 3] array with integer coordinates of the BZ points.
+            mesh: Three integers with the number of divisions.
+            bz2ibz: [nbz] array with the BZ --> IBZ mapping.
+            reciprocal_matrix: [3, 3] matrix with the reciprocal lattice vectors along the rows.
+        """
+        mesh = np.asarray(mesh, dtype=np.int)
+        grid = np.asarray(grid, dtype=np.int) % mesh
+        bz2ibz_grid = -np.ones(mesh, dtype=np.int)
+        bz2ibz_grid[grid[:, 0], grid[:, 1], grid[:, 2]] = bz2ibz
+        if np.any(bz2ibz_grid == -1):
+            raise ValueError("Grid points do not cover the full mesh: %s" % str(mesh))
+
+        return cls(bz2ibz_grid, reciprocal_matrix)
+
+    @classmethod
+    def from_ktables(cls, ktables, reciprocal_matrix):
+        """Build the object from a :class:`Ktables` instance."""
+        return cls.from_grid(ktables.grid, ktables.mesh, ktables.bz2ibz, reciprocal_matrix)
+
+    def __str__(self):
+        return self.to_string()
+
+    def to_string(self, verbose=0):
+        """String representation."""
+        lines = []; app = lines.append
+        app("mesh: %s, number of IBZ points: %d" % (str(self.mesh), self.nibz))
+        app("Number of tetrahedra in the BZ: %d, inequivalent tetrahedra: %d" % (self.ntetra_bz, self.ntetra))
+        return "\n".join(lines)
+
+    def get_dos_idos(self, eigens, wmesh, weights=None, blochl=False, max_pairs=2**22):
+        """
+        Compute the DOS and the IDOS on the linear mesh `wmesh` with the linear tetrahedron method:
+
+            :math:`\\sum_{kb} f_{kb} \\delta(\\omega - \\epsilon_{kb})`
+
+        Args:
+            eigens: [nibz, nband] array with the energies in the IBZ.
+            wmesh: Linear mesh (sorted array).
+            weights: Optional array of shape [..., nibz, nband] with the values of the integrand
+                in the IBZ. If None, f_{kb} = 1 i.e. standard DOS.
+            blochl: True to use the Blöchl correction for the integration weights.
+            max_pairs: Max number of (tetrahedron, frequency) pairs treated at once.
+                Used to bound the memory.
+
+        Return:
+            (dos, idos) arrays of shape [..., nw]
+        """
+        eigens = np.asarray(eigens)
+        if eigens.shape[0] != self.nibz:
+            raise ValueError("eigens.shape: %s while nibz: %s" % (str(eigens.shape), self.nibz))
+        nband = eigens.shape[1]
+        wmesh = np.asarray(wmesh)
+        nw = len(wmesh)
+
+        unit_weights = weights is None
+        if unit_weights:
+            oshape = ()
+            weights = np.ones((1, self.nibz, nband))
+        else:
+            weights = np.asarray(weights)
+            oshape = weights.shape[:-2]
+            weights = np.reshape(weights, (-1, self.nibz, nband))
+        ncomp = len(weights)
+
+        dos = np.zeros((ncomp, nw))
+        idos_full = np.zeros((ncomp, nw + 1))
+        idos = np.zeros((ncomp, nw))
+
+        # Loop over bands and blocks of tetrahedra.
+        ntblock = max(1, max_pairs // 8)
+        for band in range(nband):
+            eband = eigens[:, band]
+            for start in range(0, self.ntetra, ntblock):
+                tetra = self.tetra[start:start + ntblock]
+                tvols = self.tvols[start:start + ntblock]
+                etet = eband[tetra]
+                iperm = np.argsort(etet, axis=1)
+                etet = np.take_along_axis(etet, iperm, axis=1)
+                # [ncomp, nt, 4] values of the integrand at the (sorted) vertices.
+                ftet = weights[:, np.take_along_axis(tetra, iperm, axis=1), band]
+
+                if unit_weights: origins, coefs = _tetra_idos_coefs(etet, tvols)
+
+                # Frequencies above e4 get the full contribution.
+                i1 = np.searchsorted(wmesh, etet[:, 0], side="right")
+                i4 = np.searchsorted(wmesh, etet[:, 3], side="left")
+                for ic in range(ncomp):
+                    idos_full[ic] += np.bincount(i4, weights=tvols * ftet[ic].sum(axis=1) / 4, minlength=nw + 1)
+
+                # Expand (tetra, frequency) pairs with e1 < w < e4 in chunks with at most max_pairs items.
+                counts = np.maximum(i4 - i1, 0)
+                cumcounts = np.cumsum(counts)
+                if len(cumcounts) == 0 or cumcounts[-1] == 0: continue
+                bounds = np.searchsorted(cumcounts, np.arange(0, cumcounts[-1], max_pairs), side="right")
+                bounds = np.unique(np.append(bounds, len(counts)))
+                ts = 0
+                for te in bounds:
+                    if te <= ts: continue
+                    cnt = counts[ts:te]
+                    npairs = cnt.sum()
+                    if npairs == 0:
+                        ts = te
+                        continue
+                    itet = np.repeat(np.arange(ts, te), cnt)
+                    offsets = cumcounts[ts:te] - cnt
+                    iw = i1[itet] + np.arange(npairs) + offsets[0] - offsets[itet - ts]
+
+                    if unit_weights:
+                        # The sum of the weights over the vertices is not affected by the Blöchl correction.
+                        # Evaluate the polynomial associated to the interval containing w.
+                        wpair = wmesh[iw]
+                        ipiece = (wpair >= etet[itet, 1]).astype(np.int) + (wpair >= etet[itet, 2])
+                        x = wpair - origins[itet, ipiece]
+                        c = coefs[itet, ipiece]
+                        dos[0] += np.bincount(iw, weights=(3 * c[:, 3] * x + 2 * c[:, 2]) * x + c[:, 1], minlength=nw)
+                        idos[0] += np.bincount(iw, weights=((c[:, 3] * x + c[:, 2]) * x + c[:, 1]) * x + c[:, 0],
+                                               minlength=nw)
+                    else:
+                        tw, dw = _tetra_weights(wmesh[iw], etet[itet], tvols[itet], blochl)
+                        for ic in range(ncomp):
+                            fv = ftet[ic][itet]
+                            dos[ic] += np.bincount(iw, weights=(fv * dw).sum(axis=1), minlength=nw)
+                            idos[ic] += np.bincount(iw, weights=(fv * tw).sum(axis=1), minlength=nw)
+                    ts = te
+
+        idos += np.cumsum(idos_full, axis=1)[:, :nw]
+
+        return np.reshape(dos, oshape + (nw,)), np.reshape(idos, oshape + (nw,))
+
+
+def _tetra_idos_coefs(etet, tvols):
+    """
+    The IDOS of a tetrahedron is a cubic polynomial in each of the three intervals
+    [e1, e2], [e2, e3], [e3, e4]. Return the coefficients of the polynomials
+    in powers of (w - e1), (w - e2) and (w - e4), respectively.
+
+    Args:
+        etet: [nt, 4] array with sorted energies at the vertices.
+        tvols: [nt] array with volume of the tetrahedron divided by the volume of the BZ.
+
+    Return:
+        (origins, coefs) with origins[nt, 3] and coefs[nt, 3, 4]
+    """
+    def safe_inv(x):
+        out = np.zeros(x.shape)
+        np.divide(1.0, x, out=out, where=x > 0)
+        return out
+
+    e1, e2, e3, e4 = etet.T
+    e21, e31, e41 = e2 - e1, e3 - e1, e4 - e1
+    e32, e42, e43 = e3 - e2, e4 - e2, e4 - e3
+
+    coefs = np.zeros((len(etet), 3, 4))
+    coefs[:, 0, 3] = tvols * safe_inv(e21 * e31 * e41)
+    fact = tvols * safe_inv(e31 * e41)
+    coefs[:, 1, 0] = fact * e21 ** 2
+    coefs[:, 1, 1] = 3 * fact * e21
+    coefs[:, 1, 2] = 3 * fact
+    coefs[:, 1, 3] = -fact * (e31 + e42) * safe_inv(e32 * e42)
+    coefs[:, 2, 0] = tvols
+    coefs[:, 2, 3] = tvols * safe_inv(e41 * e42 * e43)
+
+    return np.stack([e1, e2, e4], axis=1), coefs
+
+
+def _tetra_weights(w, etet, tvols, blochl):
+    """
+    Integration weights for the step function and the delta function at the four vertices
+    of the tetrahedra (Appendix B of :cite:`Blochl1994`).
+
+    Args:
+        w: [npts] array with frequencies. It is assumed that etet[:, 0] < w < etet[:, 3].
+        etet: [npts, 4] array with sorted energies at the vertices.
+        tvols: [npts] array with volume of the tetrahedron divided by the volume of the BZ.
+        blochl: True if Blöchl correction should be included.
+
+    Return:
+        (tw, dw) arrays of shape [npts, 4] with the weights for the step function and the delta function.
+    """
+    npts = len(w)
+    tw = np.zeros((npts, 4))
+    dw = np.zeros((npts, 4))
+    # DOS of the tetrahedron and its derivative (for the Blöchl correction).
+    dos = np.zeros(npts)
+    dos_dw = np.zeros(npts)
+
+    e1, e2, e3, e4 = etet.T
+    c4 = tvols / 4
+
+    # e1 < w < e2
+    m = w < e2
+    if m.any():
+        x = w[m] - e1[m]
+        e21, e31, e41 = e2[m] - e1[m], e3[m] - e1[m], e4[m] - e1[m]
+        den = e21 * e31 * e41
+        cc = c4[m] * x ** 3 / den
+        cc_dw = 3 * c4[m] * x ** 2 / den
+        s = 1 / e21 + 1 / e31 + 1 / e41
+        tw[m, 0] = cc * (4 - x * s)
+        tw[m, 1] = cc * x / e21
+        tw[m, 2] = cc * x / e31
+        tw[m, 3] = cc * x / e41
+        dw[m, 0] = cc_dw * (4 - x * s) - cc * s
+        dw[m, 1] = (cc_dw * x + cc) / e21
+        dw[m, 2] = (cc_dw * x + cc) / e31
+        dw[m, 3] = (cc_dw * x + cc) / e41
+        dos[m] = 4 * cc_dw
+        dos_dw[m] = 24 * c4[m] * x / den
+
+    # e2 <= w < e3
+    m = (w >= e2) & (w < e3)
+    if m.any():
+        wm, cm = w[m], c4[m]
+        e1m, e2m, e3m, e4m = e1[m], e2[m], e3[m], e4[m]
+        e21, e31, e41 = e2m - e1m, e3m - e1m, e4m - e1m
+        e32, e42 = e3m - e2m, e4m - e2m
+        w1, w2, w3, w4 = wm - e1m, wm - e2m, e3m - wm, e4m - wm
+        c1 = cm * w1 ** 2 / (e41 * e31)
+        c2 = cm * w1 * w2 * w3 / (e41 * e32 * e31)
+        c3 = cm * w2 ** 2 * w4 / (e42 * e32 * e41)
+        c1_dw = 2 * cm * w1 / (e41 * e31)
+        c2_dw = cm * (w2 * w3 + w1 * w3 - w1 * w2) / (e41 * e32 * e31)
+        c3_dw = cm * (2 * w2 * w4 - w2 ** 2) / (e42 * e32 * e41)
+        c12, c123, c23 = c1 + c2, c1 + c2 + c3, c2 + c3
+        c12_dw, c123_dw, c23_dw = c1_dw + c2_dw, c1_dw + c2_dw + c3_dw, c2_dw + c3_dw
+        tw[m, 0] = c1 + c12 * w3 / e31 + c123 * w4 / e41
+        tw[m, 1] = c123 + c23 * w3 / e32 + c3 * w4 / e42
+        tw[m, 2] = c12 * w1 / e31 + c23 * w2 / e32
+        tw[m, 3] = c123 * w1 / e41 + c3 * w2 / e42
+        dw[m, 0] = c1_dw + (c12_dw * w3 - c12) / e31 + (c123_dw * w4 - c123) / e41
+        dw[m, 1] = c123_dw + (c23_dw * w3 - c23) / e32 + (c3_dw * w4 - c3) / e42
+        dw[m, 2] = (c12_dw * w1 + c12) / e31 + (c23_dw * w2 + c23) / e32
+        dw[m, 3] = (c123_dw * w1 + c123) / e41 + (c3_dw * w2 + c3) / e42
+        dos[m] = 4 * cm / (e31 * e41) * (3 * e21 + 6 * w2 - 3 * (e31 + e42) * w2 ** 2 / (e32 * e42))
+        dos_dw[m] = 4 * cm / (e31 * e41) * (6 - 6 * (e31 + e42) * w2 / (e32 * e42))
+
+    # e3 <= w < e4
+    m = w >= e3
+    if m.any():
+        y = e4[m] - w[m]
+        e41, e42, e43 = e4[m] - e1[m], e4[m] - e2[m], e4[m] - e3[m]
+        den = e41 * e42 * e43
+        cc = c4[m] * y ** 3 / den
+        cc_dw = -3 * c4[m] * y ** 2 / den
+        s = 1 / e41 + 1 / e42 + 1 / e43
+        tw[m, 0] = c4[m] - cc * y / e41
+        tw[m, 1] = c4[m] - cc * y / e42
+        tw[m, 2] = c4[m] - cc * y / e43
+        tw[m, 3] = c4[m] - cc * (4 - y * s)
+        dw[m, 0] = -(cc_dw * y - cc) / e41
+        dw[m, 1] = -(cc_dw * y - cc) / e42
+        dw[m, 2] = -(cc_dw * y - cc) / e43
+        dw[m, 3] = -(cc_dw * (4 - y * s) + cc * s)
+        dos[m] = -4 * cc_dw
+        dos_dw[m] = -24 * c4[m] * y / den
+
+    if blochl:
+        # dw_i = D_T(w) / 40 sum_j (e_j - e_i)
+        esum = (etet.sum(axis=1)[:, None] - 4 * etet) / 40
+        tw += dos[:, None] * esum
+        dw += dos_dw[:, None] * esum
+
+    return tw, dw
@@ -4,7 +4,9 @@ Python API for the DDB file containing the derivatives of the total Energy wrt d
 """
 import sys
 import os
+import hashlib
 import tempfile
+import threading
 import itertools
 import numpy as np
 import pandas as pd
@@ -29,7 +31,7 @@ from abipy.iotools import ETSF_Reader
 from abipy.tools.numtools import data_from_cplx_mode
 from abipy.abio.inputs import AnaddbInput
 from abipy.dfpt.phonons import PhononDosPlotter, PhononBandsPlotter
-from abipy.dfpt.ifc import InteratomicForceConstants
+from abipy.dfpt.ifc import InteratomicForceConstants, PhononInterpolator
 from abipy.dfpt.elastic import ElasticData
 from abipy.dfpt.raman import Raman
 from abipy.core.abinit_units import phfactor_ev2units, phunit_tag
@@ -39,6 +41,224 @@ from abipy.tools.iotools import ExitStackWithFiles
 from abipy.tools.tensors import DielectricTensor, ZstarTensor, Stress
 from abipy.abio.robots import Robot
 
+import logging
+logger = logging.getLogger(__name__)
+
+
+# DDB files larger than this value (bytes) are indexed once and the index
+# is saved in a binary file next to the DDB. None disables the cache.
+_DDB_CACHE_MINSIZE = 4 * 1024 ** 2
+
+# Version of the format used for the cache. Increase it if _build_index changes.
+_DDB_INDEX_VERSION = 1
+
+
+def set_ddb_cache_minsize(nbytes):
+    """
+    Change the minimum size in bytes (``_DDB_CACHE_MINSIZE``) of the DDB files whose index
+    is cached in a binary file. None disables the cache. Return old value.
+    """
+    global _DDB_CACHE_MINSIZE
+    old = _DDB_CACHE_MINSIZE
+    _DDB_CACHE_MINSIZE = nbytes
+    return old
+
+
+# Directory used to store the results of the anaddb runs executed by DdbFile.
+# Results are indexed by the content of the DDB, the anaddb input and the version of anaddb.
+# None (default) disables the cache.
+_ANADDB_CACHE_DIR = None
+
+# Max size of the anaddb cache in bytes. The least recently used entries are removed when this size is exceeded.
+_ANADDB_CACHE_MAXSIZE = 1024 ** 3
+
+# Maximum number of anaddb processes executed concurrently by the shared executor.
+_ANADDB_MAX_WORKERS = 4
+_ANADDB_EXECUTOR = None
+
+
+def set_anaddb_cache_dir(new_dir):
+    """
+    Change the directory ``_ANADDB_CACHE_DIR`` used to cache the results of anaddb.
+    None disables the cache. Return old value.
+    """
+    global _ANADDB_CACHE_DIR
+    old_dir = _ANADDB_CACHE_DIR
+    _ANADDB_CACHE_DIR = new_dir
+    return old_dir
+
+
+def set_anaddb_cache_maxsize(nbytes):
+    """
+    Change the max size in bytes (``_ANADDB_CACHE_MAXSIZE``) of the directory used to cache
+    the results of anaddb. Return old value.
+    """
+    global _ANADDB_CACHE_MAXSIZE
+    old = _ANADDB_CACHE_MAXSIZE
+    _ANADDB_CACHE_MAXSIZE = nbytes
+    return old
+
+
+def set_anaddb_max_workers(num_workers):
+    """
+    Change the maximum number of anaddb processes (``_ANADDB_MAX_WORKERS``) executed
+    concurrently by the shared executor. Return old value.
+    """
+    global _ANADDB_MAX_WORKERS, _ANADDB_EXECUTOR
+    old = _ANADDB_MAX_WORKERS
+    _ANADDB_MAX_WORKERS = max(1, int(num_workers))
+    if _ANADDB_EXECUTOR is not None:
+        _ANADDB_EXECUTOR.shutdown(wait=False)
+        _ANADDB_EXECUTOR = None
+    return old
+
+
+def get_anaddb_executor():
+    """
+    Return the executor shared by the |DdbFile| objects to run anaddb.
+    Each worker waits for an anaddb subprocess so threads are used.
+    """
+    global _ANADDB_EXECUTOR
+    if _ANADDB_EXECUTOR is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _ANADDB_EXECUTOR = ThreadPoolExecutor(max_workers=_ANADDB_MAX_WORKERS)
+    return _ANADDB_EXECUTOR
+
+
+# Script used to run anaddb (without workdir) --> version of anaddb.
+_ANADDB_VERSIONS = {}
+_ANADDB_VERSIONS_LOCK = threading.Lock()
+
+
+def get_anaddb_version(manager=None, executable="anaddb"):
+    """
+    Return string with the version of the anaddb executable. None if not available.
+    The executable is run with the shell adapter of the |TaskManager| (same modules,
+    environment and pre_run commands as the |AnaddbTask|). Default manager from the user configuration.
+    """
+    from abipy.flowtk import TaskManager
+    import shutil
+    manager = TaskManager.as_manager(manager).to_shell_manager(mpi_procs=1)
+    workdir = tempfile.mkdtemp()
+    stdout = os.path.join(workdir, "run.abo")
+    try:
+        script = manager.qadapter.get_script_str(
+            job_name="anaddb_version",
+            launch_dir=workdir,
+            executable=executable,
+            qout_path=os.path.join(workdir, "queue.qout"),
+            qerr_path=os.path.join(workdir, "queue.qerr"),
+            stdout=stdout,
+            stderr=os.path.join(workdir, "run.err"),
+            exec_args=["--version"],
+        )
+        key = script.replace(os.path.abspath(workdir), "")
+        with _ANADDB_VERSIONS_LOCK:
+            if key not in _ANADDB_VERSIONS:
+                version = None
+                script_file = os.path.join(workdir, "job.sh")
+                with open(script_file, "wt") as fh:
+                    fh.write(script)
+                try:
+                    _, process = manager.qadapter.submit_to_queue(script_file)
+                    process.wait(timeout=60)
+                    process.stderr.close()
+                    with open(stdout, "rt") as fh:
+                        version = fh.read().strip()
+                    if process.returncode != 0 or not version: version = None
+                except Exception as exc:
+                    logger.warning("Cannot get version of %s:\n%s" % (executable, str(exc)))
+                _ANADDB_VERSIONS[key] = version
+
+            return _ANADDB_VERSIONS[key]
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# (filepath, size, mtime_ns) --> sha1 of the file.
+_FILE_HASHES = {}
+
+
+def _get_file_hash(filepath):
+    """Return the sha1 of the content of the file. Hashes are computed once per process."""
+    st = os.stat(filepath)
+    key = (os.path.abspath(filepath), st.st_size, st.st_mtime_ns)
+    if key not in _FILE_HASHES:
+        h = hashlib.sha1()
+        with open(filepath, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 ** 2), b""):
+                h.update(chunk)
+        _FILE_HASHES[key] = h.hexdigest()
+
+    return _FILE_HASHES[key]
+
+
+def _restore_anaddb_results(cache_key, workdir):
+    """
+    Copy the files associated to cache_key to workdir. Return False if the entry does not exist.
+    """
+    import shutil
+    cache_dir = os.path.join(_ANADDB_CACHE_DIR, cache_key)
+    if not os.path.isdir(cache_dir): return False
+    try:
+        os.makedirs(workdir, exist_ok=True)
+        for fname in os.listdir(cache_dir):
+            shutil.copy(os.path.join(cache_dir, fname), os.path.join(workdir, fname))
+        # The mtime of the entry is used to find the least recently used entries.
+        os.utime(cache_dir)
+        return True
+    except OSError as exc:
+        logger.warning("Cannot restore anaddb results from %s:\n%s" % (cache_dir, str(exc)))
+        return False
+
+
+def _store_anaddb_results(cache_key, workdir):
+    """
+    Save the files produced by anaddb in workdir (top level only) in the cache.
+    """
+    import shutil
+    cache_dir = os.path.join(_ANADDB_CACHE_DIR, cache_key)
+    # Write to temporary directory and rename so that other processes never read partial data.
+    tmp_dir = cache_dir + ".%d.%d.tmp" % (os.getpid(), threading.get_ident())
+    try:
+        os.makedirs(tmp_dir)
+        for fname in os.listdir(workdir):
+            path = os.path.join(workdir, fname)
+            if os.path.isfile(path) and not os.path.islink(path):
+                shutil.copy(path, os.path.join(tmp_dir, fname))
+        os.rename(tmp_dir, cache_dir)
+    except OSError as exc:
+        # The entry may have been written by another process.
+        if not os.path.isdir(cache_dir):
+            logger.warning("Cannot write anaddb results to cache %s:\n%s" % (cache_dir, str(exc)))
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    _prune_anaddb_cache()
+
+
+def _prune_anaddb_cache():
+    """
+    Remove the least recently used entries of the anaddb cache until its size is smaller than _ANADDB_CACHE_MAXSIZE.
+    """
+    import shutil
+    if _ANADDB_CACHE_DIR is None or _ANADDB_CACHE_MAXSIZE is None: return
+    entries = []
+    try:
+        for entry in os.scandir(_ANADDB_CACHE_DIR):
+            if not entry.is_dir() or entry.name.endswith(".tmp"): continue
+            nbytes = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            entries.append((entry.stat().st_mtime, nbytes, entry.path))
+    except OSError as exc:
+        logger.warning("Cannot scan anaddb cache %s:\n%s" % (_ANADDB_CACHE_DIR, str(exc)))
+        return
+
+    total = sum(e[1] for e in entries)
+    for _, nbytes, path in sorted(entries):
+        if total <= _ANADDB_CACHE_MAXSIZE: break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= nbytes
+
 
 class DdbError(Exception):
     """Error class raised by DDB."""
@@ -71,6 +291,23 @@ class AnaddbError(DdbError):
         return "\n".join(lines)
 
 
+def _parse_gaussian_dos_method(dos_method):
+    """
+    Parse the string ``dos_method`` ("gaussian" or "gaussian:0.001 eV") used for the phonon DOS
+    computed in-process. Return method and gaussian broadening in eV (None to use the default value).
+    """
+    if not dos_method.startswith("gaussian"):
+        raise ValueError("dos_method `%s` is not supported without anaddb. Use `gaussian`." % str(dos_method))
+
+    width = None
+    i = dos_method.find(":")
+    if i != -1:
+        value, eunit = dos_method[i+1:].split()
+        width = float(Energy(float(value), eunit).to("eV"))
+
+    return "gaussian", width
+
+
 class DdbFile(TextFile, Has_Structure, NotebookWriter):
     """
     This object provides an interface to the DDB_ file produced by ABINIT
@@ -339,27 +576,173 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
 
     def _read_qpoints(self):
         """Read the list q-points from the DDB file. Returns |numpy-array|."""
+        return self._index["qpoints"]
+
+    def _get_index_cache_path(self):
+        """
+        Path of the binary file used to cache the index. None if caching is disabled.
+        """
+        if _DDB_CACHE_MINSIZE is None or os.path.getsize(self.filepath) < _DDB_CACHE_MINSIZE:
+            return None
+        dirname, basename = os.path.split(os.path.abspath(self.filepath))
+        return os.path.join(dirname, "." + basename + ".index.npz")
+
+    def _get_index_cache_key(self):
+        """
+        String used to validate the cache. Computed from the size, the modification time
+        and the hash of the last bytes of the file.
+        """
+        st = os.stat(self.filepath)
+        h = hashlib.sha1()
+        with open(self.filepath, "rb") as fh:
+            fh.seek(max(0, st.st_size - 65536))
+            h.update(fh.read())
+        return "%d %d %d %s" % (_DDB_INDEX_VERSION, st.st_size, st.st_mtime_ns, h.hexdigest())
+
+    @lazy_property
+    def _index(self):
+        """
+        Dictionary with the byte-offset index of the data blocks, the list of q-points and
+        the 2nd-order derivatives. Loaded from the binary cache file if available.
+        """
+        path = self._get_index_cache_path()
+        if path is not None:
+            key = self._get_index_cache_key()
+            if os.path.exists(path):
+                try:
+                    with np.load(path) as data:
+                        if str(data["key"]) == key:
+                            return {k: data[k] for k in data.files if k != "key"}
+                except Exception as exc:
+                    logger.warning("Cannot read DDB index from cache file %s:\n%s" % (path, str(exc)))
+
+        index = self._build_index()
+
+        if path is not None:
+            # Write to temporary file and rename so that other processes never read partial data.
+            try:
+                tmp_path = path + ".%d.tmp" % os.getpid()
+                with open(tmp_path, "wb") as fh:
+                    np.savez(fh, key=key, **index)
+                os.replace(tmp_path, path)
+            except OSError as exc:
+                logger.warning("Cannot write DDB index to cache file %s:\n%s" % (path, str(exc)))
+
+        return index
+
+    def _build_index(self):
+        """
+        Scan the database section of the DDB file once. Record the byte offsets of the blocks,
+        the q-points and parse the entries of the 2nd-order derivatives.
+        """
         # 2nd derivatives (non-stat.)  - # elements :      36
         # qpt  2.50000000E-01  0.00000000E+00  0.00000000E+00   1.0
-
+        #   1   1   1   1  0.80977066582497D+01 -0.46347282336361D-16
+        dord_from_str = {"Total energy": 0, "1st derivatives": 1, "2nd derivatives": 2, "3rd derivatives": 3}
+        starts, ends, dords, bqpts = [], [], [], []
         # Since there are multiple occurrences of qpt in the DDB file
         # we use seen to remove duplicates.
-        self.seek(0)
-        tokens, seen = [], set()
+        qpoints, seen = [], set()
+        d2_blocks, d2_lines, d2_counts = [], [], []
+
+        pos, in_db = 0, False
+        with open(self.filepath, "rb") as fh:
+            for line in fh:
+                start = pos
+                pos += len(line)
+                if not in_db:
+                    # skip until the beginning of the db
+                    in_db = b"Number of data blocks" in line
+                    continue
 
-        for line in self:
-            line = line.strip()
-            if line.startswith("qpt") and line not in seen:
-                seen.add(line)
-                tokens.append(line.replace("qpt", ""))
+                if b"List of bloks and their characteristics" in line:
+                    # This line is present only if DDB has been produced by mrgddb
+                    pos = start
+                    break
+
+                if b"# elements" in line:
+                    # new block --> detect order
+                    if starts: ends.append(start)
+                    s = " ".join(line.decode().split()[:2])
+                    dord = dord_from_str.get(s, None)
+                    if dord is None:
+                        raise RuntimeError("Cannot detect derivative order from string: `%s`" % s)
+                    starts.append(start)
+                    dords.append(dord)
+                    bqpts.append(3 * [np.nan])
+                    if dord == 2:
+                        d2_blocks.append(len(starts) - 1)
+                        d2_counts.append(0)
+                    continue
 
-        qpoints, weights = [], []
-        for tok in tokens:
-            nums = list(map(float, tok.split()))
-            qpoints.append(nums[:3])
-            weights.append(nums[3])
+                if not starts: continue
+                line = line.strip()
+                if not line: continue
+
+                if line.startswith(b"qpt"):
+                    if line not in seen:
+                        seen.add(line)
+                        qpoints.append(list(map(float, line.replace(b"D", b"E").split()[1:4])))
+                    if np.isnan(bqpts[-1][0]):
+                        bqpts[-1] = list(map(float, line.replace(b"D", b"E").split()[1:4]))
+                elif dords[-1] == 2:
+                    d2_lines.append(line)
+                    d2_counts[-1] += 1
+
+        if starts: ends.append(pos)
+
+        # Parse all the entries of the dynamical matrices at once.
+        # Python does not support exp format with D
+        try:
+            values = np.array(b" ".join(d2_lines).replace(b"D", b"E").split(), dtype=np.float)
+            values = np.reshape(values, (-1, 6))
+        except Exception as exc:
+            raise RuntimeError("Exception:\n%s\nwhile parsing 2nd-order derivatives in %s" % (str(exc), self.filepath))
+
+        return dict(
+            qpoints=np.reshape(qpoints, (-1, 3)),
+            block_starts=np.array(starts, dtype=np.int64),
+            block_ends=np.array(ends, dtype=np.int64),
+            block_dords=np.array(dords, dtype=np.int),
+            block_qpts=np.reshape(np.array(bqpts, dtype=np.float), (-1, 3)),
+            d2_blocks=np.array(d2_blocks, dtype=np.int),
+            d2_ptr=np.concatenate(([0], np.cumsum(d2_counts))).astype(np.int),
+            d2_inds=np.array(values[:, :4], dtype=np.int),
+            d2_vals=values[:, 4] + 1j * values[:, 5],
+        )
+
+    @lazy_property
+    def _d2_qpt2pos(self):
+        """
+        OrderedDict mapping q-point object to the position of its 2nd-order block in the index.
+        If there are multiple blocks for the same q-point, the last one is used.
+        """
+        idx = self._index
+        od = OrderedDict()
+        for pos, ib in enumerate(idx["d2_blocks"]):
+            qpt = Kpoint(frac_coords=idx["block_qpts"][ib], lattice=self.structure.reciprocal_lattice,
+                         weight=None, name=None)
+            od[qpt] = pos
+        return od
 
-        return np.reshape(qpoints, (-1, 3))
+    def _get_d2_entries(self, pos):
+        """
+        Return the (idir1, ipert1, idir2, ipert2) indices and the complex values of the
+        2nd-order block at position ``pos``.
+        """
+        idx = self._index
+        sl = slice(idx["d2_ptr"][pos], idx["d2_ptr"][pos + 1])
+        return idx["d2_inds"][sl], idx["d2_vals"][sl]
+
+    def _get_d2_dict(self, qpt):
+        """
+        Dictionary mapping (idir1, ipert1, idir2, ipert2) --> complex value for the q-point ``qpt``.
+        None if the DDB file does not contain 2nd-order derivatives for this q-point.
+        """
+        pos = self._d2_qpt2pos.get(qpt, None)
+        if pos is None: return None
+        inds, vals = self._get_d2_entries(pos)
+        return dict(zip(map(tuple, inds.tolist()), vals))
 
     @lazy_property
     def computed_dynmat(self):
@@ -372,44 +755,43 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
 
             The indices follow the Abinit (Fortran) notation so they start at 1.
         """
-        # TODO: Create mapping [(idir1, ipert1), (idir2, ipert2)] --> element
         df_columns = "idir1 ipert1 idir2 ipert2 cvalue".split()
 
         dynmat = OrderedDict()
-        for block in self.blocks:
-            # skip the blocks that are not related to second order derivatives
-            first_line = block["data"][0].strip()
-            if not first_line.startswith("2nd derivatives"):
-                continue
+        for qpt, pos in self._d2_qpt2pos.items():
+            inds, vals = self._get_d2_entries(pos)
+            data = OrderedDict([(k, inds[:, i]) for i, k in enumerate(df_columns[:4])])
+            data["cvalue"] = vals
+            dynmat[qpt] = pd.DataFrame(data, index=list(map(tuple, inds.tolist())), columns=df_columns)
 
-            # Build q-point object.
-            qpt = Kpoint(frac_coords=block["qpt"], lattice=self.structure.reciprocal_lattice, weight=None, name=None)
+        return dynmat
 
-            # Build pandas dataframe with df_columns and (idir1, ipert1, idir2, ipert2) as index.
-            # Each line in data represents an element of the dynamical matric
-            # idir1 ipert1 idir2 ipert2 re_D im_D
-            df_rows, df_index = [], []
-            for line in block["data"]:
-                line = line.strip()
-                if line.startswith("2nd derivatives") or line.startswith("qpt"):
-                    continue
-                try:
-                    toks = line.split()
-                    idir1, ipert1 = p1 = (int(toks[0]), int(toks[1]))
-                    idir2, ipert2 = p2 = (int(toks[2]), int(toks[3]))
-                    toks[4] = toks[4].replace("D", "E")
-                    toks[5] = toks[5].replace("D", "E")
-                    cvalue = float(toks[4]) + 1j*float(toks[5])
-                except Exception as exc:
-                    cprint("exception while parsing line: %s" % line, "red")
-                    raise exc
+    @lazy_property
+    def d2matr(self):
+        """
+        namedtuple with the 2nd-order derivatives stored in dense arrays. Entries:
+
+            qpoints: |KpointList| with the q-points.
+            values: [nq, 3, mpert, 3, mpert] complex array with the derivatives
+                (C indices: values[iq, idir1-1, ipert1-1, idir2-1, ipert2-1]).
+            mask: [nq, 3, mpert, 3, mpert] bool array. True if the entry is present in the DDB.
 
-                df_index.append(p1 + p2)
-                df_rows.append(dict(idir1=idir1, ipert1=ipert1, idir2=idir2, ipert2=ipert2, cvalue=cvalue))
+        where mpert = natom + 6
+        """
+        qpoints = list(self._d2_qpt2pos.keys())
+        nq, mpert = len(qpoints), self.natom + 6
+        values = np.zeros((nq, 3, mpert, 3, mpert), dtype=np.complex)
+        mask = np.zeros((nq, 3, mpert, 3, mpert), dtype=np.bool)
+        for iq, pos in enumerate(self._d2_qpt2pos.values()):
+            inds, vals = self._get_d2_entries(pos)
+            i = (iq, inds[:, 0] - 1, inds[:, 1] - 1, inds[:, 2] - 1, inds[:, 3] - 1)
+            values[i] = vals
+            mask[i] = True
 
-            dynmat[qpt] = pd.DataFrame(df_rows, index=df_index, columns=df_columns)
+        frac_coords = np.reshape([q.frac_coords for q in qpoints], (-1, 3))
+        qpoints = KpointList(self.structure.reciprocal_lattice, frac_coords, weights=None, names=None)
 
-        return dynmat
+        return dict2namedtuple(qpoints=qpoints, values=values, mask=mask)
 
     @lazy_property
     def blocks(self):
@@ -420,58 +802,23 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
         """
         return self._read_blocks()
 
-    def _read_blocks(self):
-        # skip until the beginning of the db
-        self.seek(0)
-        while "Number of data blocks" not in self._file.readline():
-            pass
-
+    def _read_blocks(self, dords=None):
+        """
+        Read the blocks using the byte offsets stored in the index.
+        If ``dords`` is not None, only the blocks with these derivative orders are read.
+        """
+        idx = self._index
         blocks = []
-        block_lines = []
-        qpt = None
-        dord = None
-
-        for line in self:
-            # skip empty lines
-            if line.isspace():
-                continue
-
-            if "List of bloks and their characteristics" in line:
-                # add last block when we reach the last part of the file.
-                # This line is present only if DDB has been produced by mrgddb
-                if block_lines:
-                    blocks.append({"data": block_lines, "qpt": qpt, "dord": dord})
-                    block_lines = []
-                    qpt = None
-                break
-
-            # Don't use lstring because we may reuse block_lines to write new DDB.
-            line = line.rstrip()
-
-            # new block --> detect order
-            if "# elements" in line:
-                if block_lines:
-                    blocks.append({"data": block_lines, "qpt": qpt, "dord": dord})
-
-                tokens = line.split()
-                num_elements = int(tokens[-1])
-                s = " ".join(tokens[:2])
-                dord = {"Total energy": 0,
-                        "1st derivatives": 1,
-                        "2nd derivatives": 2,
-                        "3rd derivatives": 3}.get(s, None)
-                if dord is None:
-                    raise RuntimeError("Cannot detect derivative order from string: `%s`" % s)
-
-                block_lines = []
-                qpt = None
-
-            block_lines.append(line)
-            if "qpt" in line:
-                qpt = list(map(float, line.split()[1:4]))
-
-        if block_lines:
-            blocks.append({"data": block_lines, "qpt": qpt, "dord": dord})
+        with open(self.filepath, "rb") as fh:
+            for start, end, dord, qpt in zip(idx["block_starts"], idx["block_ends"],
+                                             idx["block_dords"], idx["block_qpts"]):
+                if dords is not None and dord not in dords: continue
+                fh.seek(start)
+                # Don't use lstring because we may reuse block_lines to write new DDB.
+                lines = fh.read(end - start).decode().splitlines()
+                block_lines = [line.rstrip() for line in lines if line.strip()]
+                qpt = None if np.isnan(qpt[0]) else qpt.tolist()
+                blocks.append({"data": block_lines, "qpt": qpt, "dord": int(dord)})
 
         return blocks
 
@@ -558,7 +905,7 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
         """
         Total energy in eV. None if not available.
         """
-        for block in self.blocks:
+        for block in self._read_blocks(dords=[0]):
             if block["dord"] == 0:
                 ene_ha = float(block["data"][1].split()[0].replace("D", "E"))
                 return Energy(ene_ha, "Ha").to("eV")
@@ -570,7 +917,7 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
         Cartesian forces in eV / Ang
         None if not available i.e. if the GS DDB has not been merged.
         """
-        for block in self.blocks:
+        for block in self._read_blocks(dords=[1]):
             if block["dord"] != 1: continue
             natom = len(self.structure)
             fred = np.empty((natom, 3))
@@ -604,7 +951,7 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
         """
         |Stress| tensor in cartesian coordinates (GPa units). None if not available.
         """
-        for block in self.blocks:
+        for block in self._read_blocks(dords=[1]):
             if block["dord"] != 1: continue
             svoigt = np.empty(6)
             # Abinit stress is in cart coords and Ha/Bohr**3
@@ -644,10 +991,10 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
         natom = len(self.structure)
         ap_list = list(itertools.product(range(1, 4), range(1, natom + 1)))
 
-        for qpt_dm, df in self.computed_dynmat.items():
+        for qpt_dm, pos in self._d2_qpt2pos.items():
             if qpt is not None and qpt_dm != qpt: continue
 
-            index_set = set(df.index)
+            index_set = set(map(tuple, self._get_d2_entries(pos)[0].tolist()))
             for p1 in ap_list:
                 for p2 in ap_list:
                     p12 = p1 + p2
@@ -669,11 +1016,10 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
                 If select == "all", all tensor components must be present in the DDB file.
         """
         gamma = Kpoint.gamma(self.structure.reciprocal_lattice)
-        if gamma not in self.computed_dynmat:
+        index_set = self._get_d2_dict(gamma)
+        if index_set is None:
             return False
 
-        index_set = set(self.computed_dynmat[gamma].index)
-
         natom = len(self.structure)
         ep_list = list(itertools.product(range(1, 4), [natom + 2]))
         for p1 in ep_list:
@@ -709,22 +1055,17 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
                 If select == "all", all bec components must be present in the DDB file.
         """
         gamma = Kpoint.gamma(self.structure.reciprocal_lattice)
-        if gamma not in self.computed_dynmat:
+        index_set = self._get_d2_dict(gamma)
+        if index_set is None:
             return False
-        index_set = set(self.computed_dynmat[gamma].index)
         natom = len(self.structure)
         ep_list = list(itertools.product(range(1, 4), [natom + 2]))
         ap_list = list(itertools.product(range(1, 4), range(1, natom + 1)))
 
-        # helper function to get the value, since has a cumbersome notation
-        # when dealing with tuples as indices
-        dmg = self.computed_dynmat[gamma]
-
         def non_zero_value(ind):
             if ind not in index_set:
                 return False
-            v = dmg.loc[[ind]].iloc[0].cvalue
-            return v != 0.0
+            return index_set[ind] != 0.0
 
         # if the BECs perturbations are not calculated, abinit can set all
         # of them to 0 and writes them in the DDB. To be considered
@@ -766,11 +1107,10 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
             the default value for select is "all"
         """
         gamma = Kpoint.gamma(self.structure.reciprocal_lattice)
-        if gamma not in self.computed_dynmat:
+        index_set = self._get_d2_dict(gamma)
+        if index_set is None:
             return False
 
-        index_set = set(self.computed_dynmat[gamma].index)
-
         natom = len(self.structure)
         sp_list = list(itertools.product(range(1, 4), [natom + 3, natom + 4]))
         for p1 in sp_list:
@@ -806,11 +1146,10 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
             the default value for select is "all"
         """
         gamma = Kpoint.gamma(self.structure.reciprocal_lattice)
-        if gamma not in self.computed_dynmat:
+        index_set = self._get_d2_dict(gamma)
+        if index_set is None:
             return False
 
-        index_set = set(self.computed_dynmat[gamma].index)
-
         natom = len(self.structure)
         sp_list = list(itertools.product(range(1, 4), [natom + 3, natom + 4]))
         ap_list = list(itertools.product(range(1, 4), range(1, natom + 1)))
@@ -847,11 +1186,10 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
             the default value for select is "all"
         """
         gamma = Kpoint.gamma(self.structure.reciprocal_lattice)
-        if gamma not in self.computed_dynmat:
+        index_set = self._get_d2_dict(gamma)
+        if index_set is None:
             return False
 
-        index_set = set(self.computed_dynmat[gamma].index)
-
         natom = len(self.structure)
         sp_list = list(itertools.product(range(1, 4), [natom + 3, natom + 4]))
         ep_list = list(itertools.product(range(1, 4), [natom + 2]))
@@ -921,6 +1259,18 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
 
         Return: |PhononBands| object.
         """
+        inp, qpoint, lo_to_splitting = self._get_phmodes_input(qpoint=qpoint, asr=asr, chneut=chneut, dipdip=dipdip,
+            lo_to_splitting=lo_to_splitting, directions=directions, anaddb_kwargs=anaddb_kwargs, spell_check=spell_check)
+
+        task = self._run_anaddb_task(inp, mpi_procs, workdir, manager, verbose)
+        return self._read_phmodes(task, inp, qpoint, lo_to_splitting, return_input=return_input)
+
+    def _get_phmodes_input(self, qpoint=None, asr=2, chneut=1, dipdip=1, lo_to_splitting=False,
+                           directions=None, anaddb_kwargs=None, spell_check=True):
+        """
+        Build the |AnaddbInput| used in anaget_phmodes_at_qpoint.
+        Return (inp, qpoint, lo_to_splitting) where qpoint is the |Kpoint| in the DDB.
+        """
         if qpoint is None:
             qpoint = self.qpoints[0]
             if len(self.qpoints) != 1:
@@ -946,8 +1296,10 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
                                           lo_to_splitting=lo_to_splitting, directions=directions,
                                           anaddb_kwargs=anaddb_kwargs, spell_check=spell_check)
 
-        task = self._run_anaddb_task(inp, mpi_procs, workdir, manager, verbose)
+        return inp, qpoint, lo_to_splitting
 
+    def _read_phmodes(self, task, inp, qpoint, lo_to_splitting, return_input=False):
+        """Read the phonon modes computed by the |AnaddbTask| built in anaget_phmodes_at_qpoint."""
         with task.open_phbst() as ncfile:
             if lo_to_splitting and qpoint.is_gamma():
                 ncfile.phbands.read_non_anal_from_file(os.path.join(task.workdir, "anaddb.nc"))
@@ -1003,6 +1355,21 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
             |PhbstFile| with the phonon band structure.
             |PhdosFile| with the the phonon DOS.
         """
+        inp, lo_to_splitting = self._get_phbst_and_phdos_input(
+            nqsmall=nqsmall, qppa=qppa, ndivsm=ndivsm, line_density=line_density, asr=asr, chneut=chneut,
+            dipdip=dipdip, dos_method=dos_method, lo_to_splitting=lo_to_splitting, ngqpt=ngqpt,
+            qptbounds=qptbounds, anaddb_kwargs=anaddb_kwargs, spell_check=spell_check)
+
+        task = self._run_anaddb_task(inp, mpi_procs, workdir, manager, verbose)
+
+        return self._open_phbst_and_phdos_files(task, inp, lo_to_splitting, return_input=return_input)
+
+    def _get_phbst_and_phdos_input(self, nqsmall=10, qppa=None, ndivsm=20, line_density=None, asr=2, chneut=1,
+                                   dipdip=1, dos_method="tetra", lo_to_splitting="automatic", ngqpt=None,
+                                   qptbounds=None, anaddb_kwargs=None, spell_check=True):
+        """
+        Build the |AnaddbInput| used in anaget_phbst_and_phdos_files. Return (input, lo_to_splitting).
+        """
         if ngqpt is None: ngqpt = self.guessed_ngqpt
 
         if lo_to_splitting == "automatic":
@@ -1017,8 +1384,13 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
             asr=asr, chneut=chneut, dipdip=dipdip, dos_method=dos_method, lo_to_splitting=lo_to_splitting,
             anaddb_kwargs=anaddb_kwargs, spell_check=spell_check)
 
-        task = self._run_anaddb_task(inp, mpi_procs, workdir, manager, verbose)
+        return inp, lo_to_splitting
 
+    def _open_phbst_and_phdos_files(self, task, inp, lo_to_splitting, return_input=False):
+        """
+        Open the PHBST and PHDOS files produced by the |AnaddbTask| executed with the input
+        returned by _get_phbst_and_phdos_input. Return context manager with the two files.
+        """
         # Use ExitStackWithFiles so that caller can use with contex manager.
         exit_stack = ExitStackWithFiles()
 
@@ -1041,6 +1413,59 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
 
         return exit_stack
 
+    @lazy_property
+    def _phonon_interpolators(self):
+        """Cache (ngqpt, asr, chneut, dipdip) --> PhononInterpolator."""
+        return {}
+
+    def get_phonon_interpolator(self, ngqpt=None, asr=2, chneut=1, dipdip=1):
+        """
+        Compute the real-space interatomic force constants in-process (no anaddb run)
+        and return a :class:`PhononInterpolator` that can be used to interpolate
+        the phonons on arbitrary lists of q-points. Objects are cached.
+
+        Args:
+            ngqpt: Number of divisions for the q-mesh in the DDB file. Auto-detected if None (default).
+            asr, chneut, dipdip: Same meaning as the anaddb input variables.
+        """
+        if ngqpt is None: ngqpt = self.guessed_ngqpt
+        key = (tuple(int(n) for n in ngqpt), asr, chneut, dipdip)
+        if key not in self._phonon_interpolators:
+            self._phonon_interpolators[key] = PhononInterpolator.from_ddb(self, ngqpt=ngqpt, asr=asr,
+                                                                          chneut=chneut, dipdip=dipdip)
+
+        return self._phonon_interpolators[key]
+
+    def get_phbands_and_phdos(self, nqsmall=10, qppa=None, ndivsm=20, line_density=None, asr=2, chneut=1, dipdip=1,
+                              dos_method="gaussian", lo_to_splitting="automatic", ngqpt=None, qptbounds=None):
+        """
+        Compute the phonon band structure and the phonon DOS with the Fourier interpolation
+        performed in-process by :class:`PhononInterpolator`. Same meaning of the arguments as in
+        ``anaget_phbst_and_phdos_files`` but the tetrahedron method is not available and ``dos_method``
+        must be "gaussian" or "gaussian:0.001 eV".
+
+        Return: (|PhononBands|, |PhononDos|). The DOS is None if nqsmall == 0 and qppa is None.
+        """
+        method, width = _parse_gaussian_dos_method(dos_method)
+        phint = self.get_phonon_interpolator(ngqpt=ngqpt, asr=asr, chneut=chneut, dipdip=dipdip)
+
+        if lo_to_splitting == "automatic":
+            lo_to_splitting = self.has_lo_to_data() and dipdip != 0
+
+        if lo_to_splitting and phint.zeff is None:
+            cprint("lo_to_splitting is True but Eps_inf and Becs are not available in DDB: %s" % self.filepath, "yellow")
+            lo_to_splitting = False
+
+        phbands = phint.get_phbands_along_path(ndivsm=ndivsm, line_density=line_density, qptbounds=qptbounds,
+                                               lo_to_splitting=lo_to_splitting)
+        self._add_params(phbands)
+
+        phdos = None
+        if nqsmall != 0 or qppa:
+            phdos = phint.get_phdos(nqsmall=nqsmall, qppa=qppa, method=method, width=width)
+
+        return phbands, phdos
+
     def get_coarse(self, ngqpt_coarse, filepath=None):
         """
         Get a version of this file on a coarse mesh
@@ -1108,15 +1533,25 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
 
             Client code can use ``plotter.combiplot()`` or ``plotter.gridplot()`` to visualize the results.
         """
-        phbands_plotter = PhononBandsPlotter()
-
+        labels, inputs = [], []
         for asr, chneut in itertools.product(asr_list, chneut_list):
-            phbst_file, phdos_file = self.anaget_phbst_and_phdos_files(
+            labels.append("asr: %d, dipdip: %d, chneut: %d" % (asr, dipdip, chneut))
+            inputs.append(self._get_phbst_and_phdos_input(
                 nqsmall=nqsmall, ndivsm=ndivsm, asr=asr, chneut=chneut, dipdip=dipdip, dos_method=dos_method,
-                lo_to_splitting=lo_to_splitting, ngqpt=ngqpt, qptbounds=None,
-                anaddb_kwargs=None, verbose=verbose, mpi_procs=mpi_procs, workdir=None, manager=None)
+                lo_to_splitting=lo_to_splitting, ngqpt=ngqpt, qptbounds=None, anaddb_kwargs=None))
+
+        return self._run_and_plot_phbands(labels, inputs, mpi_procs=mpi_procs, verbose=verbose)
+
+    def _run_and_plot_phbands(self, labels, inputs, mpi_procs=1, verbose=0):
+        """
+        Execute the anaddb inputs returned by _get_phbst_and_phdos_input with the shared executor.
+        Build and return |PhononBandsPlotter| object.
+        """
+        tasks = self._run_anaddb_tasks([inp for inp, _ in inputs], mpi_procs=mpi_procs, verbose=verbose)
 
-            label = "asr: %d, dipdip: %d, chneut: %d" % (asr, dipdip, chneut)
+        phbands_plotter = PhononBandsPlotter()
+        for label, (inp, lo_to_splitting), task in zip(labels, inputs, tasks):
+            phbst_file, phdos_file = self._open_phbst_and_phdos_files(task, inp, lo_to_splitting)
             if phdos_file is not None:
                 phbands_plotter.add_phbands(label, phbst_file.phbands, phdos=phdos_file.phdos)
                 phdos_file.close()
@@ -1155,28 +1590,19 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
 
             Client code can use ``plotter.combiplot()`` or ``plotter.gridplot()`` to visualize the results.
         """
-        phbands_plotter = PhononBandsPlotter()
-
+        labels, inputs = [], []
         for dipdip in (0, 1):
             my_chneut_list = chneut_list if dipdip != 0 else [0]
             for chneut in my_chneut_list:
-                phbst_file, phdos_file = self.anaget_phbst_and_phdos_files(
+                labels.append("asr: %d, dipdip: %d, chneut: %d" % (asr, dipdip, chneut))
+                inputs.append(self._get_phbst_and_phdos_input(
                     nqsmall=nqsmall, ndivsm=ndivsm, asr=asr, chneut=chneut, dipdip=dipdip, dos_method=dos_method,
-                    lo_to_splitting=lo_to_splitting, ngqpt=ngqpt, qptbounds=None,
-                    anaddb_kwargs=None, verbose=verbose, mpi_procs=mpi_procs, workdir=None, manager=None)
+                    lo_to_splitting=lo_to_splitting, ngqpt=ngqpt, qptbounds=None, anaddb_kwargs=None))
 
-                label = "asr: %d, dipdip: %d, chneut: %d" % (asr, dipdip, chneut)
-                if phdos_file is not None:
-                    phbands_plotter.add_phbands(label, phbst_file.phbands, phdos=phdos_file.phdos)
-                    phdos_file.close()
-                else:
-                    phbands_plotter.add_phbands(label, phbst_file.phbands)
-                phbst_file.close()
-
-        return phbands_plotter
+        return self._run_and_plot_phbands(labels, inputs, mpi_procs=mpi_procs, verbose=verbose)
 
     def anacompare_phdos(self, nqsmalls, asr=2, chneut=1, dipdip=1, dos_method="tetra", ngqpt=None,
-                         verbose=0, num_cpus=1, stream=sys.stdout):
+                         verbose=0, num_cpus=1, stream=sys.stdout, use_anaddb=True):
         """
         Invoke Anaddb to compute Phonon DOS with different q-meshes. The ab-initio dynamical matrix
         reported in the DDB_ file will be Fourier-interpolated on the list of q-meshes specified
@@ -1190,8 +1616,11 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
                 In the later case, the value 0.001 eV is used as gaussian broadening
             ngqpt: Number of divisions for the ab-initio q-mesh in the DDB file. Auto-detected if None (default)
             verbose: Verbosity level.
-            num_cpus: Number of CPUs (threads) used to parallellize the calculation of the DOSes. Autodetected if None.
+            num_cpus: Number of anaddb processes executed in parallel.
+                None to use the executor shared by the |DdbFile| objects (see :func:`set_anaddb_max_workers`).
             stream: File-like object used for printing.
+            use_anaddb: False to compute the DOSes in-process with :class:`PhononInterpolator`.
+                The IFCs are computed only once. Requires a gaussian ``dos_method``.
 
         Return:
             ``namedtuple`` with the following attributes::
@@ -1200,49 +1629,26 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
                     plotter: |PhononDosPlotter| object.
                         Client code can use ``plotter.gridplot()`` to visualize the results.
         """
-        #num_cpus = get_ncpus() // 2 if num_cpus is None else num_cpus
-        if num_cpus <= 0: num_cpus = 1
-        num_cpus = min(num_cpus, len(nqsmalls))
-
-        def do_work(nqsmall):
-            phbst_file, phdos_file = self.anaget_phbst_and_phdos_files(
-                nqsmall=nqsmall, ndivsm=1, asr=asr, chneut=chneut, dipdip=dipdip, dos_method=dos_method, ngqpt=ngqpt)
-            phdos = phdos_file.phdos
-            phbst_file.close()
-            phdos_file.close()
-            return phdos
-
-        if num_cpus == 1:
-            # Sequential version
-            phdoses = [do_work(nqs) for nqs in nqsmalls]
+        if not use_anaddb:
+            method, width = _parse_gaussian_dos_method(dos_method)
+            phint = self.get_phonon_interpolator(ngqpt=ngqpt, asr=asr, chneut=chneut, dipdip=dipdip)
+            phdoses = [phint.get_phdos(nqsmall=nqsmall, method=method, width=width) for nqsmall in nqsmalls]
 
         else:
-            # Threads
+            inputs = [self._get_phbst_and_phdos_input(
+                nqsmall=nqsmall, ndivsm=1, asr=asr, chneut=chneut, dipdip=dipdip, dos_method=dos_method, ngqpt=ngqpt)
+                for nqsmall in nqsmalls]
             if verbose:
-                print("Computing %d phonon DOS with %d threads" % (len(nqsmalls), num_cpus))
-            phdoses = [None] * len(nqsmalls)
-
-            def worker():
-                while True:
-                    nqsm, phdos_index = q.get()
-                    phdos = do_work(nqsm)
-                    phdoses[phdos_index] = phdos
-                    q.task_done()
-
-            from threading import Thread
-            from queue import Queue
-
-            q = Queue()
-            for i in range(num_cpus):
-                t = Thread(target=worker)
-                t.daemon = True
-                t.start()
-
-            for i, nqsmall in enumerate(nqsmalls):
-                q.put((nqsmall, i))
-
-            # block until all tasks are done
-            q.join()
+                print("Computing %d phonon DOS with %d workers" % (len(nqsmalls),
+                      _ANADDB_MAX_WORKERS if num_cpus is None else max(1, num_cpus)))
+            tasks = self._run_anaddb_tasks([inp for inp, _ in inputs], num_workers=num_cpus, verbose=verbose)
+
+            phdoses = []
+            for (inp, lo_to_splitting), task in zip(inputs, tasks):
+                phbst_file, phdos_file = self._open_phbst_and_phdos_files(task, inp, lo_to_splitting)
+                phdoses.append(phdos_file.phdos)
+                phbst_file.close()
+                phdos_file.close()
 
         # Compute relative difference wrt last phonon DOS. Be careful because the DOSes may be defined
         # on different frequency meshes ==> spline on the mesh of the last DOS.
@@ -1286,20 +1692,15 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
 
             Client code can use ``plotter.combiplot()`` or ``plotter.gridplot()`` to visualize the results.
         """
-        phbands_plotter = PhononBandsPlotter()
-
+        labels, inputs = [], []
         for rifcsph in rifcsph_list:
-            phbst_file, _ = self.anaget_phbst_and_phdos_files(
+            labels.append("rifcsph: %f" % rifcsph)
+            inputs.append(self._get_phbst_and_phdos_input(
                 nqsmall=0, ndivsm=ndivsm, asr=asr, chneut=chneut, dipdip=dipdip, dos_method="tetra",
                 lo_to_splitting=lo_to_splitting, ngqpt=ngqpt, qptbounds=None,
-                anaddb_kwargs={"rifcsph": rifcsph},
-                verbose=verbose, mpi_procs=mpi_procs, workdir=None, manager=None)
+                anaddb_kwargs={"rifcsph": rifcsph}))
 
-            label = "rifcsph: %f" % rifcsph
-            phbands_plotter.add_phbands(label, phbst_file.phbands)
-            phbst_file.close()
-
-        return phbands_plotter
+        return self._run_and_plot_phbands(labels, inputs, mpi_procs=mpi_procs, verbose=verbose)
 
     def anaget_epsinf_and_becs(self, chneut=1, mpi_procs=1, workdir=None, manager=None, verbose=0):
         """
@@ -1507,6 +1908,8 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
     def _run_anaddb_task(self, anaddb_input, mpi_procs, workdir, manager, verbose):
         """
         Execute an |AnaddbInput| via the shell. Return |AnaddbTask|.
+        The output files are restored from the cache if anaddb has already been executed with the same
+        DDB and the same input (see set_anaddb_cache_dir).
         """
         task = AnaddbTask.temp_shell_task(anaddb_input, ddb_node=self.filepath,
                 mpi_procs=mpi_procs, workdir=workdir, manager=manager)
@@ -1515,6 +1918,11 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
             print("ANADDB INPUT:\n", anaddb_input)
             print("workdir:", task.workdir)
 
+        cache_key = self._get_anaddb_cache_key(anaddb_input, manager=task.manager, executable=task.executable)
+        if cache_key is not None and _restore_anaddb_results(cache_key, task.workdir):
+            if verbose: print("Results restored from anaddb cache:", cache_key)
+            return task
+
         # Run the task here.
         task.start_and_wait(autoparal=False)
 
@@ -1522,8 +1930,50 @@ class DdbFile(TextFile, Has_Structure, NotebookWriter):
         if not report.run_completed:
             raise self.AnaddbError(task=task, report=report)
 
+        if cache_key is not None:
+            _store_anaddb_results(cache_key, task.workdir)
+
         return task
 
+    def _run_anaddb_tasks(self, anaddb_inputs, mpi_procs=1, manager=None, num_workers=None, verbose=0):
+        """
+        Execute a list of |AnaddbInput| in parallel. Return list of |AnaddbTask| (same order as anaddb_inputs).
+
+        Args:
+            num_workers: Number of anaddb processes executed concurrently.
+                None to use the shared executor (see set_anaddb_max_workers).
+        """
+        if (num_workers is not None and num_workers <= 1) or len(anaddb_inputs) == 1:
+            return [self._run_anaddb_task(inp, mpi_procs, None, manager, verbose) for inp in anaddb_inputs]
+
+        if num_workers is None:
+            executor = get_anaddb_executor()
+            futures = [executor.submit(self._run_anaddb_task, inp, mpi_procs, None, manager, verbose)
+                       for inp in anaddb_inputs]
+            return [future.result() for future in futures]
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(num_workers, len(anaddb_inputs))) as executor:
+            futures = [executor.submit(self._run_anaddb_task, inp, mpi_procs, None, manager, verbose)
+                       for inp in anaddb_inputs]
+            return [future.result() for future in futures]
+
+    def _get_anaddb_cache_key(self, anaddb_input, manager=None, executable="anaddb"):
+        """
+        Return the key used to cache the results of anaddb computed from the content of the DDB,
+        the normalized anaddb input and the version of the anaddb executable run by the manager.
+        None if the cache is disabled.
+        """
+        if _ANADDB_CACHE_DIR is None: return None
+        version = get_anaddb_version(manager=manager, executable=executable)
+        if version is None: return None
+
+        h = hashlib.sha1()
+        h.update(_get_file_hash(self.filepath).encode())
+        h.update(anaddb_input.to_string(sortmode="a").encode())
+        h.update(version.encode())
+        return h.hexdigest()
+
     def write(self, filepath, filter_blocks=None):
         """
         Writes the DDB file in filepath. Requires the blocks data.
@@ -2220,16 +2670,18 @@ class DdbRobot(Robot):
             if any(np.any(ddb.qpoints[0] != qpoint) for ddb in self.abifiles):
                 raise ValueError("All the q-points in the DDB files must be equal")
 
-        rows, row_names = [], []
-        for i, (label, ddb) in enumerate(self.items()):
-            row_names.append(label)
+        def get_row(ddb):
             d = OrderedDict()
             #d = {aname: getattr(ddb, aname) for aname in attrs}
             #d.update({"qpgap": mdf.get_qpgap(spin, kpoint)})
 
             # Call anaddb to get the phonon frequencies. Note lo_to_splitting set to False.
-            phbands = ddb.anaget_phmodes_at_qpoint(qpoint=qpoint, asr=asr, chneut=chneut,
-               dipdip=dipdip, lo_to_splitting=False)
+            if ddb.filepath in prefetched:
+                inp, qpt, task = prefetched.pop(ddb.filepath)
+                phbands = ddb._read_phmodes(task, inp, qpt, False)
+            else:
+                phbands = ddb.anaget_phmodes_at_qpoint(qpoint=qpoint, asr=asr, chneut=chneut,
+                   dipdip=dipdip, lo_to_splitting=False)
             # [nq, nmodes] array
             freqs = phbands.phfreqs[0, :] * phfactor_ev2units(units)
 
@@ -2242,9 +2694,30 @@ class DdbRobot(Robot):
             if with_geo:
                 d.update(phbands.structure.get_dict4pandas(with_spglib=with_spglib))
 
-            # Execute functions.
+            return d
+
+        # filepath --> (inp, qpoint, task) for the DDB files whose anaddb run has been already executed.
+        prefetched = {}
+
+        def prefetch(ddbs):
+            # Execute anaddb in parallel for the DDB files that are not in the summary index.
+            if len(ddbs) < 2: return
+            inputs = [ddb._get_phmodes_input(qpoint=qpoint, asr=asr, chneut=chneut, dipdip=dipdip,
+                      lo_to_splitting=False) for ddb in ddbs]
+            executor = get_anaddb_executor()
+            futures = [executor.submit(ddb._run_anaddb_task, inp, 1, None, None, 0)
+                       for ddb, (inp, _, _) in zip(ddbs, inputs)]
+            for ddb, (inp, qpt, _), future in zip(ddbs, inputs, futures):
+                prefetched[ddb.filepath] = (inp, qpt, future.result())
+
+        # Rows are cached in the summary index so that anaddb is executed only for new or modified files.
+        qfrac = [float(q) for q in np.reshape(getattr(qpoint, "frac_coords", qpoint), -1)]
+        tag = "get_dataframe_at_qpoint%s" % str((qfrac, units, asr, chneut, dipdip, with_geo, with_spglib))
+        rows = self._get_cached_results(tag, get_row, prefetch=prefetch)
+        row_names = []
+        for (label, ddb), d in zip(self.items(), rows):
+            row_names.append(label)
             if funcs is not None: d.update(self._exec_funcs(funcs, ddb))
-            rows.append(d)
 
         row_names = row_names if not abspath else self._to_relpaths(row_names)
         return pd.DataFrame(rows, index=row_names, columns=list(rows[0].keys()))
@@ -2256,7 +2729,10 @@ class DdbRobot(Robot):
 
             phbands_plotter: |PhononBandsPlotter| object.
             phdos_plotter: |PhononDosPlotter| object.
+
+        Use ``use_anaddb=False`` to compute the phonons in-process with ``DdbFile.get_phbands_and_phdos``.
         """
+        use_anaddb = kwargs.pop("use_anaddb", True)
         # TODO: Multiprocessing?
         if "workdir" in kwargs:
             raise ValueError("Cannot specify `workdir` when multiple DDB file are executed.")
@@ -2264,6 +2740,13 @@ class DdbRobot(Robot):
         phbands_plotter, phdos_plotter = PhononBandsPlotter(), PhononDosPlotter()
 
         for label, ddb in self.items():
+            if not use_anaddb:
+                phbands, phdos = ddb.get_phbands_and_phdos(**kwargs)
+                phbands_plotter.add_phbands(label, phbands, phdos=phdos)
+                if phdos is not None:
+                    phdos_plotter.add_phdos(label, phdos=phdos)
+                continue
+
             # Invoke anaddb to get phonon bands and DOS.
             phbst_file, phdos_file = ddb.anaget_phbst_and_phdos_files(**kwargs)
 
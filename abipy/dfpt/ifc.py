@@ -1,9 +1,15 @@
 # coding: utf-8
-"""The interatomic force constants calculated by anaddb."""
+"""
+The interatomic force constants calculated by anaddb and the Fourier interpolation
+of the dynamical matrix performed in-process from the DDB.
+"""
+import itertools
 import numpy as np
+import abipy.core.abinit_units as abu
 
 from monty.functools import lazy_property
 from abipy.core.mixins import Has_Structure
+from abipy.core.kpoints import KpointList, kpath_from_bounds_and_ndivsm
 from abipy.iotools import ETSF_Reader
 from abipy.tools.plotting import add_fig_kwargs, get_ax_fig_plt
 
@@ -300,3 +306,530 @@ class InteratomicForceConstants(Has_Structure):
         return self.get_plot_ifc(self.ifc_local_coord_ewald[:, :, 0, 0], atom_indices=atom_indices,
                                  atom_element=atom_element, neighbour_element=neighbour_element, min_dist=min_dist,
                                  max_dist=max_dist, ax=ax, **kwargs)
+
+
+class PhononInterpolator(Has_Structure):
+    """
+    Fourier interpolation of the dynamical matrix performed in-process with numpy.
+
+    The real-space interatomic force constants are computed from the dynamical matrices
+    stored in the DDB (ab-initio q-mesh) following the same approach used by anaddb
+    with ``ifcflag 1``: the dynamical matrices are symmetrized and unfolded in the full
+    q-mesh, the acoustic sum rule is imposed, the dipole-dipole part is subtracted
+    (Ewald sum with the Born effective charges and the electronic dielectric tensor) and
+    the short-range part is Fourier transformed to real space with Wigner-Seitz weights.
+    The dynamical matrix is then interpolated and diagonalized for batches of q-points
+    without calling anaddb.
+
+    Usage example:
+
+    .. code-block:: python
+
+        with DdbFile("out_DDB") as ddb:
+            phint = ddb.get_phonon_interpolator(asr=2, chneut=1, dipdip=1)
+
+        phbands = phint.get_phbands_along_path(ndivsm=20)
+        phdos = phint.get_phdos(nqsmall=20)
+    """
+
+    # Number of q-points treated together when interpolating the dynamical matrix.
+    qchunk = 512
+
+    def __init__(self, structure, amu, ngqpt, rpts, ifc, ewald=None, zeff=None, epsinf=None):
+        """
+        Args:
+            structure: |Structure| object.
+            amu: dictionary that associates the atomic species present in the structure to the values of the atomic
+                mass units used for the calculation.
+            ngqpt: Ab-initio q-mesh used to compute the IFCs.
+            rpts: [nrpt, 3] array with the lattice vectors in reduced coordinates.
+            ifc: [nrpt, natom, 3, natom, 3] array with the short-range IFCs in Cartesian coordinates (Ha/bohr^2)
+                multiplied by the Wigner-Seitz weights.
+            ewald: :class:`DipDipEwald` object with the dipole-dipole part. None if dipdip = 0.
+            zeff: [natom, 3, 3] array with the Born effective charges in Cartesian coordinates. None if not available.
+            epsinf: [3, 3] array with the electronic dielectric tensor in Cartesian coordinates. None if not available.
+        """
+        self._structure = structure
+        self.amu = amu
+        self.ngqpt = np.array(ngqpt, dtype=int)
+        self.rpts = rpts
+        self.ifc = ifc
+        self.ewald = ewald
+        self.zeff = zeff
+        self.epsinf = epsinf
+
+        # Masses in atomic units for each degree of freedom.
+        amu_atoms = [amu[site.specie.Z] for site in structure]
+        self._masses = np.repeat(np.array(amu_atoms) * abu.amu_emass, 3)
+
+    @classmethod
+    def from_ddb(cls, ddb, ngqpt=None, asr=2, chneut=1, dipdip=1):
+        """
+        Compute the IFCs from the dynamical matrices in a |DdbFile|.
+
+        Args:
+            ddb: |DdbFile| object.
+            ngqpt: Number of divisions for the ab-initio q-mesh in the DDB file. Auto-detected if None.
+                The mesh must be Gamma-centered and the DDB must contain the q-points in the IBZ.
+            asr, chneut, dipdip: Same meaning as the anaddb input variables. Supported values:
+                asr in (0, 1, 2), chneut in (0, 1), dipdip in (0, 1).
+        """
+        if asr not in (0, 1, 2): raise ValueError("Unsupported value of asr: %s" % str(asr))
+        if chneut not in (0, 1): raise ValueError("Unsupported value of chneut: %s" % str(chneut))
+        if dipdip not in (0, 1): raise ValueError("Unsupported value of dipdip: %s" % str(dipdip))
+        ngqpt = np.array(ddb.guessed_ngqpt if ngqpt is None else ngqpt, dtype=int)
+        nqbz = np.prod(ngqpt)
+
+        h, natom = ddb.header, ddb.natom
+        rprimd = np.array(h.rprim) * np.array(h.acell)[:, None]
+        gprimd = np.linalg.inv(rprimd).T
+        ucvol = abs(np.linalg.det(rprimd))
+        xred = np.reshape(h.xred, (natom, 3))
+        typat = np.array(h.typat, dtype=int) - 1
+        zion = np.array(h.zion, dtype=float)[typat]
+        amu = {int(z): m for z, m in zip(h.znucl, h.amu)}
+
+        # Dynamical matrices in the IBZ of the ab-initio mesh.
+        # Phonon perturbations are given in reduced coordinates: dyn_cart = gprimd^T dyn_red gprimd
+        d2 = ddb.d2matr
+        ief = natom + 1
+        dyns_ibz, qred_ibz = [], []
+        zeff, epsinf = None, None
+        for iq, qpt in enumerate(d2.qpoints):
+            q = qpt.frac_coords
+            if not np.allclose(q * ngqpt, np.rint(q * ngqpt), atol=1e-6): continue
+            qred_ibz.append(q)
+            dyns_ibz.append((d2.values[iq, :, :natom, :, :natom], d2.mask[iq, :, :natom, :, :natom]))
+
+            mask = d2.mask[iq]
+            if np.allclose(q, 0) and mask[:, ief, :, ief].all() and mask[:, ief, :, :natom].all():
+                # The electric field perturbation is given in the basis of the reciprocal lattice vectors.
+                # The DDB contains only the electronic part of the Born effective charges.
+                values, efmat = d2.values[iq], rprimd.T / (2 * np.pi)
+                epsinf = np.eye(3) - 4 * np.pi / ucvol * (efmat @ values[:, ief, :, ief].real @ efmat.T)
+                zeff = np.array([efmat @ values[:, ief, :, iat].real @ gprimd + zion[iat] * np.eye(3)
+                                for iat in range(natom)])
+
+        if zeff is not None and chneut:
+            # Impose charge neutrality by distributing the excess charge equally among the atoms.
+            zeff = zeff - zeff.sum(axis=0) / natom
+
+        symops = _get_symops(h, natom, rprimd)
+        to_cart = lambda dyn_red: np.einsum("ai,ikjl,bj->kalb", gprimd.T, dyn_red, gprimd.T)
+        dyns_ibz = [_complete_dynmat(q, values, mask, symops, to_cart) for q, (values, mask) in zip(qred_ibz, dyns_ibz)]
+
+        # Unfold the dynamical matrices in the full mesh with symmetries and time-reversal.
+        qmesh = np.array(list(itertools.product(*[range(n) for n in ngqpt]))) / ngqpt
+        dynmats = np.zeros((nqbz, natom, 3, natom, 3), dtype=complex)
+        found = np.zeros(nqbz, dtype=bool)
+        for q, dyn in zip(qred_ibz, dyns_ibz):
+            for op in symops:
+                qrot, dyn_rot = _rotate_dynmat(dyn, q, op)
+                for time_sign in (+1, -1):
+                    i = np.rint(time_sign * qrot * ngqpt).astype(int) % ngqpt
+                    iqbz = (i[0] * ngqpt[1] + i[1]) * ngqpt[2] + i[2]
+                    if found[iqbz]: continue
+                    dynmats[iqbz] = dyn_rot if time_sign == 1 else dyn_rot.conj()
+                    found[iqbz] = True
+
+        if not found.all():
+            raise ValueError("DDB file does not contain all the q-points required to reconstruct the %s q-mesh.\n"
+                             "Found %d/%d q-points in the full BZ." % (str(ngqpt), found.sum(), nqbz))
+
+        if asr:
+            # Acoustic sum rule: sum_k' D_{kk'}(q=0) = 0. asr 1 uses the symmetrized correction.
+            corr = dynmats[0].sum(axis=2).real
+            if asr == 1: corr = 0.5 * (corr + corr.transpose(0, 2, 1))
+            for iat in range(natom):
+                dynmats[:, iat, :, iat, :] -= corr[iat]
+
+        ewald = None
+        if dipdip and zeff is not None:
+            ewald = DipDipEwald(rprimd, xred, zeff, epsinf)
+            dynmats -= ewald.get_dynmat(qmesh)
+
+        # Real-space IFCs: C(R) = 1/N sum_q D(q) e^{-i q.R} with Wigner-Seitz weights.
+        rpts, wghts = _get_wigner_seitz_rpts(rprimd, xred, ngqpt)
+        phases = np.exp(-2j * np.pi * rpts @ qmesh.T)
+        ifc = np.einsum("rq,qkalb->rkalb", phases, dynmats).real / nqbz
+        ifc *= wghts[:, :, None, :, None]
+
+        return cls(ddb.structure, amu, ngqpt, rpts, ifc, ewald=ewald, zeff=zeff, epsinf=epsinf)
+
+    @property
+    def structure(self):
+        """|Structure| object."""
+        return self._structure
+
+    def __str__(self):
+        return self.to_string()
+
+    def to_string(self, verbose=0):
+        """String representation."""
+        lines = []; app = lines.append
+        app(self.structure.to_string(verbose=verbose, title="Structure"))
+        app("")
+        app("Ab-initio q-mesh: %s" % str(self.ngqpt))
+        app("Number of lattice vectors: %d" % len(self.rpts))
+        app("Dipole-dipole: %s" % (self.ewald is not None))
+
+        return "\n".join(lines)
+
+    @property
+    def natom(self):
+        """Number of atoms in the unit cell."""
+        return len(self.structure)
+
+    def get_dynmat(self, qpoints):
+        """
+        Interpolate the dynamical matrix.
+
+        Args:
+            qpoints: [nq, 3] array with the q-points in reduced coordinates.
+
+        Return: [nq, 3*natom, 3*natom] complex array with the dynamical matrix in Cartesian coordinates (Ha/bohr^2).
+        """
+        qpoints = np.reshape(qpoints, (-1, 3))
+        n3 = 3 * self.natom
+        dynmats = np.empty((len(qpoints), n3, n3), dtype=complex)
+        ifc = self.ifc.reshape(len(self.rpts), n3 * n3)
+
+        for start in range(0, len(qpoints), self.qchunk):
+            qchunk = qpoints[start:start + self.qchunk]
+            dyn = (np.exp(2j * np.pi * qchunk @ self.rpts.T) @ ifc).reshape(len(qchunk), n3, n3)
+            if self.ewald is not None:
+                dyn += self.ewald.get_dynmat(qchunk).reshape(len(qchunk), n3, n3)
+            dynmats[start:start + self.qchunk] = 0.5 * (dyn + dyn.conj().transpose(0, 2, 1))
+
+        return dynmats
+
+    def _diagonalize(self, dynmats):
+        """
+        Diagonalize the dynamical matrices. Return phonon frequencies in eV and displacements in Angstrom.
+        """
+        sqrt_m = np.sqrt(self._masses)
+        eigvals, eigvecs = np.linalg.eigh(dynmats / np.outer(sqrt_m, sqrt_m))
+        phfreqs = np.sign(eigvals) * np.sqrt(np.abs(eigvals)) * abu.Ha_eV
+        phdispl_cart = eigvecs.transpose(0, 2, 1) / sqrt_m * abu.Bohr_Ang
+
+        return phfreqs, phdispl_cart
+
+    def get_phbands(self, qpoints, weights=None, names=None, non_anal_directions=None):
+        """
+        Compute the phonon band structure for a list of q-points.
+
+        Args:
+            qpoints: [nq, 3] array with the q-points in reduced coordinates.
+            weights: q-point weights. None if the q-points are not used for integrations in the BZ.
+            names: List with the names of the q-points.
+            non_anal_directions: List of Cartesian directions for the non-analytical contribution at Gamma.
+                Requires the Born effective charges and the dielectric tensor.
+
+        Return: |PhononBands| object.
+        """
+        from abipy.dfpt.phonons import PhononBands
+        qpoints = np.reshape(qpoints, (-1, 3))
+        phfreqs, phdispl_cart = self._diagonalize(self.get_dynmat(qpoints))
+        qpoints = KpointList(self.structure.reciprocal_lattice, qpoints, weights=weights, names=names)
+
+        non_anal_ph = None
+        if non_anal_directions is not None and len(non_anal_directions):
+            non_anal_ph = self.get_non_anal_ph(non_anal_directions)
+
+        return PhononBands(self.structure, qpoints, phfreqs, phdispl_cart, non_anal_ph=non_anal_ph,
+                           amu=self.amu, epsinf=self.epsinf, zcart=self.zeff)
+
+    def get_non_anal_ph(self, directions):
+        """
+        Compute the phonons at Gamma including the non-analytical contribution along
+        a list of Cartesian directions. Return :class:`NonAnalyticalPh` object.
+        """
+        from abipy.dfpt.phtk import NonAnalyticalPh
+        if self.zeff is None or self.epsinf is None:
+            raise ValueError("The non-analytical contribution requires Born effective charges and dielectric tensor.")
+
+        directions = np.reshape(directions, (-1, 3))
+        dyn_gamma = self.get_dynmat(np.zeros(3))[0]
+        ucvol = self.structure.volume * abu.Ang_Bohr ** 3
+
+        dynmats = []
+        for qdir in directions:
+            qz = np.einsum("a,kab->kb", qdir, self.zeff).ravel()
+            dynmats.append(dyn_gamma + 4 * np.pi / ucvol * np.outer(qz, qz) / (qdir @ self.epsinf @ qdir))
+
+        phfreqs, phdispl_cart = self._diagonalize(np.array(dynmats))
+
+        return NonAnalyticalPh(self.structure, directions, phfreqs, phdispl_cart, amu=self.amu)
+
+    def get_phbands_along_path(self, ndivsm=20, line_density=None, qptbounds=None, lo_to_splitting="automatic"):
+        """
+        Compute the phonon band structure along a high-symmetry path.
+        Same meaning of the arguments as in ``DdbFile.anaget_phbst_and_phdos_files``.
+
+        Return: |PhononBands| object.
+        """
+        if line_density:
+            from pymatgen.symmetry.bandstructure import HighSymmKpath
+            hs = HighSymmKpath(self.structure, symprec=1e-2)
+            qpts, _ = hs.get_kpoints(line_density=line_density, coords_are_cartesian=False)
+            # Remove repeated q-points.
+            qpath = [qpts[0]]
+            for qpt in qpts[1:]:
+                if not np.array_equal(qpt, qpath[-1]): qpath.append(qpt)
+            qptbounds = self.structure.calc_kptbounds()
+        else:
+            if qptbounds is None: qptbounds = self.structure.calc_kptbounds()
+            qptbounds = np.reshape(qptbounds, (-1, 3))
+            qpath = kpath_from_bounds_and_ndivsm(qptbounds, ndivsm, self.structure)
+
+        if lo_to_splitting == "automatic":
+            lo_to_splitting = self.ewald is not None
+
+        directions = []
+        if lo_to_splitting:
+            # Same directions used by AnaddbInput.phbands_and_dos.
+            rl = self.structure.lattice.reciprocal_lattice_crystallographic
+            for i, qpt in enumerate(qptbounds):
+                if np.array_equal(qpt, (0, 0, 0)):
+                    if i > 0: directions.append(rl.get_cartesian_coords(qptbounds[i - 1]))
+                    if i < len(qptbounds) - 1: directions.append(rl.get_cartesian_coords(qptbounds[i + 1]))
+
+        return self.get_phbands(qpath, non_anal_directions=directions)
+
+    def get_phbands_on_mesh(self, nqsmall=10, qppa=None, ngqpt=None):
+        """
+        Compute the phonon frequencies in the full BZ sampled with a Gamma-centered q-mesh.
+
+        Args:
+            nqsmall: Number of divisions used to sample the smallest reciprocal lattice vector.
+            qppa: Defines the q-mesh in units of q-points per reciprocal atom. Overrides nqsmall.
+            ngqpt: Number of divisions of the q-mesh. Overrides nqsmall and qppa.
+
+        Return: |PhononBands| object with normalized weights.
+        """
+        if ngqpt is None:
+            if qppa:
+                from abipy.flowtk import abiobjects as aobj
+                ngqpt = aobj.KSampling.automatic_density(self.structure, kppa=qppa).kpts[0]
+            else:
+                ngqpt = self.structure.calc_ngkpt(nqsmall)
+
+        ngqpt = np.array(ngqpt, dtype=int)
+        qmesh = np.array(list(itertools.product(*[range(n) for n in ngqpt]))) / ngqpt
+        qmesh[qmesh > 0.5] -= 1
+        weights = np.full(len(qmesh), 1.0 / len(qmesh))
+
+        return self.get_phbands(qmesh, weights=weights)
+
+    def get_phdos(self, nqsmall=10, qppa=None, ngqpt=None, method="gaussian", step=1.e-4, width=4.e-4):
+        """
+        Compute the phonon DOS with the frequencies interpolated in the full BZ.
+        See ``get_phbands_on_mesh`` for the definition of the q-mesh and
+        ``PhononBands.get_phdos`` for the meaning of method, step and width (None for default).
+
+        Return: |PhononDos| object.
+        """
+        if width is None: width = 4.e-4
+        phbands = self.get_phbands_on_mesh(nqsmall=nqsmall, qppa=qppa, ngqpt=ngqpt)
+        return phbands.get_phdos(method=method, step=step, width=width)
+
+
+class DipDipEwald(object):
+    """
+    Dipole-dipole contribution to the dynamical matrix computed with the reciprocal-space
+    Ewald sum (Gonze and Lee, PRB 55, 10355). The term at q = 0 is subtracted from the
+    diagonal blocks so that the dipole-dipole part fulfills the acoustic sum rule.
+    """
+
+    # Terms with (q + G).eps.(q + G) / (4 * alpha) > gmax are neglected.
+    gmax = 14.0
+
+    # Number of q-points treated together.
+    qchunk = 16
+
+    def __init__(self, rprimd, xred, zeff, epsinf):
+        """
+        Args:
+            rprimd: [3, 3] array with the lattice vectors (rows) in bohr.
+            xred: [natom, 3] array with the reduced coordinates of the atoms.
+            zeff: [natom, 3, 3] array with the Born effective charges in Cartesian coordinates.
+            epsinf: [3, 3] array with the electronic dielectric tensor in Cartesian coordinates.
+        """
+        self.xred = np.array(xred)
+        self.zeff = np.array(zeff)
+        self.epsinf = np.array(epsinf)
+        self.ucvol = abs(np.linalg.det(rprimd))
+        self.gmat = 2 * np.pi * np.linalg.inv(rprimd).T
+        self.alpha = (2 * np.pi / np.linalg.norm(rprimd[0])) ** 2
+
+        # Reciprocal lattice vectors inside the sphere defined by gmax (q-points in the first BZ).
+        kmax = np.sqrt(4 * self.alpha * self.gmax / np.linalg.eigvalsh(self.epsinf).min())
+        nmax = [int(kmax * np.linalg.norm(r) / (2 * np.pi)) + 2 for r in rprimd]
+        gvecs = np.array(list(itertools.product(*[range(-n, n + 1) for n in nmax])))
+        # Norm induced by epsinf. The q-points are folded in [-0.5, 0.5] (the sum is periodic).
+        enorm = lambda v: np.sqrt(np.einsum("...a,ab,...b->...", v, self.epsinf, v))
+        qmax = 0.5 * enorm(self.gmat).sum()
+        self.gvecs = gvecs[enorm(gvecs @ self.gmat) <= np.sqrt(4 * self.alpha * self.gmax) + qmax]
+
+        self._dyn0 = None
+        self._dyn0 = self.get_dynmat(np.zeros(3))[0].sum(axis=2).real
+
+    def get_dynmat(self, qpoints):
+        """
+        Return [nq, natom, 3, natom, 3] complex array with the dipole-dipole part of the dynamical matrix
+        in Cartesian coordinates for the q-points in reduced coordinates.
+        """
+        qpoints = np.reshape(qpoints, (-1, 3))
+        qpoints = qpoints - np.rint(qpoints)
+        natom = len(self.xred)
+        dynmats = np.empty((len(qpoints), natom, 3, natom, 3), dtype=complex)
+
+        for start in range(0, len(qpoints), self.qchunk):
+            # kred: [nq, ng, 3] array with q + G in reduced coordinates.
+            kred = self.gvecs[None, :, :] + qpoints[start:start + self.qchunk, None, :]
+            kcart = kred @ self.gmat
+            kek = np.einsum("qga,ab,qgb->qg", kcart, self.epsinf, kcart)
+            ok = (kek > 1e-14) & (kek / (4 * self.alpha) < self.gmax)
+            # Keep only the G-vectors that contribute for at least one q-point in the chunk.
+            gsel = ok.any(axis=0)
+            kred, kcart, kek, ok = kred[:, gsel], kcart[:, gsel], kek[:, gsel], ok[:, gsel]
+            kek[~ok] = 1.0
+            fact = np.where(ok, 4 * np.pi / self.ucvol * np.exp(-kek / (4 * self.alpha)) / kek, 0.0)
+            kz = np.einsum("qga,kab->qgkb", kcart, self.zeff) * np.exp(2j * np.pi * kred @ self.xred.T)[..., None]
+            nq, ng = fact.shape
+            kz = kz.reshape(nq, ng, 3 * natom)
+            dyn = np.matmul((fact[..., None] * kz).transpose(0, 2, 1), kz.conj())
+            dynmats[start:start + self.qchunk] = dyn.reshape(nq, natom, 3, natom, 3)
+
+        if self._dyn0 is not None:
+            for iat in range(natom):
+                dynmats[:, iat, :, iat, :] -= self._dyn0[iat]
+
+        return dynmats
+
+
+def _get_symops(header, natom, rprimd):
+    """
+    Return list of tuples (symrec, rotation in Cartesian coordinates, atom permutation, lattice vectors)
+    with the symmetry operations of the crystal. The symmetry operation maps atom iat into atom
+    perm[iat] translated by the lattice vector lvecs[iat] (reduced coordinates).
+    """
+    xred = np.reshape(header.xred, (natom, 3))
+    amat = rprimd.T
+    amat_inv = np.linalg.inv(amat)
+    symops = []
+    for symrel, tnons, afm in zip(np.reshape(header.symrel, (-1, 3, 3)), np.reshape(header.tnons, (-1, 3)),
+                                  header.symafm):
+        if afm != 1: continue
+        xrot = xred @ symrel.T + tnons
+        perm, lvecs = np.empty(natom, dtype=int), np.empty((natom, 3))
+        for iat in range(natom):
+            diff = xrot[iat] - xred
+            jat = np.where(np.all(np.abs(diff - np.rint(diff)) < 1e-5, axis=1))[0]
+            if len(jat) != 1:
+                raise ValueError("Cannot find the image of atom %d with symmetry operation:\n%s" % (iat, symrel))
+            perm[iat], lvecs[iat] = jat[0], np.rint(diff[jat[0]])
+
+        symops.append((np.linalg.inv(symrel).T, amat @ symrel @ amat_inv, perm, lvecs))
+
+    return symops
+
+
+def _rotate_dynmat(dyn, q, symop):
+    """
+    Apply a symmetry operation to the dynamical matrix dyn [natom, 3, natom, 3] at q (reduced coordinates):
+
+        D_{S k, S k'}(S q) = S D_{k k'}(q) S^T e^{i (S q).(L_k' - L_k)}
+
+    Return the rotated q-point and the dynamical matrix.
+    """
+    symrec, rotcart, perm, lvecs = symop
+    qrot = symrec @ q
+    phase = np.exp(2j * np.pi * lvecs @ qrot)
+    new = np.einsum("ab,kblc,dc->kald", rotcart, dyn, rotcart)
+    new *= phase.conj()[:, None, None, None] * phase[None, None, :, None]
+    inv = np.argsort(perm)
+
+    return qrot, new[inv][:, :, inv]
+
+
+def _complete_dynmat(q, values, mask, symops, to_cart):
+    """
+    Fill the entries of the dynamical matrix that are not stored in the DDB (perturbations that
+    can be obtained by symmetry) by requiring the matrix to be hermitian and invariant under the
+    little group of q. Return the dynamical matrix in Cartesian coordinates [natom, 3, natom, 3].
+
+    Args:
+        values, mask: [3, natom, 3, natom] arrays with the values in reduced coordinates and the mask.
+    """
+    if mask.all(): return to_cart(values)
+
+    little_group = []
+    for symop in symops:
+        qrot = symop[0] @ q
+        for time_sign in (+1, -1):
+            dq = time_sign * qrot - q
+            if np.allclose(dq, np.rint(dq), atol=1e-6): little_group.append((symop, time_sign))
+
+    def residual(dyn_red):
+        # Real-linear function that vanishes if the matrix is invariant and hermitian.
+        dyn = to_cart(dyn_red)
+        sym = np.zeros_like(dyn)
+        for symop, time_sign in little_group:
+            new = _rotate_dynmat(dyn, q, symop)[1]
+            sym += new if time_sign == 1 else new.conj()
+        n3 = dyn.shape[0] * 3
+        dmat = dyn.reshape(n3, n3)
+        res = np.concatenate([(dyn - sym / len(little_group)).ravel(), (dmat - dmat.conj().T).ravel()])
+        return np.concatenate([res.real, res.imag])
+
+    values = np.where(mask, values, 0)
+    missing = [tuple(idx) for idx in np.argwhere(~mask)]
+    cols = []
+    for idx in missing:
+        for fact in (1, 1j):
+            delta = np.zeros_like(values)
+            delta[idx] = fact
+            cols.append(residual(delta))
+
+    amat = np.array(cols).T
+    x, _, rank, _ = np.linalg.lstsq(amat, -residual(values), rcond=None)
+    if rank < len(cols):
+        raise ValueError("Cannot reconstruct the missing entries of the dynamical matrix at q-point: %s" % str(q))
+
+    for i, idx in enumerate(missing):
+        values[idx] = x[2 * i] + 1j * x[2 * i + 1]
+
+    return to_cart(values)
+
+
+def _get_wigner_seitz_rpts(rprimd, xred, ngqpt):
+    """
+    Compute the lattice vectors and the weights for the Fourier interpolation.
+    The weight of (R, k, k') is the inverse of the number of vectors equivalent to R + tau_k' - tau_k
+    (modulo the supercell) that are inside the Wigner-Seitz cell of the supercell defined by ngqpt.
+
+    Return: [nrpt, 3] array with the lattice vectors in reduced coordinates, [nrpt, natom, natom] weights.
+    """
+    natom = len(xred)
+    ngqpt = np.array(ngqpt, dtype=int)
+    rpts = np.array(list(itertools.product(*[range(-n - 1, n + 2) for n in ngqpt])))
+    rcart = rpts @ rprimd
+    xcart = xred @ rprimd
+    scvecs = np.array(list(itertools.product(range(-2, 3), repeat=3))) @ (rprimd * ngqpt[:, None])
+
+    wghts = np.zeros((len(rpts), natom, natom))
+    for iat, jat in itertools.product(range(natom), repeat=2):
+        rvecs = rcart + xcart[jat] - xcart[iat]
+        dist0 = np.linalg.norm(rvecs, axis=1)
+        dists = np.linalg.norm(rvecs[:, None, :] + scvecs[None, :, :], axis=2)
+        tol = 1e-6 * (1 + dist0)
+        inside = dist0 <= dists.min(axis=1) + tol
+        nequiv = np.count_nonzero(np.abs(dists - dist0[:, None]) <= tol[:, None], axis=1)
+        wghts[:, iat, jat] = np.where(inside, 1.0 / nequiv, 0.0)
+
+    if not np.allclose(wghts.sum(axis=0), np.prod(ngqpt)):
+        raise RuntimeError("Wigner-Seitz weights do not sum up to the number of q-points.")
+
+    keep = wghts.any(axis=(1, 2))
+    return rpts[keep], wghts[keep]
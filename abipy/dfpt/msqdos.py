@@ -10,6 +10,7 @@ from monty.string import list_strings, marquee
 from monty.collections import dict2namedtuple
 from monty.termcolor import cprint
 from abipy.core.mixins import Has_Structure
+from abipy.tools.numtools import simpson_weights
 from abipy.tools.plotting import add_fig_kwargs, set_axlims, get_axarray_fig_plt, set_visible
 from abipy.tools.printing import print_dataframe
 
@@ -196,34 +197,33 @@ class MsqDos(Has_Structure):
         nw = len(wvals)
 
         # We will compute: Ucart(T, k, ij) = 1/M_k \int dw (n(w) + 1/2) g_ij(w) / w for the k-atom in a.u.
-        # Calculate Bose-Einstein occupation factors only once for each T (instead of for each atom).
-        npht = np.zeros((nt, nw))
-        for it, temp in enumerate(tmesh):
-            npht[it] = abu.occ_be(wvals, temp * abu.kb_HaK) + 0.5
+        # Calculate Bose-Einstein occupation factors for all T at once (same conventions as abu.occ_be).
+        kt = (tmesh * abu.kb_HaK)[:, None]
+        arg = wvals[None, :] / np.where(kt > 1e-12 * abu.Ha_eV, kt, 1.0)
+        ok = (kt > 1e-12 * abu.Ha_eV) & (arg > 1e-12) & (arg < 600.0)
+        npht = np.where(ok, 1.0 / np.expm1(np.where(ok, arg, 1.0)), 0.0) + 0.5
 
         natom = len(self.structure)
         msq_d = np.empty((natom, 3, 3, nt))
         msq_v = np.empty((natom, 3, 3, nt))
         what_list = list_strings(what_list)
 
-        # Perform frequency integration to get tensor(T)
-        from scipy.integrate import simps
-        if iatom_list is not None: iatom_list = set(iatom_list)
-        for iatom in range(natom):
-            if iatom_list is not None and iatom not in iatom_list: continue
-            symbol = self.structure[iatom].specie.symbol
-            for it in range(nt):
-                fn = self.values[iatom, :, :, iomin:] * npht[it]
-                if "displ" in what_list:
-                    # Mean square displacement for each atom as a function of T (bohr^2).
-                    ys = fn / wvals
-                    fact = 1.0 / (self.amu_symbol[symbol] * abu.amu_emass)
-                    msq_d[iatom, :, :, it] = simps(ys, x=wvals) * fact * abu.Bohr_Ang ** 2
-                if "vel" in what_list:
-                    # Mean square velocity for each atom as a function of T (bohr^2/atomic time unit^2)"
-                    ys = fn * wvals
-                    fact = 1.0 / (self.amu_symbol[symbol] * abu.amu_emass)
-                    msq_v[iatom, :, :, it] = simps(ys, x=wvals) * fact # * abu.velocity_at_to_si ** 2
+        # Perform frequency integration for all atoms and temperatures with matrix products.
+        # sweights are the weights of Simpson's rule (same results as scipy.integrate.simps).
+        iatoms = list(range(natom)) if iatom_list is None else sorted(set(iatom_list))
+        gvals = self.values[iatoms][..., iomin:].reshape(-1, nw)
+        sweights = simpson_weights(wvals)
+        fact = np.array([1.0 / (self.amu_symbol[self.structure[iatom].specie.symbol] * abu.amu_emass)
+                         for iatom in iatoms])[:, None, None, None]
+
+        if "displ" in what_list:
+            # Mean square displacement for each atom as a function of T (bohr^2).
+            vals = np.dot(gvals, (npht * (sweights / wvals)).T).reshape(len(iatoms), 3, 3, nt)
+            msq_d[iatoms] = vals * fact * abu.Bohr_Ang ** 2
+        if "vel" in what_list:
+            # Mean square velocity for each atom as a function of T (bohr^2/atomic time unit^2)"
+            vals = np.dot(gvals, (npht * (sweights * wvals)).T).reshape(len(iatoms), 3, 3, nt)
+            msq_v[iatoms] = vals * fact # * abu.velocity_at_to_si ** 2
 
         return dict2namedtuple(tmesh=tmesh, displ=msq_d, vel=msq_v)
 
@@ -23,9 +23,10 @@ from abipy.core.kpoints import Kpoint, Kpath
 from abipy.abio.robots import Robot
 from abipy.iotools import ETSF_Reader
 from abipy.tools import duck
-from abipy.tools.numtools import gaussian, sort_and_groupby
+from abipy.tools.numtools import gaussian, gaussian_binned, sort_and_groupby
 from abipy.tools.plotting import add_fig_kwargs, get_ax_fig_plt, set_axlims, get_axarray_fig_plt, set_visible, set_ax_xylabels
-from .phtk import match_eigenvectors, get_dyn_mat_eigenvec, open_file_phononwebsite, NonAnalyticalPh
+from .phtk import match_eigenvectors_batch, get_dyn_mat_eigenvec, open_file_phononwebsite, NonAnalyticalPh
+from .phtk import match_eigenvectors  # noqa: F401 (backward compatibility)
 
 __all__ = [
     "PhononBands",
@@ -616,7 +617,8 @@ class PhononBands(object):
         Compute the phonon DOS on a linear mesh.
 
         Args:
-            method: String defining the method
+            method: String defining the method. "gaussian" for gaussian broadening,
+                "gaussian_binned" for gaussian broadening computed by convolving the histogram of the frequencies.
             step: Energy step (eV) of the linear mesh.
             width: Standard deviation (eV) of the gaussian.
 
@@ -635,7 +637,7 @@ class PhononBands(object):
         w_min -= 0.1 * abs(w_min)
         w_max = self.maxfreq
         w_max += 0.1 * abs(w_max)
-        nw = 1 + (w_max - w_min) / step
+        nw = int(1 + (w_max - w_min) / step)
 
         mesh, step = np.linspace(w_min, w_max, num=nw, endpoint=True, retstep=True)
 
@@ -647,6 +649,9 @@ class PhononBands(object):
                     w = self.phfreqs[q, nu]
                     values += weight * gaussian(mesh, width, center=w)
 
+        elif method == "gaussian_binned":
+            values = gaussian_binned(mesh, width, self.phfreqs, weights=self.qpoints.weights[:, None])
+
         else:
             raise ValueError("Method %s is not supported" % str(method))
 
@@ -1222,9 +1227,6 @@ class PhononBands(object):
             return self._split_matched_indices
         except AttributeError:
 
-            split_matched_indices = []
-            last_eigenvectors = None
-
             # simpler method based just on the matching with the previous point
             #TODO remove after verifying the other method currently in use
             # for i, displ in enumerate(self.split_phdispl_cart):
@@ -1249,35 +1251,44 @@ class PhononBands(object):
             # before. This should avoid exchange of lines due to degeneracies.
             # The code will assume that there is a high symmetry point if the points are not collinear (change in the
             # direction in the path).
-            def collinear(a, b, c):
-                v1 = [b[0] - a[0], b[1] - a[1], b[2] - a[2]]
-                v2 = [c[0] - a[0], c[1] - a[1], c[2] - a[2]]
-                d = [v1, v2, [1, 1, 1]]
-                return np.isclose(np.linalg.det(d), 0, atol=1e-5)
-
-            for i, displ in enumerate(self.split_phdispl_cart):
-                eigenvectors = get_dyn_mat_eigenvec(displ, self.structure, amu=self.amu)
-                ind_block = np.zeros((len(displ), self.num_branches), dtype=np.int)
+            # The overlaps are computed for all the pairs at once and the bands are connected with the
+            # assignment maximizing the total overlap (degenerate subspaces are treated as a whole).
+            # The indices are then propagated along the path.
+            split_eigvecs = [get_dyn_mat_eigenvec(displ, self.structure, amu=self.amu)
+                             for displ in self.split_phdispl_cart]
+
+            # List of (iblock, iq) for the reference and the target point of each match.
+            refs, targets = [], []
+            for i, qpts in enumerate(self.split_qpoints):
                 # if it's not the first block, match the first two points with the last of the previous block.
                 # Should give a match in case of LO-TO splitting
                 if i == 0:
-                    ind_block[0] = range(self.num_branches)
-                    match = match_eigenvectors(eigenvectors[0], eigenvectors[1])
-                    ind_block[1] = [match[m] for m in ind_block[0]]
+                    refs.append((0, 0)); targets.append((0, 1))
                 else:
-                    match = match_eigenvectors(last_eigenvectors, eigenvectors[0])
-                    ind_block[0] = [match[m] for m in split_matched_indices[-1][-2]]
-                    match = match_eigenvectors(last_eigenvectors, eigenvectors[1])
-                    ind_block[1] = [match[m] for m in split_matched_indices[-1][-2]]
-                for j in range(2, len(displ)):
-                    k = j-1
-                    if not collinear(self.split_qpoints[i][j-2], self.split_qpoints[i][j-1], self.split_qpoints[i][j]):
-                        k = j-2
-                    match = match_eigenvectors(eigenvectors[k], eigenvectors[j])
-                    ind_block[j] = [match[m] for m in ind_block[k]]
-
-                split_matched_indices.append(ind_block)
-                last_eigenvectors = eigenvectors[-2]
+                    refs.extend([(i - 1, len(split_eigvecs[i - 1]) - 2)] * 2)
+                    targets.extend([(i, 0), (i, 1)])
+                if len(qpts) > 2:
+                    qpts = np.asarray(qpts)
+                    d = np.ones((len(qpts) - 2, 3, 3))
+                    d[:, 0] = qpts[1:-1] - qpts[:-2]
+                    d[:, 1] = qpts[2:] - qpts[:-2]
+                    collinear = np.isclose(np.linalg.det(d), 0, atol=1e-5)
+                    for j in range(2, len(qpts)):
+                        refs.append((i, j - 1 if collinear[j - 2] else j - 2))
+                        targets.append((i, j))
+
+            matches = []
+            chunk_size = 256
+            for start in range(0, len(refs), chunk_size):
+                r, t = refs[start:start + chunk_size], targets[start:start + chunk_size]
+                matches.extend(match_eigenvectors_batch(
+                    [split_eigvecs[b][q] for b, q in r], [split_eigvecs[b][q] for b, q in t],
+                    w1=[self.split_phfreqs[b][q] for b, q in r], w2=[self.split_phfreqs[b][q] for b, q in t]))
+
+            split_matched_indices = [np.zeros((len(e), self.num_branches), dtype=np.int) for e in split_eigvecs]
+            split_matched_indices[0][0] = range(self.num_branches)
+            for (rb, rq), (tb, tq), match in zip(refs, targets, matches):
+                split_matched_indices[tb][tq] = match[split_matched_indices[rb][rq]]
 
             self._split_matched_indices = split_matched_indices
 
@@ -2346,6 +2357,86 @@ _THERMO_YLABELS = {  # [name][units] --> latex string
 }
 
 
+def get_harmonic_thermo(wmesh, weights, tmesh, chunk_size=2**22):
+    """
+    Thermodynamic properties of a set of harmonic oscillators for all the temperatures in ``tmesh``.
+    The oscillators can be given by the points of a phonon DOS multiplied by the quadrature weights
+    (see :func:`stack_phdos_weights`) or by the frequencies on a q-mesh and the q-point weights.
+    Extra leading dimensions of ``wmesh`` and ``weights`` (e.g. volumes) are treated as a batch.
+    Frequencies <= 0 do not contribute.
+
+    Args:
+        wmesh: (..., nw) array with frequencies in eV.
+        weights: (..., nw) array with the weights of the frequencies.
+        tmesh: Temperature mesh in Kelvin.
+        chunk_size: Maximum number of elements in the temporary (..., nt, nw) arrays.
+
+    Return:
+        ``namedtuple`` with the following attributes:
+
+            tmesh: numpy array with the temperatures. Shape (nt).
+            zpe: zero point energy in eV. Shape (...).
+            internal_energy: internal energy in eV (ZPE included). Shape (..., nt).
+            entropy: entropy in eV/K. Shape (..., nt).
+            free_energy: free energy in eV (ZPE included). Shape (..., nt).
+            cv: constant-volume specific heat in eV/K. Shape (..., nt).
+    """
+    wmesh, weights = np.broadcast_arrays(np.asarray(wmesh, dtype=np.float), np.asarray(weights, dtype=np.float))
+    tmesh = np.atleast_1d(np.asarray(tmesh, dtype=np.float))
+    nt = len(tmesh)
+
+    # Oscillators with w <= 0 have zero weight, w is set to 1 to avoid divisions by zero.
+    mask = wmesh > 0
+    weights = np.where(mask, weights, 0.0)
+    w = np.where(mask, wmesh, 1.0)[..., None, :]
+    ww = weights[..., None, :]
+
+    zpe = 0.5 * (weights * wmesh).sum(axis=-1)
+    bshape = wmesh.shape[:-1]
+    uvals = np.empty(bshape + (nt,))
+    svals = np.zeros(bshape + (nt,))
+    cvals = np.zeros(bshape + (nt,))
+    uvals[...] = zpe[..., None]
+
+    # Temperatures are processed in chunks to limit the memory requirements.
+    it_list = np.nonzero(tmesh > 0)[0]
+    step = max(1, chunk_size // max(1, wmesh.size))
+    for start in range(0, len(it_list), step):
+        its = it_list[start:start + step]
+        x = w / (2 * abu.kb_eVK * tmesh[its, None])
+        # Use exp(-2x) to avoid overflows for large x.
+        em2x = np.exp(-2 * x)
+        one_m_em2x = -np.expm1(-2 * x)
+        coth = (1 + em2x) / one_m_em2x
+        uvals[..., its] = (ww * 0.5 * w * coth).sum(axis=-1)
+        svals[..., its] = (ww * (x * coth - x - np.log(one_m_em2x))).sum(axis=-1)
+        cvals[..., its] = (ww * x ** 2 * 4 * em2x / one_m_em2x ** 2).sum(axis=-1)
+
+    svals *= abu.kb_eVK
+    cvals *= abu.kb_eVK
+
+    return dict2namedtuple(tmesh=tmesh, zpe=zpe, internal_energy=uvals, entropy=svals,
+                           free_energy=uvals - tmesh * svals, cv=cvals)
+
+
+def stack_phdos_weights(phdoses):
+    """
+    Stack the frequencies and the quadrature weights of a list of |PhononDos| (e.g. for different volumes)
+    so that the thermodynamic properties can be computed with a single call to :func:`get_harmonic_thermo`.
+    Meshes with different number of points are padded with zero weights.
+
+    Return: (wmesh, weights) arrays with shape (len(phdoses), nw).
+    """
+    data = [phdos.thermo_weights for phdos in phdoses]
+    nw = max(len(w) for w, _ in data)
+    wmesh, weights = np.ones((len(data), nw)), np.zeros((len(data), nw))
+    for i, (w, c) in enumerate(data):
+        wmesh[i, :len(w)] = w
+        weights[i, :len(w)] = c
+
+    return wmesh, weights
+
+
 class PhononDos(Function1D):
     """
     This object stores the phonon density of states.
@@ -2487,6 +2578,32 @@ class PhononDos(Function1D):
 
         return fig
 
+    @lazy_property
+    def thermo_weights(self):
+        """
+        Frequencies (eV) and weights used to compute the thermodynamic properties with the trapezoidal rule.
+        The integration starts at the first positive frequency. See :func:`get_harmonic_thermo`.
+        """
+        w, gw = self.mesh[self.iw0:], self.values[self.iw0:]
+        if w[0] < 1e-12:
+            w, gw = self.mesh[self.iw0+1:], self.values[self.iw0+1:]
+
+        # Trapezoidal weights.
+        dx = np.diff(w)
+        c = np.zeros(len(w))
+        c[:-1] += 0.5 * dx
+        c[1:] += 0.5 * dx
+
+        return w, c * gw
+
+    def get_harmonic_thermo(self, tmesh):
+        """
+        Compute all the thermodynamic properties in the harmonic approximation for the temperatures in tmesh.
+        See :func:`get_harmonic_thermo` for the attributes of the ``namedtuple`` returned.
+        """
+        w, c = self.thermo_weights
+        return get_harmonic_thermo(w, c, tmesh)
+
     def get_internal_energy(self, tstart=5, tstop=300, num=50):
         """
         Returns the internal energy, in eV, in the harmonic approximation for different temperatures
@@ -2499,22 +2616,8 @@ class PhononDos(Function1D):
 
         Return: |Function1D| object with U(T) + ZPE.
         """
-        tmesh = np.linspace(tstart, tstop, num=num)
-        w, gw = self.mesh[self.iw0:], self.values[self.iw0:]
-        if w[0] < 1e-12:
-            w, gw = self.mesh[self.iw0+1:], self.values[self.iw0+1:]
-        coth = lambda x: 1.0 / np.tanh(x)
-
-        vals = np.empty(len(tmesh))
-        for it, temp in enumerate(tmesh):
-            if temp == 0:
-                vals[it] = self.zero_point_energy
-            else:
-                wd2kt = w / (2 * abu.kb_eVK * temp)
-                vals[it] = 0.5 * np.trapz(w * coth(wd2kt) * gw, x=w)
-            #print(vals[it])
-
-        return Function1D(tmesh, vals)
+        thermo = self.get_harmonic_thermo(np.linspace(tstart, tstop, num=num))
+        return Function1D(thermo.tmesh, thermo.internal_energy)
 
     def get_entropy(self, tstart=5, tstop=300, num=50):
         """
@@ -2527,21 +2630,8 @@ class PhononDos(Function1D):
 
         Return: |Function1D| object with S(T).
         """
-        tmesh = np.linspace(tstart, tstop, num=num)
-        w, gw = self.mesh[self.iw0:], self.values[self.iw0:]
-        if w[0] < 1e-12:
-            w, gw = self.mesh[self.iw0+1:], self.values[self.iw0+1:]
-        coth = lambda x: 1.0 / np.tanh(x)
-
-        vals = np.empty(len(tmesh))
-        for it, temp in enumerate(tmesh):
-            if temp == 0:
-                vals[it] = 0
-            else:
-                wd2kt = w / (2 * abu.kb_eVK * temp)
-                vals[it] = np.trapz((wd2kt * coth(wd2kt) - np.log(2 * np.sinh(wd2kt))) * gw, x=w)
-
-        return Function1D(tmesh, abu.kb_eVK * vals)
+        thermo = self.get_harmonic_thermo(np.linspace(tstart, tstop, num=num))
+        return Function1D(thermo.tmesh, thermo.entropy)
 
     def get_free_energy(self, tstart=5, tstop=300, num=50):
         """
@@ -2555,10 +2645,8 @@ class PhononDos(Function1D):
 
         Return: |Function1D| object with F(T) = U(T) + ZPE - T x S(T)
         """
-        uz = self.get_internal_energy(tstart=tstart, tstop=tstop, num=num)
-        s = self.get_entropy(tstart=tstart, tstop=tstop, num=num)
-
-        return Function1D(uz.mesh, uz.values - s.mesh * s.values)
+        thermo = self.get_harmonic_thermo(np.linspace(tstart, tstop, num=num))
+        return Function1D(thermo.tmesh, thermo.free_energy)
 
     def get_cv(self, tstart=5, tstop=300, num=50):
         """
@@ -2572,21 +2660,8 @@ class PhononDos(Function1D):
 
         Return: |Function1D| object with C_v(T).
         """
-        tmesh = np.linspace(tstart, tstop, num=num)
-        w, gw = self.mesh[self.iw0:], self.values[self.iw0:]
-        if w[0] < 1e-12:
-            w, gw = self.mesh[self.iw0+1:], self.values[self.iw0+1:]
-        csch2 = lambda x: 1.0 / (np.sinh(x) ** 2)
-
-        vals = np.empty(len(tmesh))
-        for it, temp in enumerate(tmesh):
-            if temp == 0:
-                vals[it] = 0
-            else:
-                wd2kt = w / (2 * abu.kb_eVK * temp)
-                vals[it] = np.trapz(wd2kt ** 2 * csch2(wd2kt) * gw, x=w)
-
-        return Function1D(tmesh, abu.kb_eVK * vals)
+        thermo = self.get_harmonic_thermo(np.linspace(tstart, tstop, num=num))
+        return Function1D(thermo.tmesh, thermo.cv)
 
     @add_fig_kwargs
     def plot_harmonic_thermo(self, tstart=5, tstop=300, num=50, units="eV", formula_units=None,
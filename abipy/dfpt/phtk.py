@@ -63,21 +63,59 @@ def match_eigenvectors(v1, v2):
     """
     Given two list of vectors, returns the pair matching based on the complex scalar product.
     Returns the indices of the second list that match the vectors of the first list in ascending order.
+    The assignment maximizes the sum of the overlaps (see :func:`match_eigenvectors_batch`).
     """
-    prod = np.absolute(np.dot(v1, v2.transpose().conjugate()))
-
-    indices = np.zeros(len(v1), dtype=np.int)
-    missing_v1 = [True] * len(v1)
-    missing_v2 = [True] * len(v1)
-    for m in reversed(np.argsort(prod, axis=None)):
-        i, j = np.unravel_index(m, prod.shape)
-        if missing_v1[i] and missing_v2[j]:
-            indices[i] = j
-            missing_v1[i] = missing_v2[j] = False
-            if not any(missing_v1):
-                if any(missing_v2):
-                    raise RuntimeError('Something went wrong in matching vectors: {} {}'.format(v1, v2))
-                break
+    return match_eigenvectors_batch(np.asarray(v1)[None], np.asarray(v2)[None])[0]
+
+
+def _degenerate_groups(freqs, degtol):
+    """
+    Return (n, nb, nb) boolean array with True if the two modes belong to the same degenerate subspace.
+    freqs: (n, nb) array. Modes are considered degenerate if they are connected by differences < degtol.
+    """
+    order = np.argsort(freqs, axis=-1)
+    sorted_freqs = np.take_along_axis(freqs, order, axis=-1)
+    # Index of the group of each mode in sorted order, then in the original order.
+    gsorted = np.concatenate([np.zeros(freqs.shape[:-1] + (1,), dtype=int),
+                              np.cumsum(np.diff(sorted_freqs, axis=-1) > degtol, axis=-1)], axis=-1)
+    groups = np.empty_like(gsorted)
+    np.put_along_axis(groups, order, gsorted, axis=-1)
+    return groups[..., :, None] == groups[..., None, :]
+
+
+def match_eigenvectors_batch(v1, v2, w1=None, w2=None, degtol=1e-6):
+    """
+    Match two batches of eigenvectors e.g. the eigenvectors of the dynamical matrix at consecutive q-points
+    of a path. The overlap matrices are computed for all the pairs at once and the assignment maximizing
+    the sum of the squared overlaps is found with the Hungarian algorithm (scipy linear_sum_assignment).
+
+    If the frequencies are given, the overlap with a vector of a degenerate subspace is replaced
+    by the overlap with the full subspace as the eigenvectors in the subspace are defined up to a unitary
+    transformation. The overlaps with the individual vectors are used to break ties.
+
+    Args:
+        v1, v2: (n, nb, nb) arrays. v[i, m] is the m-th eigenvector of the i-th pair.
+        w1, w2: (n, nb) arrays with the frequencies associated to v1 and v2. None if not available.
+        degtol: Tolerance on frequencies for degenerate modes (same units as w1 and w2).
+
+    Return:
+        (n, nb) array. indices[i, m] is the index of the vector in v2[i] matching v1[i, m].
+    """
+    from scipy.optimize import linear_sum_assignment
+    v1, v2 = np.asarray(v1), np.asarray(v2)
+    ovlp = np.abs(np.matmul(v1, np.conj(np.swapaxes(v2, -1, -2)))) ** 2
+    score = ovlp
+    if w2 is not None:
+        score = np.matmul(score, _degenerate_groups(np.asarray(w2), degtol).astype(float))
+    if w1 is not None:
+        score = np.matmul(_degenerate_groups(np.asarray(w1), degtol).astype(float), score)
+    if score is not ovlp:
+        score = score + 1e-3 * ovlp
+
+    indices = np.empty(v1.shape[:2], dtype=int)
+    for i in range(len(score)):
+        rows, cols = linear_sum_assignment(-score[i])
+        indices[i, rows] = cols
 
     return indices
 
@@ -11,8 +11,8 @@ from pymatgen.analysis.eos import EOS
 from abipy.core.func1d import Function1D
 from abipy.tools.plotting import add_fig_kwargs, get_ax_fig_plt, get_axarray_fig_plt
 from abipy.electrons.gsr import GsrFile
-from abipy.dfpt.ddb import DdbFile
-from abipy.dfpt.phonons import PhononBandsPlotter, PhononDos, PhdosFile
+from abipy.dfpt.ddb import DdbFile, get_anaddb_executor
+from abipy.dfpt.phonons import PhononBandsPlotter, PhononDos, PhdosFile, get_harmonic_thermo, stack_phdos_weights
 from abipy.dfpt.gruneisen import GrunsNcFile
 
 
@@ -510,12 +510,8 @@ class QHA(AbstractQHA):
         Returns:
             A numpy array of `num` values of the vibrational contribution to the free energy
         """
-        f = np.zeros((self.nvols, num))
-
-        for i, dos in enumerate(self.doses):
-            f[i] = dos.get_free_energy(tstart, tstop, num).values
-
-        return f
+        wmesh, weights = stack_phdos_weights(self.doses)
+        return get_harmonic_thermo(wmesh, weights, np.linspace(tstart, tstop, num)).free_energy
 
     def get_thermodynamic_properties(self, tstart=0, tstop=800, num=100):
         """
@@ -535,21 +531,13 @@ class QHA(AbstractQHA):
                 entropy: entropy, in eV/K. Shape (nvols, num).
                 zpe: zero point energy in eV. Shape (nvols).
         """
-        tmesh = np.linspace(tstart, tstop, num)
-        cv = np.zeros((self.nvols, num))
-        free_energy = np.zeros((self.nvols, num))
-        entropy = np.zeros((self.nvols, num))
-        internal_energy = np.zeros((self.nvols, num))
-        zpe = np.zeros(self.nvols)
+        # All the volumes and temperatures are computed with a single call.
+        wmesh, weights = stack_phdos_weights(self.doses)
+        thermo = get_harmonic_thermo(wmesh, weights, np.linspace(tstart, tstop, num))
+        zpe = np.array([d.zero_point_energy for d in self.doses])
 
-        for i, d in enumerate(self.doses):
-            cv[i] = d.get_cv(tstart, tstop, num).values
-            free_energy[i] = d.get_free_energy(tstart, tstop, num).values
-            entropy[i] = d.get_entropy(tstart, tstop, num).values
-            zpe[i] = d.zero_point_energy
-
-        return dict2namedtuple(tmesh=tmesh, cv=cv, free_energy=free_energy, entropy=entropy,
-                               zpe=zpe)
+        return dict2namedtuple(tmesh=thermo.tmesh, cv=thermo.cv, free_energy=thermo.free_energy,
+                               entropy=thermo.entropy, zpe=zpe)
 
 
 class QHA3PF(AbstractQHA):
@@ -625,9 +613,10 @@ class QHA3PF(AbstractQHA):
                 zpe: zero point energy in eV. Shape (nvols).
         """
         tmesh = np.linspace(tstart, tstop, num)
-        cv = self._get_thermodynamic_prop("cv", tstart, tstop, num)
-        free_energy = self._get_thermodynamic_prop("free_energy", tstart, tstop, num)
-        entropy = self._get_thermodynamic_prop("entropy", tstart, tstop, num)
+        thermo = self._get_doses_thermo(tmesh)
+        cv = self._get_thermodynamic_prop("cv", tstart, tstop, num, thermo=thermo)
+        free_energy = self._get_thermodynamic_prop("free_energy", tstart, tstop, num, thermo=thermo)
+        entropy = self._get_thermodynamic_prop("entropy", tstart, tstop, num, thermo=thermo)
         zpe = np.zeros(self.nvols)
 
         for i, dos in zip(self.ind_doses, self.doses):
@@ -642,35 +631,40 @@ class QHA3PF(AbstractQHA):
         return dict2namedtuple(tmesh=tmesh, cv=cv, free_energy=free_energy, entropy=entropy,
                                zpe=zpe)
 
-    def _get_thermodynamic_prop(self, name, tstart, tstop, num):
+    def _get_doses_thermo(self, tmesh):
+        """Thermodynamic properties for all the phonon DOSes computed with a single call."""
+        wmesh, weights = stack_phdos_weights(self.doses)
+        return get_harmonic_thermo(wmesh, weights, tmesh)
+
+    def _get_thermodynamic_prop(self, name, tstart, tstop, num, thermo=None):
         """
         Helper function to get a generic thermodynamic property for all the volumes.
 
         Args:
             name: name of the property to calculate. Possible values in "internal_energy",
-                "free_energy", "entropy", "c_v".
+                "free_energy", "entropy", "cv".
             tstart: The starting value (in Kelvin) of the temperature mesh.
             tstop: The end value (in Kelvin) of the mesh.
             num: int, optional Number of samples to generate. Default is 100.
+            thermo: Results of ``_get_doses_thermo`` for this temperature mesh. Computed if None.
 
         Returns:
             Numpy array with the values of the thermodynamic properties at the different
             volumes with size (nvols, num).
         """
-        prop_doses = np.array([getattr(dos, "get_" + name)(tstart, tstop, num).values for dos in self.doses])
+        if thermo is None:
+            thermo = self._get_doses_thermo(np.linspace(tstart, tstop, num))
+        prop_doses = getattr(thermo, name)
 
         p = np.zeros((self.nvols, num))
-
-        for i, prop_dos in zip(self.ind_doses, prop_doses):
-            p[i] = prop_dos
+        p[self.ind_doses] = prop_doses
 
         dos_vols = self.volumes[self.ind_doses]
         missing_vols = self.volumes[self._ind_energy_only]
 
-        # generate fit objects from the known dos values
-        for i_temp in range(num):
-            fit_params = np.polyfit(dos_vols, prop_doses[:, i_temp], self.fit_degree)
-            p[self._ind_energy_only, i_temp] = np.poly1d(fit_params)(missing_vols)
+        # Fit the known dos values for all the temperatures at once.
+        fit_params = np.polyfit(dos_vols, prop_doses, self.fit_degree)
+        p[self._ind_energy_only] = np.vander(missing_vols, self.fit_degree + 1) @ fit_params
 
         return p
 
@@ -774,19 +768,11 @@ class QHA3P(AbstractQHA):
         tmesh = np.linspace(tstart, tstop, num)
         weights = self.grun.doses['qpoints'].weights
 
-        free_energy = np.zeros((self.nvols, num))
-        cv = np.zeros((self.nvols, num))
-        entropy = np.zeros((self.nvols, num))
-        zpe = np.zeros(self.nvols)
-
-        for i in range(self.nvols):
-            free_energy[i] = [get_free_energy(w[i], weights, t) for t in tmesh]
-            cv[i] = [get_cv(w[i], weights, t) for t in tmesh]
-            entropy[i] = [get_entropy(w[i], weights, t) for t in tmesh]
-            zpe[i] = get_zero_point_energy(w, weights)
+        # All the volumes and temperatures are computed with a single call.
+        thermo = get_harmonic_thermo(w.reshape(self.nvols, -1), np.repeat(weights, w.shape[2]), tmesh)
 
-        return dict2namedtuple(tmesh=tmesh, cv=cv, free_energy=free_energy, entropy=entropy,
-                               zpe=zpe)
+        return dict2namedtuple(tmesh=tmesh, cv=thermo.cv, free_energy=thermo.free_energy, entropy=thermo.entropy,
+                               zpe=thermo.zpe)
 
     @lazy_property
     def fitted_frequencies(self):
@@ -833,12 +819,7 @@ class QHA3P(AbstractQHA):
         tmesh = np.linspace(tstart, tstop, num)
         weights = self.grun.doses['qpoints'].weights
 
-        f = np.zeros((self.nvols, num))
-
-        for i in range(self.nvols):
-            f[i] = [get_free_energy(w[i], weights, t) for t in tmesh]
-
-        return f
+        return get_harmonic_thermo(w.reshape(self.nvols, -1), np.repeat(weights, w.shape[2]), tmesh).free_energy
 
 
 def get_free_energy(w, weights, t):
@@ -997,37 +978,66 @@ class QHAQmeshAnalyzer(AbstractQmeshAnalyzer):
         self.gsr_paths = gsr_paths
         self.ddb_paths = ddb_paths
 
-    def run_qlist(self, nqsmall_list, **kwargs):
+    def run_qlist(self, nqsmall_list, use_anaddb=True, **kwargs):
         """
+        Compute the phonon DOSes for the list of q-meshes defined by ``nqsmall_list`` and build the QHA objects.
+
+        Args:
+            nqsmall_list: List of integers defining the q-meshes (number of divisions for
+                the smallest reciprocal lattice vector).
+            use_anaddb: False to compute the DOSes in-process with ``DdbFile.get_phonon_interpolator``.
+                The IFCs are computed only once per DDB and gaussian broadening is used instead of tetrahedra.
         """
         self.qha_list = []
         self.ngqpt_list = []
 
         ddb_list = [DdbFile(p) for p in self.ddb_paths]
-        for nqsmall in nqsmall_list:
-            phdos_paths = []
-
-            for i, ddb in enumerate(ddb_list):
-                phbst_file, phdos_file = ddb.anaget_phbst_and_phdos_files(
-                    nqsmall=nqsmall, qppa=None, ndivsm=1, line_density=None, asr=2, chneut=1, dipdip=1,
-                    dos_method="tetra", lo_to_splitting="automatic", ngqpt=None, qptbounds=None,
-                    anaddb_kwargs=None, verbose=0, spell_check=True,
-                    mpi_procs=1, workdir=None, manager=None)
-
-                phdos_paths.append(phdos_file.filepath)
-                if i == 0:
-                    # These variables added in abinit v8.11. Use nqsmall is not available.
-                    ngqpt = 3 * [nqsmall]
-                    if "qptrlatt" in phdos_file.reader.rootgrp.variables:
-                        ngqpt = np.diagonal(phdos_file.reader.read_value("qptrlatt").T)
-                        #shiftq = phdos_file.reader.read_value("shiftq")
-                    self.ngqpt_list.append(ngqpt)
-
-                phbst_file.close()
-                phdos_file.close()
-
-            qha = QHA.from_files(self.gsr_paths, phdos_paths)
-            self.qha_list.append(qha)
+        if not use_anaddb:
+            energies, structures = [], []
+            for gp in self.gsr_paths:
+                with GsrFile.from_file(gp) as g:
+                    energies.append(g.energy)
+                    structures.append(g.structure)
+            QHA._check_volumes(structures, [ddb.structure for ddb in ddb_list])
+
+            phints = [ddb.get_phonon_interpolator(asr=2, chneut=1, dipdip=1) for ddb in ddb_list]
+            for nqsmall in nqsmall_list:
+                doses = [phint.get_phdos(nqsmall=nqsmall) for phint in phints]
+                self.ngqpt_list.append(ddb_list[0].structure.calc_ngkpt(nqsmall))
+                self.qha_list.append(QHA(structures, doses, energies))
+        else:
+            # Execute all the anaddb runs with the shared executor, then read the results.
+            executor = get_anaddb_executor()
+            futures = []
+            for nqsmall in nqsmall_list:
+                for ddb in ddb_list:
+                    inp, lo_to_splitting = ddb._get_phbst_and_phdos_input(
+                        nqsmall=nqsmall, qppa=None, ndivsm=1, line_density=None, asr=2, chneut=1, dipdip=1,
+                        dos_method="tetra", lo_to_splitting="automatic", ngqpt=None, qptbounds=None,
+                        anaddb_kwargs=None, spell_check=True)
+                    futures.append((inp, lo_to_splitting, executor.submit(ddb._run_anaddb_task, inp, 1, None, None, 0)))
+
+            for iq, nqsmall in enumerate(nqsmall_list):
+                phdos_paths = []
+
+                for i, ddb in enumerate(ddb_list):
+                    inp, lo_to_splitting, future = futures[iq * len(ddb_list) + i]
+                    phbst_file, phdos_file = ddb._open_phbst_and_phdos_files(future.result(), inp, lo_to_splitting)
+
+                    phdos_paths.append(phdos_file.filepath)
+                    if i == 0:
+                        # These variables added in abinit v8.11. Use nqsmall is not available.
+                        ngqpt = 3 * [nqsmall]
+                        if "qptrlatt" in phdos_file.reader.rootgrp.variables:
+                            ngqpt = np.diagonal(phdos_file.reader.read_value("qptrlatt").T)
+                            #shiftq = phdos_file.reader.read_value("shiftq")
+                        self.ngqpt_list.append(ngqpt)
+
+                    phbst_file.close()
+                    phdos_file.close()
+
+                qha = QHA.from_files(self.gsr_paths, phdos_paths)
+                self.qha_list.append(qha)
 
         self.ngqpt_list = np.reshape(self.ngqpt_list, (-1, 3))
         self.num_qmeshes = len(self.ngqpt_list)
@@ -6,7 +6,7 @@ import abipy.core.abinit_units as abu
 
 from abipy import abilab
 from abipy.core.testing import AbipyTest
-from abipy.dfpt.ddb import DdbFile, DielectricTensorGenerator
+from abipy.dfpt.ddb import DdbFile, DielectricTensorGenerator, set_ddb_cache_minsize
 from abipy.dfpt.anaddbnc import AnaddbNcFile
 from abipy.dfpt.phonons import PhononBands
 
@@ -391,6 +391,161 @@ class DdbTest(AbipyTest):
             raman = ddb.anaget_raman()
             self.assertAlmostEqual(raman.susceptibility[5, 0, 1], -0.0114683, places=5)
 
+    def test_ddb_index_cache(self):
+        """Testing DDB index, dense arrays and binary cache."""
+        import shutil
+        tmp_dir = self.mkdtemp()
+        filepath = os.path.join(tmp_dir, "out_DDB")
+        shutil.copy(abidata.ref_file("refs/znse_phonons/ZnSe_hex_qpt_DDB"), filepath)
+        cache_path = os.path.join(tmp_dir, ".out_DDB.index.npz")
+
+        old_minsize = set_ddb_cache_minsize(0)
+        try:
+            ddb = DdbFile(filepath)
+            assert os.path.exists(cache_path)
+            assert len(ddb.qpoints) == 121
+            assert len(ddb.blocks) == 121
+            assert all(b["dord"] == 2 for b in ddb.blocks)
+
+            # Dense arrays are consistent with the dataframes.
+            d2 = ddb.d2matr
+            assert d2.values.shape == (121, 3, ddb.natom + 6, 3, ddb.natom + 6)
+            for iq, (qpt, df) in enumerate(ddb.computed_dynmat.items()):
+                assert d2.qpoints[iq] == qpt
+                assert np.count_nonzero(d2.mask[iq]) == len(df)
+                for idir1, ipert1, idir2, ipert2, cvalue in df.values[:10]:
+                    i = (iq, int(idir1.real) - 1, int(ipert1.real) - 1, int(idir2.real) - 1, int(ipert2.real) - 1)
+                    assert d2.mask[i]
+                    assert d2.values[i] == cvalue
+
+            # Second instance reads the index from the cache.
+            mtime = os.path.getmtime(cache_path)
+            same_ddb = DdbFile(filepath)
+            assert os.path.getmtime(cache_path) == mtime
+            self.assert_equal(same_ddb.qpoints.frac_coords, ddb.qpoints.frac_coords)
+            assert same_ddb.blocks == ddb.blocks
+            self.assert_equal(same_ddb.d2matr.values, d2.values)
+
+            # The cache is rebuilt if the DDB changes.
+            ddb.write(filepath, filter_blocks=[0, 1])
+            new_ddb = DdbFile(filepath)
+            assert len(new_ddb.qpoints) == 2
+            assert new_ddb.blocks == ddb.blocks[:2]
+            for f in (ddb, same_ddb, new_ddb): f.close()
+        finally:
+            set_ddb_cache_minsize(old_minsize)
+
+    def test_anaddb_cache(self):
+        """Testing content-addressed cache and executor for anaddb runs."""
+        from abipy.dfpt import ddb as ddbmod
+        tmp_dir = self.mkdtemp()
+        cache_dir = os.path.join(tmp_dir, "cache")
+        old_dir = ddbmod.set_anaddb_cache_dir(cache_dir)
+        try:
+            with DdbFile(abidata.ref_file("refs/znse_phonons/ZnSe_hex_qpt_DDB")) as ddb:
+                # The key depends on the DDB, the anaddb input and the version of anaddb.
+                inp, _ = ddb._get_phbst_and_phdos_input(nqsmall=2, ndivsm=2)
+                other_inp, _ = ddb._get_phbst_and_phdos_input(nqsmall=4, ndivsm=2)
+                if ddbmod.get_anaddb_version() is None:
+                    assert ddb._get_anaddb_cache_key(inp) is None
+                else:
+                    key = ddb._get_anaddb_cache_key(inp)
+                    assert key == ddb._get_anaddb_cache_key(inp)
+                    assert key != ddb._get_anaddb_cache_key(other_inp)
+
+                sha1 = ddbmod._get_file_hash(ddb.filepath)
+                assert len(sha1) == 40 and ddbmod._get_file_hash(ddb.filepath) == sha1
+
+            # Store and restore the top-level files of a workdir.
+            workdir = os.path.join(tmp_dir, "run")
+            os.makedirs(os.path.join(workdir, "outdata"))
+            with open(os.path.join(workdir, "run.abo_PHBST.nc"), "wt") as fh:
+                fh.write("data")
+            assert not ddbmod._restore_anaddb_results("foo", os.path.join(tmp_dir, "new"))
+            ddbmod._store_anaddb_results("foo", workdir)
+            # Second store is a no-op.
+            ddbmod._store_anaddb_results("foo", workdir)
+            assert os.listdir(cache_dir) == ["foo"]
+            newdir = os.path.join(tmp_dir, "new")
+            assert ddbmod._restore_anaddb_results("foo", newdir)
+            assert os.listdir(newdir) == ["run.abo_PHBST.nc"]
+
+            # Least recently used entries are removed if the cache is too large.
+            old_maxsize = ddbmod.set_anaddb_cache_maxsize(6)
+            try:
+                os.utime(os.path.join(cache_dir, "foo"), (0, 0))
+                ddbmod._store_anaddb_results("bar", workdir)
+                assert os.listdir(cache_dir) == ["bar"]
+            finally:
+                assert ddbmod.set_anaddb_cache_maxsize(old_maxsize) == 6
+
+            # Cache disabled.
+            ddbmod.set_anaddb_cache_dir(None)
+            with DdbFile(abidata.ref_file("refs/znse_phonons/ZnSe_hex_qpt_DDB")) as ddb:
+                assert ddb._get_anaddb_cache_key(inp) is None
+        finally:
+            ddbmod.set_anaddb_cache_dir(old_dir)
+
+        old_workers = ddbmod.set_anaddb_max_workers(2)
+        try:
+            executor = ddbmod.get_anaddb_executor()
+            assert executor is ddbmod.get_anaddb_executor()
+            assert executor._max_workers == 2
+        finally:
+            assert ddbmod.set_anaddb_max_workers(old_workers) == 2
+
+    def test_phonon_interpolator(self):
+        """Testing Fourier interpolation of the dynamical matrix without anaddb."""
+        from abipy.dfpt.phtk import NonAnalyticalPh
+
+        # Si. Reference phonons computed by anaddb with asr 2, chneut 1, dipdip 1.
+        with DdbFile(abidata.ref_file("refs/si_sound_vel/Si_DDB")) as ddb:
+            phint = ddb.get_phonon_interpolator(asr=2, chneut=1, dipdip=1)
+            assert phint is ddb.get_phonon_interpolator(asr=2, chneut=1, dipdip=1)
+            assert phint.ewald is not None
+            self.assert_almost_equal(phint.zeff, np.zeros((2, 3, 3)), decimal=1)
+            assert ddb.get_phonon_interpolator(dipdip=0).ewald is None
+            self.assert_equal(phint.ngqpt, [9, 9, 9])
+            assert phint.to_string(verbose=2)
+            ref_phbands = PhononBands.from_file(abidata.ref_file("refs/si_sound_vel/Si_sound_PHBST.nc"))
+            phbands = phint.get_phbands(ref_phbands.qpoints.frac_coords)
+            self.assert_almost_equal(phbands.phfreqs, ref_phbands.phfreqs, decimal=6)
+            self.assert_almost_equal(np.linalg.norm(phbands.phdispl_cart, axis=2),
+                                     np.linalg.norm(ref_phbands.phdispl_cart, axis=2), decimal=6)
+
+            # Acoustic modes at Gamma and DOS normalized to 3 * natom.
+            phbands, phdos = ddb.get_phbands_and_phdos(nqsmall=6, ndivsm=5, dos_method="gaussian:1 meV",
+                                                       lo_to_splitting=False)
+            assert phbands.non_anal_ph is None
+            assert np.all(np.abs(phbands.phfreqs[0, :3]) < 1e-6)
+            self.assert_almost_equal(phdos.integral_value, 6, decimal=2)
+            phdos = ddb.anacompare_phdos([4, 6], dos_method="gaussian", use_anaddb=False).phdoses[-1]
+            self.assert_almost_equal(phdos.integral_value, 6, decimal=2)
+            with self.assertRaises(ValueError):
+                ddb.get_phbands_and_phdos(dos_method="tetra")
+
+        # ZnSe with dipole-dipole interaction and LO-TO splitting.
+        with DdbFile(abidata.ref_file("refs/znse_phonons/ZnSe_hex_qpt_DDB")) as ddb:
+            phint = ddb.get_phonon_interpolator(ngqpt=[8, 8, 6], asr=2, chneut=1, dipdip=1)
+            assert phint.ewald is not None
+            self.assert_almost_equal(phint.zeff.sum(axis=0), np.zeros((3, 3)))
+            ref_phbands = PhononBands.from_file(abidata.ref_file("refs/znse_phonons/ZnSe_hex_886.out_PHBST.nc"))
+            phbands = phint.get_phbands(ref_phbands.qpoints.frac_coords)
+            self.assert_almost_equal(phbands.phfreqs, ref_phbands.phfreqs, decimal=5)
+
+            ref_nonanal = NonAnalyticalPh.from_file(abidata.ref_file("refs/znse_phonons/ZnSe_hex_886.anaddb.nc"))
+            nonanal = phint.get_non_anal_ph(ref_nonanal.directions)
+            self.assert_almost_equal(nonanal.phfreqs, ref_nonanal.phfreqs, decimal=6)
+
+            phbands = phint.get_phbands_along_path(ndivsm=2, lo_to_splitting="automatic")
+            assert phbands.non_anal_ph is not None
+            # Same directions used by anaddb.
+            self.assert_almost_equal(phbands.non_anal_ph.directions, ref_nonanal.directions)
+
+            # The DDB does not contain the 8x8x8 q-mesh.
+            with self.assertRaises(ValueError):
+                ddb.get_phonon_interpolator(ngqpt=[8, 8, 8])
+
 
 class DielectricTensorGeneratorTest(AbipyTest):
 
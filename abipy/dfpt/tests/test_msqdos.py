@@ -2,6 +2,7 @@
 import os
 import numpy as np
 import abipy.data as abidata
+import abipy.core.abinit_units as abu
 
 from abipy.core.testing import AbipyTest
 from abipy import abilab
@@ -130,3 +131,27 @@ O8    0.01916    0.01512    0.01353   -0.00660   -0.00411    0.01153""")
             assert msqd_dos.plot_uiso(show=False)
             assert msqd_dos.plot_uiso(view="all", show=False)
             assert msqd_dos.plot_uiso(view="all", what="vel", show=False)
+
+    def test_msq_tmesh(self):
+        """Testing vectorized computation of the thermal displacement tensors."""
+        from scipy.integrate import simps
+        filepath = os.path.join(abidata.dirpath, "refs", "si_qha", "mp-149_+0_PHDOS.nc")
+        with abilab.abiopen(filepath) as phdos_file:
+            msqd_dos = phdos_file.msqd_dos
+
+        tmesh = [0, 100, 300]
+        msq = msqd_dos.get_msq_tmesh(tmesh)
+        assert msq.displ.shape == (2, 3, 3, 3) and msq.vel.shape == (2, 3, 3, 3)
+
+        # Compare with explicit integration for one atom at 300 K.
+        iomin = np.nonzero(msqd_dos.wmesh > 1e-12)[0][0]
+        wvals = msqd_dos.wmesh[iomin:]
+        occ = 1.0 / np.expm1(wvals / (300 * abu.kb_HaK)) + 0.5
+        fact = 1.0 / (msqd_dos.amu_symbol["Si"] * abu.amu_emass)
+        ref = simps(msqd_dos.values[1, :, :, iomin:] * occ / wvals, x=wvals) * fact * abu.Bohr_Ang ** 2
+        self.assert_almost_equal(msq.displ[1, :, :, 2], ref)
+        assert msq.displ[1, 0, 0, 0] < msq.displ[1, 0, 0, 1] < msq.displ[1, 0, 0, 2]
+
+        # Single atom.
+        msq1 = msqd_dos.get_msq_tmesh(tmesh, iatom_list=[1], what_list="displ")
+        self.assert_almost_equal(msq1.displ[1], msq.displ[1])
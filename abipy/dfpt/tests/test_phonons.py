@@ -9,7 +9,7 @@ import abipy.core.abinit_units as abu
 
 from abipy import abilab
 from abipy.dfpt.phonons import (PhononBands, PhononDos, PhdosFile, phbands_gridplot,
-        PhononBandsPlotter, PhononDosPlotter, dataframe_from_phbands)
+        PhononBandsPlotter, PhononDosPlotter, dataframe_from_phbands, get_harmonic_thermo, stack_phdos_weights)
 from abipy.dfpt.ddb import DdbFile
 from abipy.core.testing import AbipyTest
 
@@ -389,6 +389,22 @@ class PhononDosTest(AbipyTest):
         f = phdos.get_free_energy()
         self.assert_almost_equal(f.values, (u - s.mesh * s.values).values)
 
+        # All the properties for a batch of DOSes with a single call.
+        tmesh = np.linspace(0, 600, 31)
+        thermo = phdos.get_harmonic_thermo(tmesh)
+        self.assert_almost_equal(thermo.cv, phdos.get_cv(0, 600, 31).values)
+        assert thermo.cv[0] == 0 and thermo.entropy[0] == 0 and thermo.internal_energy[0] == thermo.zpe
+        scaled = PhononDos(phdos.mesh[::2], 2 * phdos.values[::2])
+        wmesh, weights = stack_phdos_weights([phdos, scaled])
+        assert wmesh.shape == weights.shape == (2, len(phdos.thermo_weights[0]))
+        batch = get_harmonic_thermo(wmesh, weights, tmesh)
+        assert batch.free_energy.shape == (2, 31) and batch.zpe.shape == (2,)
+        self.assert_almost_equal(batch.entropy[0], thermo.entropy)
+        self.assert_almost_equal(batch.entropy[1], scaled.get_harmonic_thermo(tmesh).entropy)
+        self.assert_almost_equal(batch.free_energy, batch.internal_energy - tmesh * batch.entropy)
+        # Small chunks give the same results.
+        self.assert_almost_equal(get_harmonic_thermo(wmesh, weights, tmesh, chunk_size=10).cv, batch.cv)
+
         self.assertAlmostEqual(phdos.debye_temp, 469.01524830328606)
         self.assertAlmostEqual(phdos.get_acoustic_debye_temp(len(ncfile.structure)), 372.2576492728813)
 
@@ -501,3 +517,47 @@ class NonAnalyticalPhTest(AbipyTest):
             assert phbands.non_anal_directions is not None
             assert phbands.non_anal_phdispl_cart is not None
             assert phbands.non_anal_dyn_mat_eigenvect is not None
+
+
+class MatchEigenvectorsTest(AbipyTest):
+
+    def test_match_eigenvectors_batch(self):
+        """Testing the band connection based on the overlap of the eigenvectors."""
+        import itertools
+        from abipy.dfpt.phtk import match_eigenvectors, match_eigenvectors_batch
+        np.random.seed(7)
+        nb = 5
+        v1 = np.linalg.qr(np.random.rand(nb, nb) + 1j * np.random.rand(nb, nb))[0].T
+
+        # Permutation + small perturbation
+        perm = np.random.permutation(nb)
+        v2 = np.linalg.qr((v1[np.argsort(perm)] + 0.05 * np.random.rand(nb, nb)).T)[0].T
+        self.assert_equal(match_eigenvectors(v1, v2), perm)
+
+        # The assignment maximizes the sum of the overlaps. Compare with brute force.
+        v2 = np.array([np.linalg.qr(np.random.rand(nb, nb) + 1j * np.random.rand(nb, nb))[0].T for _ in range(4)])
+        inds = match_eigenvectors_batch(np.array([v1] * 4), v2)
+        assert inds.shape == (4, nb)
+        for i in range(4):
+            ovlp = np.abs(v1 @ v2[i].conj().T) ** 2
+            best = max(ovlp[range(nb), list(p)].sum() for p in itertools.permutations(range(nb)))
+            assert sorted(inds[i]) == list(range(nb))
+            self.assert_almost_equal(ovlp[range(nb), inds[i]].sum(), best)
+
+        # Degenerate subspace {0, 1} rotated by 45 degrees and slightly mixed with mode 2.
+        # The vectors of the subspace are matched inside the subspace.
+        v1 = np.eye(3, dtype=np.complex)
+        v2 = np.array([[1, 1, 0.7], [1, -1, 0.7], [-0.7, -0.7, 1]], dtype=np.complex)
+        v2 = np.linalg.qr(v2.T)[0].T
+        w = np.array([[1.0, 1.0, 2.0]])
+        ind = match_eigenvectors_batch(v1[None], v2[None], w1=w, w2=w)[0]
+        assert set(ind[:2]) == {0, 1} and ind[2] == 2
+
+    def test_split_matched_indices(self):
+        """Testing split_matched_indices."""
+        phbands = PhononBands.from_file(abidata.ref_file("trf2_5.out_PHBST.nc"))
+        for ind, freqs in zip(phbands.split_matched_indices, phbands.split_phfreqs):
+            assert ind.shape == freqs.shape
+            # Each row is a permutation.
+            self.assert_equal(np.sort(ind, axis=1), np.tile(np.arange(phbands.num_branches), (len(ind), 1)))
+        self.assert_equal(phbands.split_matched_indices[0][0], np.arange(phbands.num_branches))
@@ -93,6 +93,19 @@ class QhaTest(AbipyTest):
             assert qhana.plot_vol_vs_t(title="Volume as a function of T", show=False)
 
 
+    def test_qha_qmesh_analyzer_without_anaddb(self):
+        """Testing QHAQmeshAnalyzer with phonon DOS computed in-process."""
+        qhana = QHAQmeshAnalyzer(self.gsr_paths[1:5], self.ddb_paths[1:5])
+        qhana.run_qlist([2, 4], use_anaddb=False)
+        qhana.set_eos("birch_murnaghan")
+        assert qhana.ngqpt_list.shape == (2, 3)
+        assert qhana.num_qmeshes == 2
+        assert len(qhana.qha_list) == 2
+        assert all(len(qha.doses) == 4 for qha in qhana.qha_list)
+        for phdos in qhana.qha_list[-1].doses:
+            self.assert_almost_equal(phdos.integral_value, 6, decimal=1)
+
+
 class Qha3pfTest(AbipyTest):
 
     @classmethod
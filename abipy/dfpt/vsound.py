@@ -8,7 +8,7 @@ import abipy.core.abinit_units as abu
 
 from abipy.core.mixins import Has_Structure, NotebookWriter
 from abipy.dfpt.ddb import DdbFile
-from abipy.dfpt.phonons import PhononBands, get_dyn_mat_eigenvec, match_eigenvectors
+from abipy.dfpt.phonons import PhononBands, get_dyn_mat_eigenvec, match_eigenvectors_batch
 from abipy.abio.inputs import AnaddbInput
 from abipy.tools.plotting import add_fig_kwargs, get_ax_fig_plt, set_visible
 from pymatgen.core.units import bohr_to_angstrom, eV_to_Ha
@@ -207,10 +207,9 @@ class SoundVelocity(Has_Structure, NotebookWriter):
             ind_match = np.zeros((n_points, n_freqs), dtype=np.int)
             ind_match[0] = range(n_freqs)
 
+            matches = match_eigenvectors_batch(dir_eigv[:-1], dir_eigv[1:], w1=dir_freqs[:-1], w2=dir_freqs[1:])
             for j in range(1, n_points):
-                k = j - 1
-                match = match_eigenvectors(dir_eigv[k], dir_eigv[j])
-                ind_match[j] = [match[m] for m in ind_match[k]]
+                ind_match[j] = matches[j - 1][ind_match[j - 1]]
 
             acoustic_freqs = (dir_freqs[np.arange(n_points)[:, None], ind_match])[:, 0:3]
             acoustic_displ = (dir_displ[np.arange(n_points)[:, None], ind_match])[:, 0:3]
@@ -586,9 +586,7 @@ class HistRobot(Robot):
             #"ecut", "pawecutdg", "tsmear", "nkpt",
         ] + kwargs.pop("attrs", [])
 
-        rows, row_names = [], []
-        for label, hist in self.items():
-            row_names.append(label)
+        def get_row(hist):
             d = OrderedDict()
 
             initial_fstas_dict = hist.get_fstats_dict(step=0)
@@ -607,9 +605,13 @@ class HistRobot(Robot):
                     value = getattr(hist, aname, None)
                 d[aname] = value
 
-            # Execute functions
+            return d
+
+        rows = self._get_cached_results("get_dataframe%s" % str((with_geo, with_spglib, attrs)), get_row)
+        row_names = []
+        for (label, hist), d in zip(self.items(), rows):
+            row_names.append(label)
             if funcs is not None: d.update(self._exec_funcs(funcs, hist))
-            rows.append(d)
 
         import pandas as pd
         row_names = row_names if not abspath else self._to_relpaths(row_names)
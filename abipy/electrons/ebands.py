@@ -26,9 +26,10 @@ from abipy.core.mixins import Has_Structure, NotebookWriter
 from abipy.core.kpoints import (Kpoint, KpointList, Kpath, IrredZone, KSamplingInfo, KpointsReaderMixin,
     Ktables, has_timrev_from_kptopt, map_grid2ibz) #, kmesh_from_mpdivs)
 from abipy.core.structure import Structure
+from abipy.core.tetrahedron import TetraMesh
 from abipy.iotools import ETSF_Reader
 from abipy.tools import duck
-from abipy.tools.numtools import gaussian
+from abipy.tools.numtools import gaussian, gaussian_binned
 from abipy.tools.plotting import (set_axlims, add_fig_kwargs, get_ax_fig_plt, get_axarray_fig_plt,
     get_ax3d_fig_plt, rotate_ticklabels, set_visible, plot_unit_cell, set_ax_xylabels)
 
@@ -877,6 +878,20 @@ class ElectronBands(Has_Structure):
                 return True
         return False
 
+    @lazy_property
+    def tetramesh(self):
+        """
+        |TetraMesh| used to compute integrals in the BZ with the tetrahedron method.
+        Requires a gamma-centered Monkhorst-Pack mesh in the IBZ.
+        """
+        if not self.supports_fermi_surface:
+            raise ValueError("Tetrahedron method requires a gamma-centered MP mesh in the IBZ.\nksampling: %s" %
+                             str(getattr(self.kpoints, "ksampling", None)))
+
+        mpdivs, _ = self.kpoints.mpdivs_shifts
+        bz2ibz = map_grid2ibz(self.structure, self.kpoints.frac_coords, mpdivs, self.has_timrev)
+        return TetraMesh(np.reshape(bz2ibz, mpdivs), self.structure.reciprocal_lattice.matrix)
+
     def kindex(self, kpoint):
         """
         The index of the k-point in the internal list of k-points.
@@ -1548,7 +1563,7 @@ class ElectronBands(Has_Structure):
         import ipywidgets as ipw
         return ipw.interact_manual(
                 plot_dos,
-                method=["gaussian", "tetra"],
+                method=["gaussian", "gaussian_binned", "tetra"],
                 step=ipw.FloatSlider(value=0.1, min=1e-6, max=1, step=0.05, description="Step of linear mesh (eV)"),
                 width=ipw.FloatSlider(value=0.2, min=1e-6, max=1, step=0.05, description="Gaussian broadening (eV)"),
             )
@@ -1559,6 +1574,9 @@ class ElectronBands(Has_Structure):
 
         Args:
             method: String defining the method for the computation of the DOS.
+                "gaussian" for gaussian broadening, "gaussian_binned" for gaussian broadening
+                computed by convolving the histogram of the eigenvalues (faster for large number of states),
+                "tetra" for the linear tetrahedron method.
             step: Energy step (eV) of the linear mesh.
             width: Standard deviation (eV) of the gaussian.
 
@@ -1583,6 +1601,19 @@ class ElectronBands(Has_Structure):
                         e = self.eigens[spin,k,band]
                         dos[spin] += weight * gaussian(mesh, width, center=e)
 
+        elif method == "gaussian_binned":
+            weights = self.kpoints.weights
+            for spin in self.spins:
+                # Exclude the padding bands if nband depends on k.
+                mask = np.arange(self.mband)[None, :] < self.nband_sk[spin][:, None]
+                dos[spin] = gaussian_binned(mesh, width, self.eigens[spin][mask],
+                                            weights=np.broadcast_to(weights[:, None], mask.shape)[mask])
+
+        elif method == "tetra":
+            for spin in self.spins:
+                nb = self.nband_sk[spin].min()
+                dos[spin] = self.tetramesh.get_dos_idos(self.eigens[spin, :, :nb], mesh)[0]
+
         else:
             raise NotImplementedError("Method %s is not supported" % method)
 
@@ -1692,6 +1723,8 @@ class ElectronBands(Has_Structure):
             valence: Int or iterable with the valence indices.
             conduction: Int or iterable with the conduction indices.
             method (str): String defining the integraion method.
+                "gaussian" for gaussian broadening, "gaussian_binned" for gaussian broadening
+                computed by convolving the histogram of the transition energies, "tetra" for the linear tetrahedron method.
             step: Energy step (eV) of the linear mesh.
             width: Standard deviation (eV) of the gaussian.
             mesh: Frequency mesh to use. If None, the mesh is computed automatically from the eigenvalues.
@@ -1742,6 +1775,25 @@ class ElectronBands(Has_Structure):
                         fact = weight * fv * fc
                         jdos += fact * gaussian(mesh, width, center=ec-ev)
 
+        elif method == "gaussian_binned":
+            conduction, valence = list(conduction), list(valence)
+            ec = self.eigens[spin][:, conduction, None]
+            ev = self.eigens[spin][:, None, valence]
+            fc = 1.0 - self.occfacts[spin][:, conduction, None] / full
+            fv = self.occfacts[spin][:, None, valence] / full
+            jdos = gaussian_binned(mesh, width, ec - ev, weights=self.kpoints.weights[:, None, None] * fc * fv)
+
+        elif method == "tetra":
+            # Treat each (c, v) pair as a band with energy ec - ev and weight fv * fc.
+            conduction, valence = list(conduction), list(valence)
+            ec = self.eigens[spin][:, conduction, None]
+            ev = self.eigens[spin][:, None, valence]
+            fc = 1.0 - self.occfacts[spin][:, conduction, None] / full
+            fv = self.occfacts[spin][:, None, valence] / full
+            nk = len(self.kpoints)
+            jdos = self.tetramesh.get_dos_idos(np.reshape(ec - ev, (nk, -1)), mesh,
+                                               weights=np.reshape(fc * fv, (nk, -1)))[0]
+
         else:
             raise NotImplementedError("Method %s is not supported" % str(method))
 
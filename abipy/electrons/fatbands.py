@@ -16,6 +16,23 @@ from abipy.tools.numtools import gaussian
 from abipy.tools.plotting import set_axlims, get_axarray_fig_plt, add_fig_kwargs
 
 
+# Max number of bytes of the blocks of DOS weights (and of the gaussians) used to accumulate the projected DOS.
+# The weights are read from file in blocks of k-points so that the memory does not scale with nkpt.
+# The peak memory is a few times this value due to the temporary arrays.
+_PJDOS_MAX_BLOCK_NBYTES = 16 * 1024 ** 2
+
+
+def set_pjdos_max_block_nbytes(nbytes):
+    """
+    Change the maximum number of bytes (``_PJDOS_MAX_BLOCK_NBYTES``) of the blocks of DOS weights
+    read from file when the projected DOS is computed. Return old value.
+    """
+    global _PJDOS_MAX_BLOCK_NBYTES
+    old = _PJDOS_MAX_BLOCK_NBYTES
+    _PJDOS_MAX_BLOCK_NBYTES = max(1, int(nbytes))
+    return old
+
+
 def gaussians_dos(dos, mesh, width, values, energies, weights):
     assert len(dos) == len(mesh) and len(values) == len(energies) == len(weights)
     for vw, e, w in zip(values * weights, energies, weights):
@@ -270,6 +287,105 @@ class FatBandsFile(AbinitNcFile, Has_Header, Has_Structure, Has_ElectronBands, N
 
         return walm_sbk
 
+    def _iter_weights_kblocks(self, key, nlm, nkblock):
+        """
+        Generator producing (kslice, weights) where weights is the [natom, nlm, nsppol, mband, nk] array
+        with the DOS weights of the k-points in kslice read from the netcdf variable ``key``.
+        Only ``nkblock`` k-points are read at once. Atoms that are not in iatsph have zero weights.
+        """
+        var = self.reader.read_variable(key)
+        same_order = self.natsph == self.natom and np.all(self.iatsph == np.arange(self.natom))
+
+        for k0 in range(0, self.nkpt, nkblock):
+            kslice = slice(k0, min(k0 + nkblock, self.nkpt))
+            data = np.reshape(var[..., kslice], (self.natsph, nlm, self.nsppol, self.mband, -1))
+            if same_order:
+                yield kslice, data
+            else:
+                weights = np.zeros((self.natom,) + data.shape[1:])
+                weights[self.iatsph] = data
+                yield kslice, weights
+
+    def _get_gaussian_pjdos(self, key, nlm, mesh, width, groups, mask):
+        """
+        Compute the projected DOS with gaussian broadening. The DOS weights are read from file in blocks
+        of k-points and reduced on the fly so that the memory is bounded by ``_PJDOS_MAX_BLOCK_NBYTES``.
+
+        Args:
+            key: Name of the netcdf variable with the weights (dos_fractions, dos_fractions_m ...)
+            nlm: Number of channels (l or lm) in the netcdf variable.
+            mesh: Energy mesh in eV.
+            width: Standard deviation (eV) of the gaussian.
+            groups: List of arrays with atom indices. The contributions of the atoms in a group are summed.
+            mask: [natom, nlm] boolean array. False if the channel should be ignored.
+
+        Return: [ngroups, nlm, nsppol, nw] array.
+        """
+        ebands = self.ebands
+        kweights = ebands.kpoints.weights
+        mesh = np.asarray(mesh)
+
+        # Matrix used to sum the contributions of the atoms in the same group.
+        gmat = np.zeros((len(groups), self.natom))
+        for ig, atoms in enumerate(groups):
+            gmat[ig, atoms] = 1.0
+        gmat = gmat[:, :, None] * mask[None, :, :]
+
+        # Number of k-points such that both the block of weights and the gaussians fit the memory budget.
+        nbytes_k = 8 * self.mband * max(self.natom * nlm * self.nsppol, len(mesh))
+        nkblock = max(1, min(self.nkpt, _PJDOS_MAX_BLOCK_NBYTES // nbytes_k))
+
+        pjdos = np.zeros((len(groups), nlm, self.nsppol, len(mesh)))
+        num_neg, size = 0, 0
+        for kslice, weights in self._iter_weights_kblocks(key, nlm, nkblock):
+            num_neg += np.sum(weights < 0); size += weights.size
+            # [ngroups, nlm, nsppol, mband, nk]
+            wg = np.einsum("gal,alsbk->glsbk", gmat, weights)
+            for spin in range(self.nsppol):
+                # Select the states with band < nband_sk.
+                nband_k = ebands.nband_sk[spin, kslice]
+                ib, ik = np.nonzero(np.arange(self.mband)[:, None] < nband_k[None, :])
+                enes = ebands.eigens[spin, kslice][ik, ib]
+                gs = gaussian(mesh[None, :], width, center=enes[:, None])
+                pjdos[:, :, spin] += np.dot(wg[:, :, spin, ib, ik] * kweights[kslice][ik], gs)
+
+        # In principle, this should never happen (see _read_wal_sbk).
+        if num_neg:
+            print("WARNING: There are %d (%.1f%%) negative entries in LDOS weights" % (
+                  num_neg, 100 * num_neg / size))
+
+        return pjdos
+
+    def get_symbols_pjdos(self, mesh, width, with_m=False):
+        """
+        Compute the L- (LM- if ``with_m``) projected DOS for each type of atom with gaussian broadening.
+        The weights are read in blocks of k-points (see ``set_pjdos_max_block_nbytes``).
+
+        Args:
+            mesh: Energy mesh in eV.
+            width: Standard deviation (eV) of the gaussian.
+            with_m: True to compute the LM-projected DOS. Requires prtdosm != 0.
+
+        Return: :class:`OrderedDict` chemical symbol --> [lsize, nsppol, nw] array
+            ([lsize**2, nsppol, nw] if ``with_m``).
+        """
+        if self.prtdos != 3:
+            raise RuntimeError("The file does not contain L-DOS since prtdos=%i" % self.prtdos)
+        if with_m and self.prtdosm == 0:
+            raise RuntimeError("The file does not contain LM-DOS since prtdosm=%i" % self.prtdosm)
+
+        groups = [self.symbol2indices[symbol] for symbol in self.symbols]
+        if with_m:
+            nlm, key, size = self.mbesslang ** 2, "dos_fractions_m", self.lsize ** 2
+            mask = np.arange(nlm)[None, :] < (self.lmax_atom[:, None] + 1) ** 2
+        else:
+            nlm, key, size = self.mbesslang, "dos_fractions", self.lsize
+            mask = np.arange(nlm)[None, :] <= self.lmax_atom[:, None]
+
+        pjdos = self._get_gaussian_pjdos(key, nlm, mesh, width, groups, mask)
+
+        return OrderedDict((symbol, pjdos[isymb, :size]) for isymb, symbol in enumerate(self.symbols))
+
     @property
     def ebands(self):
         """|ElectronBands| object."""
@@ -1366,14 +1482,7 @@ class FatBandsFile(AbinitNcFile, Has_Header, Has_Structure, Has_ElectronBands, N
         # Onsite contributions.
         # fracts_paw1,(dtset%nkpt,dtset%mband,dtset%nsppol,new%ndosfraction))
         #wshape = (self.natom, self.mbesslang, self.nsppol, self.mband, self.nkpt)
-        wal_sbk = self.wal_sbk
-        paw1_wal_sbk = self._read_wal_sbk(key="dos_fractions_paw1")
-        pawt1_wal_sbk = self._read_wal_sbk(key="dos_fractions_pawt1")
-
         ebands = self.ebands
-        kpoints = ebands.kpoints
-        nband_sk = ebands.nband_sk
-        eigens = ebands.eigens
 
         # Compute the linear mesh for DOS.
         epad = 1.0
@@ -1382,22 +1491,15 @@ class FatBandsFile(AbinitNcFile, Has_Header, Has_Structure, Has_ElectronBands, N
 
         nw = int(1 + (e_max - e_min) / step)
         mesh, step = np.linspace(e_min, e_max, num=nw, endpoint=True, retstep=True)
-        totdos_al = np.zeros((self.natom, self.lsize, self.nsppol, nw))
-        paw1dos_al = np.zeros((self.natom, self.lsize, self.nsppol, nw))
-        pawt1dos_al = np.zeros((self.natom, self.lsize, self.nsppol, nw))
 
         if method == "gaussian":
-            for spin in range(self.nsppol):
-                for k, kpoint in enumerate(kpoints):
-                    weight = kpoint.weight
-                    for band in range(nband_sk[spin, k]):
-                        gs = gaussian(mesh, width, center=eigens[spin,k,band])
-                        for iatom in range(self.natom):
-                            if not self.has_atom[iatom]: continue
-                            for l in range(min(self.lmax_atom[iatom] + 1, mylsize)):
-                                totdos_al[iatom, l, spin] += weight * gs * wal_sbk[iatom, l, spin, band, k]
-                                paw1dos_al[iatom, l, spin] += weight * gs * paw1_wal_sbk[iatom, l, spin, band, k]
-                                pawt1dos_al[iatom, l, spin] += weight * gs * pawt1_wal_sbk[iatom, l, spin, band, k]
+            # The weights are read in blocks of k-points and accumulated for each atom.
+            groups = [[iatom] for iatom in range(self.natom)]
+            mask = (np.arange(self.mbesslang)[None, :] < np.minimum(self.lmax_atom + 1, mylsize)[:, None]) & \
+                   self.has_atom[:, None]
+            totdos_al, paw1dos_al, pawt1dos_al = [
+                self._get_gaussian_pjdos(key, self.mbesslang, mesh, width, groups, mask)[:, :self.lsize]
+                for key in ("dos_fractions", "dos_fractions_paw1", "dos_fractions_pawt1")]
 
         else:
             raise ValueError("Method %s is not supported" % method)
@@ -1633,32 +1735,28 @@ class _DosIntegrator(object):
     @lazy_property
     def symbols_lso(self):
         """
+        :class:`OrderedDict` mapping the chemical symbol to the [lsize, nsppol, nw] array
+        with the L-projected DOS.
         """
-        fbfile, ebands = self.fbfile, self.fbfile.ebands
-
         # Compute l-decomposed PJDOS for each type of atom.
-        symbols_lso = OrderedDict()
         if self.method == "gaussian":
-
-            for symbol in fbfile.symbols:
-                lmax = fbfile.lmax_symbol[symbol]
-                wlsbk = fbfile.get_wl_symbol(symbol)
-                lso = np.zeros((fbfile.lsize, fbfile.nsppol, len(self.mesh)))
-                for spin in range(fbfile.nsppol):
-                    for k, kpoint in enumerate(ebands.kpoints):
-                        weight = kpoint.weight
-                        for band in range(ebands.nband_sk[spin, k]):
-                            e = ebands.eigens[spin, k, band]
-                            for l in range(lmax + 1):
-                                lso[l, spin] += wlsbk[l, spin, band, k] *\
-                                                weight * gaussian(self.mesh, self.width, center=e)
-                symbols_lso[symbol] = lso
-
+            symbols_lso = self.fbfile.get_symbols_pjdos(self.mesh, self.width)
         else:
             raise ValueError("Method %s is not supported" % self.method)
 
         return symbols_lso
 
+    @lazy_property
+    def symbols_lmso(self):
+        """
+        :class:`OrderedDict` mapping the chemical symbol to the [lsize**2, nsppol, nw] array
+        with the LM-projected DOS. Requires prtdosm != 0.
+        """
+        if self.method == "gaussian":
+            return self.fbfile.get_symbols_pjdos(self.mesh, self.width, with_m=True)
+        else:
+            raise ValueError("Method %s is not supported" % self.method)
+
     @lazy_property
     def ls_stackdos(self):
         """
@@ -426,9 +426,7 @@ class GsrRobot(Robot, RobotWithEbands):
             "nsppol", "nspinor", "nspden",
         ] + kwargs.pop("attrs", [])
 
-        rows, row_names = [], []
-        for label, gsr in self.items():
-            row_names.append(label)
+        def get_row(gsr):
             d = OrderedDict()
 
             # Add info on structure.
@@ -443,9 +441,13 @@ class GsrRobot(Robot, RobotWithEbands):
                     if value is None: value = getattr(gsr.ebands, aname, None)
                 d[aname] = value
 
-            # Execute functions
+            return d
+
+        rows = self._get_cached_results("get_dataframe%s" % str((with_geo, attrs)), get_row)
+        row_names = []
+        for (label, gsr), d in zip(self.items(), rows):
+            row_names.append(label)
             if funcs is not None: d.update(self._exec_funcs(funcs, gsr))
-            rows.append(d)
 
         row_names = row_names if not abspath else self._to_relpaths(row_names)
         return pd.DataFrame(rows, index=row_names, columns=list(rows[0].keys()))
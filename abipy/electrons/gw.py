@@ -1078,13 +1078,7 @@ class SigresFile(AbinitNcFile, Has_Structure, Has_ElectronBands, NotebookWriter)
         Args:
             ignore_imag: Only real part is returned if ``ignore_imag``.
         """
-        df_list = []
-        for spin in range(self.nsppol):
-            for gwkpoint in self.gwkpoints:
-                df_sk = self.get_dataframe_sk(spin, gwkpoint, ignore_imag=ignore_imag)
-                df_list.append(df_sk)
-
-        return pd.concat(df_list)
+        return self._get_qp_dataframe(ignore_imag=ignore_imag, with_params=True)
 
     # FIXME: To maintain previous interface.
     to_dataframe = get_dataframe
@@ -1097,22 +1091,31 @@ class SigresFile(AbinitNcFile, Has_Structure, Has_ElectronBands, NotebookWriter)
             ignore_imag: Only real part is returned if ``ignore_imag``.
             with_params: True to include convergence paramenters.
         """
-        rows, bands = [], []
-        # bstart and bstop depends on kpoint.
-        ik_gw = self.reader.gwkpt2seqindex(kpoint)
-        for band in range(self.gwbstart_sk[spin, ik_gw], self.gwbstop_sk[spin, ik_gw]):
-            bands.append(band)
-            # Build dictionary with the QP results.
-            qpstate = self.reader.read_qp(spin, kpoint, band, ignore_imag=ignore_imag)
-            d = qpstate.as_dict()
-            # Add other entries that may be useful when comparing different calculations.
-            if with_params:
-                d.update(self.params)
-            rows.append(d)
+        return self._get_qp_dataframe(spin=spin, ikgw=self.reader.gwkpt2seqindex(kpoint), index=index,
+                                      ignore_imag=ignore_imag, with_params=with_params)
+
+    def _get_qp_dataframe(self, spin=None, ikgw=None, index=None, ignore_imag=False, with_params=True):
+        """
+        Build |pandas-DataFrame| with QP results directly from the arrays returned by
+        ``reader.read_allqps_arrays``. One row per state with the fields of :class:`QPState`.
+        If spin (ikgw) is None, all spins (k-points) are included. The band index is used as index
+        if ``index`` is None.
+        """
+        arrs = self.reader.read_allqps_arrays(ignore_imag=ignore_imag)
+        select = np.ones(len(arrs.spin), dtype=bool)
+        if spin is not None: select &= arrs.spin == spin
+        if ikgw is not None: select &= arrs.ikgw == ikgw
+
+        od = OrderedDict()
+        for field in QPState._fields:
+            od[field] = getattr(arrs, field)[select] if field != "kpoint" else \
+                        [self.gwkpoints[ik] for ik in arrs.ikgw[select]]
+        od["qpeme0"] = od["qpe"] - od["e0"]
+        # Add other entries that may be useful when comparing different calculations.
+        if with_params: od.update((k, select.sum() * [v]) for k, v in self.params.items())
 
-        import pandas as pd
-        index = len(bands) * [index] if index is not None else bands
-        return pd.DataFrame(rows, index=index, columns=list(rows[0].keys()))
+        index = arrs.band[select] if index is None else select.sum() * [index]
+        return pd.DataFrame(od, index=index)
 
     #def plot_matrix_elements(self, mel_name, spin, kpoint, *args, **kwargs):
     #   matrix = self.reader.read_mel(mel_name, spin, kpoint):
@@ -1600,19 +1603,61 @@ class SigresReader(ETSF_Reader):
         Args:
             ignore_imag: Only real part is returned if ``ignore_imag``.
         """
+        arrs = self.read_allqps_arrays(ignore_imag=ignore_imag)
         qps_spin = self.nsppol * [None]
 
         for spin in range(self.nsppol):
-            qps = []
-            for gwkpoint in self.gwkpoints:
-                ik = self.gwkpt2seqindex(gwkpoint)
-                for band in range(self.gwbstart_sk[spin, ik], self.gwbstop_sk[spin, ik]):
-                    qps.append(self.read_qp(spin, gwkpoint, band, ignore_imag=ignore_imag))
-
-            qps_spin[spin] = QPList(qps)
+            qps_spin[spin] = QPList([QPState(
+                spin=spin,
+                kpoint=self.gwkpoints[arrs.ikgw[i]],
+                band=int(arrs.band[i]),
+                e0=arrs.e0[i],
+                qpe=arrs.qpe[i],
+                qpe_diago=arrs.qpe_diago[i],
+                vxcme=arrs.vxcme[i],
+                sigxme=arrs.sigxme[i],
+                sigcmee0=arrs.sigcmee0[i],
+                vUme=arrs.vUme[i],
+                ze0=arrs.ze0[i],
+            ) for i in np.nonzero(arrs.spin == spin)[0]])
 
         return tuple(qps_spin)
 
+    def read_allqps_arrays(self, ignore_imag=False):
+        """
+        Extract the QP results for all the (spin, kpoint, band) states computed with fancy indexing.
+
+        Return: namedtuple with arrays of shape [nstates] (same order as read_allqps).
+            ikgw is the index of the k-point in gwkpoints, band is a global index.
+            The other entries have the same meaning as in :class:`QPState`. Energies in eV.
+
+        Args:
+            ignore_imag: Only real part is returned if ``ignore_imag``.
+        """
+        nb_sk = self.gwbstop_sk - self.gwbstart_sk
+        spin, ikgw, ib = np.nonzero(np.arange(nb_sk.max()) < nb_sk[..., None])
+        band = self.gwbstart_sk[spin, ikgw] + ib
+        kfile = np.array([self.kpt2fileindex(kpoint) for kpoint in self.gwkpoints], dtype=np.int)[ikgw]
+        # Must shift band index (see fortran code that allocates with mdbgw)
+        ib_gw = band - self.min_gwbstart
+
+        def ri(a):
+            return np.real(a) if ignore_imag else a
+
+        return dict2namedtuple(
+            spin=spin,
+            ikgw=ikgw,
+            band=band,
+            e0=self.ks_bands.eigens[spin, kfile, band],
+            qpe=ri(self._egw[spin, kfile, band]),
+            qpe_diago=ri(self._en_qp_diago[spin, kfile, band]),
+            vxcme=self._vxcme[spin, kfile, ib_gw],
+            sigxme=self._sigxme[spin, kfile, ib_gw],
+            sigcmee0=ri(self._sigcmee0[spin, kfile, ib_gw]),
+            vUme=self._vUme[spin, kfile, ib_gw],
+            ze0=ri(self._ze0[spin, kfile, ib_gw]),
+        )
+
     def read_qplist_sk(self, spin, kpoint, ignore_imag=False):
         """
         Read and return :class:`QPList` object for the given spin, kpoint.
@@ -1761,8 +1806,8 @@ class SigresRobot(Robot, RobotWithEbands):
     # Try to have API similar to SigEPhRobot
     EXT = "SIGRES"
 
-    def __init__(self, *args):
-        super().__init__(*args)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         if len(self.abifiles) in (0, 1): return
 
         # TODO
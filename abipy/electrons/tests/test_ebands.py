@@ -264,7 +264,16 @@ class ElectronBandsTest(AbipyTest):
         with self.assertRaises(NotImplementedError):
             si_ebands_kmesh.get_edos(method="tetrahedron")
 
+        # Tetrahedron method.
+        si_tdos = si_ebands_kmesh.get_edos(method="tetra")
+        self.assert_almost_equal(si_tdos.tot_idos.values[-1], 2 * si_ebands_kmesh.nband, decimal=1)
+        assert si_ebands_kmesh.tetramesh.nibz == si_ebands_kmesh.nkpt
+
         si_edos = si_ebands_kmesh.get_edos()
+        # Binned gaussians should agree with the explicit sum of gaussians.
+        si_bdos = si_ebands_kmesh.get_edos(method="gaussian_binned")
+        self.assert_equal(si_bdos.spin_dos[0].mesh, si_edos.spin_dos[0].mesh)
+        assert np.abs(si_bdos.tot_dos.values - si_edos.tot_dos.values).max() < 1e-2 * si_edos.tot_dos.values.max()
         repr(si_edos); str(si_edos)
         assert ElectronDos.as_edos(si_edos, {}) is si_edos
         assert si_edos == si_edos and not (si_edos != si_edos)
@@ -343,6 +352,10 @@ class ElectronBandsTest(AbipyTest):
             jdos = si_ebands_kmesh.get_ejdos(spin, valence, conduction)
             intg = jdos.integral()[-1][-1]
             self.assert_almost_equal(intg, len(conduction) * len(valence))
+            bjdos = si_ebands_kmesh.get_ejdos(spin, valence, conduction, method="gaussian_binned")
+            self.assert_almost_equal(bjdos.integral()[-1][-1], len(conduction) * len(valence), decimal=3)
+            tjdos = si_ebands_kmesh.get_ejdos(spin, valence, conduction, method="tetra")
+            self.assert_almost_equal(tjdos.integral()[-1][-1], len(conduction) * len(valence), decimal=2)
 
         self.serialize_with_pickle(jdos, protocols=[-1])
 
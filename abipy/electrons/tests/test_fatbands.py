@@ -1,5 +1,6 @@
 """Tests for electrons.bse module"""
 import itertools
+import numpy as np
 import abipy.data as abidata
 
 from abipy import abilab
@@ -9,6 +10,34 @@ from abipy.core.testing import AbipyTest
 
 class TestElectronFatbands(AbipyTest):
 
+    def check_symbols_pjdos(self, fbnc_kmesh):
+        """
+        PJDOS computed by reading the weights in blocks of k-points.
+        Compare with the explicit sum over states using the full array of weights.
+        """
+        from abipy.electrons import fatbands
+        from abipy.tools.numtools import gaussian
+        ebands = fbnc_kmesh.ebands
+        mesh, width = np.linspace(-10, 10, 201), 0.2
+        old_nbytes = fatbands.set_pjdos_max_block_nbytes(8 * 10**4)
+        try:
+            symbols_lso = fbnc_kmesh.get_symbols_pjdos(mesh, width)
+        finally:
+            assert fatbands.set_pjdos_max_block_nbytes(old_nbytes) == 8 * 10**4
+        assert list(symbols_lso.keys()) == fbnc_kmesh.symbols
+        for symbol, lso in symbols_lso.items():
+            assert lso.shape == (fbnc_kmesh.lsize, fbnc_kmesh.nsppol, len(mesh))
+            wl = fbnc_kmesh.get_wl_symbol(symbol)
+            ref = np.zeros_like(lso)
+            for spin, k in itertools.product(range(ebands.nsppol), range(ebands.nkpt)):
+                for band in range(ebands.nband_sk[spin, k]):
+                    gs = gaussian(mesh, width, center=ebands.eigens[spin, k, band]) * ebands.kpoints[k].weight
+                    ref[:, spin] += wl[:, spin, band, k, None] * gs
+            self.assert_almost_equal(lso, ref)
+
+        with self.assertRaises(RuntimeError):
+            fbnc_kmesh.get_symbols_pjdos(mesh, width, with_m=True)
+
     def test_MgB2_fatbands(self):
         """Testing MgB2 fatbands with prtdos 3."""
         fbnc_kpath = FatBandsFile(abidata.ref_file("mgb2_kpath_FATBANDS.nc"))
@@ -47,6 +76,8 @@ class TestElectronFatbands(AbipyTest):
         assert fbnc_kmesh.ebands.kpoints.is_ibz
         assert fbnc_kmesh.ebands.has_metallic_scheme
 
+        self.check_symbols_pjdos(fbnc_kmesh)
+
         if self.has_matplotlib():
             assert fbnc_kmesh.plot_pjdos_typeview(tight_layout=True, show=False)
             assert fbnc_kmesh.plot_pjdos_lview(tight_layout=True, stacked=True, show=False)
@@ -101,6 +132,8 @@ class TestElectronFatbands(AbipyTest):
         repr(fbnc_kmesh); str(fbnc_kmesh)
         assert fbnc_kmesh.ebands.kpoints.is_ibz
         assert fbnc_kmesh.ebands.has_metallic_scheme
+
+        self.check_symbols_pjdos(fbnc_kmesh)
         assert fbnc_kmesh.prtdosm == 0
 
         if self.has_matplotlib():
@@ -61,7 +61,17 @@ class TestQPList(AbipyTest):
         assert str(qp.tips)
         assert qp.spin == 0
         assert qp.kpoint == self.sigres.gwkpoints[0]
-        assert qp.kpoint is self.sigres.gwkpoints[0]
+        # The k-point is a view of gwkpoints: set_name and set_weight modify the list.
+        old_name, old_weight = qp.kpoint.name, qp.kpoint.weight
+        try:
+            qp.kpoint.set_name("foo")
+            qp.kpoint.set_weight(0.5)
+            assert self.sigres.gwkpoints[0].name == "foo"
+            assert self.sigres.gwkpoints.weights[0] == 0.5
+        finally:
+            qp.kpoint.set_name(old_name)
+            qp.kpoint.set_weight(old_weight)
+        assert self.sigres.gwkpoints[0].name == old_name
 
         self.assert_equal(qp.re_qpe + 1j * qp.imag_qpe, qp.qpe)
         self.assert_almost_equal(qp.e0, -5.04619941555265, decimal=5)
@@ -84,6 +94,19 @@ class TestSigresFile(AbipyTest):
         sigres = abilab.abiopen(abidata.ref_file("tgw1_9o_DS4_SIGRES.nc"))
         assert sigres.nsppol == 1
         sigres.print_qps(precision=5, ignore_imag=False)
+
+        # QP results extracted for all the states at once.
+        arrs = sigres.reader.read_allqps_arrays()
+        qplist = sigres.qplist_spin[0]
+        assert len(arrs.band) == len(qplist)
+        for i, qp in enumerate(qplist):
+            assert qp.band == arrs.band[i] and qp.kpoint == sigres.gwkpoints[arrs.ikgw[i]]
+            ref = sigres.reader.read_qp(0, qp.kpoint, qp.band)
+            for field in ("e0", "qpe", "qpe_diago", "vxcme", "sigxme", "sigcmee0", "vUme", "ze0"):
+                self.assert_equal(getattr(qp, field), getattr(ref, field))
+        df = sigres.get_dataframe()
+        assert len(df) == len(qplist)
+        self.assert_equal(df["qpe"].values, arrs.qpe)
         assert sigres.params["nsppol"] == sigres.nsppol
         assert not sigres.has_spectral_function
 
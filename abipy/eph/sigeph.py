@@ -17,6 +17,7 @@ from tabulate import tabulate
 from monty.string import marquee, list_strings
 from monty.functools import lazy_property
 from monty.termcolor import cprint
+from monty.collections import dict2namedtuple
 from abipy.core.mixins import AbinitNcFile, Has_Structure, Has_ElectronBands, NotebookWriter
 from abipy.core.kpoints import Kpoint, KpointList, Kpath, IrredZone, has_timrev_from_kptopt
 from abipy.tools.plotting import (add_fig_kwargs, get_ax_fig_plt, get_axarray_fig_plt, set_axlims, set_visible,
@@ -1104,14 +1105,43 @@ class SigEPhFile(AbinitNcFile, Has_Structure, Has_ElectronBands, NotebookWriter)
             with_params: False to exclude calculation parameters from the dataframe.
             ignore_imag: only real part is returned if ``ignore_imag``.
         """
-        df_list = []; app = df_list.append
+        return self._get_qp_dataframe(itemp=itemp, with_params=with_params,
+                                      with_spin=with_spin, ignore_imag=ignore_imag)
+
+    def _get_qp_dataframe(self, spin=None, ikc=None, itemp=None, with_params=False, with_spin="auto",
+                          ignore_imag=False):
+        """
+        Build |pandas-DataFrame| with QP results directly from the arrays returned by
+        ``reader.read_allqps_arrays``. Same format as the dataframes produced by :class:`QpTempState`
+        (one row for each state and temperature). If spin (ikc) is None, all spins (k-points) are included.
+        """
+        arrs = self.reader.read_allqps_arrays(ignore_imag=ignore_imag)
         with_spin = self.nsppol == 2 if with_spin == "auto" else with_spin
-        for spin in range(self.nsppol):
-            for ikc, kpoint in enumerate(self.sigma_kpoints):
-                app(self.get_dataframe_sk(spin, ikc, itemp=itemp, with_params=with_params,
-                    with_spin=with_spin, ignore_imag=ignore_imag))
+        select = np.ones(len(arrs.spin), dtype=bool)
+        if spin is not None: select &= arrs.spin == spin
+        if ikc is not None: select &= arrs.ikc == ikc
 
-        return pd.concat(df_list)
+        ntemp = len(self.tmesh)
+        fan0, dw = arrs.fan0[select].ravel(), arrs.dw[select].ravel()
+        qpe, e0 = arrs.qpe[select].ravel(), np.repeat(arrs.e0[select], ntemp)
+
+        od = OrderedDict()
+        if with_spin: od["spin"] = np.repeat(arrs.spin[select], ntemp)
+        od["band"] = np.repeat(arrs.band[select], ntemp)
+        od["e0"] = e0
+        od["re_qpe"] = qpe.real
+        od["qpeme0"] = (qpe - e0).real
+        od["re_sig0"] = fan0.real + dw
+        od["imag_sig0"] = fan0.imag
+        od["ze0"] = arrs.ze0[select].ravel()
+        od["re_fan0"] = fan0.real
+        od["dw"] = dw
+        od["tmesh"] = np.tile(self.tmesh, select.sum())
+        if with_params: od.update(self.params)
+
+        df = pd.DataFrame(od, index=np.tile(np.arange(ntemp), select.sum()))
+        if itemp is not None: df = df[df["tmesh"] == self.tmesh[itemp]]
+        return df
 
     def get_gaps_dataframe(self, itemp=None, with_params=False, ignore_imag=False):
         """
@@ -1164,18 +1194,8 @@ class SigEPhFile(AbinitNcFile, Has_Structure, Has_ElectronBands, NotebookWriter)
             with_spin: True to add column with spin index. "auto" to add it only if nsppol == 2
             ignore_imag: Only real part is returned if ``ignore_imag``.
         """
-        ikc = self.sigkpt2index(kpoint)
-        with_spin = self.nsppol == 2 if with_spin == "auto" else with_spin
-        rows = []
-        for band in range(self.bstart_sk[spin, ikc], self.bstop_sk[spin, ikc]):
-            # Read QP data.
-            qp = self.reader.read_qp(spin, ikc, band, ignore_imag=ignore_imag)
-            # Convert to dataframe and add other entries useful when comparing different calculations.
-            rows.append(qp.get_dataframe(with_spin=with_spin, params=self.params if with_params else None))
-
-        df = pd.concat(rows)
-        if itemp is not None: df = df[df["tmesh"] == self.tmesh[itemp]]
-        return df
+        return self._get_qp_dataframe(spin=spin, ikc=self.sigkpt2index(kpoint), itemp=itemp,
+                                      with_params=with_params, with_spin=with_spin, ignore_imag=ignore_imag)
 
     def get_linewidth_dos(self, method="gaussian", e0="fermie", step=0.1, width=0.2):
         """
@@ -1207,15 +1227,14 @@ class SigEPhFile(AbinitNcFile, Has_Structure, Has_ElectronBands, NotebookWriter)
         # get dos
         if method == "gaussian":
             dos = np.zeros((ntemp,self.nsppol,nw))
+            arrs = self.reader.read_allqps_arrays()
+            weights = ebands.kpoints.weights[np.asarray(self.kcalc2ibz)[arrs.ikc]]
             for spin in range(self.nsppol):
-                for i, ik in enumerate(self.kcalc2ibz):
-                    weight = ebands.kpoints.weights[ik]
-                    for band in range(self.bstart_sk[spin, i], self.bstop_sk[spin, i]):
-                        qp = self.reader.read_qp(spin,i,band)
-                        e0 = qp.e0
-                        for it in range(ntemp):
-                            linewidth = abs(qp.fan0.imag[it])
-                            dos[it,spin] += weight * linewidth * gaussian(mesh, width, center=e0)
+                select = arrs.spin == spin
+                # [nstates, nw] gaussians centered on the KS energies.
+                gauss = gaussian(mesh[None, :], width, center=arrs.e0[select, None])
+                linewidths = np.abs(arrs.fan0[select].imag) * weights[select, None]
+                dos[:, spin] = np.dot(linewidths.T, gauss)
         else:
             raise NotImplementedError("Method %s is not supported" % method)
 
@@ -1984,8 +2003,8 @@ class SigEPhRobot(Robot, RobotWithEbands):
     # Try to have API similar to SigresRobot
     EXT = "SIGEPH"
 
-    def __init__(self, *args):
-        super().__init__(*args)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         if len(self.abifiles) in (0, 1): return
 
         # Check dimensions and self-energy states and issue warning.
@@ -2069,14 +2088,11 @@ class SigEPhRobot(Robot, RobotWithEbands):
         """
         with_spin = any(ncfile.nsppol == 2 for ncfile in self.abifiles) if with_spin == "auto" else with_spin
 
-        df_list = []; app = df_list.append
-        for label, ncfile in self.items():
-            for spin in range(ncfile.nsppol):
-                for ikc, kpoint in enumerate(ncfile.sigma_kpoints):
-                    app(ncfile.get_dataframe_sk(spin, ikc, with_params=with_params,
-                        with_spin=with_spin, ignore_imag=ignore_imag))
+        def get_df(ncfile):
+            return ncfile.get_dataframe(with_params=with_params, with_spin=with_spin, ignore_imag=ignore_imag)
 
-        return pd.concat(df_list)
+        tag = "get_dataframe%s" % str((with_params, with_spin, ignore_imag))
+        return pd.concat(self._get_cached_results(tag, get_df))
 
     @add_fig_kwargs
     def plot_selfenergy_conv(self, spin, kpoint, band, itemp=0, sortby=None, hue=None,
@@ -3027,14 +3043,77 @@ class SigmaPhReader(BaseEphReader):
         Args:
             ignore_imag: Only real part is returned if ``ignore_imag``.
         """
+        # The QpTempState objects are built from the arrays read with read_allqps_arrays (no netcdf I/O per state).
+        arrs = self.read_allqps_arrays(ignore_imag=ignore_imag)
         qps_spin = self.nsppol * [None]
-
-        # TODO: Try to optimize this part.
         for spin in range(self.nsppol):
-            qps = []
-            for ikc, kpoint in enumerate(self.sigma_kpoints):
-                for band in range(self.bstart_sk[spin, ikc], self.bstop_sk[spin, ikc]):
-                    qps.append(self.read_qp(spin, ikc, band, ignore_imag=ignore_imag))
-            qps_spin[spin] = QpTempList(qps)
+            qps_spin[spin] = QpTempList([QpTempState(
+                spin=spin,
+                kpoint=self.sigma_kpoints[arrs.ikc[i]],
+                band=int(arrs.band[i]),
+                tmesh=self.tmesh,
+                e0=arrs.e0[i],
+                qpe=arrs.qpe[i],
+                ze0=arrs.ze0[i],
+                fan0=arrs.fan0[i],
+                dw=arrs.dw[i],
+                qpe_oms=arrs.qpe_oms[i],
+            ) for i in np.nonzero(arrs.spin == spin)[0]])
 
         return tuple(qps_spin)
+
+    def read_allqps_arrays(self, ignore_imag=False):
+        """
+        Read the QP results for all the (spin, kpoint, band) states computed.
+        Each netcdf variable is read with a single slice and the arrays are cached.
+
+        Return: namedtuple with arrays flattened over the states (same order as read_allqps).
+            spin, ikc, band, e0 have shape [nstates].
+            qpe, qpe_oms, ze0, fan0, dw have shape [nstates, ntemp].
+            band is a global index. Energies in eV.
+
+        Args:
+            ignore_imag: Only real part is returned if ``ignore_imag``.
+        """
+        try:
+            arrs = self._allqps_arrays
+        except AttributeError:
+            # [nsppol, nkcalc, max_nbcalc] mask with the states computed.
+            max_nbcalc = self.read_dimvalue("max_nbcalc")
+            spin, ikc, ibc = np.nonzero(np.arange(max_nbcalc) < self.nbcalc_sk[..., None])
+
+            def read_skb(varname, cmode=None):
+                return self.read_value(varname, cmode=cmode)[spin, ikc, ibc]
+
+            # nctkarr_t("qp_enes", "dp", "two, ntemp, max_nbcalc, nkcalc, nsppol")
+            qpe = read_skb("qp_enes", cmode="c") * abu.Ha_eV
+            # nctkarr_t("qpoms_enes", "dp", "two, ntemp, max_nbcalc, nkcalc, nsppol")
+            try:
+                qpe_oms = read_skb("qpoms_enes", cmode="c").real * abu.Ha_eV
+            except Exception:
+                cprint("Reading old deprecated sigeph file!", "yellow")
+                qpe_oms = read_skb("qpadb_enes", cmode="c").real * abu.Ha_eV
+
+            # nctkarr_t("dw_vals", "dp", "ntemp, max_nbcalc, nkcalc, nsppol"),
+            dw = read_skb("dw_vals") * abu.Ha_eV
+            # nctkarr_t("vals_e0ks", "dp", "two, ntemp, max_nbcalc, nkcalc, nsppol")
+            fan0 = read_skb("vals_e0ks", cmode="c") * abu.Ha_eV - dw
+
+            arrs = self._allqps_arrays = dict2namedtuple(
+                spin=spin,
+                ikc=ikc,
+                band=self.bstart_sk[spin, ikc] + ibc,
+                # nctkarr_t("ks_enes", "dp", "max_nbcalc, nkcalc, nsppol")
+                e0=read_skb("ks_enes") * abu.Ha_eV,
+                qpe=qpe,
+                qpe_oms=qpe_oms,
+                # nctkarr_t("ze0_vals", "dp", "ntemp, max_nbcalc, nkcalc, nsppol")
+                ze0=read_skb("ze0_vals"),
+                fan0=fan0,
+                dw=dw,
+            )
+
+        if ignore_imag:
+            arrs = arrs._replace(qpe=arrs.qpe.real, fan0=arrs.fan0.real)
+
+        return arrs
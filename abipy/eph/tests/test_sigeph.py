@@ -178,6 +178,19 @@ class SigEPhFileTest(AbipyTest):
 
         qplist_spin = sigeph.qplist_spin
         assert len(qplist_spin) == sigeph.nsppol
+
+        # QP results read with one slice per netcdf variable.
+        arrs = sigeph.reader.read_allqps_arrays()
+        nstates = sum(len(qpl) for qpl in qplist_spin)
+        assert arrs.e0.shape == (nstates,) and arrs.qpe.shape == (nstates, sigeph.ntemp)
+        assert np.iscomplexobj(arrs.fan0)
+        assert not np.iscomplexobj(sigeph.reader.read_allqps_arrays(ignore_imag=True).fan0)
+        for i, qpstate in ((0, qplist_spin[0][0]), (nstates - 1, qplist_spin[-1][-1])):
+            qp = sigeph.reader.read_qp(arrs.spin[i], arrs.ikc[i], arrs.band[i])
+            assert qpstate.band == qp.band == arrs.band[i]
+            for field in ("e0", "qpe", "ze0", "fan0", "dw", "qpe_oms"):
+                self.assert_almost_equal(getattr(qp, field), getattr(arrs, field)[i])
+                self.assert_almost_equal(getattr(qpstate, field), getattr(qp, field))
         if self.has_matplotlib():
             assert sigeph.plot_qps_vs_e0(show=False)
 
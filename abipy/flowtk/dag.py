@@ -0,0 +1,158 @@
+# coding: utf-8
+"""
+Index with the dependency graph of the tasks in a |Flow|.
+
+The index is used by the scheduler to select the tasks that can be executed, to group the
+tasks by status and to detect deadlocks without scanning the entire flow at each cycle.
+The index is updated by |Task| when the status changes and it is rebuilt when the
+structure of the flow (number of tasks or dependencies) changes.
+"""
+import threading
+
+from collections import OrderedDict, defaultdict, deque
+from .nodes import Status
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "FlowDag",
+]
+
+
+_S_OK = Status.from_string("Completed")
+_S_LOCKED = Status.from_string("Locked")
+_S_SUB = Status.from_string("Submitted")
+
+
+class FlowDag(object):
+    """
+    Dependency graph of the tasks in a |Flow| with tasks grouped by status.
+
+    .. attributes:
+
+        parents: dict node_id --> set with the node_ids of the tasks required by the task.
+            Dependencies on works are expanded into the tasks of the work.
+        children: dict node_id --> set with the node_ids of the tasks that depend on the task.
+        buckets: dict status --> set with the node_ids of the tasks with this status.
+    """
+
+    def __init__(self, flow):
+        # node_id --> task and node_id --> (work_index, task_index). Both in flow order.
+        self.tasks = OrderedDict()
+        self.pos = {}
+        # The index can be updated by the tasks only if they have a reference to the flow (see flow.allocate)
+        self.is_linked = True
+        for wi, work in enumerate(flow):
+            if getattr(work, "_flow", None) is not flow: self.is_linked = False
+            for ti, task in enumerate(work):
+                if getattr(task, "_work", None) is not work: self.is_linked = False
+                self.tasks[task.node_id] = task
+                self.pos[task.node_id] = (wi, ti)
+
+        self.num_tasks = len(self.tasks)
+        self.parents = {}
+        self.children = defaultdict(set)
+        # Dependencies that cannot be expressed in terms of the tasks in the flow e.g. FileNodes or
+        # works that are still empty. These dependencies are evaluated when runnable_tasks is called.
+        self.extra_deps = {}
+
+        for nid, task in self.tasks.items():
+            parents = set()
+            for dep in task.deps:
+                node = dep.node
+                if node.is_task and node.node_id in self.tasks:
+                    parents.add(node.node_id)
+                elif node.is_work and len(node) > 0 and all(t.node_id in self.tasks for t in node):
+                    parents.update(t.node_id for t in node)
+                else:
+                    self.extra_deps.setdefault(nid, []).append(dep)
+
+            parents.discard(nid)
+            self.parents[nid] = parents
+            for p in parents:
+                self.children[p].add(nid)
+
+        self.buckets = defaultdict(set)
+        for nid, task in self.tasks.items():
+            self.buckets[task.status].add(nid)
+
+        # Number of parents whose status is not S_OK.
+        ok_nids = self.buckets[_S_OK]
+        self.num_notok = {nid: sum(1 for p in parents if p not in ok_nids) for nid, parents in self.parents.items()}
+
+        self.runnables = set()
+        for nid in self.tasks:
+            self._update_runnable(nid)
+
+        # Tasks can be submitted by the worker threads of the scheduler (see PyFlowScheduler.use_asyncio)
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return "num_tasks: %d, num_edges: %d, num_runnables: %d" % (
+            self.num_tasks, sum(len(p) for p in self.parents.values()), len(self.runnables))
+
+    def _update_runnable(self, nid):
+        """Add/remove the task from the set of runnable tasks (extra_deps are not taken into account)."""
+        status = self.tasks[nid].status
+        if status < _S_SUB and status != _S_LOCKED and self.num_notok[nid] == 0:
+            self.runnables.add(nid)
+        else:
+            self.runnables.discard(nid)
+
+    def on_status_changed(self, task, old_status):
+        """
+        Update the index after a change of the status of the task.
+        Cost is proportional to the number of children of the task.
+        """
+        nid = task.node_id
+        if self.tasks.get(nid) is not task: return
+        new_status = task.status
+        if new_status == old_status: return
+
+        with self._lock:
+            self.buckets[old_status].discard(nid)
+            self.buckets[new_status].add(nid)
+
+            if (old_status == _S_OK) != (new_status == _S_OK):
+                delta = -1 if new_status == _S_OK else +1
+                for child in self.children.get(nid, ()):
+                    self.num_notok[child] += delta
+                    self._update_runnable(child)
+
+            self._update_runnable(nid)
+
+    def sorted_tasks(self, nids):
+        """Return list of tasks with the given node_ids in flow order."""
+        pos = self.pos
+        return [self.tasks[nid] for nid in sorted(nids, key=lambda n: pos[n])]
+
+    def iflat_tasks_wti(self, status):
+        """Generator producing (task, work_index, task_index) for the tasks with the given status in flow order."""
+        for nid in sorted(self.buckets.get(status, ()), key=lambda n: self.pos[n]):
+            wi, ti = self.pos[nid]
+            yield self.tasks[nid], wi, ti
+
+    def runnable_tasks(self):
+        """List with the tasks that can be submitted (flow order)."""
+        with self._lock:
+            nids = list(self.runnables)
+        nids = [nid for nid in nids
+                if all(dep.status == _S_OK for dep in self.extra_deps.get(nid, ()))]
+        return self.sorted_tasks(nids)
+
+    def descendants(self, nids):
+        """
+        Return set with the node_ids of the tasks that depend, directly or indirectly,
+        on the tasks with the given node_ids.
+        """
+        found = set()
+        queue = deque(nids)
+        while queue:
+            for child in self.children.get(queue.popleft(), ()):
+                if child not in found:
+                    found.add(child)
+                    queue.append(child)
+
+        return found
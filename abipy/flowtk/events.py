@@ -5,6 +5,7 @@ provides a parser to extract these events form the main output file and the log
 """
 import sys
 import os.path
+import re
 import datetime
 import collections
 import ruamel.yaml as yaml
@@ -13,14 +14,13 @@ import logging
 import numpy as np
 
 from monty.string import indent, is_string
-from monty.fnmatch import WildCard
 from monty.termcolor import colored
 from monty.inspect import all_subclasses
 from monty.json import MontyDecoder
 from pymatgen.core.structure import Structure
 from monty.json import MSONable
 from pymatgen.util.serialization import pmg_serialize
-from pymatgen.io.abinit.abiinspect import YamlTokenizer
+from pymatgen.io.abinit.abiinspect import YamlDoc
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +71,7 @@ class AbinitEvent(yaml.YAMLObject):
 
     The algorithm to extract the YAML sections is very simple.
 
-    1) We use YamlTokenizer to extract the documents from the output file
+    1) We use regular expressions to extract the documents from the output file
     2) If we have a tag that ends with "Warning", "Error", "Bug", "Comment
        we know we have encountered a new ABINIT event
     3) We parse the document with yaml.safe_load(doc.text) and we get the object
@@ -408,58 +408,136 @@ class EventsParserError(Exception):
 class EventsParser(object):
     """
     Parses the output or the log file produced by ABINIT and extract the list of events.
+
+    The parser keeps track of the byte offset reached in each file so that a new call
+    to ``parse`` with the same file only processes the bytes appended in the meantime.
+    Tasks keep an instance of the parser so that the log file of a running calculation
+    is not reparsed from the beginning at each check.
     """
     Error = EventsParserError
 
+    # The file is read in chunks of this size (bytes).
+    chunk_size = 16 * 1024 ** 2
+
+    # Regular expressions used to find the YAML documents.
+    # --- and ... are reserved words when they are placed at the beginning of a line.
+    _doc_start_re = re.compile(rb"^---(.*)$", re.M)
+    _doc_end_re = re.compile(rb"^\.\.\.", re.M)
+
+    # Documents whose tag does not match this regex are skipped without calling the YAML parser.
+    _event_tag_re = re.compile(r"(Error|Warning|Comment|Bug|ERROR|WARNING|COMMENT|BUG)$")
+
+    def __init__(self, incremental=True):
+        """
+        Args:
+            incremental: False if the file should be parsed from the beginning at each call.
+        """
+        self.incremental = incremental
+        self._states = {}
+
     def parse(self, filename, verbose=0):
         """
         Parse the given file. Return :class:`EventReport`.
         """
-        run_completed, start_datetime, end_datetime = False, None, None
         filename = os.path.abspath(filename)
-        report = EventReport(filename)
+        state = self._states.get(filename) if self.incremental else None
+
+        with open(filename, "rb") as fh:
+            # Start from scratch if the file has been replaced or truncated.
+            head = fh.read(256)
+            st = os.fstat(fh.fileno())
+            if (state is None or state["ino"] != st.st_ino or st.st_size < state["offset"] or
+                state["head"] != head[:len(state["head"])]):
+                state = dict(ino=st.st_ino, head=head, offset=0, lineno=0, events=[],
+                             run_completed=False, start_datetime=None, end_datetime=None)
+
+            fh.seek(state["offset"])
+            buf = b""
+            while True:
+                chunk = fh.read(self.chunk_size)
+                if not chunk: break
+                buf += chunk
+                consumed = self._parse_buffer(buf, state, verbose)
+                buf = buf[consumed:]
+
+        state["head"] = head
+        if self.incremental:
+            self._states[filename] = state
+
+        report = EventReport(filename, events=state["events"])
+        report.set_run_completed(state["run_completed"], state["start_datetime"], state["end_datetime"])
+        return report
 
-        w = WildCard("*Error|*Warning|*Comment|*Bug|*ERROR|*WARNING|*COMMENT|*BUG")
+    def _parse_buffer(self, buf, state, verbose):
+        """
+        Extract the YAML documents from the bytes in buf and update state.
+        Return the number of bytes consumed. Incomplete documents and lines are left
+        in the buffer so that they can be parsed when more data is available.
+        """
         import warnings
         warnings.simplefilter('ignore', yaml.error.UnsafeLoaderWarning)
-        with YamlTokenizer(filename) as tokens:
-            for doc in tokens:
-                if w.match(doc.tag):
-                    #print("got doc.tag", doc.tag,"--")
-                    try:
-                        #print(doc.text)
-                        event = yaml.load(doc.text)   # Can't use ruamel safe_load!
-                        #yaml.load(doc.text, Loader=ruamel.yaml.Loader)
-                        #print(event.yaml_tag, type(event))
-                    except Exception:
-                        #raise
-                        # Wrong YAML doc. Check tha doc tag and instantiate the proper event.
-                        message = "Malformatted YAML document at line: %d\n" % doc.lineno
-                        message += doc.text
-
-                        # This call is very expensive when we have many exceptions due to malformatted YAML docs.
-                        if verbose:
-                            message += "Traceback:\n %s" % straceback()
-
-                        if "error" in doc.tag.lower():
-                            print("It seems an error. doc.tag:", doc.tag)
-                            event = AbinitYamlError(message=message, src_file=__file__, src_line=0)
-                        else:
-                            event = AbinitYamlWarning(message=message, src_file=__file__, src_line=0)
-
-                    event.lineno = doc.lineno
-                    report.append(event)
-
+        pos, line_pos, lineno = 0, 0, state["lineno"]
+        consumed = None
+
+        while True:
+            m = self._doc_start_re.search(buf, pos)
+            if m is None: break
+            tag = m.group(1).strip()
+            if tag and not tag.startswith(b"!"):
+                # Spurious line starting with ---
+                pos = m.end()
+                continue
+
+            e = self._doc_end_re.search(buf, m.end())
+            if e is None:
+                # Incomplete document.
+                consumed = m.start()
+                break
+
+            eol = buf.find(b"\n", e.end())
+            pos = len(buf) if eol == -1 else eol + 1
+            lineno += buf.count(b"\n", line_pos, m.start())
+            line_pos = m.start()
+
+            tag = tag.decode("utf-8", "ignore") or None
+            if tag is None or not (self._event_tag_re.search(tag) or tag == "!FinalSummary"):
+                continue
+
+            doc = YamlDoc(text=buf[m.start():pos], lineno=lineno + 1, tag=tag)
+            if tag == "!FinalSummary":
                 # Check whether the calculation completed.
-                if doc.tag == "!FinalSummary":
-                    #print(doc)
-                    run_completed = True
-                    d = doc.as_dict()
-                    #print(d)
-                    start_datetime, end_datetime = d["start_datetime"], d["end_datetime"]
-
-        report.set_run_completed(run_completed, start_datetime, end_datetime)
-        return report
+                state["run_completed"] = True
+                d = doc.as_dict()
+                state["start_datetime"], state["end_datetime"] = d["start_datetime"], d["end_datetime"]
+                continue
+
+            try:
+                event = yaml.load(doc.text)   # Can't use ruamel safe_load!
+            except Exception:
+                # Wrong YAML doc. Check tha doc tag and instantiate the proper event.
+                message = "Malformatted YAML document at line: %d\n" % doc.lineno
+                message += doc.text
+
+                # This call is very expensive when we have many exceptions due to malformatted YAML docs.
+                if verbose:
+                    message += "Traceback:\n %s" % straceback()
+
+                if "error" in doc.tag.lower():
+                    print("It seems an error. doc.tag:", doc.tag)
+                    event = AbinitYamlError(message=message, src_file=__file__, src_line=0)
+                else:
+                    event = AbinitYamlWarning(message=message, src_file=__file__, src_line=0)
+
+            event.lineno = doc.lineno
+            state["events"].append(event)
+
+        if consumed is None:
+            # Don't consume the last line if it's not complete.
+            consumed = max(pos, buf.rfind(b"\n", pos) + 1)
+
+        state["lineno"] = lineno + buf.count(b"\n", line_pos, consumed)
+        state["offset"] += consumed
+        return consumed
 
     def report_exception(self, filename, exc):
         """
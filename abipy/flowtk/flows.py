@@ -11,6 +11,7 @@ import collections
 import warnings
 import shutil
 import tempfile
+import uuid
 import numpy as np
 
 from io import StringIO
@@ -37,6 +38,8 @@ from .tasks import ScfTask, TaskManager, FixQueueCriticalError
 from .utils import File, Directory, Editor
 from .works import NodeContainer, Work, BandStructureWork, PhononWork, BecWork, G0W0Work, QptdmWork, DteWork
 from .events import EventsParser
+from . import journal
+from .dag import FlowDag
 
 __author__ = "Matteo Giantomassi"
 __copyright__ = "Copyright 2013, The Materials Project"
@@ -114,6 +117,15 @@ class Flow(Node, NodeContainer, MSONable):
     """
     VERSION = "0.1"
     PICKLE_FNAME = "__AbinitFlow__.pickle"
+    # Journal with the status transitions recorded after the last pickle_dump.
+    JOURNAL_FNAME = "__AbinitFlow__.journal"
+    # JSON index used to show the status of the flow without unpickling it.
+    STATUS_FNAME = "__AbinitFlow__.status.json"
+
+    # journal_dump performs a full pickle_dump when the journal contains more records than this.
+    journal_maxrecords = 500
+    # Number of threads used by check_status to stat the files of the tasks.
+    check_status_nthreads = 8
 
     Error = FlowError
 
@@ -191,6 +203,9 @@ class Flow(Node, NodeContainer, MSONable):
         # List of works.
         self._works = []
 
+        # Dependency graph of the tasks (built on demand, see dag property).
+        self._dag = None
+
         self._waited = 0
 
         # List of callbacks that must be executed when the dependencies reach S_OK
@@ -270,6 +285,12 @@ class Flow(Node, NodeContainer, MSONable):
         self.tmpdir = Directory(os.path.join(self.workdir, "tmpdata"))
         self.wdir = Directory(self.workdir)
 
+    def __getstate__(self):
+        """The dependency graph of the tasks is not pickled since it is rebuilt on demand."""
+        d = self.__dict__.copy()
+        d["_dag"] = None
+        return d
+
     def reload(self):
         """
         Reload the flow from the pickle file. Used when we are monitoring the flow
@@ -320,6 +341,10 @@ class Flow(Node, NodeContainer, MSONable):
             with open(filepath, "rb") as fh:
                 flow = pmg_pickle_load(fh)
 
+            # Read the status transitions recorded after the last pickle_dump.
+            records = journal.read_journal(os.path.join(os.path.dirname(filepath), cls.JOURNAL_FNAME),
+                                           getattr(flow, "_journal_token", None))
+
         # Check if versions match.
         if flow.VERSION != cls.VERSION:
             msg = ("File flow version %s != latest version %s\n."
@@ -328,6 +353,17 @@ class Flow(Node, NodeContainer, MSONable):
 
         flow.set_spectator_mode(spectator_mode)
 
+        if records:
+            nid2task = {task.node_id: task for task in flow.iflat_tasks()}
+            for rec in records:
+                for nid, state in rec.items():
+                    if nid in nid2task: journal.apply_light_state(nid2task[nid], state)
+
+        # Save the persisted state so that journal_dump can compute the differences.
+        if getattr(flow, "_journal_token", None) is not None:
+            flow._journal_states = journal.get_flow_states(flow)
+            flow._journal_nrecords = len(records)
+
         # Recompute the status of each task since tasks that
         # have been submitted previously might be completed.
         flow.check_status()
@@ -483,16 +519,30 @@ class Flow(Node, NodeContainer, MSONable):
     @property
     def num_tasks(self):
         """Total number of tasks"""
-        return len(list(self.iflat_tasks()))
+        return sum(len(work) for work in self)
+
+    @property
+    def dag(self):
+        """
+        |FlowDag| with the dependency graph of the tasks and the tasks grouped by status.
+        The index is rebuilt automatically if tasks or dependencies have been added.
+        Before `allocate`, the tasks cannot update the index so a new index is built at each call.
+        """
+        dag = getattr(self, "_dag", None)
+        if dag is None or dag.num_tasks != self.num_tasks:
+            dag = FlowDag(self)
+            self._dag = dag if dag.is_linked else None
+        return dag
 
     @property
     def errored_tasks(self):
         """List of errored tasks."""
-        etasks = []
+        buckets = self.dag.buckets
+        nids = set()
         for status in [self.S_ERROR, self.S_QCRITICAL, self.S_ABICRITICAL]:
-            etasks.extend(list(self.iflat_tasks(status=status)))
+            nids.update(buckets.get(status, ()))
 
-        return set(etasks)
+        return set(self.dag.tasks[nid] for nid in nids)
 
     @property
     def num_errored_tasks(self):
@@ -693,6 +743,14 @@ class Flow(Node, NodeContainer, MSONable):
                     else:
                         yield task
 
+        elif op == "==" and not nids:
+            # Use the index with the tasks grouped by status.
+            for task, wi, ti in self.dag.iflat_tasks_wti(Status.as_status(status)):
+                if with_wti:
+                    yield task, wi, ti
+                else:
+                    yield task
+
         else:
             # Get the operator from the string.
             op = operator_from_str(op)
@@ -760,24 +818,25 @@ class Flow(Node, NodeContainer, MSONable):
             named tuple with the tasks grouped in: deadlocks, runnables, running
         """
         # Find jobs that can be submitted and and the jobs that are already in the queue.
-        runnables = []
-        for work in self:
-            runnables.extend(work.fetch_alltasks_to_run())
+        runnables = self.fetch_alltasks_to_run()
         runnables.extend(list(self.iflat_tasks(status=self.S_SUB)))
 
         # Running jobs.
         running = list(self.iflat_tasks(status=self.S_RUN))
 
-        # Find deadlocks.
-        err_tasks = self.errored_tasks
-        deadlocked = []
-        if err_tasks:
-            for task in self.iflat_tasks():
-                if any(task.depends_on(err_task) for err_task in err_tasks):
-                    deadlocked.append(task)
+        # Find deadlocks i.e. the tasks that depend, directly or indirectly, on an errored task.
+        err_nids = [task.node_id for task in self.errored_tasks]
+        deadlocked = self.dag.sorted_tasks(self.dag.descendants(err_nids)) if err_nids else []
 
         return dict2namedtuple(deadlocked=deadlocked, runnables=runnables, running=running)
 
+    def fetch_alltasks_to_run(self):
+        """
+        Returns a list with all the tasks that can be submitted (flow order).
+        Empty list if not task has been found.
+        """
+        return self.dag.runnable_tasks()
+
     def check_status(self, **kwargs):
         """
         Check the status of the works in self.
@@ -786,8 +845,19 @@ class Flow(Node, NodeContainer, MSONable):
             show: True to show the status of the flow.
             kwargs: keyword arguments passed to show_status
         """
+        # Stat the files of the tasks in a thread pool since this step is I/O bound
+        # (usually on a shared file system). The status is then computed sequentially only
+        # for the tasks whose files changed because set_status triggers callbacks.
+        stats = None
+        tasks = [task for task in self.iflat_tasks() if task.status not in (task.S_OK, task.S_LOCKED)]
+        if self.check_status_nthreads > 1 and len(tasks) > self.check_status_nthreads:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=self.check_status_nthreads) as executor:
+                stats = dict(zip((task.node_id for task in tasks),
+                                 executor.map(lambda task: task.stat_status_files(), tasks)))
+
         for work in self:
-            work.check_status()
+            work.check_status(stats=stats)
 
         if kwargs.pop("show", False):
             self.show_status(**kwargs)
@@ -1953,11 +2023,62 @@ class Flow(Node, NodeContainer, MSONable):
 
         protocol = self.pickle_protocol
 
+        # New checkpoint: the journal is reset and the records of the previous checkpoint are discarded.
+        self._journal_token = uuid.uuid4().hex
+        self._journal_states, self._journal_nrecords = None, 0
+
         # Atomic transaction with FileLock.
         with FileLock(self.pickle_file):
             with AtomicFile(self.pickle_file, mode="wb") as fh:
                 pmg_pickle_dump(self, fh, protocol=protocol)
 
+            journal.write_status_index(self, os.path.join(self.workdir, self.STATUS_FNAME), self._journal_token)
+            journal.reset_journal(os.path.join(self.workdir, self.JOURNAL_FNAME), self._journal_token)
+
+        self._journal_states = journal.get_flow_states(self)
+
+        return 0
+
+    @check_spectator
+    def journal_dump(self):
+        """
+        Save the status of the flow. Cheaper version of pickle_dump used by the scheduler at each cycle.
+
+        Only the status transitions of the tasks (status, returncode, start/end datetimes)
+        are appended to the journal file. A full pickle_dump is performed if the structure of the flow changed,
+        if a node has been (re)launched, corrected or finalized (these operations may change inputs, managers
+        and dependencies) or if the journal contains more than `journal_maxrecords` records.
+        Note that the entries added to the history of the tasks are saved only by pickle_dump.
+        Returns 0 if success
+        """
+        old_states = getattr(self, "_journal_states", None)
+        if old_states is None or self.has_chrooted:
+            return self.pickle_dump()
+
+        new_states = journal.get_flow_states(self)
+        if new_states.keys() != old_states.keys() or self._journal_nrecords >= self.journal_maxrecords:
+            return self.pickle_dump()
+
+        nodes = {}
+        for nid, (light, heavy) in new_states.items():
+            old_light, old_heavy = old_states[nid]
+            if heavy != old_heavy:
+                return self.pickle_dump()
+            if light != old_light:
+                nodes[nid] = light
+
+        if not nodes: return 0
+
+        journal_path = os.path.join(self.workdir, self.JOURNAL_FNAME)
+        if not os.path.exists(journal_path):
+            return self.pickle_dump()
+
+        with FileLock(self.pickle_file):
+            journal.append_journal(journal_path, nodes)
+
+        self._journal_states = new_states
+        self._journal_nrecords += 1
+
         return 0
 
     def pickle_dumps(self, protocol=None):
@@ -0,0 +1,324 @@
+# coding: utf-8
+"""
+Lightweight persistence of the runtime state of a |Flow|.
+
+The full pickle database of the flow is expensive to write for large flows since it contains
+the entire object graph (inputs, managers, histories, dependencies...).
+Between two full checkpoints, the scheduler only appends the status transitions of the tasks
+to a JSON-lines journal. A JSON index with the static info needed to build the status table is
+written together with each checkpoint so that the status of the flow can be shown
+without unpickling the flow (see |FlowStatusView|).
+"""
+import os
+import sys
+import json
+import datetime
+
+from collections import OrderedDict, Counter
+from tabulate import tabulate
+from monty.termcolor import cprint, cprint_map, colored
+from pymatgen.util.io_utils import AtomicFile
+from .nodes import Status
+from .tasks import MyTimedelta
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "FlowStatusView",
+]
+
+
+def _ts(dt):
+    """Convert datetime to timestamp. None if dt is None."""
+    return None if dt is None else dt.timestamp()
+
+
+def _dt(ts):
+    """Convert timestamp to datetime. None if ts is None."""
+    return None if ts is None else datetime.datetime.fromtimestamp(ts)
+
+
+def task_light_state(task):
+    """
+    Return list with the attributes of the task that can change without
+    modifying the input or the manager: [status, returncode, start, end].
+    """
+    return [str(task.status), task.returncode, _ts(task.datetimes.start), _ts(task.datetimes.end)]
+
+
+def node_heavy_key(node):
+    """
+    Return tuple with the attributes that, if changed, require a full checkpoint of the flow.
+    These changes are usually associated to (re)launches, corrections and callbacks
+    that may modify the input files, the manager or the structure of the flow.
+    """
+    if not node.is_task:
+        return (node.finalized,)
+
+    return (node.finalized, node.num_launches, node.num_restarts, node.num_corrections,
+            node.queue_id, node.mpi_procs, node.omp_threads, float(node.mem_per_proc),
+            _ts(node.datetimes.submission))
+
+
+def get_flow_states(flow):
+    """
+    Return dictionary node_id --> (light_state, heavy_key) with the state of the nodes of the flow.
+    """
+    states = {flow.node_id: (None, node_heavy_key(flow))}
+    for work in flow:
+        states[work.node_id] = (None, node_heavy_key(work))
+        for task in work:
+            states[task.node_id] = (task_light_state(task), node_heavy_key(task))
+
+    return states
+
+
+def apply_light_state(task, state):
+    """Update the task with the light state read from the journal (callbacks are not executed)."""
+    status, returncode, start, end = state
+    old_status = task.status
+    task._status = Status.as_status(status)
+    task._update_flow_dag(old_status)
+    if returncode is not None:
+        task._returncode = returncode
+    task.datetimes.start = _dt(start)
+    task.datetimes.end = _dt(end)
+
+
+def reset_journal(filepath, token):
+    """Truncate the journal and write the header with the checkpoint token."""
+    with AtomicFile(filepath, mode="wt") as fh:
+        fh.write(json.dumps({"token": token}) + "\n")
+
+
+def append_journal(filepath, nodes):
+    """Append one record with the new light states of the tasks to the journal."""
+    line = json.dumps({"time": _ts(datetime.datetime.now()), "nodes": nodes})
+    with open(filepath, "at") as fh:
+        fh.write(line + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def read_journal(filepath, token):
+    """
+    Read the journal. Return list of dictionaries node_id --> light_state.
+    Empty list if the file does not exist or the journal does not belong to the checkpoint with this token.
+    Truncated or corrupted records at the end of the file (e.g. process killed while writing) are ignored.
+    """
+    if token is None or not os.path.exists(filepath): return []
+
+    records = []
+    with open(filepath, "rt") as fh:
+        try:
+            header = json.loads(fh.readline())
+        except ValueError:
+            return []
+        if header.get("token") != token: return []
+
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                logger.warning("Ignoring corrupted record in journal %s" % filepath)
+                break
+            records.append({int(k): v for k, v in rec["nodes"].items()})
+
+    return records
+
+
+def write_status_index(flow, filepath, token):
+    """
+    Write JSON file with the info needed to produce the status table of the flow.
+    """
+    works = []
+    for work in flow:
+        tasks = []
+        for task in work:
+            tasks.append(OrderedDict([
+                ("node_id", task.node_id),
+                ("name", os.path.basename(task.name)),
+                ("class", task.__class__.__name__),
+                ("state", task_light_state(task)),
+                ("submission", _ts(task.datetimes.submission)),
+                ("queue_id", task.queue_id),
+                ("qname", None if task.queue_id is None else str(task.qname)),
+                ("mpi_procs", task.mpi_procs),
+                ("omp_threads", task.omp_threads),
+                ("mem_gb", float(task.mem_per_proc.to("Gb"))),
+                ("num_launches", task.num_launches),
+                ("num_restarts", task.num_restarts),
+                ("num_corrections", task.num_corrections),
+            ]))
+
+        works.append(OrderedDict([
+            ("node_id", work.node_id),
+            ("repr", str(work)),
+            ("finalized", work.finalized),
+            ("tasks", tasks),
+        ]))
+
+    index = OrderedDict([
+        ("token", token),
+        ("flow", str(flow)),
+        ("workdir", flow.workdir),
+        ("works", works),
+    ])
+
+    with AtomicFile(filepath, mode="wt") as fh:
+        json.dump(index, fh)
+
+
+class FlowStatusView(object):
+    """
+    Read-only view of the status of a |Flow| built from the JSON index and the journal
+    written by the scheduler. The pickle database is not read and the status of the tasks
+    is not recomputed: the view reports the state saved in the last scheduler cycle.
+    """
+
+    def __init__(self, index, records=None):
+        self.flow_repr = index["flow"]
+        self.workdir = index["workdir"]
+        self.works = index["works"]
+
+        # Apply the journal records.
+        if records:
+            nid2task = {task["node_id"]: task for work in self.works for task in work["tasks"]}
+            for rec in records:
+                for nid, state in rec.items():
+                    if nid in nid2task: nid2task[nid]["state"] = state
+
+    @classmethod
+    def from_flowdir(cls, flowdir):
+        """
+        Build the object from the directory of the flow (or the path to the pickle database).
+        Raise FileNotFoundError if the status index does not exist e.g. flow created with an old
+        version of AbiPy or flow that has never been saved.
+        """
+        from .flows import Flow
+        if os.path.isfile(flowdir): flowdir = os.path.dirname(flowdir)
+        index_path = os.path.join(flowdir, Flow.STATUS_FNAME)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError("Cannot find status index %s" % index_path)
+
+        with open(index_path, "rt") as fh:
+            index = json.load(fh)
+
+        records = read_journal(os.path.join(flowdir, Flow.JOURNAL_FNAME), index["token"])
+        return cls(index, records=records)
+
+    def __str__(self):
+        return "%s, num_tasks=%s, all_ok=%s" % (self.flow_repr, self.num_tasks, self.all_ok)
+
+    def iflat_tasks(self):
+        """Generator producing the dictionaries with the info on the tasks."""
+        for work in self.works:
+            for task in work["tasks"]:
+                yield task
+
+    @property
+    def num_tasks(self):
+        """Total number of tasks"""
+        return sum(len(work["tasks"]) for work in self.works)
+
+    @property
+    def status_counter(self):
+        """
+        Returns a :class:`Counter` object that counts the number of tasks with
+        given status (use the string representation of the status as key).
+        """
+        return Counter(task["state"][0] for task in self.iflat_tasks())
+
+    @property
+    def all_ok(self):
+        """True if all the tasks are completed."""
+        return all(task["state"][0] == str(Status.from_string("Completed")) for task in self.iflat_tasks())
+
+    def show_summary(self, **kwargs):
+        """
+        Print a short summary with the status of the flow and a counter task_status --> number_of_tasks
+
+        Args:
+            stream: File-like object, Default: sys.stdout
+        """
+        stream = kwargs.pop("stream", sys.stdout)
+        stream.write("\n")
+        table = list(self.status_counter.items())
+        stream.write(tabulate(table, headers=["Status", "Count"]) + "\n")
+        stream.write("\n")
+        stream.write(str(self) + "\n")
+        stream.write("\n")
+
+    def show_status(self, **kwargs):
+        """
+        Report the status of the works and the status of the different tasks on the specified stream.
+        Same API as Flow.show_status but the number of warnings and comments is not available.
+
+        Args:
+            stream: File-like object, Default: sys.stdout
+            nids:  List of node identifiers. By defaults all nodes are shown
+            verbose: Verbosity level (default 0). > 0 to show only the works that are not finalized.
+        """
+        stream = kwargs.pop("stream", sys.stdout)
+        nids = kwargs.pop("nids", None)
+        nids = None if nids is None else set(nids)
+        verbose = kwargs.pop("verbose", 0)
+        now = datetime.datetime.now()
+
+        for i, work in enumerate(self.works):
+            if nids and work["node_id"] not in nids and not any(t["node_id"] in nids for t in work["tasks"]):
+                continue
+            print("", file=stream)
+            cprint_map("Work #%d: %s, Finalized=%s" % (i, work["repr"], work["finalized"]),
+                       cmap={"True": "green"}, file=stream)
+            if verbose == 0 and work["finalized"]:
+                print("  Finalized works are not shown. Use verbose > 0 to force output.", file=stream)
+                continue
+
+            headers = ["Task", "Status", "Queue", "MPI|Omp|Gb",
+                       "Warn|Com", "Class", "Sub|Rest|Corr", "Time",
+                       "Node_ID"]
+            table = []
+            tot_num_errors = 0
+            for task in work["tasks"]:
+                if nids and work["node_id"] not in nids and task["node_id"] not in nids: continue
+                task_name = task["name"]
+                status, _, start, end = task["state"]
+                status = Status.as_status(status)
+
+                # Get time info (run-time or time in queue or None)
+                stime = None
+                if start is not None:
+                    stime = str(MyTimedelta.as_timedelta((_dt(end) if end is not None else now) - _dt(start))) + "R"
+                elif task["submission"] is not None:
+                    stime = str(MyTimedelta.as_timedelta(now - _dt(task["submission"]))) + "Q"
+
+                para_info = '{:>4}|{:>3}|{:>3}'.format(*map(str, (
+                   task["mpi_procs"], task["omp_threads"], "%.1f" % task["mem_gb"])))
+
+                task_info = list(map(str, [task["class"],
+                                 (task["num_launches"], task["num_restarts"], task["num_corrections"]),
+                                 stime, task["node_id"]]))
+
+                qinfo = "None"
+                if task["queue_id"] is not None:
+                    qname = str(task["qname"])
+                    if not verbose:
+                        qname = qname[:min(5, len(qname))]
+                    qinfo = str(task["queue_id"]) + "@" + qname
+
+                if status.is_critical:
+                    tot_num_errors += 1
+                    task_name = colored(task_name, "red")
+
+                table.append([task_name, status.colored, qinfo, para_info, "NA|NA"] + task_info)
+
+            print(tabulate(table, headers=headers, tablefmt="grid"), file=stream)
+            if tot_num_errors:
+                cprint("Total number of errors: %d" % tot_num_errors, "red", file=stream)
+            print("", file=stream)
+
+        if self.all_ok:
+            cprint("\nall_ok reached\n", "green", file=stream)
@@ -5,6 +5,7 @@
 
 import os
 import time
+import asyncio
 import ruamel.yaml as yaml
 import pickle
 
@@ -224,8 +225,8 @@ class PyLauncher(object):
                     do_exit = True
                     break
 
-        # Update the database.
-        self.flow.pickle_dump()
+        # Update the database (only the status transitions if nothing has been launched).
+        self.flow.journal_dump()
 
         return num_launched
 
@@ -234,12 +235,7 @@ class PyLauncher(object):
         Return the list of tasks that can be submitted.
         Empty list if no task has been found.
         """
-        tasks_to_run = []
-
-        for work in self.flow:
-            tasks_to_run.extend(work.fetch_alltasks_to_run())
-
-        return tasks_to_run
+        return self.flow.fetch_alltasks_to_run()
 
 
 class PyFlowSchedulerError(Exception):
@@ -312,6 +308,16 @@ class PyFlowScheduler(object):
                 completed successfully. (DEFAULT: "no")
             killjobs_if_errors: "yes" if the scheduler should try to kill all the runnnig jobs
                 before exiting due to an error. (DEFAULT: "yes")
+            use_asyncio: "yes" to run the scheduler in an asyncio event loop instead of apscheduler.
+                The resource manager is polled while checking the status of the tasks, jobs are submitted
+                concurrently and the scheduler wakes up before the end of the interval if the
+                error/queue files of the submitted jobs change or a job started by the shell exits.
+                (DEFAULT: "no")
+            max_concurrency: Maximum number of jobs submitted concurrently in asyncio mode. (DEFAULT: 8)
+            poll_s: Seconds between two checks of the files of the submitted jobs in asyncio mode (DEFAULT: 5)
+            backoff_s: In asyncio mode, the submissions to a qadapter that raised an exception are suspended
+                for backoff_s seconds. The delay is doubled after each failure up to max_backoff_s. (DEFAULT: 60)
+            max_backoff_s: Maximum delay for the backoff of a qadapter (DEFAULT: 3600)
         """
         # Options passed to the scheduler.
         self.sched_options = AttrDict(
@@ -343,6 +349,12 @@ class PyFlowScheduler(object):
         self.rmflow = as_bool(kwargs.pop("rmflow", False))
         self.killjobs_if_errors = as_bool(kwargs.pop("killjobs_if_errors", True))
 
+        self.use_asyncio = as_bool(kwargs.pop("use_asyncio", False))
+        self.max_concurrency = int(kwargs.pop("max_concurrency", 8))
+        self.poll_s = float(kwargs.pop("poll_s", 5))
+        self.backoff_s = float(kwargs.pop("backoff_s", 60))
+        self.max_backoff_s = float(kwargs.pop("max_backoff_s", 3600))
+
         self.customer_service_dir = kwargs.pop("customer_service_dir", None)
         if self.customer_service_dir is not None:
             self.customer_service_dir = Directory(self.customer_service_dir)
@@ -351,10 +363,19 @@ class PyFlowScheduler(object):
         if kwargs:
             raise self.Error("Unknown arguments %s" % kwargs)
 
-        if not has_apscheduler:
+        # qadapter key --> (time.time() before which submissions are suspended, current delay). asyncio mode only.
+        self._qad_backoff = {}
+        # Set to True by shutdown in asyncio mode.
+        self._stopped = False
+
+        if self.use_asyncio:
+            # apscheduler is not needed.
+            self.sched = None
+
+        elif not has_apscheduler:
             raise RuntimeError("Install apscheduler with pip")
 
-        if has_sched_v3:
+        elif has_sched_v3:
             logger.warning("Using scheduler v>=3.0.0")
             from apscheduler.schedulers.blocking import BlockingScheduler
             self.sched = BlockingScheduler()
@@ -527,6 +548,9 @@ class PyFlowScheduler(object):
         self.history.append("Started on %s" % time.asctime())
         self.start_time = time.time()
 
+        if self.use_asyncio:
+            return self._start_asyncio()
+
         if not has_apscheduler:
             raise RuntimeError("Install apscheduler with pip")
 
@@ -560,6 +584,25 @@ class PyFlowScheduler(object):
             self.flow.pickle_dump()
             return -1
 
+    def _get_njobs_in_queue(self):
+        """Return the number of jobs in the queue."""
+        flow = self.flow
+        if self.contact_resource_manager: # and flow.TaskManager.qadapter.QTYPE == "shell":
+            # This call is expensive and therefore it's optional (must be activate in manager.yml)
+            nqjobs = flow.get_njobs_in_queue()
+            if nqjobs is None:
+                nqjobs = 0
+                if flow.manager.has_queue:
+                    logger.warning('Cannot get njobs_inqueue')
+        else:
+            # Here we just count the number of tasks in the flow who are running.
+            # This logic breaks down if there are multiple schedulers runnig
+            # but it's easy to implement without having to contact the resource manager.
+            nqjobs = (len(list(flow.iflat_tasks(status=flow.S_RUN))) +
+                      len(list(flow.iflat_tasks(status=flow.S_SUB))))
+
+        return nqjobs
+
     def _runem_all(self):
         """
         This function checks the status of all tasks,
@@ -576,20 +619,7 @@ class PyFlowScheduler(object):
             for work in flow:
                 work.set_manager(new_manager)
 
-        nqjobs = 0
-        if self.contact_resource_manager: # and flow.TaskManager.qadapter.QTYPE == "shell":
-            # This call is expensive and therefore it's optional (must be activate in manager.yml)
-            nqjobs = flow.get_njobs_in_queue()
-            if nqjobs is None:
-                nqjobs = 0
-                if flow.manager.has_queue:
-                    logger.warning('Cannot get njobs_inqueue')
-        else:
-            # Here we just count the number of tasks in the flow who are running.
-            # This logic breaks down if there are multiple schedulers runnig
-            # but it's easy to implement without having to contact the resource manager.
-            nqjobs = (len(list(flow.iflat_tasks(status=flow.S_RUN))) +
-                      len(list(flow.iflat_tasks(status=flow.S_SUB))))
+        nqjobs = self._get_njobs_in_queue()
 
         if nqjobs >= self.max_njobs_inqueue:
             print("Too many jobs in the queue: %s. No job will be submitted." % nqjobs)
@@ -623,7 +653,7 @@ class PyFlowScheduler(object):
                     max_nlaunch -= 1
                     if max_nlaunch == 0:
                         logger.info("Restart: too many jobs in the queue, returning")
-                        flow.pickle_dump()
+                        flow.journal_dump()
                         return
 
             except task.RestartError:
@@ -640,8 +670,12 @@ class PyFlowScheduler(object):
         nfixed = flow.fix_abicritical()
         if nfixed: print("Fixed %d AbiCritical error(s)" % nfixed)
 
-        # update database
-        flow.pickle_dump()
+        # update database. The manager is not tracked by the journal so we need a full dump
+        # if the manager has been changed at run-time.
+        if self.use_dynamic_manager:
+            flow.pickle_dump()
+        else:
+            flow.journal_dump()
 
         # Submit the tasks that are ready.
         try:
@@ -679,6 +713,197 @@ class PyFlowScheduler(object):
 
             self.shutdown(msg="Exception raised in callback!\n" + s)
 
+    def _start_asyncio(self):
+        """Run the scheduler in an asyncio event loop. Same return values as start."""
+        errors = self.flow.look_before_you_leap()
+        if errors:
+            self.exceptions.append(errors)
+            return 1
+
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self._async_main(loop))
+
+        except KeyboardInterrupt:
+            self.shutdown(msg="KeyboardInterrupt from user")
+            if ask_yesno("Do you want to cancel all the jobs in the queue? [Y/n]"):
+                print("Number of jobs cancelled:", self.flow.cancel())
+
+            self.flow.pickle_dump()
+            return -1
+
+        finally:
+            loop.close()
+
+    async def _async_main(self, loop):
+        """Main loop of the scheduler in asyncio mode."""
+        from concurrent.futures import ThreadPoolExecutor
+        interval = timedelta(**self.sched_options).total_seconds()
+
+        with ThreadPoolExecutor(max_workers=max(self.max_concurrency, 2)) as executor:
+            # Try to run the job immediately. If something goes wrong return without starting the loop.
+            await self._async_runem_all(loop, executor)
+
+            if self.exceptions:
+                self.cleanup()
+                self.send_email(msg="Error while trying to run the flow for the first time!\n %s" % self.exceptions)
+                return 1
+
+            while not self._stopped:
+                await self._async_wait(loop, executor, interval)
+                try:
+                    await self._async_runem_all(loop, executor)
+                    self._check_flow_state()
+                except Exception:
+                    # All exceptions raised here will trigger the shutdown!
+                    s = straceback()
+                    self.exceptions.append(s)
+                    self.shutdown(msg="Exception raised in callback!\n" + s)
+
+        return 0
+
+    async def _async_runem_all(self, loop, executor):
+        """
+        asyncio version of _runem_all: the resource manager is contacted while the status of the
+        tasks is checked and the jobs are submitted concurrently (at most max_concurrency jobs).
+        """
+        excs = []
+        flow = self.flow
+
+        # Allow to change the manager at run-time
+        if self.use_dynamic_manager:
+            from pymatgen.io.abinit.tasks import TaskManager
+            new_manager = TaskManager.from_user_config()
+            for work in flow:
+                work.set_manager(new_manager)
+
+        if self.contact_resource_manager:
+            # Wait for the resource manager in a thread while we check the status of the tasks.
+            nqjobs = loop.run_in_executor(executor, self._get_njobs_in_queue)
+            flow.check_status(show=False)
+            nqjobs = await nqjobs
+        else:
+            nqjobs = self._get_njobs_in_queue()
+            flow.check_status(show=False)
+
+        if nqjobs >= self.max_njobs_inqueue:
+            print("Too many jobs in the queue: %s. No job will be submitted." % nqjobs)
+            return
+
+        if self.max_nlaunches == -1:
+            max_nlaunch = self.max_njobs_inqueue - nqjobs
+        else:
+            max_nlaunch = min(self.max_njobs_inqueue - nqjobs, self.max_nlaunches)
+
+        if self.max_ncores_used is not None and flow.ncores_allocated > self.max_ncores_used:
+            print("Cannot exceed max_ncores_used %s" % self.max_ncores_used)
+            return
+
+        # Try to restart the unconverged tasks
+        for task in flow.unconverged_tasks:
+            try:
+                logger.info("Flow will try restart task %s" % task)
+                fired = task.restart()
+                if fired:
+                    self.nlaunch += 1
+                    max_nlaunch -= 1
+                    if max_nlaunch == 0:
+                        logger.info("Restart: too many jobs in the queue, returning")
+                        flow.journal_dump()
+                        return
+
+            except task.RestartError:
+                excs.append(straceback())
+
+        if self.fix_qcritical:
+            nfixed = flow.fix_queue_critical()
+            if nfixed: print("Fixed %d QCritical error(s)" % nfixed)
+
+        nfixed = flow.fix_abicritical()
+        if nfixed: print("Fixed %d AbiCritical error(s)" % nfixed)
+
+        if self.use_dynamic_manager:
+            flow.pickle_dump()
+        else:
+            flow.journal_dump()
+
+        # Submit the tasks that are ready, skipping the qadapters in backoff.
+        now = time.time()
+        tasks = [task for task in flow.fetch_alltasks_to_run()
+                 if self._qad_backoff.get(self._qad_key(task), (0, 0))[0] <= now]
+        if max_nlaunch > 0: tasks = tasks[:max_nlaunch]
+
+        if tasks:
+            results = await asyncio.gather(*[loop.run_in_executor(executor, task.start) for task in tasks],
+                                           return_exceptions=True)
+            nlaunch, ok_keys, failed_keys = 0, set(), set()
+            for task, fired in zip(tasks, results):
+                if isinstance(fired, Exception):
+                    excs.append("Exception while starting %s:\n%s" % (repr(task), str(fired)))
+                    failed_keys.add(self._qad_key(task))
+                else:
+                    ok_keys.add(self._qad_key(task))
+                    nlaunch += fired
+
+            for key in ok_keys - failed_keys:
+                self._qad_backoff.pop(key, None)
+
+            for key in failed_keys:
+                delay = min(2 * self._qad_backoff.get(key, (0, self.backoff_s / 2))[1], self.max_backoff_s)
+                self._qad_backoff[key] = (time.time() + delay, delay)
+                logger.warning("Submission to qadapter %s suspended for %.1f s" % (str(key), delay))
+
+            self.nlaunch += nlaunch
+            if nlaunch:
+                cprint("[%s] Number of launches: %d" % (time.asctime(), nlaunch), "yellow")
+
+            flow.journal_dump()
+
+        flow.show_status()
+
+        if excs:
+            logger.critical("*** Scheduler exceptions:\n *** %s" % "\n".join(excs))
+            self.exceptions.extend(excs)
+
+    @staticmethod
+    def _qad_key(task):
+        """Key used to identify the qadapter of the task."""
+        qad = task.manager.qadapter
+        return (qad.QTYPE, qad.qname)
+
+    async def _async_wait(self, loop, executor, interval):
+        """
+        Sleep for interval seconds. Return before if the files signalling the end or the failure of
+        the submitted jobs change (mpiabort, stderr, queue files and creation of the output file)
+        or if a job started by the shell exits.
+        """
+        tasks = list(self.flow.iflat_tasks(status=self.flow.S_SUB)) + \
+                list(self.flow.iflat_tasks(status=self.flow.S_RUN))
+
+        def get_signature():
+            sig = []
+            for task in tasks:
+                stats = task.stat_status_files()
+                sig.append(stats[:4] + (stats[4] is not None,))
+            return sig
+
+        def has_exited(task):
+            process = getattr(task, "_process", None)
+            return process is not None and hasattr(process, "poll") and process.poll() is not None
+
+        running_shell = [task for task in tasks if not has_exited(task)]
+        sig0 = await loop.run_in_executor(executor, get_signature) if tasks else None
+        end = time.time() + interval
+        while not self._stopped:
+            remaining = end - time.time()
+            if remaining <= 0: return False
+            await asyncio.sleep(min(self.poll_s, remaining))
+            if not tasks: continue
+            if any(has_exited(task) for task in running_shell): return True
+            if await loop.run_in_executor(executor, get_signature) != sig0: return True
+
+        return False
+
     def _callback(self):
         """The actual callback."""
         if self.debug:
@@ -687,6 +912,13 @@ class PyFlowScheduler(object):
 
         self._runem_all()
 
+        return self._check_flow_state()
+
+    def _check_flow_state(self):
+        """
+        Check the state of the flow after a cycle of the scheduler and call shutdown
+        if the flow is completed or if something went wrong.
+        """
         all_ok = self.flow.all_ok
         #if all_ok: all_ok = self.flow.on_all_ok()
 
@@ -838,6 +1070,11 @@ class PyFlowScheduler(object):
             # Shutdown the scheduler thus allowing the process to exit.
             logger.debug('This should be the shutdown of the scheduler')
 
+            if self.sched is None:
+                # asyncio mode: the event loop exits when this flag is set.
+                self._stopped = True
+                return
+
             # Unschedule all the jobs before calling shutdown
             #self.sched.print_jobs()
             if not has_sched_v3:
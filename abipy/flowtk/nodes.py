@@ -719,6 +719,7 @@ class Node(metaclass=abc.ABCMeta):
         # Add the dependencies to the node and merge possibly duplicated keys.
         self._deps.extend(deps)
         self.merge_deps()
+        self._invalidate_flow_dag()
 
         if self.is_work:
             # The task in the work should inherit the same dependency.
@@ -757,12 +758,21 @@ class Node(metaclass=abc.ABCMeta):
         assert all(isinstance(d, Dependency) for d in deps)
 
         self._deps = [d for d in self._deps if d not in deps]
+        self._invalidate_flow_dag()
 
         if self.is_work:
             # remove the same list of dependencies from the task in the work
             for task in self:
                 task.remove_deps(deps)
 
+    def _invalidate_flow_dag(self):
+        """The dependency graph of the flow must be rebuilt after a change of the dependencies."""
+        try:
+            flow = self if self.is_flow else self.flow
+            flow._dag = None
+        except AttributeError:
+            pass
+
     @property
     def deps_status(self):
         """Returns a list with the status of the dependencies."""
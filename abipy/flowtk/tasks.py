@@ -1817,6 +1817,7 @@ class Task(Node, metaclass=abc.ABCMeta):
             raise ValueError("Trying to lock a task with status %s" % self.status)
 
         self._status = self.S_LOCKED
+        self._update_flow_dag(self.S_INIT)
         self.history.info("Locked by node %s", source_node)
 
     def unlock(self, source_node, check_status=True):
@@ -1829,9 +1830,19 @@ class Task(Node, metaclass=abc.ABCMeta):
             raise RuntimeError("Trying to unlock a task with status %s" % self.status)
 
         self._status = self.S_READY
+        self._update_flow_dag(self.S_LOCKED)
         if check_status: self.check_status()
         self.history.info("Unlocked by %s", source_node)
 
+    def _update_flow_dag(self, old_status):
+        """Update the dependency-graph index of the flow (if any) after a change of the status."""
+        try:
+            dag = self.work.flow._dag
+        except AttributeError:
+            return
+        if dag is not None:
+            dag.on_status_changed(self, old_status)
+
     #@check_spectator
     def set_status(self, status, msg):
         """
@@ -1856,10 +1867,12 @@ class Task(Node, metaclass=abc.ABCMeta):
         status = Status.as_status(status)
 
         changed = True
-        if hasattr(self, "_status"):
-            changed = (status != self._status)
+        old_status = getattr(self, "_status", None)
+        if old_status is not None:
+            changed = (status != old_status)
 
         self._status = status
+        if changed: self._update_flow_dag(old_status)
 
         if status == self.S_RUN:
             # Set datetimes.start when the task enters S_RUN
@@ -1905,6 +1918,53 @@ class Task(Node, metaclass=abc.ABCMeta):
 
         return status
 
+    def stat_status_files(self):
+        """
+        Return tuple with the (mtime, size) of the files analyzed by `check_status`. None if file does not exist.
+        """
+        stats = []
+        for f in (self.mpiabort_file, self.stderr_file, self.qerr_file, self.qout_file,
+                  self.output_file, self.log_file):
+            try:
+                st = os.stat(f.path)
+                stats.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+
+        return tuple(stats)
+
+    def check_status_if_changed(self, stats=None):
+        """
+        Call `check_status` only if the files of the task or the attributes affecting
+        the result of `check_status` changed since the previous call.
+        Submitted and running tasks whose output file did not change for more than
+        ``policy.frozen_timeout`` seconds are always checked so that frozen jobs are detected.
+
+        Args:
+            stats: Output of stat_status_files computed by the caller (e.g. in a thread pool).
+                If None, the files are analyzed here.
+
+        Return: The status of the task.
+        """
+        if stats is None:
+            stats = self.stat_status_files()
+
+        fingerprint = (self.workdir, int(self.status), self.returncode, self.num_launches) + stats
+        if fingerprint == getattr(self, "_status_fingerprint", None):
+            # stats[4] is the (mtime_ns, size) of the output file.
+            out_stat = stats[4]
+            maybe_frozen = (self.status in (self.S_SUB, self.S_RUN) and out_stat is not None and
+                            time.time() - out_stat[0] * 1e-9 > self.manager.policy.frozen_timeout)
+            if not maybe_frozen: return self.status
+
+        status = self.check_status()
+
+        # Recompute the fingerprint since the status changed and callbacks might have renamed files.
+        self._status_fingerprint = (self.workdir, int(self.status), self.returncode,
+                                    self.num_launches) + self.stat_status_files()
+
+        return status
+
     def check_status(self):
         """
         This function checks the status of the task by inspecting the output and the
@@ -2180,6 +2240,18 @@ class Task(Node, metaclass=abc.ABCMeta):
         self.make_links()
         self.setup()
 
+    @property
+    def events_parser(self):
+        """
+        :class:`EventsParser` used to analyze the output files. The parser is saved with the task
+        and remembers the offset reached in each file so that only the new data is parsed.
+        """
+        try:
+            return self._events_parser
+        except AttributeError:
+            self._events_parser = events.EventsParser()
+            return self._events_parser
+
     def get_event_report(self, source="log"):
         """
         Analyzes the main logfile of the calculation for possible Errors or Warnings.
@@ -2197,7 +2269,7 @@ class Task(Node, metaclass=abc.ABCMeta):
             "output": self.output_file,
             "log": self.log_file}[source]
 
-        parser = events.EventsParser()
+        parser = self.events_parser
 
         if not ofile.exists:
             if not self.mpiabort_file.exists:
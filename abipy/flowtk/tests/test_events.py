@@ -62,6 +62,33 @@ class EventsParserTest(AbipyTest):
         assert len(report.get_events_of_type(events.AbinitYamlWarning)) == 1
         assert len(report.get_events_of_type(events.AbinitYamlError)) == 1
 
+    def test_incremental_parsing(self):
+        """Parsing a log file while it is being written."""
+        with open(ref_file("mgb2_nscf.log"), "rb") as fh:
+            data = fh.read()
+        ref_report = events.EventsParser(incremental=False).parse(ref_file("mgb2_nscf.log"))
+
+        tmp_file = self.get_tmpname(text=True)
+        parser = events.EventsParser()
+        parser.chunk_size = 4096
+        with open(tmp_file, "wb") as fh:
+            half = len(data) // 2
+            for chunk in (data[:half], data[half:half + 10], data[half + 10:]):
+                fh.write(chunk)
+                fh.flush()
+                report = parser.parse(tmp_file)
+
+        assert report.run_completed
+        assert [(e.lineno, e.message) for e in report] == [(e.lineno, e.message) for e in ref_report]
+        assert report.num_warnings == 2
+        self.serialize_with_pickle(parser, test_eq=False)
+
+        # File is rewritten from scratch.
+        with open(tmp_file, "wb") as fh:
+            fh.write(b"Empty log file\n")
+        report = parser.parse(tmp_file)
+        assert len(report) == 0 and not report.run_completed
+
 
 class EventHandlersTest(AbipyTest):
     def test_events(self):
@@ -1,5 +1,6 @@
 # coding: utf-8
 import os
+import time
 import tempfile
 import shutil
 import abipy.data as abidata
@@ -309,6 +310,124 @@ class FlowTest(FlowUnitTest):
 
 
 
+class TestFlowCheckStatus(FlowUnitTest):
+
+    def test_check_status_if_changed(self):
+        """Testing check_status with file fingerprints."""
+        flow = Flow(workdir=self.workdir, manager=self.manager)
+        work = Work()
+        for i in range(12):
+            work.register_scf_task(self.fake_input)
+        flow.register_work(work)
+        flow.build()
+
+        ncalls = {}
+        def counted(task):
+            check_status = task.check_status
+            def wrapper():
+                ncalls[task.node_id] = ncalls.get(task.node_id, 0) + 1
+                return check_status()
+            return wrapper
+
+        for task in flow.iflat_tasks():
+            task.check_status = counted(task)
+
+        # check_status is not called if the files and the status do not change.
+        # Note that the first call changes the status from Initialized to Ready and uses the thread pool.
+        assert len(flow[0]) > flow.check_status_nthreads
+        flow.check_status()
+        assert all(task.status == task.S_READY for task in flow.iflat_tasks())
+        flow.check_status()
+        ncalls_ready = ncalls.copy()
+        flow.check_status()
+        assert ncalls == ncalls_ready and len(ncalls) == len(flow[0])
+
+        # New file or status change --> check_status is called again.
+        task0, task1 = flow[0][0], flow[0][1]
+        with open(task0.stderr_file.path, "wt") as fh:
+            fh.write("hello")
+        task1.set_status(task1.S_SUB, msg="Submitted")
+        flow.check_status_nthreads = 1
+        flow.check_status()
+        assert ncalls[task0.node_id] == ncalls_ready[task0.node_id] + 1
+        assert ncalls[task1.node_id] == ncalls_ready[task1.node_id] + 1
+        assert sum(ncalls.values()) == sum(ncalls_ready.values()) + 2
+
+        # Running task whose output file does not change: the frozen check is still performed.
+        task2 = flow[0][2]
+        task2.set_status(task2.S_RUN, msg="Running")
+        mtime = time.time() - 100
+        for path in (task2.output_file.path, task2.log_file.path):
+            with open(path, "wt") as fh:
+                fh.write("hello")
+            os.utime(path, (mtime, mtime))
+        flow.check_status()
+        assert task2.status == task2.S_RUN
+        ncalls_run = ncalls[task2.node_id]
+        flow.check_status()
+        assert ncalls[task2.node_id] == ncalls_run
+        # Files did not change but the output file is now older than frozen_timeout.
+        task2.manager.policy.frozen_timeout = 50
+        flow.check_status()
+        assert ncalls[task2.node_id] == ncalls_run + 1
+        assert task2.status == task2.S_ERROR
+
+
+class TestFlowDag(FlowUnitTest):
+
+    def test_dag(self):
+        """Testing dependency-graph index of the flow."""
+        flow = Flow(workdir=self.workdir, manager=self.manager)
+        work0 = Work()
+        t0 = work0.register_scf_task(self.fake_input)
+        t1 = work0.register_scf_task(self.fake_input)
+        flow.register_work(work0)
+        work1 = Work()
+        t2 = work1.register_scf_task(self.fake_input, deps={t0: "DEN"})
+        t3 = work1.register_scf_task(self.fake_input, deps={t2: "WFK"})
+        flow.register_work(work1)
+        # Dependency on a work is expanded into its tasks.
+        work2 = flow.register_task(self.fake_input, deps={work0: "DEN"})
+        t4 = work2[0]
+
+        # Before allocate, the index is rebuilt at each call.
+        assert not flow.dag.is_linked and flow._dag is None
+        flow.allocate()
+        dag = flow.dag
+        assert dag.is_linked and flow.dag is dag
+        assert dag.parents[t4.node_id] == {t0.node_id, t1.node_id}
+        assert dag.children[t0.node_id] == {t2.node_id, t4.node_id}
+
+        def legacy_runnables():
+            return [task for work in flow for task in work.fetch_alltasks_to_run()]
+
+        assert flow.fetch_alltasks_to_run() == legacy_runnables() == [t0, t1]
+
+        t0.set_status(t0.S_SUB, msg="")
+        assert list(flow.iflat_tasks(status=flow.S_SUB)) == [t0]
+        assert flow.fetch_alltasks_to_run() == legacy_runnables() == [t1]
+
+        # Completed tasks release their children. Use _status to avoid callbacks.
+        for task in (t0, t1):
+            old_status, task._status = task.status, task.S_OK
+            task._update_flow_dag(old_status)
+        assert flow.fetch_alltasks_to_run() == legacy_runnables() == [t2, t4]
+        assert flow.dag is dag
+
+        # Deadlocks include the tasks that depend indirectly on the errored task.
+        t2.set_status(t2.S_ERROR, msg="")
+        assert flow.errored_tasks == {t2}
+        g = flow.find_deadlocks()
+        assert g.deadlocked == [t3]
+        assert g.runnables == [t4] and not g.running
+
+        # New dependencies invalidate the index.
+        t4.add_deps({t3: "WFK"})
+        assert flow._dag is None
+        assert flow.fetch_alltasks_to_run() == legacy_runnables() == []
+        assert flow.find_deadlocks().deadlocked == [t3, t4]
+
+
 class TestFlowInSpectatorMode(FlowUnitTest):
 
     def test_spectator(self):
@@ -366,6 +485,72 @@ class TestFlowInSpectatorMode(FlowUnitTest):
         #with self.assertRaises(task.SpectatorError): task._on_ok()
 
 
+class TestFlowJournal(FlowUnitTest):
+
+    def test_journal_dump(self):
+        """Testing journal_dump and FlowStatusView."""
+        import datetime
+        from io import StringIO
+        from abipy.flowtk.journal import FlowStatusView
+        flow = Flow(workdir=self.workdir, manager=self.manager)
+        work = Work()
+        work.register_scf_task(self.fake_input)
+        work.register_scf_task(self.fake_input)
+        flow.register_work(work)
+        flow.build_and_pickle_dump()
+
+        journal_path = os.path.join(flow.workdir, flow.JOURNAL_FNAME)
+        assert os.path.exists(os.path.join(flow.workdir, flow.STATUS_FNAME))
+        token = flow._journal_token
+
+        # Nothing changed --> nothing is written.
+        assert flow.journal_dump() == 0
+        with open(journal_path) as fh:
+            assert len(fh.readlines()) == 1
+
+        # Status transition --> one record is appended and the pickle file is not touched.
+        pickle_mtime = os.stat(flow.pickle_file).st_mtime_ns
+        task = flow[0][1]
+        task._status = task.S_OK
+        task.datetimes.start = datetime.datetime(2020, 1, 1, 10, 0)
+        task.datetimes.end = datetime.datetime(2020, 1, 1, 11, 30)
+        assert flow.journal_dump() == 0
+        assert flow._journal_token == token and flow._journal_nrecords == 1
+        assert os.stat(flow.pickle_file).st_mtime_ns == pickle_mtime
+        with open(journal_path) as fh:
+            assert len(fh.readlines()) == 2
+
+        # The status view does not unpickle the flow.
+        view = FlowStatusView.from_flowdir(flow.workdir)
+        assert view.num_tasks == 2 and not view.all_ok
+        assert view.status_counter[str(task.S_OK)] == 1
+        stream = StringIO()
+        view.show_status(stream=stream, verbose=1)
+        assert "1:30:00R" in stream.getvalue()
+        view.show_summary(stream=StringIO())
+
+        # The journal is replayed by pickle_load.
+        same_flow = Flow.pickle_load(flow.workdir)
+        same_task = same_flow[0][1]
+        assert same_task.status == same_task.S_OK
+        assert same_task.datetimes.end == task.datetimes.end
+        assert same_flow._journal_nrecords == 1
+
+        # Changes that may affect the input trigger a new checkpoint.
+        task.num_restarts += 1
+        assert flow.journal_dump() == 0
+        assert flow._journal_token != token and flow._journal_nrecords == 0
+        same_flow = Flow.pickle_load(flow.workdir)
+        assert same_flow[0][1].num_restarts == 1
+        assert same_flow[0][1].status == task.S_OK
+
+        # Records of a previous checkpoint are ignored.
+        with open(journal_path, "wt") as fh:
+            fh.write('{"token": "foo"}\n{"time": 0, "nodes": {"%d": ["Error", 0, null, null]}}\n' % task.node_id)
+        same_flow = Flow.pickle_load(flow.workdir)
+        assert same_flow[0][1].status == task.S_OK
+
+
 class TestBatchLauncher(FlowUnitTest):
 
     def test_batchlauncher(self):
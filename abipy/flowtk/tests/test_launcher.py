@@ -1,9 +1,36 @@
 # coding: utf-8
 
 import unittest
+import asyncio
+import shutil
+import abipy.data as abidata
+import abipy.flowtk as flowtk
 
+from concurrent.futures import ThreadPoolExecutor
 from abipy.core.testing import AbipyTest
-from abipy.flowtk.launcher import ScriptEditor
+from abipy.abio.factories import gs_input
+from abipy.flowtk import mocks
+from abipy.flowtk.tasks import ScfTask
+from abipy.flowtk.launcher import ScriptEditor, PyFlowScheduler
+
+
+MANAGER = """\
+qadapters:
+    - priority: 1
+      queue: {qtype: shell, qname: localhost}
+      job: {mpi_runner: mpirun}
+      limits: {timelimit: "1:00:00", max_cores: 2}
+      hardware: {num_nodes: 1, sockets_per_node: 1, cores_per_socket: 2, mem_per_node: 4 Gb}
+"""
+
+
+class ScfTaskFailingStart(ScfTask):
+    """A Task whose start method always raises."""
+    num_calls = 0
+
+    def start(self, **kwargs):
+        ScfTaskFailingStart.num_calls += 1
+        raise RuntimeError("Cannot submit")
 
 
 class ScriptEditorTest(AbipyTest):
@@ -18,3 +45,67 @@ class ScriptEditorTest(AbipyTest):
         se.declare_vars({"FOO1": "BAR1"})
         se.load_modules(["module1", "module2"])
         print(se.get_script_str())
+
+
+class AsyncioSchedulerTest(AbipyTest):
+
+    def make_flow(self):
+        gsinp = gs_input(abidata.structure_from_cif("si.cif"), pseudos=abidata.pseudos("14si.pspnc"), ecut=4)
+        flow = flowtk.Flow.temporary_flow(manager=flowtk.TaskManager.from_string(MANAGER))
+        work = flowtk.Work()
+        t0 = work.register_scf_task(gsinp)
+        t1 = work.register_scf_task(gsinp)
+        t2 = work.register_scf_task(gsinp, deps={t0: "DEN"})
+        flow.register_work(work)
+        flow.allocate()
+        self.addCleanup(shutil.rmtree, flow.workdir, True)
+        return flow
+
+    def test_asyncio_scheduler(self):
+        """Testing PyFlowScheduler with use_asyncio."""
+        flow = self.make_flow()
+        t0, t1, t2 = flow[0]
+        for task in (t0, t1):
+            mocks.change_task_start(task, mocked_status="Error")
+
+        sched = PyFlowScheduler(seconds=0.1, poll_s=0.05, use_asyncio=True, max_num_abierrs=10)
+        assert sched.sched is None
+        sched.add_flow(flow)
+        assert sched.start() == 0
+        # Both independent tasks have been submitted in the first cycle and the scheduler
+        # detected the deadlock of the dependent task.
+        assert sched._stopped
+        assert sched.nlaunch == 2
+        assert t0.status == t1.status == flow.S_ERROR
+        assert t2.status == flow.S_READY or t2.status == flow.S_INIT
+
+    def test_qadapter_backoff(self):
+        """Testing the backoff of the qadapters in asyncio mode."""
+        flow = self.make_flow()
+        t0 = flow[0][0]
+        t0.__class__ = ScfTaskFailingStart
+        mocks.change_task_start(flow[0][1], mocked_status="Error")
+
+        sched = PyFlowScheduler(seconds=10, use_asyncio=True, backoff_s=100, max_backoff_s=150)
+        sched.add_flow(flow)
+        loop = asyncio.new_event_loop()
+        try:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                ScfTaskFailingStart.num_calls = 0
+                loop.run_until_complete(sched._async_runem_all(loop, executor))
+                assert ScfTaskFailingStart.num_calls == 1
+                assert sched.num_excs == 1
+                key = ("shell", "localhost")
+                assert sched._qad_backoff[key][1] == 100
+
+                # The qadapter is in backoff: t0 is not submitted again.
+                loop.run_until_complete(sched._async_runem_all(loop, executor))
+                assert ScfTaskFailingStart.num_calls == 1
+
+                # Backoff expired: the delay is doubled up to max_backoff_s.
+                sched._qad_backoff[key] = (0, 100)
+                loop.run_until_complete(sched._async_runem_all(loop, executor))
+                assert ScfTaskFailingStart.num_calls == 2
+                assert sched._qad_backoff[key][1] == 150
+        finally:
+            loop.close()
@@ -768,13 +768,19 @@ class Work(BaseWork, NodeContainer):
         else:
             return status_list
 
-    def check_status(self):
-        """Check the status of the tasks."""
-        # Recompute the status of the tasks
+    def check_status(self, stats=None):
+        """
+        Check the status of the tasks.
+
+        Args:
+            stats: Optional dictionary node_id --> output of Task.stat_status_files.
+                Used by the flow to stat the files in parallel.
+        """
+        # Recompute the status of the tasks whose files changed since the last check.
         # Ignore OK and LOCKED tasks.
         for task in self:
             if task.status in (task.S_OK, task.S_LOCKED): continue
-            task.check_status()
+            task.check_status_if_changed(stats=None if stats is None else stats.get(task.node_id))
 
         # Take into account possible dependencies. Use a list instead of generators
         for task in self:
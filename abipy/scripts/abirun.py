@@ -465,6 +465,9 @@ def get_parser(with_epilog=False):
         help="Enter an infinite loop and delay execution for the given number of seconds. (default: 5 secs).")
     p_status.add_argument('-s', '--summary', default=False, action="store_true",
         help="Print short version with status counters.")
+    p_status.add_argument('--fast', default=False, action="store_true",
+        help=("Show the status saved by the scheduler in the last cycle without unpickling the flow. "
+              "Much faster for large flows but the status of the tasks is not recomputed."))
 
     # Subparser for set_status command.
     p_set_status = subparsers.add_parser('set_status', parents=[copts_parser, flow_selector_parser],
@@ -815,6 +818,16 @@ def main():
         # without knowing its node id. flowdir_wname_tname will solve the problem!
         options.flowdir, wname, tname = flowdir_wname_tname(options.flowdir)
 
+    if options.command == "status" and options.fast and not (wname or tname):
+        # Read-only view built from the JSON index and the journal. Don't need to unpickle the flow.
+        from abipy.flowtk.journal import FlowStatusView
+        view = FlowStatusView.from_flowdir(options.flowdir)
+        if options.summary:
+            view.show_summary()
+        else:
+            view.show_status(verbose=options.verbose, nids=options.nids)
+        return 0
+
     # Read the flow from the pickle database.
     flow = flowtk.Flow.pickle_load(options.flowdir, remove_lock=options.remove_lock)
 
@@ -226,6 +226,249 @@ def lorentzian(x, width, center=0.0, height=None):
 
     return height * width**2 / ((x - center) ** 2 + width ** 2)
 
+
+def gaussian_binned(mesh, width, centers, weights=None, ntrunc=6):
+    """
+    Compute the sum of normalized gaussians, :math:`\\sum_i w_i g(x - c_i)`, on a linear mesh.
+    The weighted centers are linearly interpolated on the mesh points and the histogram
+    is convolved with the gaussian kernel truncated at ``ntrunc * width``.
+    The cost is O(N + nw log nw) instead of the O(N * nw) required by summing N gaussians.
+    The variance of the kernel is reduced to compensate for the broadening
+    introduced by the linear binning so that the results agree with
+    the explicit sum of gaussians to within O((step / width)^4).
+
+    Args:
+        mesh: Linear mesh.
+        width: Standard deviation of the gaussian.
+        centers: Array-like with the centers of the gaussians.
+        weights: Weights of the gaussians. Must be broadcastable to ``centers``. None for unit weights.
+        ntrunc: The gaussian kernel is truncated at ``ntrunc * width``.
+
+    Return: Array with the values on the mesh.
+    """
+    import scipy.signal
+    mesh = np.asarray(mesh)
+    nw = len(mesh)
+    if nw < 2:
+        raise ValueError("Mesh should contain at least two points.")
+    step = mesh[1] - mesh[0]
+    if step <= 0 or not np.allclose(np.diff(mesh), step, rtol=1e-6, atol=0.0):
+        raise ValueError("gaussian_binned requires a linear mesh in increasing order.")
+
+    centers = np.asarray(centers, dtype=np.float)
+    weights = np.ones(centers.size) if weights is None else \
+              np.broadcast_to(np.asarray(weights, dtype=np.float), centers.shape).ravel()
+    centers = centers.ravel()
+
+    # Pad the mesh so that the tails of the gaussians centered outside the mesh are included.
+    npad = int(np.ceil(ntrunc * width / step))
+    ntot = nw + 2 * npad
+    x = (centers - mesh[0]) / step + npad
+    i0 = np.floor(x).astype(np.int)
+    mask = (i0 >= 0) & (i0 < ntot - 1)
+    i0, frac, weights = i0[mask], x[mask] - i0[mask], weights[mask]
+    hist = np.bincount(i0, weights=weights * (1 - frac), minlength=ntot) + \
+           np.bincount(i0 + 1, weights=weights * frac, minlength=ntot)
+
+    # Linear binning convolves with a triangle whose variance is step**2 / 6.
+    sigma2 = width ** 2 - step ** 2 / 6
+    kernel = np.zeros(2 * npad + 1)
+    if sigma2 > 0:
+        kernel = np.exp(-(np.arange(-npad, npad + 1) * step) ** 2 / (2 * sigma2))
+    else:
+        # Width smaller than the step: the histogram is the best we can do.
+        kernel[npad] = 1.0
+    kernel /= kernel.sum() * step
+
+    return scipy.signal.convolve(hist, kernel, mode="valid")
+
+
+def simpson_weights(x):
+    """
+    Return the weights ``w`` such that ``np.dot(w, y)`` gives the integral of y computed
+    with the composite Simpson's rule on the mesh ``x`` (same algorithm as scipy.integrate.simps
+    with even="avg"). Useful to integrate many functions defined on the same mesh with a matrix product.
+    """
+    x = np.asarray(x, dtype=np.float)
+    n = len(x)
+    if n < 2:
+        raise ValueError("Mesh should contain at least two points.")
+    h = np.diff(x)
+
+    def basic(start, stop):
+        # Simpson's rule for irregular spacing on the points [start, stop] (odd number of points)
+        w = np.zeros(n)
+        h0, h1 = h[start:stop:2], h[start+1:stop:2]
+        hsum = h0 + h1
+        idx = np.arange(start, stop - 1, 2)
+        np.add.at(w, idx, hsum / 6 * (2 - h1 / h0))
+        np.add.at(w, idx + 1, hsum / 6 * hsum ** 2 / (h0 * h1))
+        np.add.at(w, idx + 2, hsum / 6 * (2 - h0 / h1))
+        return w
+
+    if n % 2 == 1:
+        return basic(0, n - 1)
+
+    # Even number of points: average of Simpson on the first n-1 points + trapezoidal rule on the last interval
+    # and trapezoidal rule on the first interval + Simpson on the last n-1 points.
+    w = basic(0, n - 2) + basic(1, n - 1)
+    w[-2:] += 0.5 * h[-1]
+    w[:2] += 0.5 * h[0]
+    return w / 2
+
+
+def _hilbert_hat(k):
+    """
+    Integral of the hat function centered at k (unit step) times 1/t (principal value).
+    Series expansion for large ``|k|`` to avoid cancellation errors.
+    """
+    k = np.asarray(k, dtype=np.float)
+    out = np.empty(k.shape)
+    big = np.abs(k) > 20
+    kb = k[big]
+    out[big] = 1 / kb + 1 / (6 * kb ** 3) + 1 / (15 * kb ** 5) + 1 / (28 * kb ** 7) + 1 / (45 * kb ** 9)
+
+    def xlogx(x):
+        ax = np.abs(x)
+        return x * np.log(np.where(ax > 0, ax, 1))
+
+    ks = k[~big]
+    out[~big] = xlogx(ks + 1) - 2 * xlogx(ks) + xlogx(ks - 1)
+    return out
+
+
+def _hilbert_halfhat(k):
+    """
+    Integral of the right half of the hat function centered at k (unit step) times 1/t.
+    The logarithmic divergence for k == 0 is dropped (finite part).
+    """
+    k = np.asarray(k, dtype=np.float)
+    out = np.empty(k.shape)
+    big = np.abs(k) > 20
+    kb = k[big]
+    out[big] = sum((-1) ** n / ((n + 1) * (n + 2) * kb ** (n + 1)) for n in range(10))
+
+    def log_abs(x):
+        ax = np.abs(x)
+        return np.log(np.where(ax > 0, ax, 1))
+
+    ks = k[~big]
+    out[~big] = (1 + ks) * (log_abs(1 + ks) - log_abs(ks)) - 1
+    return out
+
+
+def _hilbert_pair(mesh, values):
+    """
+    Compute :math:`A(x) = P\int g(y) / (y - x) dy` and :math:`B(x) = \int g(y) / (y + x) dy`
+    on a linear mesh with x >= 0. g is linearly interpolated between the mesh points
+    and the integrals are computed exactly with FFT convolutions. Batches along the leading axes.
+    """
+    import scipy.signal
+    mesh = np.asarray(mesh)
+    nw = len(mesh)
+    if nw < 2:
+        raise ValueError("Mesh should contain at least two points.")
+    step = mesh[1] - mesh[0]
+    if step <= 0 or not np.allclose(np.diff(mesh), step, rtol=1e-6, atol=0.0):
+        raise ValueError("Kramers-Kronig transform requires a linear mesh in increasing order.")
+    if mesh[0] < -1e-8 * step:
+        raise ValueError("Kramers-Kronig transform requires a mesh with non-negative frequencies.")
+
+    g = np.asarray(values)
+    if g.shape[-1] != nw:
+        raise ValueError("Last dimension of values should be equal to the number of mesh points.")
+    bshape = (1,) * (g.ndim - 1) + (-1,)
+    d = max(2 * mesh[0] / step, 0.0)
+    m = np.arange(2 * nw - 1)
+    i = np.arange(nw)
+    g0, gn = g[..., :1], g[..., -1:]
+
+    # A_i = sum_j g_j F(j - i) is a convolution, B_i = sum_j g_j F(i + j + d) is a convolution with reversed g.
+    # The first and the last point contribute with half of the hat function.
+    a = scipy.signal.fftconvolve(g, _hilbert_hat(nw - 1 - m).reshape(bshape), axes=-1)[..., nw-1:2*nw-1]
+    a += g0 * _hilbert_halfhat(i) - gn * _hilbert_halfhat(nw - 1 - i)
+
+    b = scipy.signal.fftconvolve(g[..., ::-1], _hilbert_hat(m + d).reshape(bshape), axes=-1)[..., nw-1:2*nw-1]
+    b += g0 * _hilbert_halfhat(-(i + d)) - gn * _hilbert_halfhat(nw - 1 + i + d)
+
+    return a, b
+
+
+def _hilbert_tail(mesh, values, tail):
+    """
+    Contribution to the integrals A and B computed by :func:`_hilbert_pair` given by the region y > W
+    where W is the last point of the mesh and g(y) = g(W) (W/y)^tail.
+    The logarithmic divergence for x == W is treated as in _hilbert_pair so that the sum is finite.
+    """
+    from scipy.special import hyp2f1, digamma
+    if tail <= 0:
+        raise ValueError("The exponent of the tail should be positive while it is %s" % str(tail))
+    mesh = np.asarray(mesh)
+    wmax, step = mesh[-1], mesh[1] - mesh[0]
+    gn = np.asarray(values)[..., -1:]
+
+    # int_W^inf (W/y)^p / (y -+ x) dy = int_0^1 t^(p-1) / (1 -+ u t) dt with u = x / W.
+    u = mesh / wmax
+    at = np.empty(len(mesh))
+    inside = u < 1 - 1e-12
+    at[inside] = hyp2f1(1, tail, tail + 1, u[inside]) / tail
+    # Finite part for x == W plus the divergence of the tail that cancels the one dropped in _hilbert_pair.
+    at[~inside] = digamma(1) - digamma(tail) + np.log(wmax / step)
+    bt = hyp2f1(1, tail, tail + 1, -u) / tail
+
+    return gn * at, gn * bt
+
+
+def kk_real_from_imag(mesh, imag_values, tail=None):
+    """
+    Kramers-Kronig transform giving the real part of a response function from the imaginary part
+    given on a linear mesh of non-negative frequencies:
+    :math:`Re(w) = \dfrac{2}{\pi} P\int_0^\infty \dfrac{w' Im(w')}{w'^2 - w^2} dw'`.
+
+    The imaginary part is linearly interpolated between the mesh points and the principal value
+    is computed with FFT convolutions so that the cost is O(N log N).
+    ``imag_values`` can have extra leading dimensions (e.g. tensor components) that are treated as a batch.
+
+    Args:
+        mesh: Linear mesh with non-negative frequencies.
+        imag_values: Imaginary part on the mesh.
+        tail: Exponent p > 0 used to extrapolate the imaginary part beyond the last point W of the mesh
+            with the power law Im(W) (W/w)^p (e.g. 3 for a Lorentz oscillator). The contribution of the tail
+            is computed analytically. If None, the integral is truncated at W. The error is then of order
+            Im(W) log(W / (W - w)) / pi and it is large close to the end of the mesh unless Im(W) is negligible.
+
+    Return: Array with the same shape as imag_values.
+    """
+    a, b = _hilbert_pair(mesh, imag_values)
+    if tail is not None:
+        at, bt = _hilbert_tail(mesh, imag_values, tail)
+        a += at
+        b += bt
+    return (a + b) / np.pi
+
+
+def kk_imag_from_real(mesh, real_values, tail=None):
+    """
+    Kramers-Kronig transform giving the imaginary part of a response function from the real part
+    given on a linear mesh of non-negative frequencies:
+    :math:`Im(w) = -\dfrac{2 w}{\pi} P\int_0^\infty \dfrac{Re(w')}{w'^2 - w^2} dw'`.
+    See :func:`kk_real_from_imag`.
+
+    Args:
+        mesh: Linear mesh with non-negative frequencies.
+        real_values: Real part on the mesh. Must vanish at high frequency (e.g. eps - 1).
+        tail: Exponent p > 0 used to extrapolate the real part beyond the last point of the mesh
+            (e.g. 2 for a Lorentz oscillator). If None, the integral is truncated at the last point.
+
+    Return: Array with the same shape as real_values.
+    """
+    a, b = _hilbert_pair(mesh, real_values)
+    if tail is not None:
+        at, bt = _hilbert_tail(mesh, real_values, tail)
+        a += at
+        b += bt
+    return -(a - b) / np.pi
+
 #=====================================
 # === Data Interpolation/Smoothing ===
 #=====================================
@@ -67,3 +67,69 @@ class TestNumTools(AbipyTest):
 
         assert lorentzian(x=0.0, width=1.0, center=0.0, height=1.0) == 1.0
         self.assert_almost_equal(lorentzian(x=0.0, width=1.0, center=0.0, height=None), 1/np.pi)
+
+        # Binned gaussians should reproduce the explicit sum of gaussians.
+        rng = np.random.RandomState(0)
+        centers, weights = rng.uniform(-5, 5, size=(10, 30)), rng.uniform(0, 1, size=(10, 30))
+        mesh = np.arange(-4, 4, 0.05)
+        ref = np.zeros(len(mesh))
+        for c, w in zip(centers.ravel(), weights.ravel()):
+            ref += w * gaussian(mesh, 0.2, center=c)
+        values = gaussian_binned(mesh, 0.2, centers, weights=weights)
+        assert values.shape == mesh.shape
+        assert np.abs(values - ref).max() < 5e-3 * ref.max()
+        self.assert_almost_equal(gaussian_binned(mesh, 0.2, [0.0]), gaussian(mesh, 0.2), decimal=2)
+        with self.assertRaises(ValueError):
+            gaussian_binned(mesh ** 2, 0.2, centers)
+
+    def test_simpson_weights(self):
+        """Testing Simpson weights."""
+        from scipy.integrate import simps
+        rng = np.random.RandomState(0)
+        for n in (2, 3, 8, 11):
+            x = np.sort(rng.uniform(0, 3, size=n))
+            y = rng.uniform(size=(4, n))
+            self.assert_almost_equal(np.dot(y, simpson_weights(x)), simps(y, x=x, even="avg"))
+        with self.assertRaises(ValueError):
+            simpson_weights([1.0])
+
+    def test_kramers_kronig(self):
+        """Testing Kramers-Kronig transforms."""
+        # Lorentz oscillator: eps(w) - 1 = A / (w0^2 - w^2 - i gamma w)
+        mesh = np.linspace(0, 60, 6001)
+        eps = 4 / (3.0 ** 2 - mesh ** 2 - 0.5j * mesh)
+        inner = mesh < 20
+
+        re = kk_real_from_imag(mesh, eps.imag)
+        assert re.shape == mesh.shape
+        assert np.abs(re - eps.real)[inner].max() < 5e-3
+        im = kk_imag_from_real(mesh, eps.real)
+        assert np.abs(im - eps.imag)[inner].max() < 5e-3
+
+        # Batch of functions (e.g. tensor components) and mesh that does not start at zero.
+        tensor = np.array([eps.imag * i for i in range(6)]).reshape(2, 3, -1)
+        self.assert_almost_equal(kk_real_from_imag(mesh, tensor)[1, 2], 5 * re)
+        # The imaginary part of this oscillator is negligible below mesh[100].
+        eps = 4 / (10.0 ** 2 - mesh ** 2 - 0.5j * mesh)
+        self.assert_almost_equal(kk_real_from_imag(mesh[100:], eps.imag[100:]),
+                                 kk_real_from_imag(mesh, eps.imag)[100:], decimal=3)
+
+        # Truncated mesh: without the tail, the error is large close to the end of the mesh
+        # (the imaginary part at W = 20 is not negligible wrt the real part).
+        mesh = np.linspace(0, 20, 2001)
+        eps = 4 / (3.0 ** 2 - mesh ** 2 - 0.5j * mesh)
+        assert abs(kk_imag_from_real(mesh, eps.real)[-1] - eps.imag[-1]) > 1e-2
+        assert abs(kk_real_from_imag(mesh, eps.imag)[-1] - eps.real[-1]) > 1e-4
+        # Asymptotic tails of the Lorentz oscillator: Re ~ 1/w^2, Im ~ 1/w^3.
+        im = kk_imag_from_real(mesh, eps.real, tail=2)
+        re = kk_real_from_imag(mesh, eps.imag, tail=3)
+        assert np.abs(im - eps.imag)[-1] < 1e-4 and np.abs(im - eps.imag).max() < 1e-3
+        assert np.abs(re - eps.real)[-1] < 1e-5 and np.abs(re - eps.real).max() < 1e-3
+        self.assert_almost_equal(kk_real_from_imag(mesh, np.array([eps.imag, 2 * eps.imag]), tail=3)[1], 2 * re)
+        with self.assertRaises(ValueError):
+            kk_real_from_imag(mesh, eps.imag, tail=0)
+
+        with self.assertRaises(ValueError):
+            kk_real_from_imag(mesh ** 2, eps.imag)
+        with self.assertRaises(ValueError):
+            kk_imag_from_real(mesh - 1, eps.real)
@@ -254,10 +254,8 @@ class PWWaveFunction(WaveFunction):
         """
         space = space.lower()
 
-        if space == "g":
-            return np.real(np.vdot(self.ug, self.ug))
-        elif space == "gsphere":
-            return np.real(np.vdot(self.ug, self.ug))
+        if space in ("g", "gsphere"):
+            return np.real(self.gsphere.vdot(self.ug, self.ug))
         elif space == "r":
             return np.vdot(self.ur, self.ur) / self.mesh.size
         else:
@@ -283,7 +281,7 @@ class PWWaveFunction(WaveFunction):
             ug2_mesh = other.gsphere.tofftmesh(self.mesh, other.ug) if other is not self else ug1_mesh
             return np.vdot(ug1_mesh, ug2_mesh)
         elif space == "gsphere":
-            return np.vdot(self.ug, other.ug)
+            return self.gsphere.vdot(self.ug, other.ug)
         elif space == "r":
             return np.vdot(self.ur, other.ur) / self.mesh.size
         else:
@@ -84,6 +84,28 @@ class TestWFKFile(AbipyTest):
 
         wave.export_ur2(".xsf")
 
+        # Block API.
+        nb = wfk.nband_sk[spin, kpoint]
+        ug_block = wfk.get_ug_block(spin, kpoint)
+        assert ug_block.shape == (nb, wfk.nspinor, wave.npw)
+        self.assert_equal(ug_block[band + 1], other_wave.ug)
+        ur_block = wfk.get_ur_block(spin, kpoint, band_range=(band, band + 2), workers=2)
+        assert ur_block.shape == (2,) + wave.mesh.shape
+        self.assert_almost_equal(ur_block[0], wave.ur)
+        self.assert_almost_equal(ur_block[1], other_wave.ur)
+        with self.assertRaises(ValueError):
+            wfk.get_ur_block(spin, kpoint, band_range=(0, nb + 1))
+
+        # Stream all the k-points with a memory cap of one band.
+        max_mem_mb = 2 * 16 * wave.mesh.size / 1024**2
+        nblocks = 0
+        for s, ik, start, ur in wfk.iter_ur_blocks(max_mem_mb=max_mem_mb):
+            assert ur.shape == (1,) + wave.mesh.shape
+            if ik == kpoint and start == band + 1:
+                self.assert_almost_equal(ur[0], other_wave.ur)
+            nblocks += 1
+        assert nblocks == wfk.nband_sk.sum()
+
         if self.has_matplotlib():
             assert wave.plot_line(0, 1, num=100, show=False)
             assert wave.plot_line([0, 0, 0], [2, 2, 2], num=100, with_krphase=True, show=False)
@@ -1,6 +1,6 @@
 # coding: utf-8
 """Wavefunction file."""
-#import numpy as np
+import numpy as np
 
 from monty.functools import lazy_property
 from monty.string import marquee
@@ -155,6 +155,84 @@ class WfkFile(AbinitNcFile, Has_Header, Has_Structure, Has_ElectronBands, Notebo
 
         return wave
 
+    def _get_band_range(self, spin, ik, band_range):
+        """Return (start, stop) band indices. None means all the bands available for (spin, ik)."""
+        nband = self.nband_sk[spin, ik]
+        if band_range is None: band_range = (0, nband)
+        start, stop = band_range
+        if not (0 <= start < stop <= nband):
+            raise ValueError("Wrong band_range %s for spin: %d, ik: %d, nband: %d" % (str(band_range), spin, ik, nband))
+        return start, stop
+
+    def get_ug_block(self, spin, kpoint, band_range=None):
+        """
+        Read a block of wavefunctions with a single netcdf read.
+
+        Args:
+            spin: spin index.
+            kpoint: Either :class:`Kpoint` instance or integer giving the sequential index in the IBZ (C-convention).
+            band_range: (start, stop) band indices. None to read all bands.
+
+        Return:
+            Complex array of shape [nband, nspinor, npw] with u(G) on the G-sphere of the k-point.
+        """
+        ik = self.kindex(kpoint)
+        if spin not in range(self.nsppol) or ik not in range(self.nkpt):
+            raise ValueError("Wrong (spin, kpt) indices")
+        start, stop = self._get_band_range(spin, ik, band_range)
+        return self.reader.read_ug_block(spin, ik, start, stop)
+
+    def get_ur_block(self, spin, kpoint, band_range=None, mesh=None, workers=None):
+        """
+        Read a block of wavefunctions and compute u(r) with a single batched FFT.
+
+        Args:
+            spin: spin index.
+            kpoint: Either :class:`Kpoint` instance or integer giving the sequential index in the IBZ (C-convention).
+            band_range: (start, stop) band indices. None to read all bands.
+            mesh: |Mesh3D| object. If None, the FFT mesh reported in the WFK file is used.
+            workers: Number of threads used for the FFT (requires scipy.fft).
+
+        Return:
+            Complex array of shape [nband, nx, ny, nz] if nspinor == 1 else [nband, nspinor, nx, ny, nz].
+        """
+        ik = self.kindex(kpoint)
+        mesh = self.fft_mesh if mesh is None else mesh
+        ug = self.get_ug_block(spin, ik, band_range=band_range)
+        nb = ug.shape[0]
+
+        ug_mesh = self.gspheres[ik].tofftmesh(mesh, ug)
+        ug_mesh = np.reshape(ug_mesh, (nb, self.nspinor) + mesh.shape)
+        if self.nspinor == 1: ug_mesh = ug_mesh[:, 0]
+
+        return mesh.fft_g2r(ug_mesh, fg_ishifted=False, workers=workers)
+
+    def iter_ur_blocks(self, spin=None, mesh=None, max_mem_mb=256, workers=None):
+        """
+        Generator over the k-points in the file. Yields (spin, ik, band_start, ur)
+        where ur is the array returned by :meth:`get_ur_block`. The bands of each k-point
+        are split in blocks so that the memory required by a block does not exceed ``max_mem_mb``.
+
+        Args:
+            spin: Spin index. None to loop over all spins.
+            mesh: |Mesh3D| object. If None, the FFT mesh reported in the WFK file is used.
+            max_mem_mb: Memory cap in Mb for a single block.
+            workers: Number of threads used for the FFT (requires scipy.fft).
+        """
+        mesh = self.fft_mesh if mesh is None else mesh
+        # u(G) and u(r) on the FFT mesh are both allocated.
+        bytes_per_band = 2 * self.nspinor * mesh.size * np.dtype(np.complex).itemsize
+        bsize = max(1, int(max_mem_mb * 1024 ** 2 // bytes_per_band))
+
+        spins = range(self.nsppol) if spin is None else [spin]
+        for spin in spins:
+            for ik in range(self.nkpt):
+                nband = self.nband_sk[spin, ik]
+                for start in range(0, nband, bsize):
+                    stop = min(start + bsize, nband)
+                    ur = self.get_ur_block(spin, ik, band_range=(start, stop), mesh=mesh, workers=workers)
+                    yield spin, ik, start, ur
+
     def export_ur2(self, filepath, spin, kpoint, band, visu=None):
         """
         Export :math:`|u(r)|^2` on file filename.
@@ -381,3 +459,18 @@ class WFK_Reader(ElectronsReader):
         var = self.rootgrp.variables["coefficients_of_wavefunctions"]
         value = var[spin, ik, band, :, :npw_k, :]
         return value[..., 0] + 1j*value[..., 1]  # Build complex array
+
+    def read_ug_block(self, spin, kpoint, start, stop):
+        """
+        Read the Fourier components of the wavefunctions with band index in [start, stop)
+        Return complex array of shape [stop - start, nspinor, npw_k]
+        """
+        ik = self.kindex(kpoint)
+        npw_k = self.npwarr[ik]
+        if self.cplex_ug != 2:
+            raise NotImplementedError("")
+
+        # Read the block with a single hyperslab.
+        var = self.rootgrp.variables["coefficients_of_wavefunctions"]
+        value = var[spin, ik, start:stop, :, :npw_k, :]
+        return value[..., 0] + 1j*value[..., 1]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Benchmark the connection of the phonon bands based on the overlap of the eigenvectors
+(PhononBands.split_matched_indices) for a dense q-path interpolated in-process from the DDB.
+The results are compared with the greedy matching applied sequentially to each pair of q-points.
+The quality of the connection is measured by the sum of the second differences of the connected bands.
+
+Usage: bench_band_connection.py [NDIVSM]
+"""
+import sys
+import time
+import numpy as np
+import abipy.data as abidata
+
+from abipy.dfpt.ddb import DdbFile
+from abipy.dfpt.phtk import get_dyn_mat_eigenvec
+
+
+def greedy_match(v1, v2):
+    """Greedy matching based on the largest overlaps (previous implementation of match_eigenvectors)."""
+    prod = np.absolute(np.dot(v1, v2.transpose().conjugate()))
+    indices = np.zeros(len(v1), dtype=np.int)
+    missing_v1 = [True] * len(v1)
+    missing_v2 = [True] * len(v1)
+    for m in reversed(np.argsort(prod, axis=None)):
+        i, j = np.unravel_index(m, prod.shape)
+        if missing_v1[i] and missing_v2[j]:
+            indices[i] = j
+            missing_v1[i] = missing_v2[j] = False
+
+    return indices
+
+
+def greedy_matched_indices(phbands):
+    """Sequential greedy matching between consecutive points of each segment."""
+    split_matched_indices = []
+    for displ in phbands.split_phdispl_cart:
+        eigvecs = get_dyn_mat_eigenvec(displ, phbands.structure, amu=phbands.amu)
+        ind_block = np.zeros((len(displ), phbands.num_branches), dtype=np.int)
+        ind_block[0] = range(phbands.num_branches)
+        for j in range(1, len(displ)):
+            ind_block[j] = greedy_match(eigvecs[j - 1], eigvecs[j])[ind_block[j - 1]]
+        split_matched_indices.append(ind_block)
+
+    return split_matched_indices
+
+
+def roughness(phbands, split_matched_indices):
+    """Sum of the absolute second differences of the connected bands in meV."""
+    tot = 0.0
+    for freqs, ind in zip(phbands.split_phfreqs, split_matched_indices):
+        if len(freqs) > 2:
+            tot += np.abs(np.diff(np.take_along_axis(freqs, ind, axis=1), n=2, axis=0)).sum() * 1000
+
+    return tot
+
+
+def main():
+    ndivsm = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    with DdbFile(abidata.ref_file("refs/znse_phonons/ZnSe_hex_qpt_DDB")) as ddb:
+        phint = ddb.get_phonon_interpolator(ngqpt=[8, 8, 6])
+        phbands = phint.get_phbands_along_path(ndivsm=ndivsm)
+
+    print("nqpt: %d, num_branches: %d" % (phbands.nqpt, phbands.num_branches))
+    phbands.split_phdispl_cart
+
+    start = time.time()
+    legacy = greedy_matched_indices(phbands)
+    t_legacy = time.time() - start
+
+    start = time.time()
+    new = phbands.split_matched_indices
+    t_new = time.time() - start
+
+    print("greedy: %.3f (s), roughness: %.1f meV" % (t_legacy, roughness(phbands, legacy)))
+    print("global: %.3f (s), roughness: %.1f meV, speedup: %.1f" % (t_new, roughness(phbands, new), t_legacy / t_new))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
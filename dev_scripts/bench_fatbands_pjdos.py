@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Benchmark the computation of the L-projected DOS from the FATBANDS.nc reference file
+(time and peak memory allocated by python). The PJDOS accumulated by reading the weights
+in blocks of k-points is compared with the loop over states using the full array of weights.
+
+Usage: bench_fatbands_pjdos.py [MAX_BLOCK_NBYTES]
+"""
+import sys
+import time
+import tracemalloc
+import numpy as np
+import abipy.data as abidata
+
+from abipy.electrons import fatbands
+from abipy.electrons.fatbands import FatBandsFile
+from abipy.tools.numtools import gaussian
+
+
+def legacy_symbols_lso(fbfile, mesh, width):
+    """Previous implementation of _DosIntegrator.symbols_lso"""
+    ebands = fbfile.ebands
+    symbols_lso = {}
+    for symbol in fbfile.symbols:
+        lmax = fbfile.lmax_symbol[symbol]
+        wlsbk = fbfile.get_wl_symbol(symbol)
+        lso = np.zeros((fbfile.lsize, fbfile.nsppol, len(mesh)))
+        for spin in range(fbfile.nsppol):
+            for k, kpoint in enumerate(ebands.kpoints):
+                weight = kpoint.weight
+                for band in range(ebands.nband_sk[spin, k]):
+                    e = ebands.eigens[spin, k, band]
+                    for l in range(lmax + 1):
+                        lso[l, spin] += wlsbk[l, spin, band, k] * weight * gaussian(mesh, width, center=e)
+        symbols_lso[symbol] = lso
+
+    return symbols_lso
+
+
+def run(func):
+    """Return (output, time, peak memory in Mb)."""
+    tracemalloc.start()
+    start = time.time()
+    out = func()
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main():
+    if len(sys.argv) > 1:
+        fatbands.set_pjdos_max_block_nbytes(int(sys.argv[1]))
+
+    path = abidata.ref_file("mgb2_kmesh181818_FATBANDS.nc")
+    mesh, width = np.linspace(-15, 10, 2501), 0.1
+
+    with FatBandsFile(path) as fbfile:
+        legacy, t_legacy, m_legacy = run(lambda: legacy_symbols_lso(fbfile, mesh, width))
+
+    with FatBandsFile(path) as fbfile:
+        print("natom: %d, nkpt: %d, mband: %d, nw: %d" % (fbfile.natom, fbfile.nkpt, fbfile.mband, len(mesh)))
+        new, t_new, m_new = run(lambda: fbfile.get_symbols_pjdos(mesh, width))
+
+    err = max(np.abs(legacy[s] - new[s]).max() for s in legacy)
+    print("loop over states: %.2f (s), %.1f (Mb)" % (t_legacy, m_legacy))
+    print("blocks of k-points: %.3f (s), %.1f (Mb), speedup: %.1f, max abs diff: %.1e" % (
+          t_new, m_new, t_legacy / t_new, err))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Benchmark the scheduler overhead (selection of runnable tasks, status queries and deadlock detection)
+for a synthetic flow with many tasks. The results obtained with the dependency-graph index
+of the flow (Flow.dag) are compared with the linear scans over all the tasks.
+
+Usage: bench_flow_dag.py [NTASKS] [NCYCLES]
+"""
+import sys
+import time
+import tempfile
+import abipy.data as abidata
+
+from abipy import abilab
+from abipy import flowtk
+
+
+MANAGER = """\
+qadapters:
+    - priority: 1
+      queue: {qtype: shell, qname: localhost}
+      job: {mpi_runner: mpirun}
+      limits: {timelimit: "1:00:00", max_cores: 2}
+      hardware: {num_nodes: 1, sockets_per_node: 1, cores_per_socket: 2, mem_per_node: 4 Gb}
+"""
+
+
+def build_flow(ntasks, ntasks_per_work=10):
+    """
+    Flow with ntasks. Task i of work w depends on task i of work w - 1 so that
+    the tasks are released progressively by the dependencies.
+    """
+    inp = abilab.AbinitInput(structure=abidata.cif_file("si.cif"), pseudos=abidata.pseudos("14si.pspnc"))
+    inp.set_vars(ecut=4, nband=4, ngkpt=[2, 2, 2], shiftk=[0, 0, 0])
+    manager = flowtk.TaskManager.from_string(MANAGER)
+
+    flow = flowtk.Flow(workdir=tempfile.mkdtemp(), manager=manager)
+    prev_work = None
+    for w in range(ntasks // ntasks_per_work):
+        work = flowtk.Work()
+        for i in range(ntasks_per_work):
+            deps = None if prev_work is None else {prev_work[i]: "DEN"}
+            work.register_scf_task(inp, deps=deps)
+        flow.register_work(work)
+        prev_work = work
+
+    return flow.allocate()
+
+
+def set_status(task, status):
+    """Change the status without executing the callbacks."""
+    old_status = task.status
+    task._status = status
+    task._update_flow_dag(old_status)
+
+
+def legacy_cycle(flow):
+    """Queries performed by the scheduler in one cycle with linear scans."""
+    runnables = []
+    for work in flow:
+        runnables.extend(work.fetch_alltasks_to_run())
+
+    nqjobs = len([t for t in flow.iflat_tasks() if t.status == t.S_RUN])
+    nqjobs += len([t for t in flow.iflat_tasks() if t.status == t.S_SUB])
+
+    err_tasks = [t for t in flow.iflat_tasks() if t.status in (t.S_ERROR, t.S_QCRITICAL, t.S_ABICRITICAL)]
+    deadlocked = []
+    if err_tasks:
+        for task in flow.iflat_tasks():
+            if any(task.depends_on(err_task) for err_task in err_tasks):
+                deadlocked.append(task)
+
+    return runnables, nqjobs, deadlocked
+
+
+def dag_cycle(flow):
+    """Queries performed by the scheduler in one cycle with the index."""
+    runnables = flow.fetch_alltasks_to_run()
+    nqjobs = len(list(flow.iflat_tasks(status=flow.S_RUN))) + len(list(flow.iflat_tasks(status=flow.S_SUB)))
+    g = flow.find_deadlocks()
+    return runnables, nqjobs, g.deadlocked
+
+
+def main():
+    ntasks = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    ncycles = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    start = time.time()
+    flow = build_flow(ntasks)
+    print("Built flow with %d tasks in %.1f (s)" % (flow.num_tasks, time.time() - start))
+
+    start = time.time()
+    print(flow.dag)
+    print("Built index in %.2f (s)" % (time.time() - start))
+
+    # One errored task in the first work.
+    set_status(flow[0][0], flow.S_ERROR)
+
+    t_legacy, t_dag = 0.0, 0.0
+    for cycle in range(ncycles):
+        start = time.time()
+        legacy = legacy_cycle(flow)
+        t_legacy += time.time() - start
+
+        start = time.time()
+        new = dag_cycle(flow)
+        t_dag += time.time() - start
+
+        # Deadlocked tasks are now computed with a reachability pass (includes indirect dependencies).
+        assert new[0] == legacy[0] and new[1] == legacy[1]
+        assert set(legacy[2]).issubset(set(new[2]))
+
+        # Simulate the scheduler: submit 100 tasks, complete the running ones.
+        for task in list(flow.iflat_tasks(status=flow.S_RUN)):
+            set_status(task, flow.S_OK)
+        for task in list(flow.iflat_tasks(status=flow.S_SUB)):
+            set_status(task, flow.S_RUN)
+        for task in new[0][:100]:
+            set_status(task, flow.S_SUB)
+
+    print("ncycles: %d, linear scans: %.3f (s/cycle), index: %.4f (s/cycle), speedup: %.1f" % (
+          ncycles, t_legacy / ncycles, t_dag / ncycles, t_legacy / t_dag))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Benchmark the Kramers-Kronig transforms of Function1D: FFT convolutions vs quadrature.
+The real part of a Lorentz oscillator is computed from the imaginary part and compared
+with the analytical result.
+
+Usage: bench_kramers_kronig.py [NPTS]
+"""
+import sys
+import time
+import numpy as np
+
+from abipy.core.func1d import Function1D
+from abipy.tools.numtools import kk_real_from_imag
+
+
+def main():
+    npts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    mesh = np.linspace(0, 40, npts)
+    chi = Function1D(mesh, 4 / (3.0 ** 2 - mesh ** 2 - 0.5j * mesh))
+    inner = mesh < 20
+
+    for method in ("fft", "quad"):
+        start = time.time()
+        re = chi.real_from_kk(method=method)
+        print("method: %s, npts: %d, time: %.3f (s), max error: %.2e" % (
+              method, npts, time.time() - start, np.abs(re.values - chi.values.real)[inner].max()))
+
+    # Batch with the 9 components of a tensor on a large mesh.
+    mesh = np.linspace(0, 400, 100 * npts)
+    values = np.tile((4 / (3.0 ** 2 - mesh ** 2 - 0.5j * mesh)).imag, (3, 3, 1))
+    start = time.time()
+    kk_real_from_imag(mesh, values)
+    print("fft batch: shape: %s, time: %.3f (s)" % (str(values.shape), time.time() - start))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+Benchmark the in-process Fourier interpolation of the dynamical matrix (PhononInterpolator)
+for the phonon DOS computed with different q-meshes. If anaddb is available, the results
+are compared with the timing of anacompare_phdos executed with anaddb.
+
+Usage: bench_phonon_interpolator.py [NQSMALL ...]
+"""
+import sys
+import time
+import abipy.data as abidata
+
+from monty.os.path import which
+from abipy.dfpt.ddb import DdbFile
+
+
+def main():
+    nqsmalls = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [4, 8, 12, 16]
+
+    with DdbFile(abidata.ref_file("refs/znse_phonons/ZnSe_hex_qpt_DDB")) as ddb:
+        start = time.time()
+        phint = ddb.get_phonon_interpolator(ngqpt=[8, 8, 6])
+        print("Computed IFCs in %.2f (s)" % (time.time() - start))
+
+        for nqsmall in nqsmalls:
+            start = time.time()
+            phbands = phint.get_phbands_on_mesh(nqsmall=nqsmall)
+            print("nqsmall: %d, nqbz: %d, interpolation: %.2f (s)" % (nqsmall, phbands.nqpt, time.time() - start))
+
+        start = time.time()
+        ddb.anacompare_phdos(nqsmalls, ngqpt=[8, 8, 6], dos_method="gaussian", use_anaddb=False)
+        t_native = time.time() - start
+        print("anacompare_phdos without anaddb: %.2f (s)" % t_native)
+
+        if which("anaddb") is not None:
+            start = time.time()
+            ddb.anacompare_phdos(nqsmalls, ngqpt=[8, 8, 6], dos_method="gaussian", use_anaddb=True)
+            t_anaddb = time.time() - start
+            print("anacompare_phdos with anaddb: %.2f (s), speedup: %.1f" % (t_anaddb, t_anaddb / t_native))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Benchmark the harmonic thermodynamic properties computed from the phonon DOSes
+of the QHA reference files for a large temperature mesh and the thermal displacement tensors.
+
+Usage: bench_phonon_thermo.py [NTEMP]
+"""
+import sys
+import os
+import time
+import numpy as np
+import abipy.data as abidata
+
+from abipy import abilab
+from abipy.dfpt.phonons import get_harmonic_thermo, stack_phdos_weights
+
+
+def main():
+    ntemp = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    dirpath = os.path.join(abidata.dirpath, "refs", "si_qha")
+    paths = [os.path.join(dirpath, "mp-149_{:+d}_PHDOS.nc".format(s)) for s in [-4, -2, 0, 2, 4, 6]]
+
+    phdoses = []
+    for path in paths:
+        with abilab.abiopen(path) as ncfile:
+            phdoses.append(ncfile.phdos)
+            msqd_dos = ncfile.msqd_dos
+
+    tmesh = np.linspace(0, 1000, ntemp)
+    start = time.time()
+    wmesh, weights = stack_phdos_weights(phdoses)
+    thermo = get_harmonic_thermo(wmesh, weights, tmesh)
+    print("nvols: %d, ntemp: %d, nw: %d, thermo: %.3f (s)" % (len(phdoses), ntemp, wmesh.shape[1], time.time() - start))
+
+    start = time.time()
+    msq = msqd_dos.get_msq_tmesh(tmesh)
+    print("natom: %d, ntemp: %d, msq tensors: %.3f (s)" % (len(msqd_dos.structure), ntemp, time.time() - start))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Benchmark the construction of the QP results (list of QP states and dataframe with all the states)
+for the SIGEPH and SIGRES reference files. The bulk readers (read_allqps_arrays) are compared
+with the loops over (spin, k-point, band) calling read_qp for each state.
+
+Usage: bench_qp_readers.py [NREPEAT]
+"""
+import sys
+import time
+import pandas as pd
+import abipy.data as abidata
+
+from abipy import abilab
+
+
+def legacy_allqps(reader, kpoints, bstart_sk, bstop_sk):
+    """Loop over the states calling read_qp (previous implementation of read_allqps)."""
+    qps = []
+    for spin in range(reader.nsppol):
+        for ik, kpoint in enumerate(kpoints):
+            for band in range(bstart_sk[spin, ik], bstop_sk[spin, ik]):
+                qps.append(reader.read_qp(spin, kpoint, band))
+
+    return qps
+
+
+def timeit(func, nrepeat, reader):
+    """Average time of func (cached arrays are removed before each call)."""
+    start = time.time()
+    for i in range(nrepeat):
+        reader.__dict__.pop("_allqps_arrays", None)
+        out = func()
+    return (time.time() - start) / nrepeat, out
+
+
+def main():
+    nrepeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    with abilab.abiopen(abidata.ref_file("diamond_444q_SIGEPH.nc")) as sigeph:
+        r = sigeph.reader
+        kpoints = list(range(r.nkcalc))
+        t_legacy, qps = timeit(lambda: legacy_allqps(r, kpoints, r.bstart_sk, r.bstop_sk), nrepeat, r)
+        t_new, _ = timeit(lambda: r.read_allqps(), nrepeat, r)
+        print("SIGEPH nstates: %d, QP states with read_qp: %.4f (s), read_allqps: %.4f (s), speedup: %.1f" % (
+              len(qps), t_legacy, t_new, t_legacy / t_new))
+
+        t_legacy, _ = timeit(lambda: pd.concat([qp.get_dataframe(params=sigeph.params) for qp in
+                             legacy_allqps(r, kpoints, r.bstart_sk, r.bstop_sk)]), nrepeat, r)
+        t_new, _ = timeit(lambda: sigeph.get_dataframe(), nrepeat, r)
+        print("SIGEPH dataframe, per-state: %.4f (s), bulk: %.4f (s), speedup: %.1f" % (
+              t_legacy, t_new, t_legacy / t_new))
+
+    with abilab.abiopen(abidata.ref_file("si_g0w0ppm_nband30_SIGRES.nc")) as sigres:
+        r = sigres.reader
+        t_legacy, qps = timeit(lambda: legacy_allqps(r, r.gwkpoints, r.gwbstart_sk, r.gwbstop_sk), nrepeat, r)
+        t_new, _ = timeit(lambda: r.read_allqps(), nrepeat, r)
+        print("SIGRES nstates: %d, QP states with read_qp: %.4f (s), read_allqps: %.4f (s), speedup: %.1f" % (
+              len(qps), t_legacy, t_new, t_legacy / t_new))
+
+        t_legacy, _ = timeit(lambda: pd.DataFrame([dict(qp.as_dict(), **sigres.params) for qp in
+                             legacy_allqps(r, r.gwkpoints, r.gwbstart_sk, r.gwbstop_sk)]), nrepeat, r)
+        t_new, _ = timeit(lambda: sigres.get_dataframe(), nrepeat, r)
+        print("SIGRES dataframe, per-state: %.4f (s), bulk: %.4f (s), speedup: %.1f" % (
+              t_legacy, t_new, t_legacy / t_new))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Benchmark the blocked version of SkwInterpolator.interp_kpts against the loop over k-points.
+
+Usage: bench_skw.py [NKPT] [MAX_MEM_MB]
+"""
+import sys
+import time
+import numpy as np
+import abipy.data as abidata
+
+from abipy.abilab import abiopen
+from abipy.core.skw import SkwInterpolator
+
+
+def main():
+    nkpt = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_mem_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 256
+
+    with abiopen(abidata.ref_file("si_scf_GSR.nc")) as gsr:
+        structure, ebands = gsr.structure, gsr.ebands
+        kcoords = [k.frac_coords for k in ebands.kpoints]
+        cell = (structure.lattice.matrix, structure.frac_coords, structure.atomic_numbers)
+        abispg = structure.abi_spacegroup
+        fm_symrel = [s for (s, afm) in zip(abispg.symrel, abispg.symafm) if afm == 1]
+        skw = SkwInterpolator(10, kcoords, ebands.eigens, ebands.fermie, ebands.nelect, cell,
+                              fm_symrel, True, filter_params=None, verbose=0)
+
+    kpts = np.random.rand(nkpt, 3)
+    for dk1, dk2 in [(False, False), (True, False), (True, True)]:
+        start = time.time()
+        ref = skw.interp_kpts(kpts, dk1=dk1, dk2=dk2, blocked=False)
+        t_loop = time.time() - start
+
+        start = time.time()
+        res = skw.interp_kpts(kpts, dk1=dk1, dk2=dk2, blocked=True, max_mem_mb=max_mem_mb)
+        t_block = time.time() - start
+
+        err = np.abs(res.eigens - ref.eigens).max()
+        if dk1: err = max(err, np.abs(res.dedk - ref.dedk).max())
+        if dk2: err = max(err, np.abs(res.dedk2 - ref.dedk2).max())
+        print("nkpt: %d, dk1: %s, dk2: %s, loop: %.3f (s), blocked: %.3f (s), speedup: %.1f, max_err: %.2e" % (
+              nkpt, dk1, dk2, t_loop, t_block, t_loop / t_block, err))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())